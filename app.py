@@ -1,16 +1,9 @@
 from app import create_app
-import os 
-from dotenv import load_dotenv
-from app import db
-
-load_dotenv() 
+import os
 
+# El esquema de la base se crea aparte: flask --app app init-db
 app = create_app()
 
-# Asegúrate de que db.create_all() se ejecute dentro del contexto de la aplicación
-with app.app_context():
-    db.create_all()
-
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 8000))  # Usa el puerto definido en .env o 5000 por defecto
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=True)
@@ -1,11 +1,22 @@
 import os
-from flask import Flask, Blueprint, request, has_request_context
+import time
+from flask import Flask, Blueprint, request
 from flask_restx import Api
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
-from .config.database_config import get_database_config, get_database_uri, setup_database_events
+from .config.serving import sse_connection_limit
+from .config.database_config import (
+    get_database_config, get_database_uri, setup_database_events, init_query_instrumentation, collect_pool_stats,
+    init_db_command,
+)
+from .utils.metrics import metrics, init_metrics
+from .utils.profiler import init_profiler
+from .utils.compression import COMPRESSIBLE_MIMETYPES, init_compression
+from .utils.tracing import init_tracing, instrument_representations
+from .utils.response_cache import init_response_cache
+from .utils.event_stream import init_event_stream
 
 
 # Create the SQLAlchemy object
@@ -15,16 +26,19 @@ mailsender = Mail()
 
 
 # Create the Flask-RESTX API object
-from app.config.api_config import api
+from app.config.api_config import api, precompute_specs
 
 def create_app():
-    app = Flask(__name__)
+    started = time.perf_counter()
+    # Las plantillas de mail están en app/template
+    app = Flask(__name__, template_folder='template')
 
     load_dotenv()
 
     # Configuración específica para pruebas
     if app.config.get('TESTING') or os.environ.get('TESTING'):
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        # TEST_DATABASE_URL permite usar un archivo SQLite (p. ej. pruebas de carga con varios hilos)
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('TEST_DATABASE_URL', 'sqlite:///:memory:')
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
         # Usar clave fija para tests
         app.config['JWT_SECRET_KEY'] = 'testing-secret-key-for-tests-only'
@@ -34,9 +48,6 @@ def create_app():
         app.config['SQLALCHEMY_DATABASE_URI'] = get_database_uri()
         app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_database_config()
         
-        # Configurar eventos de base de datos para monitoreo
-        setup_database_events()
-        
         # Configuración de JWT con clave secreta fija
         jwt_secret_key = os.getenv('JWT_SECRET_KEY')
         if not jwt_secret_key:
@@ -49,6 +60,75 @@ def create_app():
         app.config['JWT_SECRET_KEY'] = jwt_secret_key
 
     db.init_app(app)
+    # El esquema se crea con `flask --app app init-db`, no al arrancar cada worker
+    app.cli.add_command(init_db_command)
+
+    # --- PROFILER ---
+    # Primero que el resto de los hooks, para que el perfil los incluya
+    app.config['PROFILER_SECRET'] = os.getenv('PROFILER_SECRET')
+    app.config['PROFILER_SAMPLE_RATE'] = float(os.getenv('PROFILER_SAMPLE_RATE') or 0)
+    app.config['PROFILER_DIR'] = os.getenv('PROFILER_DIR') or os.path.join(os.getcwd(), 'profiles')
+    app.config['PROFILER_MAX_FILES'] = int(os.getenv('PROFILER_MAX_FILES') or 200)
+    init_profiler(app)
+
+    # --- TRACING ---
+    # Spans por request (queries, commits, API de distancias, analytics, serialización)
+    app.config['TRACING_EXPORTER'] = os.getenv('TRACING_EXPORTER')
+    app.config['TRACING_FILE'] = os.getenv('TRACING_FILE') or 'traces.jsonl'
+    app.config['TRACING_OTLP_ENDPOINT'] = os.getenv('TRACING_OTLP_ENDPOINT')
+    app.config['TRACING_SAMPLE_RATE'] = float(os.getenv('TRACING_SAMPLE_RATE') or 1.0)
+    init_tracing(app)
+
+    # Configurar eventos de base de datos para monitoreo (conteo y tiempo de queries por request)
+    app.config['SERVER_TIMING_ENABLED'] = os.getenv('SERVER_TIMING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    setup_database_events()
+    init_query_instrumentation(app)
+
+    # --- MÉTRICAS ---
+    # Se registra después de la instrumentación de queries: los after_request corren
+    # en orden inverso, así el histograma de queries por request ve las estadísticas
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+    init_metrics(app)
+    metrics.register_collector('db_pool', collect_pool_stats)
+
+    # --- COMPRESIÓN ---
+    # gzip/brotli según Accept-Encoding; después de métricas para que la latencia la incluya
+    app.config['COMPRESSION_ENABLED'] = os.getenv('COMPRESSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    app.config['COMPRESSION_MIN_SIZE'] = int(os.getenv('COMPRESSION_MIN_SIZE') or 1024)
+    app.config['COMPRESSION_LEVEL'] = int(os.getenv('COMPRESSION_LEVEL') or 6)
+    app.config['COMPRESSION_BROTLI_QUALITY'] = int(os.getenv('COMPRESSION_BROTLI_QUALITY') or 4)
+    app.config['COMPRESSION_MIMETYPES'] = COMPRESSIBLE_MIMETYPES
+    init_compression(app)
+
+    # --- CACHÉ DE RESPUESTAS ---
+    # GET de lectura por owner; se invalida por tags al commitear escrituras.
+    # local = LRU del proceso (un solo worker); resp = store compartido en RESPONSE_CACHE_URL
+    app.config['RESPONSE_CACHE_BACKEND'] = (os.getenv('RESPONSE_CACHE_BACKEND') or 'local').lower()
+    app.config['RESPONSE_CACHE_URL'] = os.getenv('RESPONSE_CACHE_URL')
+    app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL') or 300)
+    app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES') or 2048)
+    init_response_cache(app)
+
+    # --- ESTADÍSTICAS DE MANTENIMIENTO ---
+    # GET /Maintenance/stats por owner: caché en memoria del proceso, invalidada al commitear
+    app.config['MAINTENANCE_STATS_CACHE_TTL'] = int(os.getenv('MAINTENANCE_STATS_CACHE_TTL') or 30)
+    from .models.maintenance import stats_cache
+    stats_cache.configure(ttl_seconds=app.config['MAINTENANCE_STATS_CACHE_TTL'])
+
+    # --- STREAM DE EVENTOS (SSE) ---
+    # GET /events/stream: una conexión larga por cliente en vez de polling.
+    # Con gthread cada conexión abierta ocupa un hilo del worker; para muchos clientes, gevent.
+    # Pasado SSE_MAX_CONNECTIONS_PER_WORKER el endpoint responde 503 con Retry-After
+    app.config['SSE_POLL_INTERVAL'] = float(os.getenv('SSE_POLL_INTERVAL') or 1.0)
+    app.config['SSE_HEARTBEAT_SECONDS'] = float(os.getenv('SSE_HEARTBEAT_SECONDS') or 15)
+    app.config['SSE_BUFFER_SIZE'] = int(os.getenv('SSE_BUFFER_SIZE') or 100)
+    app.config['SSE_REPLAY_LIMIT'] = int(os.getenv('SSE_REPLAY_LIMIT') or 500)
+    app.config['SSE_MAX_CONNECTION_SECONDS'] = float(os.getenv('SSE_MAX_CONNECTION_SECONDS') or 300)
+    # Cuánto se espera un id faltante (transacción sin commitear) antes de darlo por rollback
+    app.config['SSE_SETTLE_SECONDS'] = float(os.getenv('SSE_SETTLE_SECONDS') or 10)
+    app.config['SSE_MAX_CONNECTIONS_PER_WORKER'] = int(os.getenv('SSE_MAX_CONNECTIONS_PER_WORKER')
+                                                       or sse_connection_limit())
+    init_event_stream(app)
     
     # Configurar manejo automático de sesiones
     @app.teardown_appcontext
@@ -64,14 +144,51 @@ def create_app():
     app.config['JWT_HEADER_TYPE'] = 'Bearer'
     jwt.init_app(app)
 
+    # --- TRIP COMPLETION ---
+    # Reintentos ante conflictos de versión del camión (concurrencia optimista)
+    app.config['TRIP_COMPLETION_MAX_ATTEMPTS'] = int(os.getenv('TRIP_COMPLETION_MAX_ATTEMPTS', '3'))
+    # sync: PATCH /Trips/<id>/complete responde 200 con el resultado.
+    # async: encola un trabajo, responde 202 y lo procesa worker.py (también con Prefer: respond-async)
+    app.config['TRIP_COMPLETION_MODE'] = (os.getenv('TRIP_COMPLETION_MODE') or 'sync').lower()
+
+    # --- COLA DE TRABAJOS (worker.py) ---
+    app.config['JOB_POLL_INTERVAL'] = float(os.getenv('JOB_POLL_INTERVAL') or 1.0)
+    app.config['JOB_MAX_ATTEMPTS'] = int(os.getenv('JOB_MAX_ATTEMPTS') or 5)
+    app.config['JOB_RETRY_BASE_SECONDS'] = float(os.getenv('JOB_RETRY_BASE_SECONDS') or 2.0)
+    app.config['JOB_LEASE_SECONDS'] = int(os.getenv('JOB_LEASE_SECONDS') or 300)
+    app.config['JOB_WEBHOOK_URL'] = os.getenv('JOB_WEBHOOK_URL')
+    app.config['JOB_WEBHOOK_SECRET'] = os.getenv('JOB_WEBHOOK_SECRET')
+    from .services.job_queue import collect_job_stats
+    metrics.register_collector('jobs', collect_job_stats)
+
+    # --- EVENTOS DE DOMINIO ---
+    # Cada cambio de camión, viaje o mantenimiento queda en domain_event; worker.py lo reparte.
+    # FLEET_ANALYTICS_MODE=events saca el recálculo de métricas de flota de los requests
+    app.config['FLEET_ANALYTICS_MODE'] = (os.getenv('FLEET_ANALYTICS_MODE') or 'inline').lower()
+    app.config['DOMAIN_EVENT_INTERVAL'] = float(os.getenv('DOMAIN_EVENT_INTERVAL') or 2)
+    app.config['DOMAIN_EVENT_BATCH_SIZE'] = int(os.getenv('DOMAIN_EVENT_BATCH_SIZE') or 500)
+    app.config['DOMAIN_EVENT_LEASE_SECONDS'] = int(os.getenv('DOMAIN_EVENT_LEASE_SECONDS') or 300)
+    # Los eventos más nuevos que esto no se reparten todavía: ids commiteados fuera de orden
+    app.config['DOMAIN_EVENT_SETTLE_SECONDS'] = float(os.getenv('DOMAIN_EVENT_SETTLE_SECONDS') or 10)
+    from .services.domain_events import init_domain_events
+    init_domain_events(app)
+
     # --- MAIL ---
     app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER')
-    app.config['MAIL_PORT'] = os.getenv('MAIL_PORT')
-    app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS')
+    app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT') or 25)
+    app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'false').lower() in ('1', 'true', 'yes')
     app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
     app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
     app.config['FLASKY_MAIL_SENDER'] = os.getenv('FLASKY_MAIL_SENDER')
     mailsender.init_app(app)
+    # Outbox: los requests solo encolan; worker.py envía en lotes por una conexión SMTP
+    app.config['MAIL_OUTBOX_BATCH_SIZE'] = int(os.getenv('MAIL_OUTBOX_BATCH_SIZE') or 100)
+    app.config['MAIL_OUTBOX_INTERVAL'] = float(os.getenv('MAIL_OUTBOX_INTERVAL') or 10)
+    app.config['MAIL_OUTBOX_MAX_ATTEMPTS'] = int(os.getenv('MAIL_OUTBOX_MAX_ATTEMPTS') or 6)
+    app.config['MAIL_OUTBOX_RETRY_BASE_SECONDS'] = float(os.getenv('MAIL_OUTBOX_RETRY_BASE_SECONDS') or 30)
+    app.config['MAIL_OUTBOX_LEASE_SECONDS'] = int(os.getenv('MAIL_OUTBOX_LEASE_SECONDS') or 300)
+    from .mail.outbox import collect_mail_stats
+    metrics.register_collector('mail_outbox', collect_mail_stats)
 
 
     # Blueprints clasicos (truck, trip, fleetanalytics, maintenance)
@@ -92,6 +209,7 @@ def create_app():
 
     # Configurar Flask-RESTX API
     api.init_app(app)
+    instrument_representations(api)
     
     # Registrar namespaces de autenticación
     from app.auth.restx_routes import auth_ns
@@ -117,67 +235,37 @@ def create_app():
     from app.resources.component_restx_routes import component_ns
     api.add_namespace(component_ns)
 
-    # ===== BEFORE_REQUEST: asegurar mapeo de endpoints de auth en caliente =====
-    # Comentado - usando Flask-RESTX que maneja esto automáticamente
-    # @app.before_request
-    # def _ensure_auth_endpoints():
-    #     if request.path.startswith('/auth/'):
-    #         # Traemos las funciones reales del blueprint (no crea rutas nuevas)
-    #         try:
-    #             from app.auth.routes import register as reg_fn, login as log_fn
-    #         except Exception:
-    #             reg_fn = log_fn = None
-
-    #         if reg_fn and 'auth.register' not in app.view_functions:
-    #             app.view_functions['auth.register'] = reg_fn
-
-    #         if log_fn and 'auth.login' not in app.view_functions:
-    #             app.view_functions['auth.login'] = log_fn
-
-    # # Estas asserts validan en setup (crear app). Si te molestan, podés comentarlas.
-    # assert 'auth.register' in app.view_functions, f"Falta endpoint 'auth.register'."
-    # assert 'auth.login' in app.view_functions, f"Falta endpoint 'auth.login'."
-
-    # ===== BEFORE_REQUEST: asegurar mapeo de endpoints de trucks =====
-    @app.before_request
-    def _ensure_trucks_endpoints():
-    # Este guard evita "Working outside of request context"
-        if not has_request_context():
-            return
-
-    # si no es una ruta de /trucks, no hacemos nada
-        if not request.path.startswith('/trucks/'):
-            return
-
-    # Evita UnboundLocalError si falla el import
-        _create_truck = _list_trucks = _view_truck = None
-        _edit_truck = _delete_truck = _assign_truck = _drivers_wo_truck = None
-
-        try:
-            from app.resources.truck_resources import (
-                create_truck as _create_truck,
-                list_trucks as _list_trucks,
-                view_truck as _view_truck,
-                edit_truck as _edit_truck,
-                delete_truck as _delete_truck,
-                assign_truck as _assign_truck,
-                get_drivers_without_truck as _drivers_wo_truck,
-            )
-        except Exception as _e:
-            return  # abortamos el reenganche en esta request
-
-    # Reenganche sin crear rutas nuevas
-        mapping = {
-            'trucks.create_truck': _create_truck,
-            'trucks.list_trucks': _list_trucks,
-            'trucks.view_truck': _view_truck,
-            'trucks.edit_truck': _edit_truck,
-            'trucks.delete_truck': _delete_truck,
-            'trucks.assign_truck': _assign_truck,
-            'trucks.get_drivers_without_truck': _drivers_wo_truck,
-        }
-        for ep, fn in mapping.items():
-            if ep not in app.view_functions and fn is not None:
-                app.view_functions[ep] = fn
+    # Registrar namespaces de trabajos en segundo plano
+    from app.resources.job_restx_routes import job_ns
+    api.add_namespace(job_ns)
+
+    # Registrar namespaces del stream de eventos (SSE)
+    from app.resources.event_restx_routes import event_ns
+    api.add_namespace(event_ns)
+
+    # --- TAREAS PERIÓDICAS ---
+    # worker: las corre worker.py; app: un hilo en cada worker web; off: ninguna.
+    # Un lock por tarea en scheduler_lock: con varios procesos corre una sola vez
+    app.config['SCHEDULER_MODE'] = (os.getenv('SCHEDULER_MODE') or 'worker').lower()
+    app.config['SCHEDULER_TICK_SECONDS'] = float(os.getenv('SCHEDULER_TICK_SECONDS') or 30)
+    app.config['MAINTENANCE_SWEEP_INTERVAL'] = float(os.getenv('MAINTENANCE_SWEEP_INTERVAL') or 3600)
+    app.config['FLEET_ANALYTICS_ROLLUP_AT'] = os.getenv('FLEET_ANALYTICS_ROLLUP_AT', '03:00')
+    app.config['CACHE_WARMUP_INTERVAL'] = float(os.getenv('CACHE_WARMUP_INTERVAL') or 600)
+    app.config['CACHE_WARMUP_MAX_OWNERS'] = int(os.getenv('CACHE_WARMUP_MAX_OWNERS') or 50)
+    app.config['CLEANUP_INTERVAL'] = float(os.getenv('CLEANUP_INTERVAL') or 3600)
+    app.config['CLEANUP_BATCH_SIZE'] = int(os.getenv('CLEANUP_BATCH_SIZE') or 1000)
+    app.config['STREAM_EVENT_RETENTION_DAYS'] = int(os.getenv('STREAM_EVENT_RETENTION_DAYS') or 7)
+    app.config['JOB_RETENTION_DAYS'] = int(os.getenv('JOB_RETENTION_DAYS') or 30)
+    app.config['MAIL_OUTBOX_RETENTION_DAYS'] = int(os.getenv('MAIL_OUTBOX_RETENTION_DAYS') or 30)
+    app.config['DOMAIN_EVENT_RETENTION_DAYS'] = int(os.getenv('DOMAIN_EVENT_RETENTION_DAYS') or 30)
+    from .services.scheduler import init_scheduler
+    init_scheduler(app)
+
+    # ===== ARRANQUE =====
+    # El spec OpenAPI se arma y serializa una sola vez; /swagger.json sirve esos bytes.
+    # Con STARTUP_LAZY se arma en el primer pedido, para que el worker arranque antes
+    app.config['STARTUP_LAZY'] = os.getenv('STARTUP_LAZY', 'false').lower() in ('1', 'true', 'yes')
+    precompute_specs(app, lazy=app.config['STARTUP_LAZY'])
+    metrics.set_gauge('app_create_seconds', time.perf_counter() - started)
 
     return app
\ No newline at end of file
@@ -6,6 +6,7 @@ from flask_restx import Resource
 from flask_jwt_extended import create_access_token
 from .. import db
 from ..models.user import User as UserModel
+from ..mail.functions import sendMail
 from ..swagger_models.auth_models import auth_ns, login_model, register_model, login_response_model, user_model, error_model
 
 
@@ -77,8 +78,9 @@ class Register(Resource):
             else:
                 try:
                     db.session.add(user)
+                    # El mail de bienvenida se escribe en el outbox con el mismo commit
+                    sendMail([user.email], "Welcome!", 'register', name=user.name)
                     db.session.commit()
-                    #sent = sendMail([user.email], "Welcome!", 'register', user=user)
                 except Exception as error:
                     db.session.rollback()
                     auth_ns.abort(500, message='Error creating user', error=str(error))
@@ -1,8 +1,17 @@
 """
 Configuración de API para evitar importaciones circulares
 """
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from flask import current_app, make_response
 from flask_restx import Api
 
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la stdlib
+    orjson = None
+
 # Crear la instancia de API
 api = Api(
     title='TruckGuard API',
@@ -19,3 +28,73 @@ api = Api(
     },
     security='Bearer'
 )
+
+
+def json_default(obj):
+    """Tipos que no son JSON nativo: fechas en ISO 8601 y Decimal como número"""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps_json(data, indent=False):
+    """Serializa a bytes (con salto de línea final) sin recorrer antes la respuesta"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=json_default, option=option)
+    if indent:
+        return (json.dumps(data, default=json_default, indent=4) + '\n').encode()
+    return (json.dumps(data, default=json_default, separators=(',', ':')) + '\n').encode()
+
+
+@api.representation('application/json')
+def output_json(data, code, headers=None):
+    """
+    Representación JSON de todas las rutas Flask-RESTX.
+
+    Las rutas pueden devolver datetime/date/Decimal directamente. RESTX_JSON,
+    si está configurado, conserva el comportamiento de flask-restx (json de la stdlib).
+    """
+    settings = current_app.config.get('RESTX_JSON')
+    if settings:
+        body = json.dumps(data, **{'default': json_default, **settings}) + '\n'
+    else:
+        body = dumps_json(data, indent=current_app.debug)
+    response = make_response(body, code)
+    response.headers.extend(headers or {})
+    return response
+
+
+def precompute_specs(app, lazy=False):
+    """
+    Arma el spec OpenAPI y sirve /swagger.json desde los bytes ya serializados.
+
+    Por defecto se arma al arrancar; con lazy=True, en el primer pedido.
+    Si el spec no se puede generar se deja la vista de Flask-RESTX, que responde 500 con el error.
+    """
+    original = app.view_functions.get('specs')
+    if original is None:
+        return
+    rendered = []
+
+    def render():
+        schema = api.__schema__
+        if 'error' in schema:
+            return None
+        rendered.append(dumps_json(schema))
+        return rendered[0]
+
+    def specs():
+        body = rendered[0] if rendered else render()
+        if body is None:
+            return original()
+        return app.response_class(body, mimetype='application/json')
+
+    if not lazy:
+        with app.test_request_context():
+            render()
+    app.view_functions['specs'] = specs
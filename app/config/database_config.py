@@ -4,19 +4,45 @@ Configuración específica para la base de datos y manejo de conexiones
 import os
 import time
 import logging
+import threading
+import click
+from flask import g, has_app_context, request
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from app.utils.metrics import metrics
+from app.config.serving import pool_sizing_from_env
 
 # Configurar logging para la base de datos
 logging.basicConfig()
 logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
 
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool que mide la espera por una conexión y cuenta los timeouts
+    (pool agotado), para exponerlos en /metrics
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.inc('db_pool_timeouts_total')
+            raise
+        finally:
+            metrics.observe('db_pool_checkout_seconds', time.perf_counter() - start)
+
+
 def get_database_config():
     """
     Retorna la configuración optimizada para la base de datos
     """
     # Configuración base del pool de conexiones
     base_config = {
+        'poolclass': InstrumentedQueuePool,  # QueuePool con métricas de espera y timeouts
         'pool_pre_ping': True,           # Verifica conexiones antes de usarlas
         'pool_recycle': 300,             # Recicla conexiones cada 5 minutos
         'pool_timeout': 20,              # Timeout de 20 segundos
@@ -46,14 +72,30 @@ def get_database_config():
             'max_overflow': 2,           # Menos conexiones adicionales
             'echo': True,                # Mostrar queries en desarrollo
         })
-    
+
+    # Detrás de gunicorn el pool sale de workers x threads (ver app/config/serving.py)
+    sizing = pool_sizing_from_env()
+    if sizing:
+        base_config.update(sizing)
+
     return base_config
 
 
+_events_registered = False
+
+
 def setup_database_events():
     """
-    Configura eventos de SQLAlchemy para monitoreo y optimización
+    Configura eventos de SQLAlchemy para monitoreo y optimización.
+
+    Es idempotente: create_app puede llamarse varias veces en el mismo proceso
+    (tests, scripts) sin duplicar listeners ni contar queries dos veces.
     """
+    global _events_registered
+    if _events_registered:
+        return
+    _events_registered = True
+
     @event.listens_for(Engine, "connect")
     def set_sqlite_pragma(dbapi_connection, connection_record):
         """
@@ -69,21 +111,133 @@ def setup_database_events():
     @event.listens_for(Engine, "before_cursor_execute")
     def receive_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
         """
-        Log de queries lentas (opcional, para debugging)
+        Marca el inicio de cada query (siempre activo, costo despreciable)
         """
-        # Solo en desarrollo, log queries que tomen más de 1 segundo
-        if os.getenv('FLASK_ENV') == 'development':
-            context._query_start_time = time.time()
+        context._query_start_time = time.perf_counter()
     
     @event.listens_for(Engine, "after_cursor_execute")
     def receive_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
         """
-        Log de queries lentas (opcional, para debugging)
+        Acumula la query en las estadísticas del request y loguea queries lentas
         """
-        if os.getenv('FLASK_ENV') == 'development' and hasattr(context, '_query_start_time'):
-            total = time.time() - context._query_start_time
-            if total > 1.0:  # Queries que toman más de 1 segundo
-                logging.warning(f"SLOW QUERY ({total:.2f}s): {statement[:100]}...")
+        start = getattr(context, '_query_start_time', None)
+        if start is None:
+            return
+        total = time.perf_counter() - start
+
+        if has_app_context():
+            stats = g.get('_query_stats')
+            if stats is not None:
+                stats['count'] += 1
+                stats['total_time'] += total
+                if total > stats['slowest_time']:
+                    stats['slowest_time'] = total
+                    stats['slowest_statement'] = statement
+
+        # Solo en desarrollo, log queries que tomen más de 1 segundo
+        if total > 1.0 and os.getenv('FLASK_ENV') == 'development':
+            logging.warning(f"SLOW QUERY ({total:.2f}s): {statement[:100]}...")
+
+
+# ---- Estadísticas de queries por request y agregados por endpoint ----
+
+_endpoint_stats = {}
+_endpoint_stats_lock = threading.Lock()
+
+
+def get_request_query_stats():
+    """Estadísticas de queries del request actual (None fuera de un request instrumentado)"""
+    return g.get('_query_stats') if has_app_context() else None
+
+
+def get_endpoint_query_stats():
+    """Copia de los agregados por endpoint: requests, queries, tiempo de BD y query más lenta"""
+    with _endpoint_stats_lock:
+        return {endpoint: dict(stats) for endpoint, stats in _endpoint_stats.items()}
+
+
+def reset_endpoint_query_stats():
+    with _endpoint_stats_lock:
+        _endpoint_stats.clear()
+
+
+def _record_endpoint_stats(endpoint, stats):
+    with _endpoint_stats_lock:
+        agg = _endpoint_stats.get(endpoint)
+        if agg is None:
+            agg = _endpoint_stats[endpoint] = {
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'db_time_ms': 0.0,
+                'slowest_query_ms': 0.0,
+                'slowest_statement': None,
+            }
+        agg['requests'] += 1
+        agg['queries'] += stats['count']
+        agg['max_queries'] = max(agg['max_queries'], stats['count'])
+        agg['db_time_ms'] += stats['total_time'] * 1000
+        if stats['slowest_time'] * 1000 > agg['slowest_query_ms']:
+            agg['slowest_query_ms'] = stats['slowest_time'] * 1000
+            agg['slowest_statement'] = stats['slowest_statement']
+
+
+def init_query_instrumentation(app):
+    """
+    Registra hooks de request que cuentan queries y tiempo de BD por request.
+
+    Con SERVER_TIMING_ENABLED agrega los headers Server-Timing y X-DB-Query-Count
+    a la respuesta, para ver regresiones N+1 sin activar echo.
+    """
+
+    @app.before_request
+    def _start_query_stats():
+        g._query_stats = {
+            'count': 0,
+            'total_time': 0.0,
+            'slowest_time': 0.0,
+            'slowest_statement': None,
+            'request_start': time.perf_counter(),
+        }
+
+    @app.after_request
+    def _finish_query_stats(response):
+        stats = g.pop('_query_stats', None)
+        if stats is None:
+            return response
+
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        _record_endpoint_stats(endpoint, stats)
+
+        if app.config.get('SERVER_TIMING_ENABLED'):
+            total_ms = (time.perf_counter() - stats['request_start']) * 1000
+            db_ms = stats['total_time'] * 1000
+            response.headers['Server-Timing'] = (
+                f'db;dur={db_ms:.2f};desc="{stats["count"]} queries", '
+                f'db-slowest;dur={stats["slowest_time"] * 1000:.2f}, '
+                f'app;dur={max(0.0, total_ms - db_ms):.2f}'
+            )
+            response.headers['X-DB-Query-Count'] = str(stats['count'])
+        return response
+
+
+def collect_pool_stats():
+    """
+    Collector de /metrics para el pool del engine de la app actual. Los pools
+    sin límite (StaticPool en tests, NullPool) no exponen size/overflow y se omiten.
+    """
+    from app import db
+
+    pool = db.engine.pool
+    samples = []
+    for name, attr in (('db_pool_size', 'size'),
+                       ('db_pool_checked_out', 'checkedout'),
+                       ('db_pool_checked_in', 'checkedin'),
+                       ('db_pool_overflow', 'overflow')):
+        method = getattr(pool, attr, None)
+        if callable(method):
+            samples.append(('gauge', name, {}, method()))
+    return samples
 
 
 def get_database_uri():
@@ -107,3 +261,18 @@ def get_database_uri():
         mysql_uri += '&charset=utf8mb4&autocommit=false'
     
     return mysql_uri
+
+
+@click.command('init-db')
+def init_db_command():
+    """
+    Crea las tablas que falten (create_all es idempotente).
+
+    Es el paso de migración del deploy: la app no crea el esquema al arrancar.
+        flask --app app init-db
+    """
+    from app import db
+    import app.models  # noqa: F401 - registra todos los modelos en la metadata
+
+    db.create_all()
+    click.echo(f"✅ Esquema listo: {len(db.metadata.tables)} tablas")
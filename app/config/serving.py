@@ -0,0 +1,112 @@
+"""
+Perfil de serving de producción (gunicorn.conf.py) y tamaño del pool derivado de él
+
+Clases de worker (WEB_WORKER_CLASS):
+- gthread (por defecto): procesos con hilos. Mientras un hilo espera a MySQL o a la API
+  de distancias, los demás atienden requests
+- gevent: greenlets, para muchas esperas de I/O concurrentes. Requiere `pip install gevent`.
+  Es la clase recomendada si se usa GET /events/stream: con gthread cada stream abierto
+  ocupa un hilo del worker durante toda la conexión
+
+Tamaño automático a partir de la cantidad de CPUs, salvo que se fije por env:
+- WEB_CONCURRENCY (workers): 2 x CPUs + 1 con gthread, CPUs con gevent, hasta WEB_MAX_WORKERS
+- WEB_THREADS: 4 por worker (gthread)
+- WEB_WORKER_CONNECTIONS: 100 greenlets por worker (gevent)
+
+Streams SSE: cada worker acepta hasta SSE_MAX_CONNECTIONS_PER_WORKER (por defecto
+sse_connection_limit), para que los streams no se queden con todos los hilos.
+
+Pool: un worker no puede tener más requests en curso que su concurrencia (threads o
+worker_connections), y entre todos los workers no deben pasar de DB_MAX_CONNECTIONS
+(el max_connections de MySQL menos una reserva). get_database_config toma el tamaño
+de pool_sizing_from_env cuando el perfil está resuelto en el entorno.
+"""
+import os
+import time
+
+
+DEFAULT_THREADS = 4
+DEFAULT_WORKER_CONNECTIONS = 100
+DEFAULT_MAX_WORKERS = 12
+DEFAULT_DB_MAX_CONNECTIONS = 100
+
+
+def _env_int(env, name, default=None):
+    value = env.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def serving_profile(env=None, cpu_count=None):
+    """Workers, threads y clase de worker resueltos desde el entorno y las CPUs"""
+    env = os.environ if env is None else env
+    cpus = cpu_count or os.cpu_count() or 1
+    worker_class = (env.get('WEB_WORKER_CLASS') or 'gthread').lower()
+    if worker_class not in ('gthread', 'gevent'):
+        raise ValueError(f"WEB_WORKER_CLASS debe ser 'gthread' o 'gevent', no {worker_class!r}")
+
+    default_workers = cpus if worker_class == 'gevent' else 2 * cpus + 1
+    workers = _env_int(env, 'WEB_CONCURRENCY') or min(default_workers, _env_int(env, 'WEB_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+    threads = _env_int(env, 'WEB_THREADS', DEFAULT_THREADS) if worker_class == 'gthread' else 1
+    worker_connections = _env_int(env, 'WEB_WORKER_CONNECTIONS', DEFAULT_WORKER_CONNECTIONS)
+    return {
+        'worker_class': worker_class,
+        'workers': workers,
+        'threads': threads,
+        'worker_connections': worker_connections,
+        'concurrency': threads if worker_class == 'gthread' else worker_connections,
+    }
+
+
+def pool_sizing(workers, concurrency, max_connections=DEFAULT_DB_MAX_CONNECTIONS):
+    """
+    pool_size/max_overflow por worker: tantas conexiones como requests simultáneos,
+    sin que workers x (pool_size + max_overflow) pase de max_connections.
+    """
+    per_worker = max(1, max_connections // max(1, workers))
+    return {'pool_size': max(1, min(concurrency, per_worker)), 'max_overflow': 0}
+
+
+def pool_sizing_from_env(env=None):
+    """Tamaño del pool si el perfil de serving está en el entorno (gunicorn.conf.py lo exporta)"""
+    env = os.environ if env is None else env
+    if not env.get('WEB_CONCURRENCY'):
+        return None
+    profile = serving_profile(env)
+    return pool_sizing(profile['workers'], profile['concurrency'],
+                       _env_int(env, 'DB_MAX_CONNECTIONS', DEFAULT_DB_MAX_CONNECTIONS))
+
+
+def sse_connection_limit(env=None):
+    """
+    Streams SSE abiertos por worker si no se fija SSE_MAX_CONNECTIONS_PER_WORKER: la
+    mitad de la concurrencia (con gthread y 4 hilos, 2; quedan 2 para el resto de la API)
+    """
+    return max(1, serving_profile(env)['concurrency'] // 2)
+
+
+def warm_up(app, connections=None):
+    """
+    Prepara un worker antes de que reciba tráfico: abre conexiones del pool, recorre
+    un request interno (hooks, routing y spec OpenAPI) e importa el cliente HTTP de la
+    API de distancias. Devuelve los segundos que tardó.
+    """
+    from app import db
+    from app.utils.metrics import metrics
+
+    start = time.perf_counter()
+    with app.app_context():
+        if connections is None:
+            size = getattr(db.engine.pool, 'size', None)
+            connections = size() if callable(size) else 1
+        opened = [db.engine.connect() for _ in range(connections)]
+        for connection in opened:
+            connection.exec_driver_sql('SELECT 1')
+        for connection in opened:
+            connection.close()
+
+    app.test_client().get('/swagger.json')
+    import httpx  # noqa: F401 - la primera llamada a la API de distancias no paga el import
+
+    elapsed = time.perf_counter() - start
+    metrics.set_gauge('worker_warmup_seconds', elapsed)
+    return elapsed
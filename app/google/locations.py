@@ -1,11 +1,36 @@
-from app.models import TripModel
-import httpx
+import asyncio
 import os
-from dotenv import load_dotenv
+import time
+from contextlib import asynccontextmanager
+from app.utils.aio import event_loop
+from app.utils.metrics import metrics
+from app.utils.tracing import tracer
 
-load_dotenv()
+DEFAULT_DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
 
-API_KEY = os.getenv("API_KEY")
+# Cliente HTTP del loop compartido (app/utils/aio.py): conexiones keep-alive reutilizadas
+# entre requests. Se crea en la primera llamada que corre en ese loop y se guarda junto
+# con él: después de un fork o de event_loop.stop() el loop es otro, y un cliente atado
+# al loop anterior fallaría con "Event loop is closed".
+_shared_client = None  # (loop, httpx.AsyncClient)
+
+
+@asynccontextmanager
+async def _distance_client(httpx):
+    """El cliente compartido si corremos en el loop compartido; si no (asyncio.run), uno de un solo uso"""
+    global _shared_client
+    timeout = float(os.getenv("DISTANCE_API_TIMEOUT") or 15)
+    if event_loop.owns_running_loop():
+        loop = asyncio.get_running_loop()
+        if _shared_client is None or _shared_client[0] is not loop:
+            # El cliente anterior (si hay) era de un loop muerto: no se puede cerrar desde este
+            max_connections = int(os.getenv("DISTANCE_API_MAX_CONNECTIONS") or 20)
+            _shared_client = (loop, httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_connections)))
+        yield _shared_client[1]
+    else:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            yield client
 
 
 def parse_distance_km(distance_text: str) -> float:
@@ -47,24 +72,54 @@ class GoogleGetLocation:
     """
 
     async def get_distance(self, origin: str, destination: str) -> dict:
-        params = {
-            "origins": origin,
-            "destinations": destination,
-            "key": API_KEY
-        }
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            r = await client.get("https://maps.googleapis.com/maps/api/distancematrix/json", params=params)
-            r.raise_for_status()
-            data = r.json()
+        # httpx se importa en el primer uso: importarlo cuesta ~190 ms en el arranque de cada worker
+        import httpx
+
+        start = time.perf_counter()
+        outcome = 'ok'
+        span, _ = tracer.start_span('distance_api.get_distance', activate=False,
+                                    origin=origin, destination=destination)
+        try:
+            params = {
+                "origins": origin,
+                "destinations": destination,
+                "key": os.getenv("API_KEY")
+            }
+            # URL y timeout configurables: permite apuntar a un stand-in local (bench/fake_distance_server.py)
+            url = os.getenv("DISTANCE_MATRIX_URL") or DEFAULT_DISTANCE_MATRIX_URL
+            # Propaga la traza al proveedor (W3C traceparent)
+            headers = {"traceparent": span.traceparent} if span is not None else None
+            async with _distance_client(httpx) as client:
+                r = await client.get(url, params=params, headers=headers)
+                r.raise_for_status()
+                data = r.json()
 
-        element = data["rows"][0]["elements"][0]
-        if element["status"] != "OK":
-            return {"error": "could not get distance"}
+            element = data["rows"][0]["elements"][0]
+            if element["status"] != "OK":
+                outcome = 'not_found'
+                return {"error": "could not get distance"}
 
-        # NUMÉRICO: metros y segundos
-        distance_m = float(element["distance"]["value"])   # e.g. 25340.0
-        duration_s = float(element["duration"]["value"])   # e.g. 1860.0
-        distance_km = distance_m / 1000.0
+            # NUMÉRICO: metros y segundos
+            distance_m = float(element["distance"]["value"])   # e.g. 25340.0
+            duration_s = float(element["duration"]["value"])   # e.g. 1860.0
+            distance_km = distance_m / 1000.0
 
-        return {"distance_km": distance_km, "duration_min": duration_s / 60.0}
-        
+            return {"distance_km": distance_km, "duration_min": duration_s / 60.0}
+        except httpx.TimeoutException:
+            outcome = 'timeout'
+            raise
+        except httpx.HTTPError:
+            outcome = 'http_error'
+            raise
+        except (KeyError, IndexError, ValueError):
+            outcome = 'bad_response'
+            raise
+        finally:
+            metrics.observe('distance_api_request_duration_seconds', time.perf_counter() - start, outcome=outcome)
+            if outcome != 'ok':
+                metrics.inc('distance_api_errors_total', reason=outcome)
+            if span is not None:
+                span.set_attribute('outcome', outcome)
+                if outcome != 'ok':
+                    span.status = 'error'
+                span.end()
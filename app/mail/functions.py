@@ -1,18 +1,10 @@
-from .. import mailsender
-from flask import current_app, render_template
-from flask_mail import Message
-from smtplib import SMTPException 
+from .outbox import queue_mail
+
 
 def sendMail(to, subject, template, **kwargs):
-    #Configuracion del mail
-    msg = Message(subject, sender=current_app.config['FLASKY_MAIL_SENDER'], recipients=to)
-    try:
-        #Creación del cuerpo del mensaje
-        #msg.body = render_template(template + '.txt', **kwargs)
-        msg.html = render_template(template + '.html', **kwargs)
-        #Envío de mail
-        result = mailsender.send(msg)
-    except SMTPException as e:
-        print(str(e))
-        return "Mail deliver failed"
-    return True
\ No newline at end of file
+    """
+    Encola el mail en el outbox (app/mail/outbox.py); lo envía worker.py.
+    Se escribe con el próximo commit de la sesión, junto con el cambio que lo origina.
+    """
+    queue_mail(to, subject, template, **kwargs)
+    return True
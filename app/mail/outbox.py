@@ -0,0 +1,153 @@
+"""
+Outbox de mails: se encolan en la transacción del request y los envía worker.py
+
+    queue_mail(owner.email, 'Mantenimiento requerido', 'maintenance_required',
+               plate=truck.plate, component='Aceite', mileage=truck.mileage)
+    db.session.commit()   # el mail queda pendiente junto con el cambio
+
+Ningún request habla con SMTP. El worker, en cada pasada:
+- Reclama un lote de pendientes con un UPDATE condicionado, como la cola de trabajos.
+- Agrupa por destinatario y plantilla: varias alertas para el mismo owner salen en
+  un solo mail (digest). La plantilla recibe `items` con el contexto de cada una.
+- Envía todo el lote por una sola conexión SMTP.
+- Ante un error reprograma el grupo con backoff exponencial. Pasados
+  MAIL_OUTBOX_MAX_ATTEMPTS intentos lo marca failed.
+"""
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from itertools import groupby
+from flask import current_app, render_template
+from flask_mail import Message
+from sqlalchemy import func, select, update
+from .. import db, mailsender
+from ..models import MailOutboxModel
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def queue_mail(recipients, subject, template, **context):
+    """Agrega un mail por destinatario a la sesión actual; el commit lo hace el llamador"""
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    rows = [MailOutboxModel(recipient, subject, template, context) for recipient in recipients if recipient]
+    db.session.add_all(rows)
+    for row in rows:
+        metrics.inc('mail_outbox_queued_total', template=template)
+    return rows
+
+
+class MailOutbox:
+    """Envío de los mails pendientes; la configuración sale de app.config"""
+
+    def __init__(self, worker_id=None):
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+
+    def drain(self, now=None):
+        """Envía un lote de pendientes y devuelve cuántos mails (filas) se enviaron"""
+        config = current_app.config
+        now = now or datetime.now()
+        self._reclaim_stale(now, config.get('MAIL_OUTBOX_LEASE_SECONDS', 300))
+        rows = self._claim(now, config.get('MAIL_OUTBOX_BATCH_SIZE', 100))
+        if not rows:
+            return 0
+
+        groups = [list(group) for _, group in
+                  groupby(sorted(rows, key=lambda row: (row.recipient, row.template, row.id)),
+                          key=lambda row: (row.recipient, row.template))]
+        sent = 0
+        try:
+            with mailsender.connect() as connection:
+                for group in groups:
+                    try:
+                        connection.send(self._message(group))
+                    except Exception as exc:
+                        self._retry(group, exc, now)
+                        continue
+                    for row in group:
+                        row.status, row.sent_at, row.worker = 'sent', now, None
+                    sent += len(group)
+                    metrics.inc('mail_outbox_sent_total', value=len(group), template=group[0].template)
+                    metrics.observe('mail_outbox_digest_size', len(group), buckets=(1, 2, 5, 10, 25, 50, 100))
+        except Exception as exc:
+            # No se pudo conectar (o se cortó la conexión): se reprograma lo que no salió
+            logger.warning("SMTP no disponible: %s", exc)
+            for group in groups:
+                if group[0].status == 'sending':
+                    self._retry(group, exc, now)
+        db.session.commit()
+        return sent
+
+    def _claim(self, now, batch_size):
+        ids = db.session.execute(
+            select(MailOutboxModel.id)
+            .where(MailOutboxModel.status == 'pending', MailOutboxModel.next_attempt_at <= now)
+            .order_by(MailOutboxModel.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            db.session.commit()
+            return []
+        db.session.execute(
+            update(MailOutboxModel)
+            .where(MailOutboxModel.id.in_(ids), MailOutboxModel.status == 'pending')
+            .values(status='sending', worker=self.worker_id, claimed_at=now,
+                    attempts=MailOutboxModel.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return (db.session.query(MailOutboxModel)
+                .filter(MailOutboxModel.id.in_(ids), MailOutboxModel.status == 'sending',
+                        MailOutboxModel.worker == self.worker_id)
+                .populate_existing()
+                .all())
+
+    def _reclaim_stale(self, now, lease_seconds):
+        """Vuelve a pending lo que quedó en sending de un worker que murió"""
+        db.session.execute(
+            update(MailOutboxModel)
+            .where(MailOutboxModel.status == 'sending',
+                   MailOutboxModel.claimed_at < now - timedelta(seconds=lease_seconds))
+            .values(status='pending', worker=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    def _message(self, group):
+        items = [row.context_data for row in group]
+        subject = group[0].subject if len(group) == 1 else f'{group[0].subject} ({len(group)})'
+        message = Message(subject, sender=current_app.config.get('FLASKY_MAIL_SENDER'),
+                          recipients=[group[0].recipient])
+        message.body = render_template(group[0].template + '.txt', items=items, **items[0])
+        message.html = render_template(group[0].template + '.html', items=items, **items[0])
+        return message
+
+    def _retry(self, group, exc, now):
+        config = current_app.config
+        max_attempts = config.get('MAIL_OUTBOX_MAX_ATTEMPTS', 6)
+        base = config.get('MAIL_OUTBOX_RETRY_BASE_SECONDS', 30)
+        for row in group:
+            row.last_error = str(exc)[:1000]
+            row.worker = None
+            if row.attempts >= max_attempts:
+                row.status = 'failed'
+            else:
+                row.status = 'pending'
+                row.next_attempt_at = now + timedelta(seconds=base * 2 ** (row.attempts - 1))
+        metrics.inc('mail_outbox_errors_total', value=len(group), template=group[0].template)
+        logger.warning("Mail %s a %s falló (intento %s): %s",
+                       group[0].template, group[0].recipient, group[0].attempts, exc)
+
+
+mail_outbox = MailOutbox()
+
+
+def collect_mail_stats():
+    """Collector de /metrics: mails pendientes y fallidos en el outbox"""
+    counts = dict(db.session.query(MailOutboxModel.status, func.count(MailOutboxModel.id))
+                  .filter(MailOutboxModel.status.in_(('pending', 'sending', 'failed')))
+                  .group_by(MailOutboxModel.status).all())
+    return [('gauge', 'mail_outbox_messages', {'status': status}, counts.get(status, 0))
+            for status in ('pending', 'sending', 'failed')]
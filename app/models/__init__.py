@@ -2,4 +2,9 @@ from .fleetanalytics import FleetAnalytics as FleetAnalyticsModel
 from .maintenance import Maintenance as MaintenanceModel
 from .trip import Trip as TripModel
 from .user import User as UserModel
-from .truck import Truck as TruckModel
\ No newline at end of file
+from .truck import Truck as TruckModel
+from .job import Job as JobModel
+from .mail_outbox import MailOutbox as MailOutboxModel
+from .stream_event import StreamEvent as StreamEventModel
+from .domain_event import DomainEvent as DomainEventModel, DomainEventCheckpoint as DomainEventCheckpointModel
+from .scheduler_lock import SchedulerLock as SchedulerLockModel
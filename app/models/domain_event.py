@@ -0,0 +1,59 @@
+import json
+from .. import db
+from datetime import datetime
+
+
+class DomainEvent(db.Model):
+    """
+    Cambio de un camión, viaje o mantenimiento (ver app/services/domain_events.py).
+
+    Se escribe solo desde la sesión, en el mismo flush que el cambio, y no se
+    modifica nunca: cada consumidor guarda hasta qué id procesó.
+    """
+
+    __tablename__ = 'domain_event'
+
+    id = db.Column(db.Integer, primary_key=True)
+    aggregate = db.Column(db.String(50), nullable=False)
+    aggregate_id = db.Column(db.Integer, nullable=False)
+    type = db.Column(db.String(50), nullable=False)
+    owner_id = db.Column(db.Integer, nullable=True)
+    truck_id = db.Column(db.Integer, nullable=True)
+    data = db.Column(db.Text, nullable=False, default='{}')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __repr__(self):
+        return f'<DomainEvent: {self.id} {self.type} {self.aggregate_id}>'
+
+    @property
+    def data_dict(self):
+        return json.loads(self.data or '{}')
+
+    @property
+    def changes(self):
+        """{columna: [antes, después]} de un *.updated"""
+        return self.data_dict.get('changes', {})
+
+
+class DomainEventCheckpoint(db.Model):
+    """
+    Hasta qué evento procesó un consumidor. El lease (worker, locked_until)
+    asegura que con varios workers cada consumidor corra en uno solo a la vez.
+    """
+
+    __tablename__ = 'domain_event_checkpoint'
+
+    consumer = db.Column(db.String(100), primary_key=True)
+    last_event_id = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String(100), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __init__(self, consumer, last_event_id=0):
+        self.consumer = consumer
+        self.last_event_id = last_event_id
+        self.updated_at = datetime.now()
+
+    def __repr__(self):
+        return f'<DomainEventCheckpoint: {self.consumer} {self.last_event_id}>'
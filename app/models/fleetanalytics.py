@@ -1,9 +1,15 @@
+import logging
 from .. import db
 from datetime import datetime
+from flask import current_app
 from .maintenance import Maintenance
 from .truck import Truck
 from .trip import Trip
 from .user import User
+from ..utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
 
 class FleetAnalytics(db.Model):
 
@@ -76,12 +82,29 @@ class FleetAnalytics(db.Model):
         return fleet_analytics
 
     @staticmethod
-    def update_fleet_analytics(user_id):
-        print(f"Starting update_fleet_analytics for user_id: {user_id}")
+    def refresh_after_write(user_id, commit=True):
+        """
+        Recalcula las métricas después de una escritura del owner. Con
+        FLEET_ANALYTICS_MODE=events no hace nada: las recalcula worker.py a partir
+        de los eventos de dominio (consumidor fleet_analytics).
+        """
+        if current_app.config.get('FLEET_ANALYTICS_MODE') == 'events':
+            return
+        FleetAnalytics.update_fleet_analytics(user_id, commit=commit)
+
+    @staticmethod
+    @traced('fleet_analytics.update')
+    def update_fleet_analytics(user_id, commit=True):
+        """
+        Recalcula las métricas de flota del owner.
+
+        Con commit=False solo hace flush, para sumarse a la transacción del llamador.
+        """
+        logger.debug("Starting update_fleet_analytics for user_id: %s", user_id)
         
         fleet_analytics = FleetAnalytics.query.filter_by(user_id=user_id).first()
         if fleet_analytics is None:
-            print(f"No existing fleet analytics for user_id: {user_id}, creating new one")
+            logger.debug("No existing fleet analytics for user_id: %s, creating new one", user_id)
             # Crear fleet analytics sin depender de un camión existente
             fleet_analytics = FleetAnalytics(user_id=user_id, maintenance_id=None)
             db.session.add(fleet_analytics)
@@ -159,11 +182,14 @@ class FleetAnalytics(db.Model):
             fleet_analytics.total_cost = total_maintenance_cost
 
             db.session.add(fleet_analytics)
-            db.session.commit()
+            if commit:
+                db.session.commit()
+            else:
+                db.session.flush()
             
-            print(f"Completed update_fleet_analytics for user_id: {user_id}")
+            logger.debug("Completed update_fleet_analytics for user_id: %s", user_id)
 
         except Exception as e:
-            print(f"Error occurred in update_fleet_analytics: {str(e)}")
+            logger.error("Error occurred in update_fleet_analytics: %s", e)
             raise
 
@@ -0,0 +1,66 @@
+import json
+from .. import db
+from datetime import datetime
+
+
+class Job(db.Model):
+    """
+    Trabajo en cola, procesado por worker.py (ver app/services/job_queue.py).
+
+    partition_key ordena los trabajos: de una misma partición (p. ej. un camión)
+    corre uno por vez y en orden de llegada. dedupe_key evita encolar dos veces
+    el mismo trabajo mientras el primero no terminó.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    partition_key = db.Column(db.String(100), nullable=True)
+    dedupe_key = db.Column(db.String(100), nullable=True, index=True)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String(100), nullable=True)
+    requested_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    owner_id = db.Column(db.Integer, nullable=True)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_job_status_partition', 'status', 'partition_key'),
+    )
+
+    def __init__(self, kind, payload, partition_key=None, dedupe_key=None, requested_by=None, owner_id=None):
+        self.kind = kind
+        self.payload = json.dumps(payload)
+        self.partition_key = partition_key
+        self.dedupe_key = dedupe_key
+        self.requested_by = requested_by
+        self.owner_id = owner_id
+        self.status = 'queued'
+        self.attempts = 0
+        self.run_after = datetime.now()
+        self.created_at = datetime.now()
+
+    def __repr__(self):
+        return f'<Job: {self.id} {self.kind} {self.status} {self.partition_key}>'
+
+    @property
+    def payload_data(self):
+        return json.loads(self.payload or '{}')
+
+    def to_json(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None,
+        }
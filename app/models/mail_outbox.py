@@ -0,0 +1,49 @@
+import json
+from .. import db
+from datetime import datetime
+
+
+class MailOutbox(db.Model):
+    """
+    Mail pendiente de envío (ver app/mail/outbox.py).
+
+    Se escribe en la misma transacción que el cambio que lo origina: si el
+    cambio hace rollback, el mail no existe. worker.py lo envía después.
+    """
+
+    __tablename__ = 'mail_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(200), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    template = db.Column(db.String(100), nullable=False)
+    context = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    worker = db.Column(db.String(100), nullable=True)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_mail_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __init__(self, recipient, subject, template, context):
+        self.recipient = recipient
+        self.subject = subject
+        self.template = template
+        self.context = json.dumps(context, default=str)
+        self.status = 'pending'
+        self.attempts = 0
+        self.next_attempt_at = datetime.now()
+        self.created_at = datetime.now()
+
+    def __repr__(self):
+        return f'<MailOutbox: {self.id} {self.template} {self.recipient} {self.status}>'
+
+    @property
+    def context_data(self):
+        return json.loads(self.context or '{}')
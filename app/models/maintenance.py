@@ -1,7 +1,20 @@
 from .. import db 
+from ..utils.cache import TTLCache
+from ..utils.metrics import metrics
 from datetime import datetime
+from sqlalchemy import event
+
+
+# Estadísticas de mantenimiento por owner: TTL corto, invalidadas al commitear escrituras.
+# El TTL sale de MAINTENANCE_STATS_CACHE_TTL (create_app)
+stats_cache = TTLCache(ttl_seconds=30)
+metrics.register_cache('maintenance_stats', stats_cache)
 
 class Maintenance(db.Model):
+    __table_args__ = (
+        # Historial por camión: WHERE truck_id, status ORDER BY updated_at
+        db.Index('ix_maintenance_truck_status_updated', 'truck_id', 'status', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(100), nullable=True)
@@ -20,6 +33,7 @@ class Maintenance(db.Model):
     driver_id = db.Column(db.Integer, db.ForeignKey('user.id', use_alter=True), nullable=True)
 
     truck = db.relationship('Truck', back_populates='maintenances', uselist=False)
+    driver = db.relationship('User', foreign_keys=[driver_id], uselist=False)
     fleetanalytics = db.relationship('FleetAnalytics', back_populates='maintenance')
 
     def __init__(self, description, status, component, cost, mileage_interval, last_maintenance_mileage, next_maintenance_mileage, truck_id, driver_id, maintenance_interval):
@@ -69,24 +83,120 @@ class Maintenance(db.Model):
 
     def update_status(self):
         """Actualiza el estado del componente basado en el kilometraje acumulado"""
-        if self.maintenance_interval == 0:
-            self.status = 'Excellent'
-        else:
-            # Usar siempre accumulated_km para consistencia
-            percentage_components = (self.accumulated_km / self.maintenance_interval) * 100
-
-            # Degradación basada en porcentaje de uso - progresiva
-            # Excellent -> Very Good -> Good -> Fair -> Maintenance Required
-            if percentage_components >= 100:
-                self.status = 'Maintenance Required'
-            elif percentage_components >= 80:
-                self.status = 'Fair'
-            elif percentage_components >= 60:
-                self.status = 'Good'
-            elif percentage_components >= 40:
-                self.status = 'Very Good'
-            else:
-                self.status = 'Excellent'
-           
-    
+        # Usar siempre accumulated_km para consistencia
+        self.status = Maintenance.status_for_usage(self.accumulated_km, self.maintenance_interval)
+
+    @staticmethod
+    def status_for_usage(accumulated_km, maintenance_interval):
+        """Estado de un componente según los km acumulados sobre su intervalo"""
+        if maintenance_interval == 0:
+            return 'Excellent'
+        percentage_components = (accumulated_km / maintenance_interval) * 100
+
+        # Degradación basada en porcentaje de uso - progresiva
+        # Excellent -> Very Good -> Good -> Fair -> Maintenance Required
+        if percentage_components >= 100:
+            return 'Maintenance Required'
+        elif percentage_components >= 80:
+            return 'Fair'
+        elif percentage_components >= 60:
+            return 'Good'
+        elif percentage_components >= 40:
+            return 'Very Good'
+        return 'Excellent'
+
+    @staticmethod
+    def status_case(accumulated_km, maintenance_interval):
+        """status_for_usage como expresión SQL, para UPDATE masivos (80% => km * 5 >= intervalo * 4)"""
+        return db.case(
+            (maintenance_interval == 0, 'Excellent'),
+            (accumulated_km >= maintenance_interval, 'Maintenance Required'),
+            (accumulated_km * 5 >= maintenance_interval * 4, 'Fair'),
+            (accumulated_km * 5 >= maintenance_interval * 3, 'Good'),
+            (accumulated_km * 5 >= maintenance_interval * 2, 'Very Good'),
+            else_='Excellent',
+        )
+
+    @staticmethod
+    def get_owner_stats(owner_id):
+        """Estadísticas de mantenimiento de los camiones de un owner (cacheadas por owner)"""
+        return stats_cache.get_or_set(int(owner_id), lambda: Maintenance._compute_owner_stats(owner_id))
+
+    @staticmethod
+    def _compute_owner_stats(owner_id):
+        from .truck import Truck
+
+        count = db.func.count(Maintenance.id)
+        cost_sum = db.func.coalesce(db.func.sum(Maintenance.cost), 0)
+        cost_avg = db.func.coalesce(db.func.avg(Maintenance.cost), 0)
+
+        def owner_query(*columns):
+            return db.session.query(*columns).join(
+                Truck, Truck.truck_id == Maintenance.truck_id
+            ).filter(Truck.owner_id == owner_id)
+
+        by_status = owner_query(Maintenance.status, count, cost_sum, cost_avg).group_by(
+            Maintenance.status
+        ).all()
+
+        by_component = owner_query(Maintenance.component, count, cost_sum, cost_avg).group_by(
+            Maintenance.component
+        ).order_by(Maintenance.component).all()
+
+        year = db.func.extract('year', Maintenance.created_at)
+        month = db.func.extract('month', Maintenance.created_at)
+        by_month = owner_query(year, month, count, cost_sum).group_by(year, month).order_by(year, month).all()
+
+        total_maintenances = sum(row[1] for row in by_status)
+        total_cost = float(sum(row[2] for row in by_status))
+        counts_by_status = {row[0]: row[1] for row in by_status}
+
+        return {
+            'total_maintenances': total_maintenances,
+            'pending_maintenances': counts_by_status.get('Pending', 0),
+            'completed_maintenances': counts_by_status.get('Completed', 0),
+            'total_cost': total_cost,
+            'average_cost': total_cost / total_maintenances if total_maintenances > 0 else 0.0,
+            'by_status': [
+                {'status': status, 'count': n, 'total_cost': float(total), 'average_cost': float(avg)}
+                for status, n, total, avg in sorted(by_status, key=lambda row: row[0])
+            ],
+            'by_component': [
+                {'component': component, 'count': n, 'total_cost': float(total), 'average_cost': float(avg)}
+                for component, n, total, avg in by_component
+            ],
+            'by_month': [
+                {'month': f'{int(y):04d}-{int(m):02d}', 'count': n, 'total_cost': float(total)}
+                for y, m, n, total in by_month if y is not None
+            ],
+        }
+
+
+# ---- Invalidación de stats_cache: se juntan los owners afectados en cada flush
+# ---- y se invalidan recién cuando la transacción commitea
+_STATS_DIRTY_OWNERS = '_maintenance_stats_dirty_owners'
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_stats_dirty_owners(session, flush_context):
+    from .truck import Truck
+
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    truck_ids = {obj.truck_id for obj in changed if isinstance(obj, Maintenance) and obj.truck_id is not None}
+    # Un camión borrado ya no está en la tabla: su owner se toma del objeto
+    owner_ids = {obj.owner_id for obj in session.deleted if isinstance(obj, Truck)}
+    if truck_ids:
+        owner_ids.update(Truck.owners_for(session, truck_ids).values())
+    if owner_ids:
+        session.info.setdefault(_STATS_DIRTY_OWNERS, set()).update(owner_ids)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_owner_stats(session):
+    for owner_id in session.info.pop(_STATS_DIRTY_OWNERS, ()):
+        stats_cache.invalidate(int(owner_id))
+
 
+@event.listens_for(db.session, 'after_rollback')
+def _discard_stats_dirty_owners(session):
+    session.info.pop(_STATS_DIRTY_OWNERS, None)
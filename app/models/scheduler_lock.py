@@ -0,0 +1,29 @@
+from .. import db
+from datetime import datetime
+
+
+class SchedulerLock(db.Model):
+    """
+    Una fila por tarea periódica (ver app/services/scheduler.py): cuándo toca la
+    próxima corrida y qué worker la tiene tomada. El worker que gana el UPDATE
+    condicionado sobre esta fila es el único que corre la tarea.
+    """
+
+    __tablename__ = 'scheduler_lock'
+
+    name = db.Column(db.String(100), primary_key=True)
+    holder = db.Column(db.String(100), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    next_run_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    last_started_at = db.Column(db.DateTime, nullable=True)
+    last_finished_at = db.Column(db.DateTime, nullable=True)
+    last_status = db.Column(db.String(20), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    last_duration = db.Column(db.Float, nullable=True)
+
+    def __init__(self, name, next_run_at):
+        self.name = name
+        self.next_run_at = next_run_at
+
+    def __repr__(self):
+        return f'<SchedulerLock: {self.name} {self.next_run_at} {self.holder}>'
@@ -0,0 +1,35 @@
+import json
+from .. import db
+from datetime import datetime
+
+
+class StreamEvent(db.Model):
+    """
+    Evento para el stream SSE de un owner (ver app/utils/event_stream.py).
+
+    El id es el Last-Event-ID del protocolo: al reconectar, el cliente recibe
+    los eventos de su owner con id mayor al último que vio.
+    """
+
+    __tablename__ = 'stream_event'
+
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, nullable=False)
+    truck_id = db.Column(db.Integer, nullable=True)
+    type = db.Column(db.String(50), nullable=False)
+    data = db.Column(db.Text, nullable=False, default='{}')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        db.Index('ix_stream_event_owner_id', 'owner_id', 'id'),
+    )
+
+    def __init__(self, owner_id, type, data, truck_id=None):
+        self.owner_id = owner_id
+        self.truck_id = truck_id
+        self.type = type
+        self.data = json.dumps(data, default=str)
+        self.created_at = datetime.now()
+
+    def __repr__(self):
+        return f'<StreamEvent: {self.id} {self.owner_id} {self.type}>'
@@ -85,21 +85,34 @@ class Trip(db.Model):
                     fleet_analyticsId=fleet_analyticsId
                     )
 
+    @staticmethod
+    def recorded_distance(distance_km):
+        """Distancia como se guarda en el viaje: km enteros, nunca negativa"""
+        if distance_km is None or distance_km < 0:
+            return 0
+        # Si guardás la distancia en el viaje, conviene en km (float o int redondeado)
+        return int(round(distance_km))  # si tu columna es Integer
+
     def complete_trip(self, distance_km: float):
-        """Completa un viaje y actualiza el odómetro y degradación."""
+        """
+        Completa un viaje y actualiza el odómetro y degradación.
+
+        Solo hace flush: el commit lo hace el llamador (ver TripCompletionService).
+        """
         # Sanitizar
         if distance_km is None or distance_km < 0:
             distance_km = 0.0
 
-        self.status = 'Completed'
-        # Si guardás la distancia en el viaje, conviene en km (float o int redondeado)
-        self.distance = int(round(distance_km))  # si tu columna es Integer
-
-        self.updated_at = datetime.utcnow()
+        distance = Trip.recorded_distance(distance_km)
+        # Si el UPDATE condicionado de TripCompletionService ya lo dejó así, no se reescribe
+        if self.status != 'Completed' or self.distance != distance:
+            self.status = 'Completed'
+            self.distance = distance
+            self.updated_at = datetime.utcnow()
 
         if self.truck:
             # Sumar al odómetro como entero (mientras mileage sea Integer)
             self.truck.update_mileage(int(round(distance_km)))
 
-        db.session.commit()
+        db.session.flush()
         return self
\ No newline at end of file
@@ -1,5 +1,6 @@
 from .. import db 
 from datetime import datetime
+from ..utils.event_stream import publish_event
 
 
 
@@ -19,6 +20,8 @@ class Truck(db.Model):
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     fleetanalytics_id = db.Column(db.Integer, db.ForeignKey('fleet_analytics.id'), nullable=True)
     driver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  
+    # Control de concurrencia optimista: cada UPDATE exige la versión leída
+    version_id = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     owner = db.relationship('User', foreign_keys=[owner_id], back_populates='trucks_as_owner', uselist=False, single_parent=True)
     driver = db.relationship('User', foreign_keys=[driver_id], back_populates='trucks_as_driver', uselist=False, cascade="all, delete-orphan", single_parent=True)
@@ -26,6 +29,7 @@ class Truck(db.Model):
     maintenances = db.relationship('Maintenance', back_populates='truck', cascade="all,delete-orphan")
     fleetanalytics = db.relationship('FleetAnalytics', back_populates='trucks', uselist=False)
 
+    __mapper_args__ = {'version_id_col': version_id}
 
 
     def __init__(self, owner_id, plate, model, brand, year, color, mileage, health_status, fleetanalytics_id, driver_id):
@@ -88,6 +92,7 @@ class Truck(db.Model):
     
 
     def update_mileage(self, distance):
+        """Suma km al odómetro y degrada los componentes. No hace commit: lo decide el llamador."""
         # clamp
         try:
             d = int(distance)
@@ -98,29 +103,55 @@ class Truck(db.Model):
 
         self.mileage += d
 
+        reaching_limit = []
         for m in self.maintenances:
+            previous_status = m.status
             m.accumulated_km += d
             m.update_status()
+            if m.status != previous_status:
+                publish_event(self.owner_id, 'component_status', truck_id=self.truck_id, plate=self.plate,
+                              maintenance_id=m.id, component=m.component,
+                              previous=previous_status, status=m.status, mileage=self.mileage)
+            if m.status == 'Maintenance Required' and previous_status != 'Maintenance Required':
+                reaching_limit.append(m.component)
+        if reaching_limit:
+            self.notify_owner(reaching_limit)
 
         self.update_health_status()
         self.updated_at = datetime.utcnow()
-        db.session.commit()
     
     def update_health_status(self):
-        statuses = [maintenance.status for maintenance in self.maintenances]
-        if 'Maintenance Required' in statuses:
-            self.health_status = 'Maintenance Required'
-        elif 'Fair' in statuses:
-            self.health_status = 'Fair'
-        elif 'Good' in statuses:
-            self.health_status = 'Good'
-        elif 'Very Good' in statuses:
-            self.health_status = 'Very Good'
-        else:
-            self.health_status = 'Excellent'
-        db.session.commit()
+        self.health_status = Truck.health_for_statuses([maintenance.status for maintenance in self.maintenances])
+
+    @staticmethod
+    def owners_for(session, truck_ids):
+        """
+        truck_id -> owner_id. Casi siempre el camión ya está en la sesión: solo se
+        consultan los que faltan. Lo usan los listeners de flush (domain events, cachés).
+        """
+        owners = {}
+        for truck_id in truck_ids:
+            truck = session.identity_map.get(session.identity_key(Truck, truck_id))
+            if truck is not None:
+                owners[truck_id] = truck.owner_id
+        missing = [truck_id for truck_id in truck_ids if truck_id not in owners]
+        if missing:
+            owners.update(session.execute(
+                db.select(Truck.truck_id, Truck.owner_id).where(Truck.truck_id.in_(missing))
+            ).all())
+        return owners
+
+    @staticmethod
+    def health_for_statuses(statuses):
+        """Salud general del camión: el peor estado entre sus componentes"""
+        statuses = set(statuses)
+        for status in ('Maintenance Required', 'Fair', 'Good', 'Very Good'):
+            if status in statuses:
+                return status
+        return 'Excellent'
 
     def check_maintenance(self): 
+        """Corre la ventana de los componentes vencidos (para toda la flota: sweep_overdue_maintenance)"""
         for maintenance in self.maintenances:
             if self.mileage >= maintenance.next_maintenance_mileage: 
                 maintenance.status = 'Pending'
@@ -130,7 +161,69 @@ class Truck(db.Model):
                 db.session.add(maintenance)
                 #self.notify_owner()
         self.update_health_status()
-        db.session.commit()
+
+    @staticmethod
+    def sweep_overdue_maintenance():
+        """
+        check_maintenance para toda la flota en tres statements, sin cargar objetos.
+        Los componentes vencidos (kilometraje del camión >= next_maintenance_mileage)
+        corren su ventana al kilometraje actual y recalculan su estado. Después se
+        recalcula la salud de los camiones tocados. No hace commit.
+
+        Devuelve [(maintenance_id, truck_id, owner_id, {columna: [antes, después]})]
+        para que el llamador registre los eventos de dominio: un UPDATE masivo no
+        pasa por la sesión.
+        """
+        from .maintenance import Maintenance
+
+        overdue = db.session.execute(
+            db.select(Maintenance.id, Maintenance.truck_id, Truck.owner_id, Truck.mileage, Maintenance.status,
+                      Maintenance.last_maintenance_mileage, Maintenance.next_maintenance_mileage,
+                      Maintenance.accumulated_km, Maintenance.maintenance_interval)
+            .join(Truck, Truck.truck_id == Maintenance.truck_id)
+            .where(Truck.mileage >= Maintenance.next_maintenance_mileage)
+        ).all()
+        if not overdue:
+            return []
+
+        truck_mileage = db.select(Truck.mileage).where(Truck.truck_id == Maintenance.truck_id).scalar_subquery()
+        db.session.execute(
+            db.update(Maintenance)
+            .where(Maintenance.id.in_([row.id for row in overdue]),
+                   Maintenance.next_maintenance_mileage <= truck_mileage)
+            .values(last_maintenance_mileage=truck_mileage,
+                    next_maintenance_mileage=truck_mileage + Maintenance.maintenance_interval,
+                    status=Maintenance.status_case(Maintenance.accumulated_km, Maintenance.maintenance_interval))
+            .execution_options(synchronize_session=False)
+        )
+
+        # Mismo orden que health_for_statuses: el peor estado entre sus componentes
+        def has_status(status):
+            return (db.select(Maintenance.id)
+                    .where(Maintenance.truck_id == Truck.truck_id, Maintenance.status == status)
+                    .exists())
+
+        health = db.case(*[(has_status(status), status)
+                           for status in ('Maintenance Required', 'Fair', 'Good', 'Very Good')],
+                         else_='Excellent')
+        db.session.execute(
+            db.update(Truck)
+            .where(Truck.truck_id.in_(sorted({row.truck_id for row in overdue})), Truck.health_status != health)
+            # version_id a mano: el UPDATE no pasa por el chequeo de versión del ORM
+            .values(health_status=health, version_id=Truck.version_id + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+        changes = []
+        for row in overdue:
+            after = {'status': Maintenance.status_for_usage(row.accumulated_km, row.maintenance_interval),
+                     'last_maintenance_mileage': row.mileage,
+                     'next_maintenance_mileage': row.mileage + row.maintenance_interval}
+            before = {'status': row.status, 'last_maintenance_mileage': row.last_maintenance_mileage,
+                      'next_maintenance_mileage': row.next_maintenance_mileage}
+            changes.append((row.id, row.truck_id, row.owner_id,
+                            {key: [before[key], after[key]] for key in after if before[key] != after[key]}))
+        return changes
 
     def update_component(self, component_name, status): 
         # Solo actualizar componentes base (costo = 0) que representan el estado actual
@@ -143,7 +236,8 @@ class Truck(db.Model):
                 maintenance.accumulated_km = 0
                 db.session.add(maintenance)
         self.update_health_status()
-        db.session.commit()
+        # Tocar el camión fuerza el chequeo de versión aunque su health_status no cambie
+        self.updated_at = datetime.utcnow()
 
 
     def calculate_remaining_km_until_services(self):
@@ -156,7 +250,16 @@ class Truck(db.Model):
             else:
                 return 0
         
-    def notify_owner(self):
-        #logic for notifying owner
-        print(f'Notifying owner of truck {self.truck_id} about maintenance required')
-        #logic sending email to owner 
\ No newline at end of file
+    def notify_owner(self, components):
+        """Avisa al owner en la misma transacción: evento SSE y mail (lo envía worker.py)"""
+        from ..mail.outbox import queue_mail
+
+        for component in components:
+            publish_event(self.owner_id, 'maintenance_alert', truck_id=self.truck_id, plate=self.plate,
+                          component=component, mileage=self.mileage)
+        if self.owner is None:
+            return
+        for component in components:
+            queue_mail(self.owner.email, 'Mantenimiento requerido', 'maintenance_required',
+                       name=self.owner.name, plate=self.plate, brand=self.brand, model=self.model,
+                       component=component, mileage=self.mileage) 
\ No newline at end of file
@@ -7,7 +7,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from .. import db
 from ..models import MaintenanceModel, TruckModel
 from ..utils.decorators import role_required
-from datetime import datetime, date
+from datetime import datetime
 from ..swagger_models.component_models import (
     component_ns, component_status_model, component_list_model,
     create_component_model, component_detail_model, bulk_components_request_model,
@@ -15,14 +15,6 @@ from ..swagger_models.component_models import (
 )
 
 
-def serialize_dt(obj):
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    if isinstance(obj, dict):
-        return {k: serialize_dt(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [serialize_dt(x) for x in obj]
-    return obj
 
 
 def compute_health_pct(current_odo, last_odo, interval_km):
@@ -257,8 +249,8 @@ class ListTruckComponents(Resource):
                     'next_maintenance_mileage': component.next_maintenance_mileage,
                     'maintenance_interval': component.maintenance_interval,
                     'accumulated_km': component.accumulated_km,  # Agregar accumulated_km
-                    'created_at': serialize_dt(component.created_at),
-                    'updated_at': serialize_dt(component.updated_at)
+                    'created_at': component.created_at,
+                    'updated_at': component.updated_at
                 }
                 components_list.append(component_data)
             
@@ -307,8 +299,8 @@ class ListTruckMaintenanceHistory(Resource):
                     'last_maintenance_mileage': maintenance.last_maintenance_mileage,
                     'next_maintenance_mileage': maintenance.next_maintenance_mileage,
                     'maintenance_interval': maintenance.maintenance_interval,
-                    'created_at': serialize_dt(maintenance.created_at),
-                    'updated_at': serialize_dt(maintenance.updated_at)
+                    'created_at': maintenance.created_at,
+                    'updated_at': maintenance.updated_at
                 }
                 maintenance_list.append(maintenance_data)
             
@@ -0,0 +1,82 @@
+"""
+Rutas Flask-RESTX para el stream de eventos (SSE)
+"""
+from flask import Response, current_app, request, stream_with_context
+from flask_restx import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from .. import db
+from ..models import TruckModel, UserModel
+from ..utils.event_stream import event_broker, stream
+from ..swagger_models.event_models import event_ns, stream_event_model
+
+# Lo que espera un cliente rechazado por SSE_MAX_CONNECTIONS_PER_WORKER antes de reintentar
+RETRY_AFTER_SECONDS = 5
+
+
+@event_ns.route('/stream')
+class EventStream(Resource):
+    @event_ns.doc(params={
+        'truck_id': 'Solo eventos de estos camiones (se puede repetir)',
+        'last_event_id': 'Alternativa al header Last-Event-ID para retomar el stream',
+        'jwt': 'Token de acceso (EventSource no permite mandar el header Authorization)',
+    })
+    @event_ns.response(200, 'text/event-stream con eventos component_status, maintenance_alert, '
+                            'maintenance_approved, maintenance_rejected, trip_completed y job_finished',
+                       stream_event_model)
+    @event_ns.response(403, 'Rol no autorizado')
+    @event_ns.response(503, 'El worker ya tiene SSE_MAX_CONNECTIONS_PER_WORKER streams abiertos (Retry-After)')
+    @jwt_required(locations=['headers', 'query_string'])
+    def get(self):
+        """
+        Stream SSE de los eventos del owner (o de los camiones del conductor).
+
+        Reemplaza el polling de /Fleetanalytics/maintenance-alerts y
+        /components/<id>/status: una conexión larga por cliente. Al reconectar con
+        Last-Event-ID se reciben los eventos perdidos.
+        """
+        user = db.session.get(UserModel, int(get_jwt_identity()))
+        if user is None or user.rol not in ('owner', 'driver'):
+            event_ns.abort(403, message='Unauthorized')
+
+        truck_ids = request.args.getlist('truck_id', type=int) or None
+        if user.rol == 'owner':
+            owner_ids = {user.id}
+        else:
+            # El conductor ve solo los camiones que tiene asignados
+            trucks = db.session.query(TruckModel.truck_id, TruckModel.owner_id).filter_by(driver_id=user.id).all()
+            owner_ids = {truck.owner_id for truck in trucks}
+            assigned = {truck.truck_id for truck in trucks}
+            truck_ids = assigned & set(truck_ids) if truck_ids else assigned
+
+        config = current_app.config
+        cursor = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        cursor = int(cursor) if cursor and cursor.isdigit() else None
+        subscription = event_broker.subscribe(owner_ids, truck_ids, cursor,
+                                              config['SSE_MAX_CONNECTIONS_PER_WORKER'])
+        if subscription is None:
+            # Cada stream ocupa un hilo: sin límite dejarían sin hilos al resto de la API
+            return ({'message': 'Too many open event streams, retry later'}, 503,
+                    {'Retry-After': str(RETRY_AFTER_SECONDS)})
+        try:
+            replayed = []
+            if cursor is not None:
+                replayed = event_broker.replay(owner_ids, cursor, subscription.start_id, truck_ids,
+                                               config['SSE_REPLAY_LIMIT'])
+            # El stream no usa la base: se devuelve la conexión al pool antes de empezar
+            db.session.remove()
+
+            response = Response(
+                stream_with_context(stream(subscription, replayed, config['SSE_HEARTBEAT_SECONDS'],
+                                           config['SSE_MAX_CONNECTION_SECONDS'],
+                                           replay_truncated=len(replayed) >= config['SSE_REPLAY_LIMIT'])),
+                mimetype='text/event-stream')
+        except Exception:
+            # Todavía no hay stream que la libere en su finally
+            event_broker.unsubscribe(subscription)
+            raise
+        # Si el cliente corta antes de leer el primer chunk, el generador nunca arranca
+        # y su finally no corre: el cierre de la respuesta libera la suscripción igual
+        response.call_on_close(lambda: event_broker.unsubscribe(subscription))
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
@@ -7,6 +7,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from .. import db
 from ..models import FleetAnalyticsModel, TruckModel, MaintenanceModel, TripModel
 from ..utils.decorators import role_required
+from ..utils.response_cache import response_cache
 from datetime import datetime
 from ..swagger_models.fleetanalytics_models import (
     fleet_ns, fleetanalytics_detail_model, driver_assigned_trucks_response_model,
@@ -21,6 +22,7 @@ class GetFleetAnalytics(Resource):
     @fleet_ns.response(500, 'Error interno del servidor')
     @jwt_required()
     @role_required(['owner'])
+    @response_cache.cached('owner:{owner}:analytics')
     def get(self):
         """
         Obtener análisis de flota del usuario actual.
@@ -143,19 +145,23 @@ class GetDriverAssignedTrucks(Resource):
                     'total_assigned': 0
                 }, 200
             
+            # Conteo de pendientes y críticos de todos los camiones en una query agrupada
+            counts = dict(
+                ((truck_id, status), total)
+                for truck_id, status, total in db.session.query(
+                    MaintenanceModel.truck_id,
+                    MaintenanceModel.status,
+                    db.func.count(MaintenanceModel.id)
+                ).filter(
+                    MaintenanceModel.truck_id.in_([truck.truck_id for truck in assigned_trucks]),
+                    MaintenanceModel.status.in_(['Pending', 'Critical'])
+                ).group_by(MaintenanceModel.truck_id, MaintenanceModel.status)
+            )
+
             trucks_data = []
             for truck in assigned_trucks:
-                # Obtener mantenimientos pendientes del camión
-                pending_maintenance = MaintenanceModel.query.filter_by(
-                    truck_id=truck.truck_id,
-                    status='Pending'
-                ).count()
-                
-                # Obtener mantenimientos críticos
-                critical_maintenance = MaintenanceModel.query.filter_by(
-                    truck_id=truck.truck_id,
-                    status='Critical'
-                ).count()
+                pending_maintenance = counts.get((truck.truck_id, 'Pending'), 0)
+                critical_maintenance = counts.get((truck.truck_id, 'Critical'), 0)
                 
                 truck_info = {
                     'truck_id': truck.truck_id,
@@ -189,6 +195,7 @@ class GetMaintenanceAlerts(Resource):
     @fleet_ns.response(500, 'Error interno del servidor')
     @jwt_required()
     @role_required(['owner'])
+    @response_cache.cached('owner:{owner}:trucks', 'owner:{owner}:maintenance')
     def get(self):
         """
         Obtener alertas de mantenimiento para la flota del owner.
@@ -217,8 +224,17 @@ class GetMaintenanceAlerts(Resource):
                 }
             }
             
+            # Todos los mantenimientos de la flota en una query, agrupados por camión
+            maintenances_by_truck = {}
+            if trucks:
+                fleet_maintenances = MaintenanceModel.query.filter(
+                    MaintenanceModel.truck_id.in_([truck.truck_id for truck in trucks])
+                ).order_by(MaintenanceModel.id).all()
+                for maintenance in fleet_maintenances:
+                    maintenances_by_truck.setdefault(maintenance.truck_id, []).append(maintenance)
+
             for truck in trucks:
-                truck_maintenance = MaintenanceModel.query.filter_by(truck_id=truck.truck_id).all()
+                truck_maintenance = maintenances_by_truck.get(truck.truck_id, [])
                 
                 for maintenance in truck_maintenance:
                     # Calcular km restantes hasta el próximo mantenimiento
@@ -253,10 +269,7 @@ class GetMaintenanceAlerts(Resource):
                         alerts['summary']['upcoming_count'] += 1
                 
                 # Componentes en estado crítico
-                critical_maintenance = MaintenanceModel.query.filter_by(
-                    truck_id=truck.truck_id,
-                    status='Critical'
-                ).all()
+                critical_maintenance = [m for m in truck_maintenance if m.status == 'Critical']
                 
                 for critical in critical_maintenance:
                     alerts['critical_components'].append({
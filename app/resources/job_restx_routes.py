@@ -0,0 +1,25 @@
+"""
+Rutas Flask-RESTX para consultar trabajos en segundo plano
+"""
+from flask_restx import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from .. import db
+from ..models import JobModel
+from ..utils.decorators import role_required
+from ..swagger_models.job_models import job_ns, job_status_model
+
+
+@job_ns.route('/<int:id>')
+class JobStatus(Resource):
+    @job_ns.response(200, 'Estado del trabajo', job_status_model)
+    @job_ns.response(404, 'Trabajo no encontrado')
+    @jwt_required()
+    @role_required(['driver', 'owner'])
+    def get(self, id):
+        """Estado de un trabajo: queued, running, done (con el resultado) o failed"""
+        job = db.session.get(JobModel, id)
+        user_id = int(get_jwt_identity())
+        # Lo ve quien lo encoló y el owner del camión; al resto se le responde 404
+        if job is None or user_id not in (job.requested_by, job.owner_id):
+            job_ns.abort(404, message='Job not found')
+        return job.to_json(), 200
@@ -4,28 +4,22 @@ Rutas Flask-RESTX para el recurso de maintenance
 from flask import request
 from flask_restx import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import contains_eager, joinedload
 from .. import db
 from ..models import MaintenanceModel, TruckModel, FleetAnalyticsModel, UserModel
 from ..utils.decorators import role_required
-from datetime import datetime, date
+from ..mail.outbox import queue_mail
+from ..utils.event_stream import publish_event
+from datetime import datetime
+import logging
 from ..swagger_models.maintenance_models import (
     maintenance_ns, create_maintenance_model, edit_maintenance_model, approve_maintenance_model,
     maintenance_list_model, maintenance_detail_model, create_maintenance_response_model,
+    pending_maintenance_list_model,
     success_message_model, maintenance_stats_model, update_status_response_model
 )
 
-
-def serialize_dt(obj):
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    if isinstance(obj, dict):
-        return {k: serialize_dt(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [serialize_dt(x) for x in obj]
-    return obj
-
-
-
+logger = logging.getLogger(__name__)
 
 
 @maintenance_ns.route('/new')
@@ -69,7 +63,7 @@ class CreateMaintenance(Resource):
 
             truck = TruckModel.query.get(data['truck_id'])
             if truck:
-                FleetAnalyticsModel.update_fleet_analytics(truck.owner_id)
+                FleetAnalyticsModel.refresh_after_write(truck.owner_id)
 
             return {'message': 'Maintenance created', 'maintenance': new_maintenance.id}, 201
         except Exception as e:
@@ -153,6 +147,10 @@ class GetComponent(Resource):
 
 @maintenance_ns.route('/<int:truck_id>/components')
 class ListCompletedMaintenances(Resource):
+    @maintenance_ns.doc(params={
+        'page': 'Número de página (por defecto 1)',
+        'per_page': 'Elementos por página (por defecto 20, máximo 100)'
+    })
     @maintenance_ns.response(200, 'Historial de mantenimientos completados obtenido exitosamente', maintenance_list_model)
     @maintenance_ns.response(404, 'Camión no encontrado')
     @jwt_required()
@@ -160,27 +158,37 @@ class ListCompletedMaintenances(Resource):
     def get(self, truck_id):
         """Listar el historial de mantenimientos completados de un camión"""
         truck = TruckModel.query.get_or_404(truck_id)
-        
-        # Primero, vamos a ver todos los mantenimientos para diagnosticar
-        all_maintenances = MaintenanceModel.query.filter_by(truck_id=truck_id).all()
-        
-        # Debug: imprimir estados para diagnosticar
-        print(f"Total mantenimientos para truck {truck_id}: {len(all_maintenances)}")
-        for maint in all_maintenances:
-            print(f"Maintenance ID: {maint.id}, Status: '{maint.status}', Component: {maint.component}")
-        
-        # Mostrar solo los mantenimientos completados para el historial
-        completed_maintenances_ordered = MaintenanceModel.query.filter_by(
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = min(100, max(1, request.args.get('per_page', 20, type=int)))
+
+        # Una sola query ordenada y paginada, cubierta por ix_maintenance_truck_status_updated
+        completed_query = MaintenanceModel.query.filter_by(
             truck_id=truck_id,
             status='Completed'
-        ).order_by(MaintenanceModel.updated_at.desc()).all()
-        
-        print(f"Total mantenimientos completados para historial: {len(completed_maintenances_ordered)}")
-        
+        )
+        total_completed = completed_query.count()
+        completed_maintenances = completed_query.options(
+            joinedload(MaintenanceModel.driver)
+        ).order_by(
+            MaintenanceModel.updated_at.desc(),
+            MaintenanceModel.id.desc()
+        ).offset((page - 1) * per_page).limit(per_page).all()
+
+        logger.debug("Truck %s: %s mantenimientos completados (página %s, %s filas)",
+                     truck_id, total_completed, page, len(completed_maintenances))
+
+        truck_data = {
+            'truck_id': truck.truck_id,
+            'plate': truck.plate,
+            'model': truck.model,
+            'brand': truck.brand,
+            'mileage': truck.mileage
+        }
+
         maintenances_list = []
-        for maintenance in completed_maintenances_ordered:
-            driver = db.session.query(UserModel).get(maintenance.driver_id)
-            
+        for maintenance in completed_maintenances:
+            driver = maintenance.driver
+
             maintenance_data = {
                 'maintenance_id': maintenance.id,
                 'description': maintenance.description,
@@ -190,15 +198,9 @@ class ListCompletedMaintenances(Resource):
                 'mileage_interval': maintenance.mileage_interval,
                 'last_maintenance_mileage': maintenance.last_maintenance_mileage,
                 'next_maintenance_mileage': maintenance.next_maintenance_mileage,
-                'created_at': serialize_dt(maintenance.created_at),
-                'updated_at': serialize_dt(maintenance.updated_at), 
-                'truck': {
-                    'truck_id': truck.truck_id,
-                    'plate': truck.plate,
-                    'model': truck.model,
-                    'brand': truck.brand,
-                    'mileage': truck.mileage
-                },
+                'created_at': maintenance.created_at,
+                'updated_at': maintenance.updated_at, 
+                'truck': truck_data,
                 'driver': {
                     'id': driver.id,
                     'name': driver.name,
@@ -208,7 +210,13 @@ class ListCompletedMaintenances(Resource):
             }
             maintenances_list.append(maintenance_data)
         
-        return {'maintenances': maintenances_list}, 200
+        return {
+            'maintenances': maintenances_list,
+            'total': total_completed,
+            'page': page,
+            'pages': (total_completed - 1) // per_page + 1 if total_completed else 0,
+            'per_page': per_page
+        }, 200
 
 
 @maintenance_ns.route('/<int:id>/approve')
@@ -239,14 +247,25 @@ class ApproveMaintenance(Resource):
                 maintenance.accumulated_km = 0
                 # Actualizar solo el componente base (costo = 0) que representa el estado actual
                 truck.update_component(maintenance.component, 'Excellent')
+                # Aviso al conductor que lo pidió; se envía desde el outbox después del commit
+                if maintenance.driver is not None:
+                    queue_mail(maintenance.driver.email, 'Mantenimiento aprobado', 'maintenance_approved',
+                               name=maintenance.driver.name, plate=truck.plate,
+                               component=maintenance.component, cost=maintenance.cost)
             
             elif approval_status == 'Rejected': 
                 maintenance.status = 'Rejected'
 
+            if approval_status in ('Approved', 'Rejected'):
+                publish_event(maintenance.truck.owner_id,
+                              'maintenance_approved' if approval_status == 'Approved' else 'maintenance_rejected',
+                              truck_id=maintenance.truck_id, maintenance_id=maintenance.id,
+                              component=maintenance.component, status=maintenance.status)
+
             db.session.commit()
 
             if approval_status == 'Approved':
-                FleetAnalyticsModel.update_fleet_analytics(truck.owner_id)
+                FleetAnalyticsModel.refresh_after_write(truck.owner_id)
 
             return {'message': 'Maintenance status updated', 'status': maintenance.status}, 200
         
@@ -261,22 +280,17 @@ class MaintenanceStats(Resource):
     @jwt_required()
     @role_required(['owner'])
     def get(self):
-        """Obtener estadísticas de mantenimiento"""
-        total_maintenances = MaintenanceModel.query.count()
-        pending_maintenances = MaintenanceModel.query.filter_by(status='Pending').count()
-        completed_maintenances = MaintenanceModel.query.filter_by(status='Completed').count()
-        
-        # Calcular costos
-        total_cost = db.session.query(db.func.sum(MaintenanceModel.cost)).scalar() or 0
-        average_cost = total_cost / total_maintenances if total_maintenances > 0 else 0
-        
-        return {
-            'total_maintenances': total_maintenances,
-            'pending_maintenances': pending_maintenances,
-            'completed_maintenances': completed_maintenances,
-            'total_cost': float(total_cost),
-            'average_cost': float(average_cost)
-        }, 200
+        """
+        Obtener estadísticas de mantenimiento de los camiones del owner actual.
+
+        Incluye totales, costos y desgloses por estado, componente y mes.
+        Se sirven desde stats_cache (app/models/maintenance.py): un caché por
+        owner de MAINTENANCE_STATS_CACHE_TTL segundos que se invalida al
+        commitear cualquier escritura de mantenimientos. No pasa además por la
+        caché de respuestas.
+        """
+        current_user = get_jwt_identity()
+        return MaintenanceModel.get_owner_stats(current_user), 200
 
 
 @maintenance_ns.route('/<int:truck_id>/update-status')
@@ -325,59 +339,79 @@ class UpdateMaintenanceStatus(Resource):
 
 @maintenance_ns.route('/pending')
 class ListPendingMaintenances(Resource):
-    @maintenance_ns.response(200, 'Mantenimientos pendientes obtenidos exitosamente', maintenance_list_model)
+    @maintenance_ns.doc(params={
+        'page': 'Número de página (por defecto 1)',
+        'per_page': 'Elementos por página (por defecto 20, máximo 100)'
+    })
+    @maintenance_ns.response(200, 'Mantenimientos pendientes obtenidos exitosamente', pending_maintenance_list_model)
     @maintenance_ns.response(500, 'Error interno del servidor')
     @jwt_required()
     @role_required(['owner'])
     def get(self):
-        """Listar todos los mantenimientos pendientes de aprobación"""
+        """Listar los mantenimientos pendientes de aprobación de los camiones del owner"""
         try:
-            current_user = get_jwt_identity()
-            
-            # Obtener todos los mantenimientos pendientes
-            pending_maintenances = MaintenanceModel.query.filter_by(status='Pending').order_by(MaintenanceModel.created_at.desc()).all()
-            
+            current_user = int(get_jwt_identity())
+            page = max(1, request.args.get('page', 1, type=int))
+            per_page = min(100, max(1, request.args.get('per_page', 20, type=int)))
+
+            # Un solo JOIN Maintenance -> Truck filtrado por owner; el filtrado,
+            # el orden y la paginación se resuelven en SQL
+            pending_query = db.session.query(MaintenanceModel).join(
+                MaintenanceModel.truck
+            ).filter(
+                MaintenanceModel.status == 'Pending',
+                TruckModel.owner_id == current_user
+            )
+
+            total_pending = pending_query.count()
+
+            # El camión viene del mismo JOIN y el driver por joinedload: sin queries por fila
+            pending_maintenances = pending_query.options(
+                contains_eager(MaintenanceModel.truck),
+                joinedload(MaintenanceModel.driver)
+            ).order_by(
+                MaintenanceModel.created_at.desc(),
+                MaintenanceModel.id.desc()
+            ).offset((page - 1) * per_page).limit(per_page).all()
+
             maintenances_list = []
             for maintenance in pending_maintenances:
-                # Obtener información del camión
-                truck = TruckModel.query.get(maintenance.truck_id)
-                
-                # Obtener información del driver
-                driver = UserModel.query.get(maintenance.driver_id) if maintenance.driver_id else None
-                
-                # Verificar que el camión pertenece al owner actual
-                if truck and str(truck.owner_id) == str(current_user):
-                    maintenance_data = {
-                        'maintenance_id': maintenance.id,
-                        'description': maintenance.description,
-                        'status': maintenance.status,
-                        'component': maintenance.component,
-                        'cost': maintenance.cost,
-                        'mileage_interval': maintenance.mileage_interval,
-                        'last_maintenance_mileage': maintenance.last_maintenance_mileage,
-                        'next_maintenance_mileage': maintenance.next_maintenance_mileage,
-                        'created_at': serialize_dt(maintenance.created_at),
-                        'updated_at': serialize_dt(maintenance.updated_at),
-                        'truck': {
-                            'truck_id': truck.truck_id,
-                            'plate': truck.plate,
-                            'model': truck.model,
-                            'brand': truck.brand,
-                            'mileage': truck.mileage
-                        } if truck else None,
-                        'driver': {
-                            'id': driver.id,
-                            'name': driver.name,
-                            'surname': driver.surname,
-                            'email': driver.email
-                        } if driver else None
-                    }
-                    maintenances_list.append(maintenance_data)
-            
+                truck = maintenance.truck
+                driver = maintenance.driver
+                maintenance_data = {
+                    'maintenance_id': maintenance.id,
+                    'description': maintenance.description,
+                    'status': maintenance.status,
+                    'component': maintenance.component,
+                    'cost': maintenance.cost,
+                    'mileage_interval': maintenance.mileage_interval,
+                    'last_maintenance_mileage': maintenance.last_maintenance_mileage,
+                    'next_maintenance_mileage': maintenance.next_maintenance_mileage,
+                    'created_at': maintenance.created_at,
+                    'updated_at': maintenance.updated_at,
+                    'truck': {
+                        'truck_id': truck.truck_id,
+                        'plate': truck.plate,
+                        'model': truck.model,
+                        'brand': truck.brand,
+                        'mileage': truck.mileage
+                    },
+                    'driver': {
+                        'id': driver.id,
+                        'name': driver.name,
+                        'surname': driver.surname,
+                        'email': driver.email
+                    } if driver else None
+                }
+                maintenances_list.append(maintenance_data)
+
             return {
                 'pending_maintenances': maintenances_list,
-                'total_pending': len(maintenances_list)
+                'total_pending': total_pending,
+                'page': page,
+                'pages': (total_pending - 1) // per_page + 1 if total_pending else 0,
+                'per_page': per_page
             }, 200
-            
+
         except Exception as e:
-            maintenance_ns.abort(500, message='Error getting pending maintenances', error=str(e))
\ No newline at end of file
+            maintenance_ns.abort(500, message='Error getting pending maintenances', error=str(e))
@@ -1,31 +1,23 @@
 """
 Rutas Flask-RESTX para el recurso de trips
 """
-from flask import request
+from flask import current_app, request
 from flask_restx import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from .. import db
 from ..models import TripModel, TruckModel, FleetAnalyticsModel, UserModel
 from ..utils.decorators import role_required
 from app.google.locations import GoogleGetLocation
-from datetime import datetime, date
-import asyncio
+from ..services.trip_completion import TripCompletionService, TripNotInCourseError
+from datetime import datetime
+from ..utils.aio import event_loop
 from ..swagger_models.trip_models import (
     trip_ns, create_trip_model, edit_trip_model, trip_list_model,
     trip_detail_model, create_trip_response_model, success_message_model,
     trip_filter_model
 )
-
-# ---- Helper: serialización segura de datetime/date a ISO8601 ----
-def serialize_dt(obj):
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    if isinstance(obj, dict):
-        return {k: serialize_dt(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [serialize_dt(x) for x in obj]
-    return obj
-
+from ..swagger_models.job_models import job_accepted_model
 
 @trip_ns.route('/new')
 class CreateTrip(Resource):
@@ -71,7 +63,7 @@ class CreateTrip(Resource):
         # Obtener distancia del viaje ANTES de validar componentes
         try:
             google_location = GoogleGetLocation()
-            distance_info = asyncio.run(google_location.get_distance(origin, destination))
+            distance_info = event_loop.run(google_location.get_distance(origin, destination))
             trip_distance = distance_info.get('distance_km', 0)
         except Exception as e:
             print(f"DEBUG: Error getting distance: {str(e)}")
@@ -217,22 +209,29 @@ class ListTrips(Resource):
         if driver_id:
             trips_query = trips_query.filter(TripModel.driver_id == driver_id)
 
-        trips = trips_query.slice((page - 1) * per_page, page * per_page).all()
+        # Camión y conductor se cargan con la página (antes: dos queries por viaje)
+        trips = (
+            trips_query
+            .options(joinedload(TripModel.driver), joinedload(TripModel.truck))
+            .slice((page - 1) * per_page, page * per_page)
+            .all()
+        )
         total_trips = trips_query.count()
 
         trips_list = []
         for trip in trips:
-            driver = db.session.query(UserModel).get(trip.driver_id)
-            truck = db.session.query(TruckModel).get(trip.truck_id)
+            driver = trip.driver
+            truck = trip.truck
 
             trip_data = {
                 'trip_id': trip.id,
                 'origin': trip.origin,
                 'destination': trip.destination,
                 'status': trip.status,
-                'date': trip.date.isoformat() if trip.date else None,
-                'created_at': trip.created_at.isoformat() if trip.created_at else None,
-                'updated_at': trip.updated_at.isoformat() if trip.updated_at else None,
+                # Las fechas se serializan en ISO 8601 en la representación JSON (api_config)
+                'date': trip.date,
+                'created_at': trip.created_at,
+                'updated_at': trip.updated_at,
                 'truck': {
                     'truck_id': truck.truck_id,
                     'plate': truck.plate,
@@ -249,12 +248,12 @@ class ListTrips(Resource):
             }
             trips_list.append(trip_data)
 
-        return serialize_dt({
+        return {
             'trips': trips_list,
             'total': total_trips,
             'pages': (total_trips - 1) // per_page + 1,
             'page': page
-        }), 200
+        }, 200
 
 
 @trip_ns.route('/<int:id>')
@@ -295,7 +294,7 @@ class TripDetail(Resource):
         if trip.status == 'Pending':
             try:
                 google_location = GoogleGetLocation()
-                distance_info = asyncio.run(google_location.get_distance(trip.origin, trip.destination))
+                distance_info = event_loop.run(google_location.get_distance(trip.origin, trip.destination))
                 trip_data.update(distance_info)
             except Exception as e:
                 trip_data['distance_error'] = str(e)
@@ -309,6 +308,7 @@ class UpdateTrip(Resource):
     @trip_ns.response(200, 'Viaje actualizado exitosamente', success_message_model)
     @trip_ns.response(400, 'Estado inválido')
     @trip_ns.response(404, 'Viaje no encontrado')
+    @trip_ns.response(409, 'El viaje ya no está en curso')
     @trip_ns.response(500, 'Error interno del servidor')
     @jwt_required()
     @role_required(['owner', 'driver'])
@@ -332,37 +332,20 @@ class UpdateTrip(Resource):
                 destination = trip.destination
 
                 google_location = GoogleGetLocation()
-                distance_info = asyncio.run(google_location.get_distance(origin, destination))
+                distance_info = event_loop.run(google_location.get_distance(origin, destination))
                 if "error" in distance_info:
                     trip_ns.abort(400, message='Error getting distance from Google')
                 distance_km = float(distance_info["distance_km"])
 
-                # Verificar estado ANTES del viaje
-                truck = trip.truck
-                components_before = []
-                for maintenance in truck.maintenances:
-                    components_before.append({
-                        'component': maintenance.component, 
-                        'status': maintenance.status
-                    })
-
-                # Completar viaje (actualiza kilometraje y degrada componentes)
-                trip.complete_trip(distance_km)
-
-                # Verificar cambios
-                components_reaching_limit = []
-                for maintenance in truck.maintenances:
-                    component_before = next((c for c in components_before if c['component'] == maintenance.component), None)
-                    if component_before and component_before['status'] != 'Maintenance Required' and maintenance.status == 'Maintenance Required':
-                        components_reaching_limit.append(maintenance.component)
-
-                FleetAnalyticsModel.update_fleet_analytics(truck.owner_id)
+                # Completar viaje (kilometraje, degradación y analytics en un solo commit)
+                completion = TripCompletionService.complete(trip, distance_km)
+                components_reaching_limit = completion['components_reaching_limit']
 
                 response = {
                     'message': 'Trip completed and updated', 
                     'trip': trip.id,
                     'distance_km': distance_km,
-                    'remaining_km_until_services': truck.calculate_remaining_km_until_services()
+                    'remaining_km_until_services': completion['remaining_km_until_services']
                 }
                 
                 if components_reaching_limit:
@@ -371,6 +354,8 @@ class UpdateTrip(Resource):
                 
                 return response, 200
 
+            except TripNotInCourseError as e:
+                trip_ns.abort(409, message='Trip is not in course', status=e.status)
             except Exception as e:
                 db.session.rollback()
                 print(f"ERROR completando viaje en update: {str(e)}")
@@ -414,7 +399,7 @@ class UpdateTrip(Resource):
                 origin = trip.origin
                 destination = trip.destination
                 google_location = GoogleGetLocation()
-                distance_info = asyncio.run(google_location.get_distance(origin, destination))
+                distance_info = event_loop.run(google_location.get_distance(origin, destination))
                 if "error" in distance_info:
                     # Si no se puede calcular la distancia, continuar sin esta validación adicional
                     distance_km = 0
@@ -472,9 +457,12 @@ class UpdateTrip(Resource):
 @trip_ns.route('/<int:id>/complete')
 class CompleteTrip(Resource):
     @trip_ns.response(200, 'Viaje completado exitosamente')
+    @trip_ns.response(202, 'Completado encolado (modo async)', job_accepted_model)
     @trip_ns.response(403, 'No autorizado')
     @trip_ns.response(404, 'Viaje no encontrado')
+    @trip_ns.response(409, 'El viaje no está en curso (ya completado o sin arrancar)')
     @trip_ns.response(500, 'Error interno del servidor')
+    @trip_ns.doc(params={'Prefer': {'in': 'header', 'description': 'respond-async: encolar y responder 202'}})
     @jwt_required()
     @role_required(['driver', 'owner'])
     def patch(self, id):
@@ -489,64 +477,31 @@ class CompleteTrip(Resource):
         if user.rol != 'owner' and trip.driver_id != user_id:
             trip_ns.abort(403, message='Unauthorized')
 
-        try:
-            origin = trip.origin
-            destination = trip.destination
+        # ---- Modo async: el worker (worker.py) hace distancia, kilometraje y analytics ----
+        if current_app.config.get('TRIP_COMPLETION_MODE') == 'async' or 'respond-async' in request.headers.get('Prefer', ''):
+            try:
+                job = TripCompletionService.enqueue(trip, requested_by=user_id)
+            except TripNotInCourseError as e:
+                trip_ns.abort(409, message='Trip is not in course', status=e.status)
+            status_url = f'/Jobs/{job.id}'
+            return {'job_id': job.id, 'status': job.status, 'status_url': status_url}, 202, {'Location': status_url}
 
-            google_location = GoogleGetLocation()
-            distance_info = asyncio.run(google_location.get_distance(origin, destination))
+        try:
+            distance_info = TripCompletionService.fetch_distance(trip)
             if "error" in distance_info:
                 trip_ns.abort(400, message='Error getting distance from Google')
             distance_km = float(distance_info["distance_km"])
 
-            # Verificar estado de componentes ANTES de completar el viaje
-            truck = trip.truck
-            components_before = []
-            for maintenance in truck.maintenances:
-                components_before.append({
-                    'component': maintenance.component, 
-                    'status': maintenance.status,
-                    'accumulated_km': maintenance.accumulated_km
-                })
-
-            print(f"DEBUG: Estados ANTES del viaje: {components_before}")
-
-            # Completar viaje (esto actualiza kilometraje y degrada componentes automáticamente)
-            trip.complete_trip(distance_km)
-
-            # Verificar cambios después del viaje
-            components_after = []
-            components_reaching_limit = []
-            for maintenance in truck.maintenances:
-                components_after.append({
-                    'component': maintenance.component, 
-                    'status': maintenance.status,
-                    'accumulated_km': maintenance.accumulated_km
-                })
-                
-                # Detectar componentes que cambiaron a Maintenance Required
-                component_before = next((c for c in components_before if c['component'] == maintenance.component), None)
-                if component_before and component_before['status'] != 'Maintenance Required' and maintenance.status == 'Maintenance Required':
-                    components_reaching_limit.append(maintenance.component)
-
-            print(f"DEBUG: Estados DESPUÉS del viaje: {components_after}")
-
-            # Actualizar analytics
-            FleetAnalyticsModel.update_fleet_analytics(truck.owner_id)
+            # Completar viaje: kilometraje, degradación de componentes, estados y
+            # analytics se escriben en una sola transacción
+            completion = TripCompletionService.complete(trip, distance_km)
 
             # Preparar respuesta
-            response = trip.to_json()
-            response.update(distance_info)
-            response.update(truck.to_json())
-            response['remaining_km_until_services'] = truck.calculate_remaining_km_until_services()
-            
-            # Información sobre degradación
-            if components_reaching_limit:
-                response['components_reaching_maintenance_limit'] = components_reaching_limit
-                response['warning_message'] = f"Los siguientes componentes alcanzaron su límite de mantenimiento: {', '.join(components_reaching_limit)}"
-
-            return serialize_dt(response), 200
+            return TripCompletionService.build_response(completion, distance_info), 200
+        except TripNotInCourseError as e:
+            trip_ns.abort(409, message='Trip is not in course', status=e.status)
         except Exception as e:
+            db.session.rollback()
             print(f"ERROR completando viaje: {str(e)}")
             trip_ns.abort(500, message='Error completing the trip', error=str(e))
 
@@ -4,9 +4,11 @@ Rutas Flask-RESTX para el recurso de trucks
 from flask import request
 from flask_restx import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from .. import db
 from ..models import TruckModel, MaintenanceModel, FleetAnalyticsModel, UserModel
 from ..utils.decorators import role_required
+from ..utils.response_cache import response_cache
 from datetime import datetime
 from ..swagger_models.truck_models import (
     truck_ns, create_truck_model, edit_truck_model, assign_truck_model, unassign_truck_model,
@@ -65,7 +67,7 @@ class CreateTruck(Resource):
             )
             
             db.session.commit()
-            FleetAnalyticsModel.update_fleet_analytics(current_user)
+            FleetAnalyticsModel.refresh_after_write(current_user)
 
             return {'message': 'Truck created', 'truck': new_truck.truck_id}, 201
         except Exception as e:
@@ -78,12 +80,14 @@ class ListTrucks(Resource):
     @truck_ns.response(200, 'Lista de camiones obtenida exitosamente', truck_list_model)
     @jwt_required()
     @role_required(['owner'])
+    @response_cache.cached('trucks', 'users')
     def get(self):
         """Listar todos los camiones"""
-        trucks = db.session.query(TruckModel).all()
+        # El conductor viaja en el mismo SELECT (antes: una query por camión)
+        trucks = db.session.query(TruckModel).options(joinedload(TruckModel.driver)).all()
         trucks_list = []
         for truck in trucks:
-            driver = db.session.query(UserModel).get(truck.driver_id)
+            driver = truck.driver
             truck_data = {
                 'truck_id': truck.truck_id, 
                 'plate': truck.plate, 
@@ -304,16 +308,18 @@ class DriversWithoutTruck(Resource):
     @role_required(['owner']) 
     def get(self):
         """Obtener lista de conductores sin camión asignado"""
-        drivers = UserModel.query.filter_by(rol='driver').all()
+        # NOT EXISTS sobre truck.driver_id en una sola query (antes: una query por conductor)
+        drivers = UserModel.query.filter(
+            UserModel.rol == 'driver',
+            ~UserModel.trucks_as_driver.any()
+        ).all()
         drivers_without_truck = []
         for driver in drivers:
-            truck = TruckModel.query.filter_by(driver_id=driver.id).first()
-            if not truck: 
-                drivers_without_truck.append({
-                    'id': driver.id,
-                    'name': driver.name,
-                    'surname': driver.surname,
-                    'phone': driver.phone,
-                    'role': driver.rol
-                })
+            drivers_without_truck.append({
+                'id': driver.id,
+                'name': driver.name,
+                'surname': driver.surname,
+                'phone': driver.phone,
+                'role': driver.rol
+            })
         return {'drivers': drivers_without_truck}, 200
@@ -0,0 +1 @@
+# Servicios de dominio que coordinan varios modelos en una misma transacción
@@ -0,0 +1,44 @@
+"""
+Consumidores de eventos de dominio que corren en worker.py (ver domain_events.py)
+
+Los avisos al owner (stream SSE y mail) no pasan por acá. Ya se escriben en su
+propio outbox (stream_event, mail_outbox) en la transacción del cambio, y
+pasarlos por el dispatcher solo les sumaría latencia.
+"""
+from flask import current_app
+from ..models import FleetAnalyticsModel
+from ..utils.response_cache import response_cache
+from .domain_events import domain_consumer
+
+
+@domain_consumer('fleet_analytics', aggregates=('truck', 'trip', 'maintenance'))
+def refresh_fleet_analytics(events):
+    """
+    Con FLEET_ANALYTICS_MODE=events los requests no recalculan las métricas de
+    flota: se recalculan acá, una vez por owner por lote aunque haya cien cambios.
+    """
+    if current_app.config.get('FLEET_ANALYTICS_MODE') != 'events':
+        return
+    for owner_id in sorted({e.owner_id for e in events if e.owner_id is not None}):
+        # Solo flush: el dispatcher commitea junto con el checkpoint
+        FleetAnalyticsModel.update_fleet_analytics(owner_id, commit=False)
+
+
+@domain_consumer('response_cache', aggregates=('truck', 'trip', 'maintenance'))
+def invalidate_response_cache(events):
+    """
+    Repite la invalidación que se hace al commitear. Cubre los commits cuya
+    invalidación falló (store caído): un CacheBackendError acá reintenta el lote.
+    """
+    if response_cache.backend is None:
+        return
+    tags = set()
+    for e in events:
+        if e.owner_id is None:
+            continue
+        if e.aggregate == 'truck':
+            tags.update(('trucks', f'owner:{e.owner_id}:trucks'))
+        else:
+            tags.add(f'owner:{e.owner_id}:{"trips" if e.aggregate == "trip" else "maintenance"}')
+    if tags:
+        response_cache.backend.bump(sorted(tags))
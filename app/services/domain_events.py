@@ -0,0 +1,284 @@
+"""
+Eventos de dominio (CDC): cada cambio de Truck, Trip o Maintenance queda en la
+tabla domain_event y worker.py lo reparte a los consumidores registrados
+
+    @domain_consumer('fleet_analytics', aggregates=('truck', 'trip', 'maintenance'))
+    def refresh_fleet_analytics(events):
+        ...
+
+Captura: un listener after_flush de la sesión escribe un evento por objeto
+creado, modificado o borrado (truck.created, maintenance.updated, ...), en el
+mismo flush. Si la transacción hace rollback, el evento tampoco existe. Ningún
+handler tiene que acordarse de publicarlo. Los *.updated guardan solo las
+columnas que cambiaron: {'changes': {'status': ['Fair', 'Maintenance Required']}}.
+
+Reparto: cada consumidor tiene un checkpoint (último id procesado) en
+domain_event_checkpoint. En cada pasada el dispatcher toma el lease del
+checkpoint con un UPDATE condicionado, igual que la cola de trabajos. Después
+le pasa al consumidor el lote siguiente, en orden de id, y avanza el checkpoint
+en la misma transacción que lo que el consumidor escribió. Si el consumidor
+falla, el checkpoint no se mueve y el mismo lote se reintenta en la próxima
+pasada. La entrega es al menos una vez, así que los consumidores tienen que
+ser idempotentes. Un consumidor que falla no frena a los demás.
+
+Ventana de asentamiento: InnoDB asigna el id al INSERT, pero las transacciones
+commitean en otro orden. El evento N puede hacerse visible después de N+1, y un
+checkpoint que ya pasó N+1 lo perdería. Por eso el lote se corta en el primer
+evento con menos de DOMAIN_EVENT_SETTLE_SECONDS de antigüedad. La garantía vale
+mientras ninguna transacción que escribe eventos tarde más que la ventana en
+commitear (y los relojes de los servidores no difieran más que eso). Un hueco
+más viejo que la ventana se da por un rollback.
+"""
+import json
+import logging
+import os
+import socket
+import time
+from itertools import takewhile
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, func, inspect, or_, update
+from sqlalchemy.exc import IntegrityError
+from .. import db
+from ..models import (
+    DomainEventModel, DomainEventCheckpointModel, MaintenanceModel, TripModel, TruckModel,
+)
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_AGGREGATES = ((TruckModel, 'truck'), (TripModel, 'trip'), (MaintenanceModel, 'maintenance'))
+# Columnas que cambian en cada escritura y no dicen nada del dominio
+_IGNORED_COLUMNS = {'created_at', 'updated_at', 'version_id'}
+
+# nombre -> (función(events), aggregates o None para todos)
+_consumers = {}
+_capture_registered = False
+_DEFERRED_KEY = '_domain_events_deferred'
+
+
+def domain_consumer(name, aggregates=None):
+    """Registra un consumidor: recibe listas de DomainEvent en orden de id"""
+    def decorator(func):
+        _consumers[name] = (func, set(aggregates) if aggregates else None)
+        return func
+    return decorator
+
+
+def _aggregate_of(obj):
+    for model, aggregate in _AGGREGATES:
+        if isinstance(obj, model):
+            return aggregate
+    return None
+
+
+def _column_values(state):
+    # state.dict y no getattr: leer un atributo expirado haría una query dentro del flush
+    return {attr.key: state.dict.get(attr.key) for attr in state.mapper.column_attrs
+            if attr.key not in _IGNORED_COLUMNS}
+
+
+def _column_changes(state):
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in _IGNORED_COLUMNS:
+            continue
+        history = state.attrs[attr.key].history
+        if history.added or history.deleted:
+            before = history.deleted[0] if history.deleted else None
+            after = history.added[0] if history.added else None
+            if before != after:
+                changes[attr.key] = [before, after]
+    return changes
+
+
+def events_for_flush(session):
+    """Filas de domain_event para lo que se acaba de escribir (estado previo al flush)"""
+    pending = []
+    for operation, objects in (('created', session.new), ('updated', session.dirty),
+                               ('deleted', session.deleted)):
+        for obj in objects:
+            aggregate = _aggregate_of(obj)
+            if aggregate is None:
+                continue
+            state = inspect(obj)
+            if operation == 'updated':
+                changes = _column_changes(state)
+                if not changes:
+                    continue
+                data = {'changes': changes}
+            else:
+                data = {'values': _column_values(state)}
+            # Los nuevos todavía no tienen identity key en after_flush, pero sí su PK
+            aggregate_id = state.mapper.primary_key_from_instance(obj)[0]
+            if aggregate == 'truck':
+                truck_id, owner_id = aggregate_id, state.dict.get('owner_id')
+            else:
+                truck_id, owner_id = state.dict.get('truck_id'), None
+            pending.append((aggregate, aggregate_id, f'{aggregate}.{operation}', owner_id, truck_id, data))
+
+    missing = {row[4] for row in pending if row[3] is None and row[4] is not None}
+    owners = TruckModel.owners_for(session, missing) if missing else {}
+    return [event_row(aggregate, aggregate_id, type, owner_id if owner_id is not None else owners.get(truck_id),
+                      truck_id, data)
+            for aggregate, aggregate_id, type, owner_id, truck_id, data in pending]
+
+
+def event_row(aggregate, aggregate_id, type, owner_id, truck_id, data):
+    """Fila de domain_event lista para append_events"""
+    return {'aggregate': aggregate, 'aggregate_id': aggregate_id, 'type': type, 'owner_id': owner_id,
+            'truck_id': truck_id, 'data': json.dumps(data, default=str), 'created_at': datetime.now()}
+
+
+def append_events(session, rows):
+    """
+    INSERT directo sobre la conexión de la sesión: misma transacción, sin pasar por
+    la unit of work. Lo usan el listener y las escrituras masivas que no pasan por
+    el ORM (UPDATE ... WHERE), que tienen que armar sus eventos a mano.
+    """
+    if not rows:
+        return
+    session.connection().execute(DomainEventModel.__table__.insert(), rows)
+    for row in rows:
+        metrics.inc('domain_events_captured_total', type=row['type'])
+
+
+def defer_events(session, rows):
+    """
+    Como append_events, pero las filas salen en el INSERT del próximo flush (a más
+    tardar, el del commit). Para escrituras fuera del ORM en medio de una unidad de
+    trabajo: no suman un INSERT propio.
+    """
+    session.info.setdefault(_DEFERRED_KEY, []).extend(rows)
+
+
+def register_capture(session):
+    """Escribe los eventos de dominio en cada flush (idempotente)"""
+    global _capture_registered
+    if _capture_registered:
+        return
+    _capture_registered = True
+
+    @event.listens_for(session, 'after_flush')
+    def _capture_domain_events(session, flush_context):
+        append_events(session, events_for_flush(session) + session.info.pop(_DEFERRED_KEY, []))
+
+    @event.listens_for(session, 'before_commit')
+    def _append_deferred_events(session):
+        # El commit flushea recién después de este evento: se adelanta el flush para
+        # que lo diferido vaya en su INSERT, y si no había nada que flushear se escribe acá
+        session.flush()
+        append_events(session, session.info.pop(_DEFERRED_KEY, None))
+
+    @event.listens_for(session, 'after_transaction_end')
+    def _discard_deferred_events(session, transaction):
+        if transaction.parent is None:
+            session.info.pop(_DEFERRED_KEY, None)
+
+
+class EventDispatcher:
+    """Reparte domain_event a los consumidores; la configuración sale de app.config"""
+
+    def __init__(self, worker_id=None):
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+
+    def dispatch(self, now=None):
+        """Una pasada por cada consumidor; devuelve cuántos eventos se entregaron"""
+        return sum(self.run_consumer(name, now) for name in sorted(_consumers))
+
+    def run_consumer(self, name, now=None):
+        config = current_app.config
+        func, aggregates = _consumers[name]
+        now = now or datetime.now()
+        checkpoint = self._claim(name, now, config.get('DOMAIN_EVENT_LEASE_SECONDS', 300))
+        if checkpoint is None:
+            return 0
+        start_id = checkpoint.last_event_id
+        events = (db.session.query(DomainEventModel)
+                  .filter(DomainEventModel.id > start_id)
+                  .order_by(DomainEventModel.id)
+                  .limit(config.get('DOMAIN_EVENT_BATCH_SIZE', 500))
+                  .all())
+        # Solo eventos asentados: uno más nuevo puede tener ids anteriores sin commitear
+        settled_before = now - timedelta(seconds=config.get('DOMAIN_EVENT_SETTLE_SECONDS', 10))
+        events = list(takewhile(lambda e: e.created_at <= settled_before, events))
+        if not events:
+            self._release(name, start_id)
+            return 0
+
+        relevant = [e for e in events if aggregates is None or e.aggregate in aggregates]
+        start = time.perf_counter()
+        try:
+            if relevant:
+                func(relevant)
+        except Exception as exc:
+            db.session.rollback()
+            self._release(name, start_id, error=str(exc))
+            metrics.inc('domain_event_consumer_errors_total', consumer=name)
+            logger.exception("Consumidor %s falló con los eventos %s-%s; se reintenta el lote",
+                             name, events[0].id, events[-1].id)
+            return 0
+        if not self._release(name, events[-1].id):
+            return 0
+        metrics.observe('domain_event_batch_seconds', time.perf_counter() - start, consumer=name)
+        metrics.inc('domain_events_delivered_total', len(relevant), consumer=name)
+        return len(relevant)
+
+    def _claim(self, name, now, lease_seconds):
+        """Toma el lease del checkpoint (lo crea en 0 la primera vez); None si lo tiene otro worker"""
+        if db.session.get(DomainEventCheckpointModel, name) is None:
+            try:
+                db.session.add(DomainEventCheckpointModel(name))
+                db.session.commit()
+            except IntegrityError:
+                # Otro worker lo creó al mismo tiempo
+                db.session.rollback()
+        claimed = db.session.execute(
+            update(DomainEventCheckpointModel)
+            .where(DomainEventCheckpointModel.consumer == name,
+                   or_(DomainEventCheckpointModel.locked_until.is_(None),
+                       DomainEventCheckpointModel.locked_until < now))
+            .values(worker=self.worker_id, locked_until=now + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return None
+        return db.session.get(DomainEventCheckpointModel, name, populate_existing=True)
+
+    def _release(self, name, last_event_id, error=None):
+        """
+        Avanza el checkpoint y suelta el lease, en la transacción de lo que escribió
+        el consumidor. Si el lease venció y lo tomó otro worker, descarta todo.
+        """
+        released = db.session.execute(
+            update(DomainEventCheckpointModel)
+            .where(DomainEventCheckpointModel.consumer == name,
+                   DomainEventCheckpointModel.worker == self.worker_id)
+            .values(last_event_id=last_event_id, worker=None, locked_until=None,
+                    last_error=error, updated_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not released:
+            db.session.rollback()
+            logger.warning("Consumidor %s: el lease venció antes de terminar el lote", name)
+            return False
+        db.session.commit()
+        return True
+
+
+def collect_domain_event_stats():
+    """Collector de /metrics: eventos pendientes de cada consumidor"""
+    last_id = db.session.query(func.max(DomainEventModel.id)).scalar() or 0
+    checkpoints = dict(db.session.query(DomainEventCheckpointModel.consumer,
+                                        DomainEventCheckpointModel.last_event_id).all())
+    return [('gauge', 'domain_event_consumer_lag', {'consumer': name}, last_id - checkpoints.get(name, 0))
+            for name in sorted(_consumers)]
+
+
+def init_domain_events(app):
+    # Registra los consumidores de la app
+    from . import domain_consumers  # noqa: F401
+
+    register_capture(db.session)
+    metrics.register_collector('domain_events', collect_domain_event_stats)
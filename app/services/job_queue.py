@@ -0,0 +1,276 @@
+"""
+Cola de trabajos persistente sobre la tabla job, procesada por worker.py
+
+    job = job_queue.enqueue('trip_completion', {'trip_id': 7}, partition_key='truck:3')
+    db.session.commit()
+    ...
+    JobWorker(app).run_forever()   # en otro proceso
+
+Orden: de cada partition_key corre un solo trabajo por vez, el más viejo. Un
+trabajo esperando reintento también frena a los que llegaron después en su
+partición. Así dos completados del mismo camión nunca se pisan el kilometraje.
+
+Reclamo: el worker elige el primer trabajo elegible y lo marca running con un
+UPDATE condicionado a status='queued'. Si otro worker lo ganó, el UPDATE no
+afecta filas y se busca el siguiente. No hace falta SELECT ... FOR UPDATE SKIP
+LOCKED, así funciona igual en MySQL y en SQLite.
+
+Errores: PermanentJobError marca el trabajo failed sin reintentar. Cualquier
+otra excepción reintenta con backoff exponencial hasta JOB_MAX_ATTEMPTS. Un
+running cuyo worker murió vuelve a la cola pasado JOB_LEASE_SECONDS, por eso
+los handlers tienen que ser idempotentes.
+
+Al terminar (done o failed) se notifica a JOB_WEBHOOK_URL, firmado con
+HMAC-SHA256 de JOB_WEBHOOK_SECRET en X-TruckGuard-Signature.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import aliased
+from .. import db
+from ..models import JobModel
+from ..utils.event_stream import publish_event
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+ACTIVE_STATUSES = ('queued', 'running')
+
+# kind -> función(payload) que devuelve el resultado (serializable a JSON)
+_handlers = {}
+
+
+class PermanentJobError(Exception):
+    """Error que no se arregla reintentando: el trabajo queda failed"""
+
+
+def job_handler(kind):
+    """Registra la función que procesa los trabajos de un tipo"""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+class JobQueue:
+    """Operaciones sobre la tabla job; el commit lo hace el llamador salvo en claim"""
+
+    def enqueue(self, kind, payload, partition_key=None, dedupe_key=None, requested_by=None, owner_id=None):
+        """
+        Agrega un trabajo a la sesión. Con dedupe_key devuelve el trabajo activo
+        (queued o running) que ya tenga esa clave en vez de encolar otro.
+        """
+        if dedupe_key is not None:
+            existing = (db.session.query(JobModel)
+                        .filter(JobModel.kind == kind, JobModel.dedupe_key == dedupe_key,
+                                JobModel.status.in_(ACTIVE_STATUSES))
+                        .order_by(JobModel.id)
+                        .first())
+            if existing is not None:
+                return existing
+        job = JobModel(kind, payload, partition_key=partition_key, dedupe_key=dedupe_key,
+                       requested_by=requested_by, owner_id=owner_id)
+        db.session.add(job)
+        db.session.flush()
+        metrics.inc('jobs_enqueued_total', kind=kind)
+        return job
+
+    def claim(self, worker_id, now=None):
+        """Marca running el próximo trabajo elegible y lo devuelve (o None si no hay)"""
+        now = now or datetime.now()
+        earlier = aliased(JobModel)
+        blocked = (select(earlier.id)
+                   .where(earlier.partition_key == JobModel.partition_key,
+                          or_(earlier.status == 'running',
+                              and_(earlier.status == 'queued', earlier.id < JobModel.id)))
+                   .exists())
+        while True:
+            job_id = db.session.execute(
+                select(JobModel.id)
+                .where(JobModel.status == 'queued', JobModel.run_after <= now, ~blocked)
+                .order_by(JobModel.id)
+                .limit(1)
+            ).scalar()
+            if job_id is None:
+                db.session.commit()
+                return None
+            claimed = db.session.execute(
+                update(JobModel)
+                .where(JobModel.id == job_id, JobModel.status == 'queued')
+                .values(status='running', worker=worker_id, started_at=now,
+                        attempts=JobModel.attempts + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return db.session.get(JobModel, job_id, populate_existing=True)
+
+    def reclaim_stale(self, lease_seconds, now=None):
+        """Devuelve a la cola los running de workers que no terminaron dentro del lease"""
+        now = now or datetime.now()
+        reclaimed = db.session.execute(
+            update(JobModel)
+            .where(JobModel.status == 'running',
+                   JobModel.started_at < now - timedelta(seconds=lease_seconds))
+            .values(status='queued', worker=None, run_after=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if reclaimed:
+            metrics.inc('jobs_reclaimed_total', value=reclaimed)
+            logger.warning("%s trabajos running sin terminar volvieron a la cola", reclaimed)
+        return reclaimed
+
+    def depth(self):
+        """Cantidad de trabajos por estado"""
+        counts = dict(db.session.query(JobModel.status, func.count(JobModel.id))
+                      .group_by(JobModel.status).all())
+        return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+
+job_queue = JobQueue()
+
+
+def collect_job_stats():
+    """Collector de /metrics: trabajos por estado y antigüedad del más viejo en cola"""
+    samples = [('gauge', 'jobs_queue_depth', {'status': status}, count)
+               for status, count in job_queue.depth().items()
+               if status in ACTIVE_STATUSES]
+    oldest = db.session.query(func.min(JobModel.created_at)).filter(JobModel.status == 'queued').scalar()
+    age = (datetime.now() - oldest).total_seconds() if oldest else 0.0
+    samples.append(('gauge', 'jobs_oldest_queued_seconds', {}, age))
+    return samples
+
+
+class JobWorker:
+    """Procesa trabajos de la cola en un loop; la configuración sale de app.config"""
+
+    def __init__(self, app, worker_id=None):
+        self.app = app
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        config = app.config
+        self.poll_interval = config.get('JOB_POLL_INTERVAL', 1.0)
+        self.max_attempts = config.get('JOB_MAX_ATTEMPTS', 5)
+        self.retry_base = config.get('JOB_RETRY_BASE_SECONDS', 2.0)
+        self.lease_seconds = config.get('JOB_LEASE_SECONDS', 300)
+        self.webhook_url = config.get('JOB_WEBHOOK_URL')
+        self.webhook_secret = config.get('JOB_WEBHOOK_SECRET')
+        self.stop_event = threading.Event()
+        # [intervalo, función, última ejecución]: tareas que corren entre trabajos
+        self._periodic = []
+        self.every(self.lease_seconds / 2, lambda: job_queue.reclaim_stale(self.lease_seconds))
+
+    def every(self, seconds, func):
+        """Corre func (dentro de un app context) cada `seconds` mientras el worker esté vivo"""
+        self._periodic.append([seconds, func, float('-inf')])
+
+    def run_periodic(self):
+        for task in self._periodic:
+            seconds, func, last = task
+            if time.monotonic() - last < seconds:
+                continue
+            task[2] = time.monotonic()
+            with self.app.app_context():
+                try:
+                    func()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Tarea periódica %s falló", getattr(func, '__qualname__', func))
+                finally:
+                    db.session.remove()
+
+    def run_forever(self):
+        logger.info("Worker %s procesando la cola de trabajos", self.worker_id)
+        while not self.stop_event.is_set():
+            self.run_periodic()
+            if not self.run_once():
+                self.stop_event.wait(self.poll_interval)
+
+    def run_pending(self):
+        """Procesa todo lo elegible ahora y devuelve cuántos trabajos corrió"""
+        processed = 0
+        while self.run_once():
+            processed += 1
+        return processed
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run_once(self):
+        """Reclama y procesa un trabajo; False si no había ninguno elegible"""
+        with self.app.app_context():
+            try:
+                job = job_queue.claim(self.worker_id)
+                if job is None:
+                    return False
+                self._execute(job)
+                return True
+            finally:
+                db.session.remove()
+
+    def _execute(self, job):
+        kind, job_id = job.kind, job.id
+        metrics.observe('job_wait_seconds', (job.started_at - job.created_at).total_seconds(), kind=kind)
+        start = time.perf_counter()
+        handler = _handlers.get(kind)
+        try:
+            if handler is None:
+                raise PermanentJobError(f'No hay handler para trabajos {kind!r}')
+            result = handler(job.payload_data)
+        except Exception as exc:
+            db.session.rollback()
+            job = db.session.get(JobModel, job_id)
+            if isinstance(exc, PermanentJobError) or job.attempts >= self.max_attempts:
+                outcome = 'failed'
+                self._finish(job, 'failed', error=str(exc))
+                logger.error("Trabajo %s (%s) falló: %s", job_id, kind, exc)
+            else:
+                outcome = 'retry'
+                delay = self.retry_base * 2 ** (job.attempts - 1)
+                job.status = 'queued'
+                job.error = str(exc)
+                job.worker = None
+                job.run_after = datetime.now() + timedelta(seconds=delay)
+                db.session.commit()
+                logger.warning("Trabajo %s (%s) intento %s falló, reintento en %.1fs: %s",
+                               job_id, kind, job.attempts, delay, exc)
+        else:
+            outcome = 'done'
+            job = db.session.get(JobModel, job_id)
+            self._finish(job, 'done', result=result)
+        metrics.observe('job_duration_seconds', time.perf_counter() - start, kind=kind, outcome=outcome)
+        metrics.inc('jobs_processed_total', kind=kind, outcome=outcome)
+
+    def _finish(self, job, status, result=None, error=None):
+        job.status = status
+        job.result = json.dumps(result, default=str) if result is not None else None
+        job.error = error
+        job.finished_at = datetime.now()
+        publish_event(job.owner_id, 'job_finished', job_id=job.id, kind=job.kind, status=status)
+        db.session.commit()
+        self._notify(job)
+
+    def _notify(self, job):
+        """POST del estado final a JOB_WEBHOOK_URL; un error se registra y no reintenta"""
+        if not self.webhook_url:
+            return
+        import httpx
+
+        body = json.dumps({'event': f'job.{job.status}', 'job': job.to_json()}, default=str).encode()
+        headers = {'Content-Type': 'application/json'}
+        if self.webhook_secret:
+            signature = hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+            headers['X-TruckGuard-Signature'] = f'sha256={signature}'
+        try:
+            httpx.post(self.webhook_url, content=body, headers=headers, timeout=5.0).raise_for_status()
+        except httpx.HTTPError as exc:
+            metrics.inc('job_webhook_errors_total')
+            logger.warning("Webhook del trabajo %s falló: %s", job.id, exc)
@@ -0,0 +1,130 @@
+"""
+Tareas periódicas de la app (ver scheduler.py para cómo se programan y reparten)
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func, select
+from .. import db
+from ..models import (
+    DomainEventCheckpointModel, DomainEventModel, FleetAnalyticsModel, JobModel, MailOutboxModel,
+    StreamEventModel, TruckModel,
+)
+from ..utils.response_cache import response_cache
+from .domain_events import _consumers, append_events, event_row
+from .scheduler import scheduled_task
+
+logger = logging.getLogger(__name__)
+
+# GET cacheados por owner que vale la pena tener calientes
+WARMUP_PATHS = ('/Fleetanalytics/analytics', '/Fleetanalytics/maintenance-alerts', '/Maintenance/stats')
+
+
+@scheduled_task('maintenance_sweep', every='MAINTENANCE_SWEEP_INTERVAL', jitter=60, timeout=300)
+def sweep_maintenance(deadline):
+    """Truck.check_maintenance para toda la flota, con UPDATE masivos en vez de camión por camión"""
+    changes = TruckModel.sweep_overdue_maintenance()
+    append_events(db.session, [
+        event_row('maintenance', maintenance_id, 'maintenance.updated', owner_id, truck_id, {'changes': changed})
+        for maintenance_id, truck_id, owner_id, changed in changes if changed
+    ])
+    db.session.commit()
+    # El UPDATE masivo no pasa por la invalidación al commitear
+    response_cache.invalidate({f'owner:{owner_id}:{kind}' for _, _, owner_id, _ in changes
+                               for kind in ('maintenance', 'trucks')})
+    return len(changes)
+
+
+@scheduled_task('fleet_analytics_rollup', at='FLEET_ANALYTICS_ROLLUP_AT', jitter=900, timeout=1800)
+def rollup_fleet_analytics(deadline):
+    """Recalcula las métricas de flota de cada owner, un commit por owner"""
+    owner_ids = db.session.execute(select(TruckModel.owner_id).distinct().order_by(TruckModel.owner_id)).scalars().all()
+    done = 0
+    for owner_id in owner_ids:
+        if time.monotonic() >= deadline:
+            logger.warning("Rollup de analytics cortado por timeout: faltaron %s owners", len(owner_ids) - done)
+            break
+        FleetAnalyticsModel.update_fleet_analytics(owner_id)
+        done += 1
+    return done
+
+
+@scheduled_task('cache_warmup', every='CACHE_WARMUP_INTERVAL', jitter=30, timeout=120)
+def warm_up_cache(deadline):
+    """
+    Recorre los GET cacheados de los owners con actividad reciente, para que el
+    primer pedido después de una invalidación no pague el cálculo. Solo sirve con
+    un caché compartido (RESPONSE_CACHE_BACKEND=resp) o corriendo en el mismo
+    proceso que lo sirve (SCHEDULER_MODE=app).
+    """
+    if response_cache.backend is None:
+        return 0
+    config = current_app.config
+    since = datetime.now() - timedelta(days=1)
+    owner_ids = db.session.execute(
+        select(DomainEventModel.owner_id)
+        .where(DomainEventModel.created_at >= since, DomainEventModel.owner_id.isnot(None))
+        .group_by(DomainEventModel.owner_id)
+        .order_by(func.max(DomainEventModel.id).desc())
+        .limit(config.get('CACHE_WARMUP_MAX_OWNERS', 50))
+    ).scalars().all()
+    client = current_app.test_client()
+    warmed = 0
+    for owner_id in owner_ids:
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(owner_id))}'}
+        for path in WARMUP_PATHS:
+            if time.monotonic() >= deadline:
+                return warmed
+            if client.get(path, headers=headers).status_code == 200:
+                warmed += 1
+    return warmed
+
+
+def _delete_in_batches(model, condition, batch_size, deadline):
+    """Borra por lotes de ids (transacciones cortas); devuelve cuántas filas borró"""
+    deleted = 0
+    while time.monotonic() < deadline:
+        ids = db.session.execute(select(model.id).where(condition).order_by(model.id).limit(batch_size)).scalars().all()
+        if not ids:
+            break
+        deleted += db.session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+    return deleted
+
+
+@scheduled_task('cleanup', every='CLEANUP_INTERVAL', jitter=300, timeout=600)
+def clean_up_stale_rows(deadline):
+    """
+    Borra lo que ya no se usa: eventos SSE viejos, trabajos y mails terminados, y
+    eventos de dominio que todos los consumidores ya procesaron.
+    """
+    config = current_app.config
+    now = datetime.now()
+    batch_size = config.get('CLEANUP_BATCH_SIZE', 1000)
+
+    def days_ago(key, default):
+        return now - timedelta(days=config.get(key, default))
+
+    # Un consumidor que nunca corrió todavía no tiene checkpoint: no se borra nada
+    checkpoints = dict(db.session.query(DomainEventCheckpointModel.consumer,
+                                        DomainEventCheckpointModel.last_event_id).all())
+    consumed = min((checkpoints.get(name, 0) for name in _consumers), default=0)
+
+    targets = (
+        ('stream_event', StreamEventModel,
+         StreamEventModel.created_at < days_ago('STREAM_EVENT_RETENTION_DAYS', 7)),
+        ('job', JobModel,
+         JobModel.status.in_(('done', 'failed')) & (JobModel.finished_at < days_ago('JOB_RETENTION_DAYS', 30))),
+        ('mail_outbox', MailOutboxModel,
+         MailOutboxModel.status.in_(('sent', 'failed'))
+         & (MailOutboxModel.created_at < days_ago('MAIL_OUTBOX_RETENTION_DAYS', 30))),
+        ('domain_event', DomainEventModel,
+         (DomainEventModel.created_at < days_ago('DOMAIN_EVENT_RETENTION_DAYS', 30))
+         & (DomainEventModel.id <= consumed)),
+    )
+    deleted = {}
+    for table, model, condition in targets:
+        deleted[table] = _delete_in_batches(model, condition, batch_size, deadline)
+    return deleted
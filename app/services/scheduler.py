@@ -0,0 +1,197 @@
+"""
+Tareas periódicas (barrido de mantenimientos, rollup nocturno, warm-up de caché,
+limpieza) con una sola ejecución por tarea entre todos los procesos
+
+    @scheduled_task('maintenance_sweep', every='MAINTENANCE_SWEEP_INTERVAL', jitter=60, timeout=300)
+    def sweep_maintenance(deadline):
+        ...
+
+`every` y `at` son claves de app.config: segundos entre corridas, u hora 'HH:MM'
+para las diarias. Con 0 o vacío la tarea no corre.
+
+Elección de líder: cada tarea tiene una fila en scheduler_lock con su próxima
+corrida. En cada tick, los workers intentan un UPDATE condicionado a que la
+corrida esté vencida y la fila libre. El que lo gana corre la tarea y los demás
+la saltean. Igual que la cola de trabajos, funciona en MySQL y en SQLite sin
+SELECT ... FOR UPDATE. Si el worker muere, el lock vence solo (el doble del
+timeout).
+
+Jitter: la próxima corrida se corre un tiempo al azar entre 0 y `jitter`
+segundos. Así varios despliegues no arrancan todos a la misma hora en punto.
+
+Timeout: no se puede cortar un hilo de Python desde afuera. La tarea recibe
+`deadline` (time.monotonic()) y las que trabajan por lotes paran al pasarlo. La
+corrida que termina después del deadline queda registrada como timeout.
+
+Corre en worker.py (SCHEDULER_MODE=worker), o en un hilo dentro de cada worker
+web (SCHEDULER_MODE=app). Con varios procesos, el lock asegura una sola corrida.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+from .. import db
+from ..models import SchedulerLockModel
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# nombre -> ScheduledTask
+_tasks = {}
+
+
+class ScheduledTask:
+    def __init__(self, name, func, every=None, at=None, jitter=0, timeout=300):
+        self.name = name
+        self.func = func
+        self.every = every
+        self.at = at
+        self.jitter = jitter
+        self.timeout = timeout
+
+    def enabled(self, config):
+        return bool(config.get(self.every) if self.every else config.get(self.at))
+
+    def next_run(self, config, after, rng=random):
+        """Próxima corrida después de `after`, con jitter"""
+        if self.every:
+            base = after + timedelta(seconds=float(config[self.every]))
+        else:
+            hour, minute = (int(part) for part in str(config[self.at]).split(':'))
+            base = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if base <= after:
+                base += timedelta(days=1)
+        return base + timedelta(seconds=rng.uniform(0, self.jitter))
+
+
+def scheduled_task(name, every=None, at=None, jitter=0, timeout=300):
+    """Registra una tarea periódica; la función recibe el deadline (time.monotonic())"""
+    def decorator(func):
+        _tasks[name] = ScheduledTask(name, func, every=every, at=at, jitter=jitter, timeout=timeout)
+        return func
+    return decorator
+
+
+class Scheduler:
+    """Corre las tareas vencidas; necesita un app context (run_pending) salvo con start()"""
+
+    def __init__(self, app, worker_id=None):
+        self.app = app
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.stop_event = threading.Event()
+        self._thread = None
+
+    def run_pending(self, now=None):
+        """Corre las tareas vencidas que este worker gane; devuelve [(nombre, estado)]"""
+        config = current_app.config
+        ran = []
+        for name in sorted(_tasks):
+            task = _tasks[name]
+            if not task.enabled(config):
+                continue
+            started_at = now or datetime.now()
+            if not self._acquire(task, config, started_at):
+                continue
+            ran.append((name, self._run(task, config, started_at)))
+        return ran
+
+    def start(self):
+        """Hilo que revisa las tareas cada SCHEDULER_TICK_SECONDS (SCHEDULER_MODE=app)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _loop(self):
+        tick = self.app.config.get('SCHEDULER_TICK_SECONDS', 30)
+        while not self.stop_event.wait(tick):
+            with self.app.app_context():
+                try:
+                    self.run_pending()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("El scheduler no pudo revisar las tareas")
+                finally:
+                    db.session.remove()
+
+    def _acquire(self, task, config, now):
+        """Toma el lock de la tarea si su corrida venció; la fila se crea la primera vez"""
+        if db.session.get(SchedulerLockModel, task.name) is None:
+            # Las que corren cada N segundos arrancan en este tick; las diarias, a su hora
+            first_run = now if task.every else task.next_run(config, now)
+            try:
+                db.session.add(SchedulerLockModel(task.name, first_run))
+                db.session.commit()
+            except IntegrityError:
+                # Otro worker la creó al mismo tiempo
+                db.session.rollback()
+        acquired = db.session.execute(
+            update(SchedulerLockModel)
+            .where(SchedulerLockModel.name == task.name,
+                   SchedulerLockModel.next_run_at <= now,
+                   or_(SchedulerLockModel.locked_until.is_(None), SchedulerLockModel.locked_until < now))
+            .values(holder=self.worker_id, locked_until=now + timedelta(seconds=2 * task.timeout),
+                    last_started_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return bool(acquired)
+
+    def _run(self, task, config, started_at):
+        start = time.monotonic()
+        error = None
+        try:
+            result = task.func(start + task.timeout)
+            status = 'timeout' if time.monotonic() - start > task.timeout else 'ok'
+        except Exception as exc:
+            db.session.rollback()
+            status, result, error = 'error', None, str(exc)
+            logger.exception("Tarea periódica %s falló", task.name)
+        duration = time.monotonic() - start
+        if status == 'timeout':
+            logger.warning("Tarea periódica %s pasó su timeout de %ss (%.1fs)", task.name, task.timeout, duration)
+        else:
+            logger.info("Tarea periódica %s: %s en %.1fs (%s)", task.name, status, duration, result)
+
+        db.session.execute(
+            update(SchedulerLockModel)
+            .where(and_(SchedulerLockModel.name == task.name, SchedulerLockModel.holder == self.worker_id))
+            .values(holder=None, locked_until=None, last_status=status, last_error=error,
+                    last_duration=duration, last_finished_at=datetime.now(),
+                    next_run_at=task.next_run(config, started_at))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        metrics.inc('scheduler_task_runs_total', task=task.name, status=status)
+        metrics.observe('scheduler_task_duration_seconds', duration, task=task.name)
+        return status
+
+
+def collect_scheduler_stats():
+    """Collector de /metrics: segundos de atraso de cada tarea respecto de su próxima corrida"""
+    now = datetime.now()
+    return [('gauge', 'scheduler_task_overdue_seconds', {'task': lock.name},
+             max(0.0, (now - lock.next_run_at).total_seconds()))
+            for lock in db.session.query(SchedulerLockModel).all()
+            if lock.name in _tasks]
+
+
+def init_scheduler(app):
+    # Registra las tareas de la app
+    from . import scheduled_tasks  # noqa: F401
+
+    metrics.register_collector('scheduler', collect_scheduler_stats)
+    if app.config.get('SCHEDULER_MODE') == 'app':
+        scheduler = Scheduler(app)
+        scheduler.start()
+        return scheduler
+    return None
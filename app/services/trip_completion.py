@@ -0,0 +1,224 @@
+"""
+Servicio de completado de viajes: una sola unidad de trabajo
+"""
+import logging
+import random
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+from .. import db
+from ..google.locations import GoogleGetLocation
+from ..models import FleetAnalyticsModel, TripModel
+from ..utils.aio import event_loop
+from ..utils.event_stream import publish_event
+from ..utils.metrics import metrics
+from ..utils.tracing import traced
+from .domain_events import defer_events, event_row
+from .job_queue import PermanentJobError, job_handler, job_queue
+
+logger = logging.getLogger(__name__)
+
+
+class TripNotInCourseError(Exception):
+    """El viaje ya no está 'In Course' (lo completó otro request o trabajo, o nunca arrancó)"""
+
+    def __init__(self, trip_id, status):
+        super().__init__(f"Trip {trip_id} is {status}, not In Course")
+        self.trip_id = trip_id
+        self.status = status
+
+
+class TripCompletionService:
+    """
+    Completa un viaje en una única transacción.
+
+    Kilometraje, degradación de componentes, estado de salud del camión,
+    estado del viaje y métricas de flota se escriben con un solo commit:
+    si algo falla en el medio se hace rollback de todo.
+
+    Truck tiene version_id_col: si otro worker modificó el camión entre la
+    lectura y el commit, el UPDATE no encuentra la versión y se reintenta la
+    transacción completa con datos frescos (hasta TRIP_COMPLETION_MAX_ATTEMPTS).
+
+    El paso de 'In Course' a 'Completed' es un UPDATE condicionado al estado: si
+    dos completados del mismo viaje compiten, el que pierde (o su reintento) no
+    encuentra la fila y termina con TripNotInCourseError sin sumar kilómetros.
+    """
+
+    @staticmethod
+    def snapshot_components(truck):
+        return {
+            maintenance.id: {
+                'component': maintenance.component,
+                'status': maintenance.status,
+                'accumulated_km': maintenance.accumulated_km
+            }
+            for maintenance in truck.maintenances
+        }
+
+    @staticmethod
+    def fetch_distance(trip):
+        """Distancia origen-destino de la API de distancias (en el loop compartido)"""
+        return event_loop.run(GoogleGetLocation().get_distance(trip.origin, trip.destination))
+
+    @staticmethod
+    def build_response(completion, distance_info):
+        """Respuesta de PATCH /Trips/<id>/complete a partir del resumen de complete()"""
+        components_reaching_limit = completion['components_reaching_limit']
+        response = completion['trip']
+        response.update(distance_info)
+        response.update(completion['truck'])
+        response['remaining_km_until_services'] = completion['remaining_km_until_services']
+
+        # Información sobre degradación
+        if components_reaching_limit:
+            response['components_reaching_maintenance_limit'] = components_reaching_limit
+            response['warning_message'] = f"Los siguientes componentes alcanzaron su límite de mantenimiento: {', '.join(components_reaching_limit)}"
+        return response
+
+    @staticmethod
+    def enqueue(trip, requested_by):
+        """
+        Encola el completado (modo async). Un trabajo por camión a la vez y en orden
+        de llegada; si el viaje ya tiene un trabajo activo se devuelve ese.
+        Solo se encolan viajes 'In Course' (TripNotInCourseError si no).
+        """
+        if trip.status != 'In Course':
+            raise TripNotInCourseError(trip.id, trip.status)
+        job = job_queue.enqueue('trip_completion', {'trip_id': trip.id},
+                                partition_key=f'truck:{trip.truck_id}',
+                                dedupe_key=f'trip:{trip.id}',
+                                requested_by=requested_by,
+                                owner_id=trip.truck.owner_id if trip.truck else None)
+        db.session.commit()
+        return job
+
+    @staticmethod
+    @traced('trip_completion.complete')
+    def complete(trip, distance_km):
+        """
+        Completa el viaje y devuelve un resumen armado antes del commit
+        (así la respuesta no necesita recargar los objetos expirados).
+        """
+        max_attempts = current_app.config.get('TRIP_COMPLETION_MAX_ATTEMPTS', 3)
+        for attempt in range(1, max_attempts + 1):
+            try:
+                return TripCompletionService._complete_once(trip, distance_km)
+            except StaleDataError:
+                # El rollback ya expiró trip y truck: el próximo intento relee
+                metrics.inc('truck_version_conflicts_total', operation='trip_completion')
+                if attempt == max_attempts:
+                    metrics.inc('trip_completion_conflicts_exhausted_total')
+                    logger.error("Trip %s: conflicto de versión del camión tras %s intentos", trip.id, attempt)
+                    raise
+                metrics.inc('trip_completion_retries_total')
+                logger.warning("Trip %s: conflicto de versión del camión, reintento %s", trip.id, attempt)
+                time.sleep(random.uniform(0, 0.01 * attempt))
+
+    @staticmethod
+    def _claim_trip(trip, distance_km):
+        """
+        Pasa el viaje a 'Completed', con su distancia, solo si sigue 'In Course';
+        False si otro lo ganó. Es la única escritura del viaje: el flush no lo reescribe.
+        """
+        values = {'status': 'Completed', 'distance': TripModel.recorded_distance(distance_km),
+                  'updated_at': datetime.utcnow()}
+        claimed = db.session.execute(
+            update(TripModel)
+            .where(TripModel.id == trip.id, TripModel.status == 'In Course')
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            return False
+
+        changes = {key: [getattr(trip, key), values[key]] for key in ('status', 'distance')
+                   if getattr(trip, key) != values[key]}
+        for key, value in values.items():
+            set_committed_value(trip, key, value)
+        # El UPDATE no pasa por el ORM: el trip.updated se arma a mano y sale en el INSERT del flush
+        defer_events(db.session, [event_row('trip', trip.id, 'trip.updated',
+                                            trip.truck.owner_id if trip.truck else None, trip.truck_id,
+                                            {'changes': changes})])
+        return True
+
+    @staticmethod
+    @traced('trip_completion.attempt')
+    def _complete_once(trip, distance_km):
+        # Después de un rollback trip está expirado: status se relee de la base
+        if trip.status != 'In Course':
+            raise TripNotInCourseError(trip.id, trip.status)
+        truck = trip.truck
+        try:
+            if not TripCompletionService._claim_trip(trip, distance_km):
+                metrics.inc('trip_completion_already_completed_total')
+                raise TripNotInCourseError(trip.id, 'Completed')
+
+            components_before = TripCompletionService.snapshot_components(truck)
+
+            # Actualiza kilometraje y degrada componentes (el viaje ya está escrito); solo hace flush
+            trip.complete_trip(distance_km)
+
+            components_after = TripCompletionService.snapshot_components(truck)
+            components_reaching_limit = [
+                after['component']
+                for maintenance_id, after in components_after.items()
+                if after['status'] == 'Maintenance Required'
+                and components_before.get(maintenance_id, {}).get('status') != 'Maintenance Required'
+            ]
+
+            logger.debug("Trip %s: componentes antes %s, después %s",
+                         trip.id, components_before, components_after)
+
+            FleetAnalyticsModel.refresh_after_write(truck.owner_id, commit=False)
+            publish_event(truck.owner_id, 'trip_completed', truck_id=truck.truck_id, trip_id=trip.id,
+                          distance=trip.distance, mileage=truck.mileage,
+                          components_reaching_limit=components_reaching_limit)
+
+            result = {
+                'trip': trip.to_json(),
+                'truck': truck.to_json(),
+                'components_before': list(components_before.values()),
+                'components_after': list(components_after.values()),
+                'components_reaching_limit': components_reaching_limit,
+                'remaining_km_until_services': truck.calculate_remaining_km_until_services()
+            }
+
+            db.session.commit()
+            return result
+
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+@job_handler('trip_completion')
+def complete_trip_job(payload):
+    """
+    Trabajo de completado de viaje. Idempotente: si el worker murió después del
+    commit, o un PATCH sincrónico lo completó antes, el trabajo encuentra el viaje
+    completado y no vuelve a sumar kilómetros. Un viaje que no está 'In Course'
+    (Pending, cancelado) no se completa.
+    """
+    trip = db.session.get(TripModel, payload['trip_id'])
+    if trip is None:
+        raise PermanentJobError('Trip not found')
+    if trip.status == 'Completed':
+        return {'trip': trip.to_json(), 'already_completed': True}
+    if trip.status != 'In Course':
+        raise PermanentJobError(f'Trip is {trip.status}, not In Course')
+
+    distance_info = TripCompletionService.fetch_distance(trip)
+    if "error" in distance_info:
+        raise PermanentJobError('Error getting distance from Google')
+    try:
+        completion = TripCompletionService.complete(trip, float(distance_info["distance_km"]))
+    except TripNotInCourseError as exc:
+        if exc.status != 'Completed':
+            raise PermanentJobError(str(exc))
+        # Lo completó otro request mientras se pedía la distancia
+        return {'trip': trip.to_json(), 'already_completed': True}
+    return TripCompletionService.build_response(completion, distance_info)
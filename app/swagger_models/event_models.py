@@ -0,0 +1,17 @@
+"""
+Modelos Swagger para el stream de eventos (SSE)
+"""
+from flask_restx import fields
+from app.config.api_config import api
+
+
+event_ns = api.namespace('events', description='Stream de eventos en tiempo real (Server-Sent Events)')
+
+
+# Modelo de referencia: el campo data de cada evento del stream
+stream_event_model = api.model('StreamEvent', {
+    'truck_id': fields.Integer(description='Camión al que se refiere el evento'),
+    'component': fields.String(description='Componente (component_status, maintenance_*)', example='Aceite'),
+    'previous': fields.String(description='Estado anterior (component_status)', example='Fair'),
+    'status': fields.String(description='Estado nuevo', example='Maintenance Required')
+})
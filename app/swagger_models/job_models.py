@@ -0,0 +1,28 @@
+"""
+Modelos Swagger para la cola de trabajos
+"""
+from flask_restx import fields
+from app.config.api_config import api
+
+
+job_ns = api.namespace('Jobs', description='Estado de trabajos en segundo plano')
+
+
+# Modelos de respuesta
+job_accepted_model = api.model('JobAccepted', {
+    'job_id': fields.Integer(description='ID del trabajo encolado'),
+    'status': fields.String(description='Estado del trabajo', example='queued'),
+    'status_url': fields.String(description='URL para consultar el estado', example='/Jobs/1')
+})
+
+job_status_model = api.model('JobStatus', {
+    'id': fields.Integer(description='ID del trabajo'),
+    'kind': fields.String(description='Tipo de trabajo', example='trip_completion'),
+    'status': fields.String(description='queued, running, done o failed', example='done'),
+    'attempts': fields.Integer(description='Intentos realizados'),
+    'result': fields.Raw(description='Resultado (la respuesta del completado sincrónico)'),
+    'error': fields.String(description='Último error'),
+    'created_at': fields.String(description='Fecha de encolado'),
+    'started_at': fields.String(description='Inicio del último intento'),
+    'finished_at': fields.String(description='Fecha de finalización')
+})
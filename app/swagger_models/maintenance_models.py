@@ -84,7 +84,19 @@ maintenance_detail_model = api.model('MaintenanceDetail', {
 })
 
 maintenance_list_model = api.model('MaintenanceList', {
-    'maintenances': fields.List(fields.Nested(maintenance_response_model), description='Lista de mantenimientos')
+    'maintenances': fields.List(fields.Nested(maintenance_response_model), description='Lista de mantenimientos'),
+    'total': fields.Integer(description='Total de mantenimientos'),
+    'page': fields.Integer(description='Página actual'),
+    'pages': fields.Integer(description='Total de páginas'),
+    'per_page': fields.Integer(description='Elementos por página')
+})
+
+pending_maintenance_list_model = api.model('PendingMaintenanceList', {
+    'pending_maintenances': fields.List(fields.Nested(maintenance_response_model), description='Mantenimientos pendientes de la página actual'),
+    'total_pending': fields.Integer(description='Total de mantenimientos pendientes del owner'),
+    'page': fields.Integer(description='Página actual'),
+    'pages': fields.Integer(description='Total de páginas'),
+    'per_page': fields.Integer(description='Elementos por página')
 })
 
 create_maintenance_response_model = api.model('CreateMaintenanceResponse', {
@@ -106,12 +118,29 @@ maintenance_filter_model = api.model('MaintenanceFilter', {
 })
 
 # Modelos para estadísticas
+maintenance_stats_group_model = api.model('MaintenanceStatsGroup', {
+    'status': fields.String(description='Estado (solo en el desglose por estado)'),
+    'component': fields.String(description='Componente (solo en el desglose por componente)'),
+    'count': fields.Integer(description='Cantidad de mantenimientos'),
+    'total_cost': fields.Float(description='Costo total'),
+    'average_cost': fields.Float(description='Costo promedio')
+})
+
+maintenance_stats_month_model = api.model('MaintenanceStatsMonth', {
+    'month': fields.String(description='Mes (YYYY-MM)', example='2025-01'),
+    'count': fields.Integer(description='Cantidad de mantenimientos creados en el mes'),
+    'total_cost': fields.Float(description='Costo total del mes')
+})
+
 maintenance_stats_model = api.model('MaintenanceStats', {
     'total_maintenances': fields.Integer(description='Total de mantenimientos'),
     'pending_maintenances': fields.Integer(description='Mantenimientos pendientes'),
     'completed_maintenances': fields.Integer(description='Mantenimientos completados'),
     'total_cost': fields.Float(description='Costo total de mantenimientos'),
-    'average_cost': fields.Float(description='Costo promedio por mantenimiento')
+    'average_cost': fields.Float(description='Costo promedio por mantenimiento'),
+    'by_status': fields.List(fields.Nested(maintenance_stats_group_model), description='Desglose por estado'),
+    'by_component': fields.List(fields.Nested(maintenance_stats_group_model), description='Desglose por componente'),
+    'by_month': fields.List(fields.Nested(maintenance_stats_month_model), description='Desglose por mes de creación')
 })
 
 # Modelo para respuesta de actualización de estado
@@ -0,0 +1,108 @@
+"""
+Event loop compartido por proceso para las llamadas de red async
+
+    future = event_loop.submit(google_location.get_distance(origin, destination))
+    ...  # trabajo de base de datos mientras la consulta está en vuelo
+    distance_info = future.result()
+
+    distance_info = event_loop.run(google_location.get_distance(origin, destination))
+
+Reemplaza a asyncio.run, que por cada llamada crea y destruye un loop (y con él el
+cliente HTTP y sus conexiones). Acá hay un solo loop en un hilo daemon, creado en el
+primer uso. Las corutinas de todos los hilos del worker corren en él concurrentemente
+y comparten las conexiones keep-alive del cliente. El hilo que llama solo espera el
+resultado. Mientras tanto, los demás hilos del worker siguen atendiendo requests.
+
+Las corutinas corren con una copia del contexto del que llama (contextvars), así el
+span de tracing del request sigue siendo el padre.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+
+
+class SharedEventLoop:
+    """Un event loop en un hilo daemon; se recrea en el proceso hijo después de un fork"""
+
+    def __init__(self, name='shared-event-loop'):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forget)
+
+    def _forget(self):
+        # El hilo del loop no sobrevive al fork: el hijo arranca uno nuevo en su primer uso
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name=self.name, daemon=True)
+                    thread.start()
+                    self._thread = thread
+                    self._loop = loop
+        return self._loop
+
+    def owns_running_loop(self):
+        """True si se llama desde una corutina que corre en este loop"""
+        try:
+            return self._loop is not None and asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def submit(self, coro):
+        """Agenda la corutina en el loop y devuelve un concurrent.futures.Future"""
+        loop = self.loop
+        context = contextvars.copy_context()
+        result = concurrent.futures.Future()
+
+        def start():
+            # create_task copia el contexto actual: dentro de context.run es el del que llama
+            task = context.run(loop.create_task, coro)
+            task.add_done_callback(lambda done: _copy_outcome(done, result))
+            result.add_done_callback(lambda future: future.cancelled() and loop.call_soon_threadsafe(task.cancel))
+
+        loop.call_soon_threadsafe(start)
+        return result
+
+    def run(self, coro, timeout=None):
+        """Ejecuta la corutina en el loop y espera el resultado desde el hilo actual"""
+        if self.owns_running_loop():
+            raise RuntimeError('event_loop.run no se puede llamar desde el propio loop: usar await')
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self):
+        loop, thread = self._loop, self._thread
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        self._forget()
+
+
+def _copy_outcome(task, future):
+    if future.done():
+        return
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+event_loop = SharedEventLoop()
@@ -0,0 +1,123 @@
+"""
+Caché en memoria con expiración por entrada (TTL)
+"""
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Caché clave -> valor en memoria del proceso, con TTL por entrada.
+
+    Thread-safe: pensado para compartirse entre los hilos de un worker.
+    Los valores cacheados se tratan como solo lectura.
+
+    Cada clave tiene una generación que sube con invalidate(). get_or_set anota la
+    generación antes de calcular y no guarda el resultado si cambió en el medio:
+    un cálculo que empezó antes de un commit no deja datos viejos hasta el TTL.
+    Las generaciones solo se guardan mientras la clave tiene un cálculo en curso,
+    así que no crecen más que los get_or_set simultáneos.
+    """
+
+    def __init__(self, ttl_seconds=30, max_entries=1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = {}
+        # clave -> invalidaciones durante sus cálculos en curso; _epoch sube con clear()
+        self._generations = {}
+        # clave -> cantidad de get_or_set calculándola
+        self._computing = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl_seconds=None):
+        with self._lock:
+            self._store(key, value, ttl_seconds)
+
+    def get_or_set(self, key, factory):
+        """
+        Devuelve el valor cacheado o lo calcula con factory() y lo guarda, salvo que
+        la clave se haya invalidado mientras se calculaba
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            with self._lock:
+                generation = self._generation(key)
+                self._computing[key] = self._computing.get(key, 0) + 1
+            try:
+                value = factory()
+                with self._lock:
+                    if self._generation(key) == generation:
+                        self._store(key, value)
+            finally:
+                with self._lock:
+                    self._done_computing(key)
+        return value
+
+    def configure(self, ttl_seconds=None, max_entries=None):
+        """Ajusta TTL y tamaño (lo llama create_app con app.config) y vacía la caché"""
+        if ttl_seconds is not None:
+            self.ttl_seconds = ttl_seconds
+        if max_entries is not None:
+            self.max_entries = max_entries
+        self.clear()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            # Sin cálculos en curso no hay a quién avisar: no hace falta anotarla
+            if key in self._computing:
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generations.clear()
+            self._epoch += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    # _generation, _done_computing y _store se llaman con _lock tomado
+    def _generation(self, key):
+        return self._epoch, self._generations.get(key, 0)
+
+    def _done_computing(self, key):
+        remaining = self._computing.pop(key) - 1
+        if remaining:
+            self._computing[key] = remaining
+        else:
+            self._generations.pop(key, None)
+
+    def _store(self, key, value, ttl_seconds=None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if key not in self._data and len(self._data) >= self.max_entries:
+            self._evict()
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    def _evict(self):
+        # Primero las entradas vencidas; si no alcanza, la que vence antes
+        now = time.monotonic()
+        expired = [k for k, (expires_at, _) in self._data.items() if expires_at <= now]
+        for k in expired:
+            del self._data[k]
+        if len(self._data) >= self.max_entries:
+            oldest = min(self._data, key=lambda k: self._data[k][0])
+            del self._data[oldest]
+
+
+_MISSING = object()
@@ -0,0 +1,158 @@
+"""
+Compresión gzip/brotli de respuestas, negociada con Accept-Encoding
+
+- Respuestas con cuerpo completo: se comprimen si superan COMPRESSION_MIN_SIZE bytes
+  y solo si el resultado es más chico que el original.
+- Respuestas en streaming: se comprimen por chunk con flush, sin esperar al final.
+- No se tocan: text/event-stream, archivos (direct_passthrough), respuestas que ya
+  traen Content-Encoding ni las marcadas con Cache-Control: no-transform.
+
+brotli es opcional (`pip install brotli`); sin él solo se ofrece gzip.
+"""
+import time
+import zlib
+from flask import request
+from .metrics import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/html', 'text/css',
+                          'application/javascript', 'application/xml')
+RATIO_BUCKETS = (1, 1.5, 2, 3, 5, 8, 13, 20, 50)
+CPU_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class _GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = formato gzip
+
+    def compress(self, chunk):
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def compress_body(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESSION_BROTLI_QUALITY'])
+    compressor = zlib.compressobj(config['COMPRESSION_LEVEL'], zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def choose_encoding(accept_encodings):
+    """'br' si el cliente lo acepta (y brotli está instalado), si no 'gzip', o None"""
+    br = accept_encodings.quality('br') if brotli is not None else 0
+    gzip = accept_encodings.quality('gzip')
+    if br > 0 and br >= gzip:
+        return 'br'
+    if gzip > 0:
+        return 'gzip'
+    return None
+
+
+def _record(route, encoding, original, compressed, cpu_seconds):
+    metrics.inc('http_response_bytes_total', original, encoding='identity', route=route)
+    metrics.inc('http_response_bytes_total', compressed, encoding=encoding, route=route)
+    if compressed:
+        metrics.observe('http_response_compression_ratio', original / compressed,
+                        buckets=RATIO_BUCKETS, encoding=encoding, route=route)
+    metrics.observe('http_response_compression_cpu_seconds', cpu_seconds, buckets=CPU_BUCKETS, encoding=encoding)
+
+
+def _compress_stream(chunks, stream, route, encoding):
+    original = compressed = 0
+    cpu_seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            start = time.thread_time()
+            out = stream.compress(chunk)
+            cpu_seconds += time.thread_time() - start
+            original += len(chunk)
+            compressed += len(out)
+            if out:
+                yield out
+        start = time.thread_time()
+        tail = stream.finish()
+        cpu_seconds += time.thread_time() - start
+        compressed += len(tail)
+        yield tail
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        _record(route, encoding, original, compressed, cpu_seconds)
+
+
+def _skip_reason(response, config):
+    if response.status_code < 200 or response.status_code in (204, 206, 304) or request.method == 'HEAD':
+        return 'no_body'
+    if response.mimetype == 'text/event-stream' or response.mimetype not in config['COMPRESSION_MIMETYPES']:
+        return 'mimetype'
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return 'passthrough'
+    if 'no-transform' in response.headers.get('Cache-Control', ''):
+        return 'no_transform'
+    return None
+
+
+def init_compression(app):
+    """
+    Comprime las respuestas según Accept-Encoding.
+
+    Registrar después de init_metrics: los after_request corren en orden inverso,
+    así la latencia del request incluye la compresión.
+    """
+
+    @app.after_request
+    def _compress_response(response):
+        config = app.config
+        if not config.get('COMPRESSION_ENABLED') or _skip_reason(response, config):
+            return response
+        response.vary.add('Accept-Encoding')
+
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+        if response.is_streamed:
+            stream = _BrotliStream(config['COMPRESSION_BROTLI_QUALITY']) if encoding == 'br' \
+                else _GzipStream(config['COMPRESSION_LEVEL'])
+            response.response = _compress_stream(response.response, stream, route, encoding)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            return response
+
+        data = response.get_data()
+        if len(data) < config['COMPRESSION_MIN_SIZE']:
+            metrics.inc('http_response_compression_skipped_total', reason='too_small')
+            return response
+
+        start = time.thread_time()
+        compressed = compress_body(data, encoding, config)
+        cpu_seconds = time.thread_time() - start
+        if len(compressed) >= len(data):
+            metrics.inc('http_response_compression_skipped_total', reason='incompressible')
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        _record(route, encoding, len(data), len(compressed), cpu_seconds)
+        return response
@@ -0,0 +1,324 @@
+"""
+Stream de eventos (SSE) por owner: alertas de mantenimiento, cambios de estado de
+componentes, aprobaciones y viajes completados
+
+    publish_event(truck.owner_id, 'component_status', truck_id=truck.truck_id,
+                  component='Aceite', previous='Fair', status='Maintenance Required')
+    db.session.commit()   # el evento existe solo si el cambio se commitea
+
+Los eventos se escriben en la tabla stream_event, en la misma transacción que el
+cambio: publish_event los junta en la sesión y el before_commit los inserta todos
+con un solo executemany (register_publish). Así los ve cualquier worker de
+gunicorn, y también worker.py. En cada proceso, un solo hilo (EventBroker) lee los
+eventos nuevos cada SSE_POLL_INTERVAL segundos y los reparte a las conexiones
+abiertas de ese proceso. Hay una query por proceso e intervalo, sin importar
+cuántos clientes estén conectados.
+
+Cada conexión tiene un buffer acotado (SSE_BUFFER_SIZE). Si el cliente lee más lento
+de lo que llegan eventos, se cierra la conexión en vez de acumular memoria. El
+EventSource del navegador reconecta con Last-Event-ID y recupera desde la tabla lo
+que se perdió. Lo mismo pasa al vencer SSE_MAX_CONNECTION_SECONDS: así un hilo del
+worker no queda tomado para siempre por un cliente.
+
+Huecos de ids: el id se asigna al INSERT, pero las transacciones commitean en otro
+orden. Si el broker ve N+1 y todavía no N, no avanza más allá del hueco: N+1 y lo
+que sigue esperan a la próxima lectura. Un hueco que dura más de SSE_SETTLE_SECONDS
+se da por un rollback y se saltea. Así ni las conexiones abiertas ni el
+Last-Event-ID de un cliente pasan por encima de un evento que todavía no commiteó.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import event as sa_event
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = '_stream_events'
+_publish_registered = False
+
+
+def publish_event(owner_id, type, truck_id=None, **data):
+    """Agrega el evento a la sesión actual; se inserta al commitear (lo hace el llamador)"""
+    from .. import db
+
+    if owner_id is None:
+        return
+    # Asegura la transacción: si termina sin commit, los eventos se descartan con ella
+    db.session.connection()
+    db.session.info.setdefault(_PENDING_KEY, []).append({
+        'owner_id': owner_id, 'truck_id': truck_id, 'type': type,
+        'data': json.dumps(dict(data, truck_id=truck_id), default=str), 'created_at': datetime.now()})
+    metrics.inc('sse_events_published_total', type=type)
+
+
+def register_publish(session):
+    """Inserta los eventos publicados en la transacción al commitear (idempotente)"""
+    global _publish_registered
+    if _publish_registered:
+        return
+    _publish_registered = True
+
+    @sa_event.listens_for(session, 'before_commit')
+    def _insert_stream_events(session):
+        from ..models import StreamEventModel
+
+        rows = session.info.pop(_PENDING_KEY, None)
+        if rows:
+            # Un INSERT por commit, sin pasar por la unit of work (como append_events)
+            session.connection().execute(StreamEventModel.__table__.insert(), rows)
+
+    @sa_event.listens_for(session, 'after_transaction_end')
+    def _discard_stream_events(session, transaction):
+        # Rollback o close: lo que no llegó al before_commit no se publica
+        if transaction.parent is None:
+            session.info.pop(_PENDING_KEY, None)
+
+
+def format_event(event_id, type, data):
+    """Un evento en formato text/event-stream (data es JSON ya serializado)"""
+    return f'id: {event_id}\nevent: {type}\ndata: {data}\n\n'
+
+
+class Subscription:
+    """Una conexión SSE: buffer acotado de eventos de sus owners (y camiones, si filtra)"""
+
+    def __init__(self, owner_ids, truck_ids=None, buffer_size=100, cursor=0):
+        self.owner_ids = set(owner_ids)
+        self.truck_ids = set(truck_ids) if truck_ids is not None else None
+        self.cursor = cursor
+        # Hasta dónde llega el replay de la tabla; lo posterior lo reparte el broker
+        self.start_id = cursor
+        self.overflowed = False
+        self._buffer = deque()
+        self._buffer_size = buffer_size
+        self._condition = threading.Condition()
+
+    def push(self, event):
+        event_id, owner_id, truck_id = event[0], event[1], event[2]
+        if event_id <= self.cursor or owner_id not in self.owner_ids:
+            return
+        if self.truck_ids is not None and truck_id not in self.truck_ids:
+            return
+        with self._condition:
+            if len(self._buffer) >= self._buffer_size:
+                self.overflowed = True
+            else:
+                self._buffer.append(event)
+            self._condition.notify()
+
+    def wait(self, timeout):
+        """Eventos pendientes (lista vacía si venció el timeout); None si desbordó"""
+        with self._condition:
+            if not self._buffer and not self.overflowed:
+                self._condition.wait(timeout)
+            if self.overflowed:
+                return None
+            events = list(self._buffer)
+            self._buffer.clear()
+        if events:
+            self.cursor = events[-1][0]
+        return events
+
+
+class EventBroker:
+    """Reparte los eventos nuevos de stream_event a las suscripciones del proceso"""
+
+    def __init__(self):
+        self.app = None
+        self.last_id = None
+        # primer id faltante -> time.monotonic() de cuando se vio el hueco
+        self._gaps = {}
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, owner_ids, truck_ids=None, cursor=None, max_connections=None):
+        """
+        Registra una conexión. Sin cursor arranca desde el último evento ya
+        repartido: solo recibe lo que llegue de ahora en más. None si el proceso
+        ya tiene max_connections streams abiertos.
+        """
+        config = self.app.config if self.app is not None else {}
+        with self._lock:
+            if max_connections is not None and len(self._subscriptions) >= max_connections:
+                metrics.inc('sse_connections_rejected_total')
+                return None
+            if self.last_id is None:
+                self.last_id = self._settled_max_id()
+            subscription = Subscription(owner_ids, truck_ids, config.get('SSE_BUFFER_SIZE', 100),
+                                        cursor if cursor is not None else self.last_id)
+            subscription.start_id = self.last_id
+            self._subscriptions.add(subscription)
+        metrics.inc('sse_connections_total')
+        if config.get('SSE_POLL_INTERVAL', 1.0) > 0:
+            self._ensure_thread()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            if not self._subscriptions:
+                # Sin conexiones no se lee la tabla; la próxima arranca desde el máximo
+                self.last_id = None
+                self._gaps.clear()
+
+    def replay(self, owner_ids, cursor, upto, truck_ids=None, limit=500):
+        """
+        Eventos de la tabla entre el cursor y `upto` (reconexión con Last-Event-ID).
+        `upto` es el start_id de la suscripción: más allá puede haber huecos sin commitear.
+        """
+        from .. import db
+        from ..models import StreamEventModel
+
+        query = (db.session.query(StreamEventModel.id, StreamEventModel.owner_id, StreamEventModel.truck_id,
+                                  StreamEventModel.type, StreamEventModel.data)
+                 .filter(StreamEventModel.owner_id.in_(owner_ids), StreamEventModel.id > cursor,
+                         StreamEventModel.id <= upto))
+        if truck_ids is not None:
+            query = query.filter(StreamEventModel.truck_id.in_(truck_ids))
+        return [tuple(row) for row in query.order_by(StreamEventModel.id).limit(limit)]
+
+    def poll_once(self):
+        """Lee los eventos nuevos y los reparte; necesita un app context"""
+        from .. import db
+        from ..models import StreamEventModel
+
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            last_id = self.last_id
+        if not subscriptions or last_id is None:
+            return 0
+        rows = (db.session.query(StreamEventModel.id, StreamEventModel.owner_id, StreamEventModel.truck_id,
+                                 StreamEventModel.type, StreamEventModel.data)
+                .filter(StreamEventModel.id > last_id)
+                .order_by(StreamEventModel.id)
+                .limit(1000)
+                .all())
+        db.session.commit()
+        rows = self._settled(rows, last_id)
+        if not rows:
+            return 0
+        with self._lock:
+            if self.last_id is not None:
+                self.last_id = max(self.last_id, rows[-1][0])
+        for row in rows:
+            event = tuple(row)
+            for subscription in subscriptions:
+                subscription.push(event)
+        return len(rows)
+
+    def _settled(self, rows, last_id):
+        """Las filas hasta el primer hueco de ids que todavía puede commitear"""
+        settle_seconds = self.app.config.get('SSE_SETTLE_SECONDS', 10) if self.app is not None else 10
+        now = time.monotonic()
+        next_id = last_id + 1
+        settled = []
+        for row in rows:
+            if row[0] > next_id:
+                first_seen = self._gaps.setdefault(next_id, now)
+                if now - first_seen < settle_seconds:
+                    break
+                # Nadie commiteó ese id en toda la ventana: fue un rollback
+                metrics.inc('sse_gaps_skipped_total')
+            settled.append(row)
+            next_id = row[0] + 1
+        self._gaps = {gap: seen for gap, seen in self._gaps.items() if gap >= next_id}
+        return settled
+
+    def _settled_max_id(self):
+        """Último id sin huecos que puedan commitear todavía: desde ahí sigue poll_once"""
+        from .. import db
+        from ..models import StreamEventModel
+
+        settle_seconds = self.app.config.get('SSE_SETTLE_SECONDS', 10) if self.app is not None else 10
+        settled_before = datetime.now() - timedelta(seconds=settle_seconds)
+        return (db.session.query(db.func.max(StreamEventModel.id))
+                .filter(StreamEventModel.created_at <= settled_before).scalar() or 0)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='sse-event-broker', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        from .. import db
+
+        interval = self.app.config.get('SSE_POLL_INTERVAL', 1.0)
+        while True:
+            time.sleep(interval)
+            with self.app.app_context():
+                try:
+                    self.poll_once()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("No se pudieron leer los eventos del stream")
+                finally:
+                    db.session.remove()
+
+
+event_broker = EventBroker()
+
+
+def stream(subscription, replayed, heartbeat, max_seconds, replay_truncated=False):
+    """
+    Generador del cuerpo text/event-stream. No toca la base: los eventos llegan
+    por la suscripción. Manda un comentario cada `heartbeat` segundos sin eventos
+    y termina al desbordar el buffer o al pasar `max_seconds`.
+
+    Si el replay llegó a SSE_REPLAY_LIMIT, entre su último evento y lo que reparte
+    el broker falta un tramo: el stream termina después del replay y el cliente
+    reconecta desde el último evento que recibió.
+    """
+    deadline = time.monotonic() + max_seconds
+    last_sent = 0
+    try:
+        yield 'retry: 3000\n\n'
+        for event_id, _, _, type, data in replayed:
+            metrics.inc('sse_events_sent_total', type=type)
+            last_sent = event_id
+            yield format_event(event_id, type, data)
+        if replay_truncated:
+            metrics.inc('sse_replay_truncated_total')
+            return
+        while time.monotonic() < deadline:
+            events = subscription.wait(min(heartbeat, max(0.0, deadline - time.monotonic())))
+            if events is None:
+                metrics.inc('sse_overflow_total')
+                return
+            if not events:
+                yield ': ping\n\n'
+                continue
+            for event_id, _, _, type, data in events:
+                # Lo que llegó mientras se leía el replay ya se mandó
+                if event_id <= last_sent:
+                    continue
+                metrics.inc('sse_events_sent_total', type=type)
+                last_sent = event_id
+                yield format_event(event_id, type, data)
+    finally:
+        event_broker.unsubscribe(subscription)
+
+
+def collect_sse_stats():
+    """Collector de /metrics: conexiones SSE abiertas en este proceso"""
+    return [('gauge', 'sse_subscriptions', {}, len(event_broker))]
+
+
+def init_event_stream(app):
+    from .. import db
+
+    register_publish(db.session)
+    event_broker.app = app
+    event_broker.last_id = None
+    event_broker._gaps = {}
+    metrics.register_collector('sse', collect_sse_stats)
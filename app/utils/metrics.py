@@ -0,0 +1,245 @@
+"""
+Registro de métricas en memoria del proceso y endpoint /metrics (formato Prometheus)
+"""
+import bisect
+import hmac
+import threading
+import time
+from flask import Response, abort, current_app, g, request
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class _Histogram:
+    """Histograma de buckets fijos con su propio lock (sección crítica mínima)"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', 'lock')
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum, self.count
+
+
+class MetricsRegistry:
+    """
+    Contadores, gauges e histogramas con etiquetas, compartidos por todos los
+    hilos del worker.
+
+    Cada serie se identifica por (nombre, etiquetas ordenadas). El lock del
+    registro solo se toma al crear una serie o al sumar a un contador; los
+    histogramas tienen un lock propio. Los valores que ya viven en otro lado
+    (pool de conexiones, cachés, colas) se leen recién al exportar, mediante
+    collectors.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+        self._collectors = {}
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, _Histogram(buckets))
+        histogram.observe(value)
+
+    def counter_value(self, name, **labels):
+        return self._counters.get(self._key(name, labels), 0)
+
+    def histogram_count(self, name, **labels):
+        histogram = self._histograms.get(self._key(name, labels))
+        return histogram.count if histogram is not None else 0
+
+    def register_collector(self, name, collector):
+        """
+        Registra (o reemplaza) una función que devuelve muestras al exportar:
+        iterable de (tipo, nombre, etiquetas, valor) con tipo 'gauge' o 'counter'.
+        """
+        self._collectors[name] = collector
+
+    def register_cache(self, name, cache):
+        """Expone hits, misses, ratio y tamaño de un caché con atributos hits/misses"""
+        self._caches[name] = cache
+
+    def snapshot(self):
+        """Copia de los contadores: {(nombre, etiquetas): valor}"""
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    # ---- Exportación ----
+
+    def _collected_samples(self):
+        samples = []
+        for collector_name, collector in list(self._collectors.items()):
+            try:
+                samples.extend(collector())
+            except Exception:
+                # Un collector roto no debe tirar el scrape completo
+                samples.append(('gauge', 'metrics_collector_failed', {'collector': collector_name}, 1))
+        for name, cache in list(self._caches.items()):
+            hits, misses = cache.hits, cache.misses
+            samples.append(('counter', 'cache_hits_total', {'cache': name}, hits))
+            samples.append(('counter', 'cache_misses_total', {'cache': name}, misses))
+            samples.append(('gauge', 'cache_hit_ratio', {'cache': name},
+                            hits / (hits + misses) if hits + misses else 0.0))
+            samples.append(('gauge', 'cache_entries', {'cache': name}, len(cache)))
+        return samples
+
+    def render_prometheus(self):
+        families = {}
+
+        def add(kind, name, line):
+            family = families.setdefault(name, (kind, []))
+            family[1].append(line)
+
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = list(self._histograms.items())
+        gauges = list(self._gauges.items())
+
+        for (name, labels), value in counters:
+            add('counter', name, f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for (name, labels), value in gauges:
+            add('gauge', name, f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for kind, name, labels, value in self._collected_samples():
+            add(kind, name, f'{name}{_format_labels(tuple(sorted(labels.items())))} {_format_value(value)}')
+        for (name, labels), histogram in histograms:
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                add('histogram', name,
+                    f'{name}_bucket{_format_labels(labels + (("le", _format_value(bound)),))} {cumulative}')
+            add('histogram', name, f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {count}')
+            add('histogram', name, f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+            add('histogram', name, f'{name}_count{_format_labels(labels)} {count}')
+
+        lines = []
+        for name in sorted(families):
+            kind, samples = families[name]
+            if name in self._help:
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+metrics = MetricsRegistry()
+
+metrics.describe('http_request_duration_seconds', 'Latencia de requests HTTP por namespace y ruta')
+metrics.describe('http_request_db_queries', 'Queries SQL por request')
+metrics.describe('db_pool_checked_out', 'Conexiones del pool en uso')
+metrics.describe('db_pool_overflow', 'Conexiones abiertas por encima de pool_size')
+metrics.describe('db_pool_timeouts_total', 'Esperas de conexión que superaron pool_timeout')
+metrics.describe('db_pool_checkout_seconds', 'Tiempo de espera para obtener una conexión del pool')
+metrics.describe('distance_api_request_duration_seconds', 'Latencia de la API de distancias')
+metrics.describe('distance_api_errors_total', 'Errores de la API de distancias')
+metrics.describe('cache_hit_ratio', 'Proporción de aciertos del caché')
+metrics.describe('truck_version_conflicts_total', 'Conflictos de versión optimista en Truck')
+
+
+def _route_labels():
+    rule = request.url_rule.rule if request.url_rule is not None else None
+    if rule is None:
+        return 'unmatched', 'unmatched'
+    segments = [segment for segment in rule.split('/') if segment]
+    return (segments[0] if segments else 'root'), rule
+
+
+def init_metrics(app):
+    """
+    Registra el histograma de latencia por namespace/ruta y el endpoint /metrics.
+
+    Si METRICS_TOKEN está configurado, /metrics exige 'Authorization: Bearer <token>'.
+    """
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is None or request.path == '/metrics':
+            return response
+        namespace, route = _route_labels()
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - start,
+                        namespace=namespace, route=route, method=request.method)
+        metrics.inc('http_requests_total', namespace=namespace, route=route,
+                    method=request.method, status=str(response.status_code))
+        query_stats = g.get('_query_stats')
+        if query_stats is not None:
+            metrics.observe('http_request_db_queries', query_stats['count'],
+                            buckets=QUERY_COUNT_BUCKETS, namespace=namespace, route=route)
+        return response
+
+    def metrics_view():
+        token = current_app.config.get('METRICS_TOKEN')
+        if token:
+            provided = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(provided, f'Bearer {token}'):
+                abort(401)
+        return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
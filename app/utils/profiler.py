@@ -0,0 +1,252 @@
+"""
+Profiler de requests bajo demanda (cProfile) con volcados .pstats y stacks colapsados
+
+Un request se perfila si:
+- trae el header X-Profile-Token con un token firmado con PROFILER_SECRET y vigente, o
+- cae en el muestreo PROFILER_SAMPLE_RATE (0.0 = nunca, 1.0 = siempre)
+
+Por cada request perfilado se escriben en PROFILER_DIR:
+- <id>.pstats     para `python -m pstats` o snakeviz
+- <id>.collapsed  stacks colapsados para flamegraph.pl / speedscope
+- <id>.json       metadatos (endpoint, status, duración, trigger)
+
+Los tokens se generan con:
+    python -m app.utils.profiler --ttl 600
+"""
+import argparse
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from flask import abort, current_app, g, jsonify, request, send_from_directory
+from .metrics import metrics
+
+
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_KINDS = ('pstats', 'collapsed')
+# Rutas que nunca se perfilan (el propio listado y el scraping de métricas)
+EXCLUDED_PREFIXES = ('/profiles', '/metrics')
+_PROFILE_ID = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+def sign_profile_token(secret, ttl=300, now=None):
+    """Token '<expira>.<firma>' válido por ttl segundos"""
+    expires = int((now or time.time()) + ttl)
+    signature = hmac.new(secret.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f'{expires}.{signature}'
+
+
+def verify_profile_token(secret, token, now=None):
+    if not secret or not token:
+        return False
+    expires, _, signature = token.partition('.')
+    if not expires.isdigit() or int(expires) < (now or time.time()):
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
+
+
+def _frame_label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name  # funciones built-in: '<built-in method ...>'
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def collapse_stats(stats, min_time=1e-5):
+    """
+    Convierte un pstats.Stats en líneas 'a;b;c <microsegundos>'.
+
+    cProfile solo guarda aristas caller -> callee, no stacks completos: el tiempo de
+    cada arista se reparte entre los caminos en proporción a su tiempo acumulado.
+    Los caminos con menos de min_time segundos se descartan: en un grafo de llamadas
+    grande la cantidad de caminos crece de forma exponencial.
+    """
+    raw = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge
+
+    lines = {}
+
+    def walk(func, path, budget):
+        if budget < min_time:
+            return
+        _, _, tottime, cumtime, _ = raw[func]
+        # Fracción del tiempo total de la función que corresponde a este camino
+        scale = min(1.0, budget / cumtime) if cumtime else 0.0
+        stack = path + (_frame_label(func),)
+        weight = int(tottime * scale * 1_000_000)
+        if weight:
+            key = ';'.join(stack)
+            lines[key] = lines.get(key, 0) + weight
+        for callee, (_, _, _, edge_ct) in callees.get(func, {}).items():
+            if _frame_label(callee) in stack:
+                continue  # recursión: el tiempo ya quedó en el frame de arriba
+            walk(callee, stack, edge_ct * scale)
+
+    for func, (_, _, _, cumtime, callers) in raw.items():
+        if not callers:
+            walk(func, (), cumtime)
+
+    return [f'{stack} {weight}' for stack, weight in sorted(lines.items())]
+
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9]+', '_', text).strip('_') or 'root'
+
+
+def _prune(directory, keep):
+    """Conserva solo los `keep` perfiles más recientes"""
+    metas = sorted((name for name in os.listdir(directory) if name.endswith('.json')), reverse=True)
+    for name in metas[keep:]:
+        profile_id = name[:-len('.json')]
+        for extension in ('json',) + PROFILE_KINDS:
+            try:
+                os.remove(os.path.join(directory, f'{profile_id}.{extension}'))
+            except FileNotFoundError:
+                pass
+
+
+def _profile_trigger(app):
+    if request.path.startswith(EXCLUDED_PREFIXES):
+        return None
+    if verify_profile_token(app.config.get('PROFILER_SECRET'), request.headers.get(PROFILE_HEADER)):
+        return 'header'
+    rate = app.config.get('PROFILER_SAMPLE_RATE') or 0.0
+    if rate > 0 and random.random() < rate:
+        return 'sample'
+    return None
+
+
+def _write_profile(app, profiler, info, status, duration):
+    directory = app.config['PROFILER_DIR']
+    os.makedirs(directory, exist_ok=True)
+
+    rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    created_at = datetime.now(timezone.utc)
+    profile_id = f"{created_at:%Y%m%dT%H%M%S%f}_{request.method}_{_slug(rule)}_{_slug(info['request_id'])}"
+
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(os.path.join(directory, f'{profile_id}.pstats'))
+    with open(os.path.join(directory, f'{profile_id}.collapsed'), 'w', encoding='utf-8') as fh:
+        fh.write('\n'.join(collapse_stats(stats)) + '\n')
+
+    meta = {
+        'id': profile_id,
+        'request_id': info['request_id'],
+        'method': request.method,
+        'path': request.path,
+        'endpoint': rule,
+        'status': status,
+        'duration_ms': round(duration * 1000, 2),
+        'trigger': info['trigger'],
+        'created_at': created_at.isoformat(),
+    }
+    with open(os.path.join(directory, f'{profile_id}.json'), 'w', encoding='utf-8') as fh:
+        json.dump(meta, fh)
+
+    _prune(directory, app.config['PROFILER_MAX_FILES'])
+    metrics.inc('profiles_captured_total', trigger=info['trigger'])
+    return profile_id
+
+
+def _require_admin_token():
+    if not verify_profile_token(current_app.config.get('PROFILER_SECRET'), request.headers.get(PROFILE_HEADER)):
+        abort(404)
+
+
+def init_profiler(app):
+    """
+    Registra el profiler por request y los endpoints de administración:
+    - GET /profiles                      perfiles recientes (metadatos)
+    - GET /profiles/<id>/<pstats|collapsed>  descarga
+
+    Los endpoints exigen el mismo token firmado; sin PROFILER_SECRET responden 404.
+    Debe registrarse antes que el resto de los hooks para que el perfil los incluya.
+    """
+
+    @app.before_request
+    def _start_profiler():
+        trigger = _profile_trigger(app)
+        if trigger is None:
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # ya hay otro profiler activo en este hilo
+        g._profiler = (profiler, {
+            'trigger': trigger,
+            'request_id': request.headers.get('X-Request-ID') or uuid.uuid4().hex[:12],
+            'start': time.perf_counter(),
+            'status': None,
+        })
+
+    @app.after_request
+    def _tag_profiled_response(response):
+        active = g.get('_profiler')
+        if active is not None:
+            active[1]['status'] = response.status_code
+            response.headers['X-Profile-Request-Id'] = active[1]['request_id']
+        return response
+
+    @app.teardown_request
+    def _stop_profiler(exception=None):
+        active = g.pop('_profiler', None)
+        if active is None:
+            return
+        profiler, info = active
+        profiler.disable()
+        status = info['status'] if info['status'] is not None else 500
+        try:
+            _write_profile(app, profiler, info, status, time.perf_counter() - info['start'])
+        except OSError as exc:
+            app.logger.warning('No se pudo guardar el perfil del request %s: %s', info['request_id'], exc)
+
+    def list_profiles():
+        _require_admin_token()
+        directory = app.config['PROFILER_DIR']
+        limit = request.args.get('limit', 50, type=int)
+        names = sorted((name for name in os.listdir(directory) if name.endswith('.json')),
+                       reverse=True) if os.path.isdir(directory) else []
+        profiles = []
+        for name in names[:limit]:
+            with open(os.path.join(directory, name), encoding='utf-8') as fh:
+                profiles.append(json.load(fh))
+        return jsonify({'profiles': profiles, 'total': len(names)})
+
+    def download_profile(profile_id, kind):
+        _require_admin_token()
+        if kind not in PROFILE_KINDS or not _PROFILE_ID.match(profile_id):
+            abort(404)
+        return send_from_directory(os.path.abspath(app.config['PROFILER_DIR']), f'{profile_id}.{kind}',
+                                   as_attachment=True)
+
+    app.add_url_rule('/profiles', 'profiles', list_profiles, methods=['GET'])
+    app.add_url_rule('/profiles/<profile_id>/<kind>', 'profile_download', download_profile, methods=['GET'])
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=f'Genera un token para el header {PROFILE_HEADER}')
+    parser.add_argument('--ttl', type=int, default=300, help='Validez en segundos')
+    args = parser.parse_args()
+    secret = os.getenv('PROFILER_SECRET')
+    if not secret:
+        parser.error('PROFILER_SECRET no está configurado')
+    print(sign_profile_token(secret, args.ttl))
+
+
+if __name__ == '__main__':
+    main()
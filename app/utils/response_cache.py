@@ -0,0 +1,350 @@
+"""
+Caché de respuestas por owner con invalidación por tags
+
+    @jwt_required()
+    @role_required(['owner'])
+    @response_cache.cached('owner:{owner}:trucks', 'owner:{owner}:maintenance')
+    def get(self):
+        ...
+
+La clave es (owner, path, query args ordenados). Cada tag tiene un número de versión
+en el backend. Las entradas guardan las versiones de sus tags al momento de calcularse,
+y una entrada cuyas versiones no coinciden con las actuales se descarta. Invalidar es
+incrementar la versión del tag: no hace falta enumerar claves, y funciona igual con
+un backend compartido entre workers.
+
+Las versiones se incrementan en el after_commit de la sesión (register_invalidation),
+con los tags que juntó cada flush a partir de los objetos escritos. Si la transacción
+hace rollback no se invalida nada.
+
+Backends (RESPONSE_CACHE_BACKEND):
+- local: LRU en memoria del proceso. Solo es coherente con un único proceso
+- resp:  store compartido que habla RESP (protocolo de Redis) en RESPONSE_CACHE_URL.
+         Para desarrollo: python -m bench.fake_resp_server
+"""
+import socket
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode, urlparse
+from flask import Response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from .metrics import metrics
+
+
+_TAGS_KEY = '_response_cache_tags'
+_invalidation_registered = False
+
+
+class CacheBackendError(Exception):
+    pass
+
+
+class LocalLRUBackend:
+    """LRU con TTL en memoria del proceso; las versiones de tags no expiran"""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get_with_versions(self, key, tags):
+        now = time.monotonic()
+        with self._lock:
+            versions = [self._versions.get(tag, 0) for tag in tags]
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, versions
+            if entry[0] <= now:
+                del self._entries[key]
+                return None, versions
+            self._entries.move_to_end(key)
+            return entry[1], versions
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class RespBackend:
+    """
+    Cliente RESP mínimo (GET/SET/MGET/INCR), una conexión por hilo.
+    Cualquier error de red se propaga como CacheBackendError.
+    """
+
+    def __init__(self, url, timeout=0.5, prefix='tg:'):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.db = int((parsed.path or '/0').lstrip('/') or 0)
+        self.timeout = timeout
+        self.prefix = prefix
+        self._local = threading.local()
+
+    # ---- Protocolo ----
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = (sock, sock.makefile('rb'))
+            if self.db:
+                self._send(conn, 'SELECT', self.db)
+        return conn
+
+    def _send(self, conn, *args):
+        parts = [f'*{len(args)}\r\n'.encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(f'${len(data)}\r\n'.encode() + data + b'\r\n')
+        conn[0].sendall(b''.join(parts))
+        return self._read(conn[1])
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise CacheBackendError('conexión cerrada por el servidor')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise CacheBackendError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            return None if length < 0 else [self._read(reader) for _ in range(length)]
+        raise CacheBackendError(f'respuesta RESP inválida: {line!r}')
+
+    def command(self, *args):
+        try:
+            return self._send(self._connection(), *args)
+        except (OSError, ValueError, CacheBackendError) as exc:
+            self.close()
+            raise CacheBackendError(str(exc)) from exc
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    # ---- Interfaz de backend ----
+
+    def get_with_versions(self, key, tags):
+        # Un solo round trip: la entrada y las versiones de sus tags
+        values = self.command('MGET', self.prefix + key, *(self.prefix + 'tag:' + tag for tag in tags))
+        return values[0], [int(value) if value is not None else 0 for value in values[1:]]
+
+    def set(self, key, value, ttl):
+        self.command('SET', self.prefix + key, value, 'EX', max(1, int(ttl)))
+
+    def bump(self, tags):
+        for tag in tags:
+            self.command('INCR', self.prefix + 'tag:' + tag)
+
+    def clear(self):
+        self.command('FLUSHDB')
+
+    def size(self):
+        return self.command('DBSIZE')
+
+
+class ResponseCache:
+    """Caché de respuestas JSON de GET; sin backend, el decorador no hace nada"""
+
+    def __init__(self):
+        self.backend = None
+        self.ttl = 300
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, backend, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        if self.backend is None:
+            return 0
+        try:
+            return self.backend.size()
+        except CacheBackendError:
+            return 0
+
+    @staticmethod
+    def request_key(owner):
+        args = urlencode(sorted(request.args.items(multi=True)))
+        return f'resp:{owner}:{request.path}?{args}'
+
+    def cached(self, *tags, ttl=None):
+        """
+        Cachea la respuesta 200 de un GET por owner (identidad del JWT).
+
+        Va debajo de jwt_required/role_required: la autorización se sigue
+        verificando en cada request. Los tags aceptan '{owner}'.
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                backend = self.backend
+                if backend is None or request.method != 'GET':
+                    return func(*args, **kwargs)
+
+                owner = str(get_jwt_identity())
+                route = request.url_rule.rule if request.url_rule is not None else request.path
+                key = self.request_key(owner)
+                tag_keys = [tag.format(owner=owner) for tag in tags]
+                try:
+                    stored, versions = backend.get_with_versions(key, tag_keys)
+                except CacheBackendError:
+                    metrics.inc('response_cache_requests_total', route=route, result='error')
+                    return func(*args, **kwargs)
+
+                stamp = ','.join(map(str, versions)).encode()
+                if stored is not None:
+                    stored_stamp, _, body = stored.partition(b'\n')
+                    if stored_stamp == stamp:
+                        self.hits += 1
+                        metrics.inc('response_cache_requests_total', route=route, result='hit')
+                        return Response(body, 200, mimetype='application/json', headers={'X-Cache': 'HIT'})
+                self.misses += 1
+                metrics.inc('response_cache_requests_total', route=route,
+                            result='stale' if stored is not None else 'miss')
+
+                result = func(*args, **kwargs)
+                data, code, headers = _unpack(result)
+                if code == 200:
+                    from ..config.api_config import dumps_json
+
+                    try:
+                        backend.set(key, stamp + b'\n' + dumps_json(data), ttl or self.ttl)
+                    except CacheBackendError:
+                        metrics.inc('response_cache_requests_total', route=route, result='error')
+                return data, code, dict(headers or {}, **{'X-Cache': 'MISS'})
+            return wrapper
+        return decorator
+
+    def invalidate(self, tags):
+        if self.backend is None or not tags:
+            return
+        try:
+            self.backend.bump(sorted(tags))
+            metrics.inc('response_cache_invalidations_total', len(tags))
+        except CacheBackendError:
+            # Sin invalidación las entradas viven hasta su TTL
+            metrics.inc('response_cache_invalidation_errors_total')
+
+
+response_cache = ResponseCache()
+
+
+def _unpack(result):
+    if isinstance(result, tuple):
+        data = result[0]
+        code = result[1] if len(result) > 1 else 200
+        headers = result[2] if len(result) > 2 else None
+        return data, code, headers
+    return result, 200, None
+
+
+def tags_for_changes(session, objects):
+    """Tags afectados por los objetos escritos en un flush"""
+    from ..models import FleetAnalyticsModel, MaintenanceModel, TripModel, TruckModel, UserModel
+
+    tags = set()
+    truck_kinds = {}  # truck_id -> {'maintenance', 'trips'}
+    for obj in objects:
+        if isinstance(obj, TruckModel):
+            tags.add('trucks')
+            if obj.owner_id is not None:
+                tags.add(f'owner:{obj.owner_id}:trucks')
+        elif isinstance(obj, MaintenanceModel) and obj.truck_id is not None:
+            truck_kinds.setdefault(obj.truck_id, set()).add('maintenance')
+        elif isinstance(obj, TripModel) and obj.truck_id is not None:
+            truck_kinds.setdefault(obj.truck_id, set()).add('trips')
+        elif isinstance(obj, FleetAnalyticsModel) and obj.user_id is not None:
+            tags.add(f'owner:{obj.user_id}:analytics')
+        elif isinstance(obj, UserModel):
+            tags.add('users')
+
+    if truck_kinds:
+        owners = TruckModel.owners_for(session, truck_kinds)
+        for truck_id, kinds in truck_kinds.items():
+            owner_id = owners.get(truck_id)
+            if owner_id is not None:
+                tags.update(f'owner:{owner_id}:{kind}' for kind in kinds)
+    return tags
+
+
+def register_invalidation(session):
+    """Junta tags en cada flush e invalida al commitear (idempotente)"""
+    global _invalidation_registered
+    if _invalidation_registered:
+        return
+    _invalidation_registered = True
+
+    @event.listens_for(session, 'after_flush')
+    def _collect_response_cache_tags(session, flush_context):
+        if response_cache.backend is None:
+            return
+        changed = list(session.new) + list(session.dirty) + list(session.deleted)
+        if changed:
+            tags = tags_for_changes(session, changed)
+            if tags:
+                session.info.setdefault(_TAGS_KEY, set()).update(tags)
+
+    @event.listens_for(session, 'after_commit')
+    def _invalidate_response_cache(session):
+        response_cache.invalidate(session.info.pop(_TAGS_KEY, ()))
+
+    @event.listens_for(session, 'after_rollback')
+    def _discard_response_cache_tags(session):
+        session.info.pop(_TAGS_KEY, None)
+
+
+def build_backend(config):
+    kind = (config.get('RESPONSE_CACHE_BACKEND') or '').lower()
+    if kind == 'local':
+        return LocalLRUBackend(config.get('RESPONSE_CACHE_MAX_ENTRIES', 2048))
+    if kind == 'resp':
+        return RespBackend(config.get('RESPONSE_CACHE_URL') or 'redis://127.0.0.1:6379/0')
+    return None
+
+
+def init_response_cache(app):
+    from .. import db
+
+    response_cache.configure(build_backend(app.config), app.config.get('RESPONSE_CACHE_TTL', 300))
+    register_invalidation(db.session)
+    metrics.register_cache('responses', response_cache)
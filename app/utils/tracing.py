@@ -0,0 +1,388 @@
+"""
+Tracing liviano: spans con propagación por contextvars y exportación a JSON-lines u OTLP
+
+Uso:
+
+    with tracer.span('distance_api.get_distance', origin=origin):
+        ...
+
+    @traced('fleet_analytics.update')
+    def update_fleet_analytics(user_id):
+        ...
+
+Cada request abre un span raíz 'HTTP <método> <ruta>'. Los spans que se abren
+durante el request (queries, commits, API de distancias, analytics, serialización)
+quedan como hijos. Fuera de un request trazado, tracer.span no hace nada.
+
+La traza sigue el header W3C `traceparent` entrante y se propaga en las llamadas
+salientes a la API de distancias.
+
+Exportadores (TRACING_EXPORTER):
+- jsonl: un span por línea en TRACING_FILE
+- otlp:  POST OTLP/JSON a TRACING_OTLP_ENDPOINT (/v1/traces) desde un hilo en segundo plano
+
+`python -m bench.trace_report` agrega los spans en latencia por etapa y endpoint.
+"""
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from .metrics import metrics
+
+
+_current_span = contextvars.ContextVar('truckguard_current_span', default=None)
+_sqlalchemy_instrumented = False
+
+
+class Span:
+    """Un tramo de la traza; duración medida con perf_counter_ns"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'status',
+                 'start_unix_nano', '_start_ns', 'duration_ns', '_trace')
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None, trace=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.status = 'ok'
+        self.start_unix_nano = time.time_ns()
+        self._start_ns = time.perf_counter_ns()
+        self.duration_ns = None
+        # Spans terminados de la misma traza; se exportan juntos al cerrar la raíz
+        self._trace = trace if trace is not None else []
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, error=None):
+        if self.duration_ns is not None:
+            return
+        self.duration_ns = time.perf_counter_ns() - self._start_ns
+        if error is not None:
+            self.status = 'error'
+            self.attributes['error'] = f'{type(error).__name__}: {error}'
+        self._trace.append(self)
+
+    @property
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_unix_nano': self.start_unix_nano,
+            'duration_ms': round((self.duration_ns or 0) / 1e6, 3),
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+class JsonLinesExporter:
+    """Agrega los spans de cada traza al final de un archivo (una línea por span)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = ''.join(json.dumps(span.to_dict(), default=str) + '\n' for span in spans)
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as fh:
+                fh.write(lines)
+
+    def shutdown(self):
+        pass
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(spans, service_name='truckguard-api'):
+    """Payload OTLP/JSON (ExportTraceServiceRequest) para una lista de spans"""
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+        'scopeSpans': [{
+            'scope': {'name': 'app.utils.tracing'},
+            'spans': [{
+                'traceId': span.trace_id,
+                'spanId': span.span_id,
+                'parentSpanId': span.parent_id or '',
+                'name': span.name,
+                'kind': 2 if span.parent_id is None else 1,
+                'startTimeUnixNano': str(span.start_unix_nano),
+                'endTimeUnixNano': str(span.start_unix_nano + (span.duration_ns or 0)),
+                'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in span.attributes.items()],
+                'status': {'code': 2 if span.status == 'error' else 1},
+            } for span in spans],
+        }],
+    }]}
+
+
+class OtlpHttpExporter:
+    """
+    Envía las trazas por OTLP/HTTP (JSON) desde un hilo propio: el request no espera
+    al colector. Si la cola se llena, las trazas se descartan y se cuentan.
+    """
+
+    def __init__(self, endpoint, timeout=2.0, max_queue=1000):
+        import httpx
+
+        self.url = endpoint.rstrip('/')
+        if not self.url.endswith('/v1/traces'):
+            self.url += '/v1/traces'
+        self._client = httpx.Client(timeout=timeout)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name='otlp-exporter', daemon=True)
+        self._thread.start()
+
+    def export(self, spans):
+        try:
+            self._queue.put_nowait(list(spans))
+        except queue.Full:
+            metrics.inc('tracing_spans_dropped_total', reason='queue_full')
+
+    def _run(self):
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                return
+            try:
+                self._client.post(self.url, json=to_otlp(spans)).raise_for_status()
+            except Exception:
+                metrics.inc('tracing_spans_dropped_total', reason='export_failed')
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        self._queue.join()
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._client.close()
+
+
+class Tracer:
+    """Crea spans sobre el span actual del contexto; sin exportador no hace nada"""
+
+    def __init__(self):
+        self.exporter = None
+        self.sample_rate = 1.0
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def current_span(self):
+        return _current_span.get()
+
+    def start_trace(self, name, traceparent=None, **attributes):
+        """Abre un span raíz (o continúa la traza de un traceparent W3C)"""
+        trace_id, parent_id = _parse_traceparent(traceparent)
+        span = Span(name, trace_id or os.urandom(16).hex(), parent_id, attributes)
+        return span, _current_span.set(span)
+
+    def finish_trace(self, span, token, error=None):
+        span.end(error)
+        _reset(token)
+        if self.exporter is not None:
+            try:
+                self.exporter.export(span._trace)
+            except Exception:
+                metrics.inc('tracing_spans_dropped_total', reason='export_failed')
+
+    def start_span(self, name, activate=True, **attributes):
+        """Abre un hijo del span actual; devuelve (None, None) si no hay traza activa"""
+        parent = _current_span.get()
+        if parent is None:
+            return None, None
+        span = Span(name, parent.trace_id, parent.span_id, attributes, parent._trace)
+        return span, (_current_span.set(span) if activate else None)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span, token = self.start_span(name, **attributes)
+        if span is None:
+            yield None
+            return
+        try:
+            yield span
+        except BaseException as exc:
+            span.end(exc)
+            raise
+        else:
+            span.end()
+        finally:
+            _reset(token)
+
+
+tracer = Tracer()
+
+
+def traced(name):
+    """Decorador: ejecuta la función dentro de un span"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _reset(token):
+    if token is None:
+        return
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # El token se creó en otro contexto (p. ej. un commit abierto dentro de asyncio.run)
+        pass
+
+
+def _parse_traceparent(header):
+    parts = (header or '').split('-')
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16 and parts[1] != '0' * 32:
+        return parts[1], parts[2]
+    return None, None
+
+
+def _short_statement(statement, limit=200):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + '...'
+
+
+def instrument_sqlalchemy():
+    """
+    Spans 'db.query' por statement y 'db.commit' por commit de sesión.
+    Es idempotente, como setup_database_events.
+    """
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+    _sqlalchemy_instrumented = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _start_query_span(conn, cursor, statement, parameters, context, executemany):
+        span, _ = tracer.start_span('db.query', activate=False, statement=_short_statement(statement))
+        context._trace_span = span
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _end_query_span(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, '_trace_span', None)
+        if span is not None:
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.set_attribute('rowcount', cursor.rowcount)
+            span.end()
+
+    @event.listens_for(Engine, 'handle_error')
+    def _fail_query_span(exception_context):
+        span = getattr(exception_context.execution_context, '_trace_span', None)
+        if span is not None:
+            span.end(exception_context.original_exception)
+
+    @event.listens_for(Session, 'before_commit')
+    def _start_commit_span(session):
+        # El flush ocurre dentro del commit: sus queries quedan como hijas
+        span, token = tracer.start_span('db.commit')
+        if span is not None:
+            session.info['_trace_commit'] = (span, token)
+
+    def _end_commit_span(session, error=None):
+        active = session.info.pop('_trace_commit', None)
+        if active is not None:
+            span, token = active
+            span.end(error)
+            _reset(token)
+
+    @event.listens_for(Session, 'after_commit')
+    def _commit_done(session):
+        _end_commit_span(session)
+
+    @event.listens_for(Session, 'after_soft_rollback')
+    def _commit_failed(session, previous_transaction):
+        if '_trace_commit' in session.info:
+            _end_commit_span(session, RuntimeError('rollback'))
+
+
+def instrument_representations(api):
+    """Span 'response.serialize' alrededor de las representaciones de Flask-RESTX"""
+    for mediatype, func in list(api.representations.items()):
+        if getattr(func, '_traced', False):
+            continue
+        wrapper = traced('response.serialize')(func)
+        wrapper._traced = True
+        api.representations[mediatype] = wrapper
+
+
+def build_exporter(config):
+    kind = (config.get('TRACING_EXPORTER') or '').lower()
+    if kind == 'jsonl':
+        return JsonLinesExporter(config.get('TRACING_FILE') or 'traces.jsonl')
+    if kind == 'otlp':
+        return OtlpHttpExporter(config.get('TRACING_OTLP_ENDPOINT') or 'http://127.0.0.1:4318')
+    return None
+
+
+def init_tracing(app):
+    """
+    Abre el span raíz de cada request y lo exporta al terminar.
+    Registrar antes que el resto de los hooks para que la traza los incluya.
+    """
+    if tracer.exporter is not None:
+        tracer.exporter.shutdown()
+    tracer.exporter = build_exporter(app.config)
+    tracer.sample_rate = app.config.get('TRACING_SAMPLE_RATE', 1.0)
+    if tracer.exporter is None:
+        return
+    instrument_sqlalchemy()
+
+    @app.before_request
+    def _start_request_trace():
+        if request.path == '/metrics' or random.random() >= tracer.sample_rate:
+            return
+        rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        span, token = tracer.start_trace(f'HTTP {request.method} {rule}', request.headers.get('traceparent'),
+                                         method=request.method, route=rule, path=request.path)
+        g._trace = (span, token)
+
+    @app.after_request
+    def _tag_traced_response(response):
+        active = g.get('_trace')
+        if active is not None:
+            active[0].set_attribute('status', response.status_code)
+            if response.status_code >= 500:
+                active[0].status = 'error'
+            response.headers['traceparent'] = active[0].traceparent
+        return response
+
+    @app.teardown_request
+    def _finish_request_trace(exception=None):
+        active = g.pop('_trace', None)
+        if active is not None:
+            tracer.finish_trace(active[0], active[1], exception)
@@ -0,0 +1,3 @@
+"""
+Benchmarks de TruckGuard (no forman parte de la suite de tests)
+"""
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Consultas concurrentes a la API de distancias: asyncio.run contra el loop compartido
+
+Simula los hilos de un worker gthread completando viajes a la vez. Cada hilo hace
+--calls consultas a bench/fake_distance_server.py con --latency-ms de latencia:
+- asyncio_run: como antes, un loop y un cliente HTTP nuevos por consulta
+- shared_loop: event_loop.run (app/utils/aio.py), con el cliente keep-alive del loop
+
+Reporta por estrategia la latencia p50/p95, el overhead p50 sobre la latencia del
+servidor, el throughput y las conexiones TCP que abrió el servidor.
+
+Uso:
+    python -m bench.distance_concurrency
+    python -m bench.distance_concurrency --threads 16 --calls 20 --latency-ms 80
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from bench.fake_distance_server import FakeDistanceServer
+from bench.stats import percentile
+
+
+def _lookup_asyncio_run(location):
+    return asyncio.run(location.get_distance('Buenos Aires', 'Rosario'))
+
+
+def _lookup_shared_loop(location):
+    from app.utils.aio import event_loop
+    return event_loop.run(location.get_distance('Buenos Aires', 'Rosario'))
+
+
+STRATEGIES = {
+    'asyncio_run': _lookup_asyncio_run,
+    'shared_loop': _lookup_shared_loop,
+}
+
+
+def run_strategy(name, threads, calls, latency_ms):
+    """Corre threads x calls consultas con la estrategia dada; devuelve el resumen"""
+    from app.google.locations import GoogleGetLocation
+
+    lookup = STRATEGIES[name]
+    server = FakeDistanceServer(latency_ms=latency_ms, jitter_ms=0).start()
+    os.environ['DISTANCE_MATRIX_URL'] = server.url
+    location = GoogleGetLocation()
+    samples = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(calls):
+            start = time.perf_counter()
+            try:
+                lookup(location)
+            except Exception as exc:
+                errors.append(exc)
+                continue
+            with lock:
+                samples.append((time.perf_counter() - start) * 1000)
+
+    try:
+        lookup(location)  # calentamiento: import de httpx, arranque del loop
+        server.connections = 0
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.stop()
+
+    p50 = percentile(samples, 50) if samples else 0.0
+    return {
+        'strategy': name,
+        'p50_ms': p50,
+        'p95_ms': percentile(samples, 95) if samples else 0.0,
+        'overhead_ms': p50 - latency_ms,
+        'throughput': len(samples) / elapsed if elapsed else 0.0,
+        'connections': server.connections,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consultas concurrentes a la API de distancias')
+    parser.add_argument('--threads', type=int, default=8, help='Hilos simultáneos (threads de un worker)')
+    parser.add_argument('--calls', type=int, default=10, help='Consultas por hilo')
+    parser.add_argument('--latency-ms', type=float, default=80.0, help='Latencia del stand-in')
+    parser.add_argument('--strategy', action='append', choices=sorted(STRATEGIES),
+                        help='Estrategias a medir (por defecto todas)')
+    args = parser.parse_args()
+
+    results = [run_strategy(name, args.threads, args.calls, args.latency_ms)
+               for name in args.strategy or list(STRATEGIES)]
+
+    print(f"\n{'estrategia':<14}{'p50 ms':>10}{'p95 ms':>10}{'overhead':>10}{'req/s':>10}{'conexiones':>12}{'errores':>9}")
+    for result in results:
+        print(f"{result['strategy']:<14}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{result['overhead_ms']:>10.1f}{result['throughput']:>10.1f}"
+              f"{result['connections']:>12}{result['errors']:>9}")
+    return 1 if any(result['errors'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Stand-in local de la API Distance Matrix de Google
+
+Responde con el mismo formato que la API real, con latencia y tasa de errores
+configurables. Las distancias salen de las rutas de generate_fleet_data (o de un
+hash estable del par origen/destino), así que son siempre las mismas.
+
+Uso:
+    python -m bench.fake_distance_server --port 8089 --latency-ms 80 --jitter-ms 40 --error-rate 0.05
+
+y en el .env de la app:
+    DISTANCE_MATRIX_URL = http://127.0.0.1:8089/maps/api/distancematrix/json
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from generate_fleet_data import ROUTES
+
+
+_KNOWN = {}
+for _origin, _destination, _km in ROUTES:
+    _KNOWN[(_origin.lower(), _destination.lower())] = _km
+    _KNOWN[(_destination.lower(), _origin.lower())] = _km
+
+
+def distance_km(origin, destination):
+    """Distancia conocida de la ruta o una estable entre 50 y 1500 km"""
+    key = (origin.strip().lower(), destination.strip().lower())
+    if key in _KNOWN:
+        return _KNOWN[key]
+    return 50 + zlib.crc32(f'{key[0]}|{key[1]}'.encode()) % 1451
+
+
+class FakeDistanceServer:
+    """Servidor HTTP en un hilo aparte; url apunta al endpoint de Distance Matrix"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=50.0, jitter_ms=0.0, error_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/maps/api/distancematrix/json'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-distance-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _next_delay_and_error(self):
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self._rng.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms))
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay / 1000.0, failed
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1: los clientes con pool reutilizan la conexión (keep-alive)
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path != '/maps/api/distancematrix/json':
+                    return self._send(404, {'status': 'NOT_FOUND'})
+                delay, failed = server._next_delay_and_error()
+                time.sleep(delay)
+                if failed:
+                    return self._send(503, {'status': 'UNKNOWN_ERROR'})
+
+                query = parse_qs(parsed.query)
+                origin = query.get('origins', [''])[0]
+                destination = query.get('destinations', [''])[0]
+                if not origin or not destination:
+                    return self._send(200, {'status': 'INVALID_REQUEST', 'rows': []})
+
+                km = distance_km(origin, destination)
+                seconds = int(km / 80.0 * 3600)  # 80 km/h promedio
+                self._send(200, {
+                    'status': 'OK',
+                    'origin_addresses': [origin],
+                    'destination_addresses': [destination],
+                    'rows': [{'elements': [{
+                        'status': 'OK',
+                        'distance': {'text': f'{km} km', 'value': km * 1000},
+                        'duration': {'text': f'{seconds // 60} mins', 'value': seconds},
+                    }]}],
+                })
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in local de Distance Matrix')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=80.0)
+    parser.add_argument('--jitter-ms', type=float, default=40.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeDistanceServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate).start()
+    print(f"🛰️  Distance Matrix falso en {server.url} "
+          f"(latencia {args.latency_ms}±{args.jitter_ms} ms, errores {args.error_rate:.0%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
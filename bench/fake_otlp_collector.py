@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Stand-in local de un colector OpenTelemetry (OTLP/HTTP con JSON)
+
+Recibe POST /v1/traces y guarda cada span en formato JSON-lines, el mismo que
+escribe el exportador jsonl de app/utils/tracing.py, así bench/trace_report.py
+sirve para los dos.
+
+Uso:
+    python -m bench.fake_otlp_collector --port 4318 --output traces.jsonl
+
+y en el .env de la app:
+    TRACING_EXPORTER = otlp
+    TRACING_OTLP_ENDPOINT = http://127.0.0.1:4318
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _attribute_value(value):
+    for key in ('stringValue', 'boolValue', 'doubleValue'):
+        if key in value:
+            return value[key]
+    if 'intValue' in value:
+        return int(value['intValue'])
+    return None
+
+
+def flatten_otlp(payload):
+    """ExportTraceServiceRequest -> lista de spans en el formato de JsonLinesExporter"""
+    spans = []
+    for resource_spans in payload.get('resourceSpans', []):
+        for scope_spans in resource_spans.get('scopeSpans', []):
+            for span in scope_spans.get('spans', []):
+                start = int(span['startTimeUnixNano'])
+                spans.append({
+                    'trace_id': span['traceId'],
+                    'span_id': span['spanId'],
+                    'parent_id': span.get('parentSpanId') or None,
+                    'name': span['name'],
+                    'start_unix_nano': start,
+                    'duration_ms': round((int(span['endTimeUnixNano']) - start) / 1e6, 3),
+                    'status': 'error' if span.get('status', {}).get('code') == 2 else 'ok',
+                    'attributes': {item['key']: _attribute_value(item['value'])
+                                   for item in span.get('attributes', [])},
+                })
+    return spans
+
+
+class FakeOtlpCollector:
+    """Servidor HTTP en un hilo aparte; guarda los spans en memoria y opcionalmente en output"""
+
+    def __init__(self, host='127.0.0.1', port=0, output=None):
+        self.output = output
+        self.spans = []
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-otlp-collector', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _store(self, spans):
+        with self._lock:
+            self.requests += 1
+            self.spans.extend(spans)
+            if self.output:
+                with open(self.output, 'a', encoding='utf-8') as fh:
+                    fh.write(''.join(json.dumps(span) + '\n' for span in spans))
+
+    def _handler_class(self):
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != '/v1/traces':
+                    return self._send(404, {})
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    spans = flatten_otlp(json.loads(self.rfile.read(length)))
+                except (ValueError, KeyError):
+                    return self._send(400, {'error': 'invalid OTLP/JSON payload'})
+                collector._store(spans)
+                self._send(200, {'partialSuccess': {}})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in local de un colector OTLP/HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4318)
+    parser.add_argument('--output', default='traces.jsonl')
+    args = parser.parse_args()
+
+    collector = FakeOtlpCollector(args.host, args.port, args.output).start()
+    print(f"📡 Colector OTLP falso en {collector.url}/v1/traces -> {args.output}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        collector.stop()
+
+
+if __name__ == '__main__':
+    main()
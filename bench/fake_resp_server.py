@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Stand-in local de un store compartido que habla RESP (el protocolo de Redis)
+
+Implementa lo que usa el backend 'resp' de app/utils/response_cache.py:
+PING, GET, SET (con EX/PX), MGET, INCR, DEL, DBSIZE, FLUSHDB y SELECT.
+Los datos viven en memoria y se comparten entre todas las conexiones, así
+varios workers de la app ven la misma caché.
+
+Uso:
+    python -m bench.fake_resp_server --port 6379
+
+y en el .env de la app:
+    RESPONSE_CACHE_BACKEND = resp
+    RESPONSE_CACHE_URL = redis://127.0.0.1:6379/0
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class FakeRespServer:
+    """Servidor TCP en un hilo aparte; un dict con expiración por clave"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.data = {}
+        self.expires = {}
+        self.commands = 0
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-resp-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ---- Comandos ----
+
+    def _get(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key)
+
+    def execute(self, name, args):
+        with self._lock:
+            self.commands += 1
+            if name == 'PING':
+                return 'PONG'
+            if name == 'FLUSHDB':
+                self.data.clear()
+                self.expires.clear()
+                return 'OK'
+            if name == 'SELECT':
+                # Una sola base: el número se ignora
+                return 'OK'
+            if name == 'GET':
+                return self._get(args[0])
+            if name == 'MGET':
+                return [self._get(key) for key in args]
+            if name == 'SET':
+                key, value = args[0], args[1]
+                self.data[key] = value
+                self.expires.pop(key, None)
+                options = [arg.decode().upper() for arg in args[2::2]]
+                for option, amount in zip(options, args[3::2]):
+                    if option == 'EX':
+                        self.expires[key] = time.monotonic() + int(amount)
+                    elif option == 'PX':
+                        self.expires[key] = time.monotonic() + int(amount) / 1000
+                return 'OK'
+            if name == 'INCR':
+                value = int(self._get(args[0]) or 0) + 1
+                self.data[args[0]] = str(value).encode()
+                return value
+            if name == 'DEL':
+                removed = sum(1 for key in args if self.data.pop(key, None) is not None)
+                for key in args:
+                    self.expires.pop(key, None)
+                return removed
+            if name == 'DBSIZE':
+                return len(self.data)
+        return RuntimeError(f"ERR unknown command '{name}'")
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    request = self._read_command()
+                    if not request:
+                        return
+                    self.wfile.write(_encode(server.execute(request[0].decode().upper(), request[1:])))
+
+            def _read_command(self):
+                line = self.rfile.readline()
+                if not line.startswith(b'*'):
+                    return None
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int(self.rfile.readline()[1:-2])
+                    args.append(self.rfile.read(length + 2)[:-2])
+                return args
+
+        return Handler
+
+
+def _encode(value):
+    if isinstance(value, RuntimeError):
+        return f'-{value}\r\n'.encode()
+    if isinstance(value, str):
+        return f'+{value}\r\n'.encode()
+    if isinstance(value, int):
+        return f':{value}\r\n'.encode()
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, list):
+        return f'*{len(value)}\r\n'.encode() + b''.join(_encode(item) for item in value)
+    return f'${len(value)}\r\n'.encode() + value + b'\r\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in local de un store RESP para la caché de respuestas')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+
+    server = FakeRespServer(args.host, args.port).start()
+    print(f"🗄️  Store RESP falso en {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Stand-in local de un servidor SMTP
+
+Acepta EHLO/HELO, MAIL FROM, RCPT TO, DATA, RSET, NOOP y QUIT, y guarda los
+mensajes en memoria (no los entrega). Cuenta conexiones, para verificar que el
+outbox envía un lote por una sola conexión, y puede rechazar los primeros
+`fail_first` mensajes con 451 para probar los reintentos.
+
+Uso:
+    python -m bench.fake_smtp_server --port 8025
+
+y en el .env de la app:
+    MAIL_SERVER = 127.0.0.1
+    MAIL_PORT = 8025
+"""
+
+import argparse
+import email
+import socketserver
+import threading
+import time
+
+
+class FakeSmtpServer:
+    """Servidor TCP en un hilo aparte; messages guarda (from, to, email.message.Message)"""
+
+    def __init__(self, host='127.0.0.1', port=0, fail_first=0):
+        self.messages = []
+        self.connections = 0
+        self.fail_first = fail_first
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-smtp-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _accept(self, sender, recipients, data):
+        """True si el mensaje se guarda; False si se rechaza (fail_first)"""
+        with self._lock:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return False
+            self.messages.append((sender, recipients, email.message_from_bytes(data)))
+            return True
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b'\r\n')
+
+            def handle(self):
+                with server._lock:
+                    server.connections += 1
+                self.reply('220 fake-smtp ready')
+                sender, recipients = None, []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode(errors='replace').strip()
+                    verb = command.split(' ', 1)[0].upper()
+                    if verb == 'EHLO':
+                        self.wfile.write(b'250-fake-smtp\r\n250 8BITMIME\r\n')
+                    elif verb == 'HELO':
+                        self.reply('250 fake-smtp')
+                    elif verb == 'MAIL':
+                        sender, recipients = command.split(':', 1)[1].strip(), []
+                        self.reply('250 OK')
+                    elif verb == 'RCPT':
+                        recipients.append(command.split(':', 1)[1].strip())
+                        self.reply('250 OK')
+                    elif verb == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        data = []
+                        for raw in iter(self.rfile.readline, b''):
+                            if raw in (b'.\r\n', b'.\n'):
+                                break
+                            data.append(raw[1:] if raw.startswith(b'..') else raw)
+                        if server._accept(sender, recipients, b''.join(data)):
+                            self.reply('250 OK: queued')
+                        else:
+                            self.reply('451 Temporary failure')
+                        sender, recipients = None, []
+                    elif verb == 'RSET':
+                        sender, recipients = None, []
+                        self.reply('250 OK')
+                    elif verb == 'NOOP':
+                        self.reply('250 OK')
+                    elif verb == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('502 Command not implemented')
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in local de SMTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+
+    server = FakeSmtpServer(args.host, args.port).start()
+    print(f'SMTP falso en {server.host}:{server.port} (Ctrl+C para salir)')
+    try:
+        while True:
+            time.sleep(5)
+            print(f'{len(server.messages)} mensajes, {server.connections} conexiones')
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+"""
+Flotas sintéticas para los benchmarks
+
+Delegan en generate_fleet_data.generate_fleet con una semilla fija, para que dos
+corridas midan exactamente los mismos datos.
+"""
+
+from generate_fleet_data import generate_fleet
+
+
+def seed_fleet(owners=3, trucks_per_owner=20, trips_per_truck=10, seed=42):
+    """
+    Siembra la flota y devuelve {'owners': [{'id', 'truck_ids', 'driver_ids'}]}.
+
+    Sin camiones con mantenimiento atrasado, para que los viajes nuevos no se
+    bloqueen por componentes en 'Maintenance Required'. Las contraseñas no se
+    hashean: el benchmark entra con tokens generados.
+    """
+    return generate_fleet(owners, trucks_per_owner, trips_per_truck, extra_drivers_ratio=0.1,
+                          overdue_ratio=0.0, seed=seed, password_hash='bench')
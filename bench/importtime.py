@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Perfil de imports del arranque (python -X importtime)
+
+Corre `import app; app.create_app()` en un intérprete nuevo con -X importtime y
+resume la salida:
+- módulos con mayor tiempo acumulado (incluye lo que importan)
+- por paquete de primer nivel: tiempo propio (suma 100%) y acumulado, contando
+  solo los imports de nivel superior de cada paquete para no sumar dos veces
+
+Uso:
+    python -m bench.importtime
+    python -m bench.importtime --top 40 --raw importtime.txt
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+STARTUP_CODE = 'import app; app.create_app()'
+
+
+def parse_importtime(output):
+    """Líneas de -X importtime -> [(módulo, self µs, acumulado µs, profundidad)]"""
+    entries = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def by_package(entries):
+    """{paquete: [propio µs, acumulado µs]}; el acumulado no cuenta dos veces imports anidados del mismo paquete"""
+    totals = defaultdict(lambda: [0, 0])
+    # -X importtime imprime los hijos antes que el padre: se recorre al revés
+    stack = []  # [(profundidad, paquete)]
+    for module, self_us, cumulative, depth in reversed(entries):
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        package = module.split('.')[0]
+        totals[package][0] += self_us
+        if all(parent != package for _, parent in stack):
+            totals[package][1] += cumulative
+        stack.append((depth, package))
+    return totals
+
+
+def run_importtime(code=STARTUP_CODE):
+    env = dict(os.environ)
+    env.setdefault('TESTING', 'True')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            env=env, capture_output=True, text=True, check=True)
+    return result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perfil de imports del arranque de la app')
+    parser.add_argument('--top', type=int, default=25, help='Módulos a listar')
+    parser.add_argument('--raw', help='Guardar la salida cruda de -X importtime en este archivo')
+    args = parser.parse_args()
+
+    output = run_importtime()
+    if args.raw:
+        with open(args.raw, 'w', encoding='utf-8') as fh:
+            fh.write(output)
+    entries = parse_importtime(output)
+    total_us = sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+    print(f"\nImports del arranque: {len(entries)} módulos, {total_us / 1000:.1f} ms")
+
+    print(f"\n{'módulo':<50}{'propio ms':>11}{'acum. ms':>11}")
+    for module, self_us, cumulative, _ in sorted(entries, key=lambda entry: -entry[2])[:args.top]:
+        print(f"{module:<50}{self_us / 1000:>11.1f}{cumulative / 1000:>11.1f}")
+
+    print(f"\n{'paquete':<30}{'propio ms':>11}{'% total':>9}{'acum. ms':>11}")
+    for package, (self_us, cumulative) in sorted(by_package(entries).items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{package:<30}{self_us / 1000:>11.1f}{self_us / (total_us or 1):>9.1%}{cumulative / 1000:>11.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga concurrente del ciclo de viajes
+
+Levanta un Distance Matrix falso (bench/fake_distance_server.py) y la app en un
+servidor WSGI con hilos, siembra una flota con generate_fleet_data y lanza N
+usuarios concurrentes que repiten: login -> crear viaje -> iniciar (In Course)
+-> completar. Mientras corre, lee /metrics para seguir la ocupación del pool
+de conexiones.
+
+Reporta throughput, tasa de errores, latencia p50/p95/p99 por paso y
+saturación del pool (máximo de conexiones en uso, overflow, timeouts).
+
+Uso:
+    python -m bench.loadtest --users 20 --duration 30
+    python -m bench.loadtest --users 50 --distance-latency-ms 300 --distance-error-rate 0.05
+    python -m bench.loadtest --database-url mysql://root:pw@127.0.0.1:3306/truckguard_load
+
+Por defecto usa un archivo SQLite temporal: sirve para comparar cambios, pero
+SQLite serializa las escrituras. Para ver los límites reales del pool usar MySQL.
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+
+from bench.fake_distance_server import FakeDistanceServer
+from bench.stats import percentile
+from generate_fleet_data import DEFAULT_PASSWORD, ROUTES
+
+
+STEPS = ('login', 'trip_create', 'trip_start', 'trip_complete')
+
+
+class Results:
+    """Latencias y status por paso, compartidos por los hilos de usuarios"""
+
+    def __init__(self):
+        self.latencies_ms = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.flows_completed = 0
+        self.flows_blocked = 0
+        self._lock = threading.Lock()
+
+    def record(self, step, elapsed_ms, status):
+        with self._lock:
+            self.latencies_ms[step].append(elapsed_ms)
+            self.statuses[step][status] += 1
+
+    def flow_done(self, blocked=False):
+        with self._lock:
+            if blocked:
+                self.flows_blocked += 1
+            else:
+                self.flows_completed += 1
+
+
+class PoolSampler(threading.Thread):
+    """Lee los gauges del pool en /metrics cada interval segundos"""
+
+    GAUGES = ('db_pool_size', 'db_pool_checked_out', 'db_pool_overflow', 'db_pool_timeouts_total')
+
+    def __init__(self, base_url, interval=0.25):
+        super().__init__(name='pool-sampler', daemon=True)
+        self.base_url = base_url
+        self.interval = interval
+        self.samples = defaultdict(list)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        with httpx.Client(base_url=self.base_url, timeout=5.0) as client:
+            while not self._stop_event.is_set():
+                try:
+                    text = client.get('/metrics').text
+                except httpx.HTTPError:
+                    text = ''
+                for line in text.splitlines():
+                    name, _, value = line.partition(' ')
+                    if name in self.GAUGES:
+                        self.samples[name].append(float(value))
+                self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _timed(results, step, client, method, path, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = client.request(method, path, **kwargs)
+        status = response.status_code
+    except httpx.HTTPError as exc:
+        response, status = None, type(exc).__name__
+    results.record(step, (time.perf_counter() - start) * 1000, status)
+    return response
+
+
+def user_loop(user, base_url, deadline, results, think_time, seed):
+    """Un usuario: login y ciclos de viaje sobre sus camiones hasta el deadline"""
+    rng = random.Random(seed)
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        response = _timed(results, 'login', client, 'POST', '/Auth/login',
+                          json={'email': user['email'], 'password': DEFAULT_PASSWORD})
+        if response is None or response.status_code != 200:
+            return
+        headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+        while time.monotonic() < deadline:
+            index = rng.randrange(len(user['truck_ids']))
+            origin, destination, _ = rng.choice(ROUTES)
+            response = _timed(results, 'trip_create', client, 'POST', '/Trips/new', headers=headers, json={
+                'origin': origin, 'destination': destination, 'status': 'Pending',
+                'truck_id': user['truck_ids'][index], 'driver_id': user['driver_ids'][index],
+            })
+            if response is None or response.status_code != 201:
+                continue
+            trip_id = response.json()['trip']
+
+            response = _timed(results, 'trip_start', client, 'PATCH', f'/Trips/{trip_id}/update',
+                              headers=headers, json={'status': 'In Course'})
+            if response is not None and response.status_code == 422:
+                # Camión con componentes en 'Maintenance Required': resultado de negocio, no error
+                results.flow_done(blocked=True)
+                continue
+            if response is None or response.status_code != 200:
+                continue
+
+            response = _timed(results, 'trip_complete', client, 'PATCH', f'/Trips/{trip_id}/complete',
+                              headers=headers)
+            if response is not None and response.status_code == 200:
+                results.flow_done()
+            if think_time:
+                time.sleep(rng.uniform(0, think_time))
+
+
+def configure_database(args, workdir):
+    if args.database_url:
+        from bench.runner import configure_database as configure_mysql
+        configure_mysql(args.database_url)
+        return
+    os.environ['TESTING'] = 'True'
+    os.environ['TEST_DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+
+
+def run(args):
+    from werkzeug.serving import make_server
+
+    workdir = tempfile.mkdtemp(prefix='truckguard-load-')
+    configure_database(args, workdir)
+
+    fake = FakeDistanceServer(latency_ms=args.distance_latency_ms, jitter_ms=args.distance_jitter_ms,
+                              error_rate=args.distance_error_rate, seed=args.seed).start()
+    os.environ['DISTANCE_MATRIX_URL'] = fake.url
+
+    from app import create_app, db
+    from generate_fleet_data import generate_fleet
+
+    app = create_app()
+    server = None
+    try:
+        with app.app_context():
+            db.create_all()
+            print(f"🌱 Sembrando {args.users} owners x {args.trucks_per_user} camiones...")
+            fleet = generate_fleet(args.users, args.trucks_per_user, trips_per_truck=5,
+                                   overdue_ratio=0.0, seed=args.seed)
+        users = [dict(owner, email=f"owner{owner['id']}@fleet.truckguard.local") for owner in fleet['owners']]
+
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, name='wsgi', daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        print(f"🚀 App en {base_url} | Distance Matrix falso en {fake.url} "
+              f"({args.distance_latency_ms}±{args.distance_jitter_ms} ms, errores {args.distance_error_rate:.0%})")
+        print(f"👥 {args.users} usuarios durante {args.duration}s...")
+
+        results = Results()
+        sampler = PoolSampler(base_url)
+        sampler.start()
+        started = time.perf_counter()
+        deadline = time.monotonic() + args.duration
+        threads = [threading.Thread(target=user_loop, name=f'user-{n}',
+                                    args=(user, base_url, deadline, results, args.think_time, args.seed + n))
+                   for n, user in enumerate(users)]
+        # Los prints de las rutas (analytics, debug) ensucian el reporte
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+
+        report(results, sampler, fake, elapsed)
+        return results
+    finally:
+        if server is not None:
+            server.shutdown()
+        fake.stop()
+        with app.app_context():
+            db.session.remove()
+            if args.database_url:
+                db.drop_all()
+            db.engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def report(results, sampler, fake, elapsed):
+    total_requests = sum(len(values) for values in results.latencies_ms.values())
+    print(f"\n📊 {elapsed:.1f}s | {total_requests} requests ({total_requests / elapsed:.1f} req/s) | "
+          f"{results.flows_completed} viajes completados ({results.flows_completed / elapsed:.2f}/s) | "
+          f"{results.flows_blocked} bloqueados por mantenimiento")
+    print(f"\n{'paso':<16}{'requests':>10}{'errores':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  status")
+    for step in STEPS:
+        latencies = results.latencies_ms.get(step)
+        if not latencies:
+            continue
+        statuses = results.statuses[step]
+        errors = sum(n for status, n in statuses.items() if not isinstance(status, int) or status >= 500)
+        print(f"{step:<16}{len(latencies):>10}{errors / len(latencies):>9.1%}"
+              f"{percentile(latencies, 50):>9.1f}{percentile(latencies, 95):>9.1f}{percentile(latencies, 99):>9.1f}"
+              f"  {dict(sorted(statuses.items(), key=str))}")
+
+    samples = sampler.samples
+    if samples.get('db_pool_checked_out'):
+        size = max(samples.get('db_pool_size', [0]))
+        checked_out = samples['db_pool_checked_out']
+        saturated = sum(1 for value in checked_out if size and value >= size) / len(checked_out)
+        print(f"\n🔌 Pool: tamaño {size:.0f} | en uso máx {max(checked_out):.0f}, "
+              f"p95 {percentile(checked_out, 95):.0f} | overflow máx {max(samples.get('db_pool_overflow', [0])):.0f} | "
+              f"saturado {saturated:.0%} del tiempo | timeouts {max(samples.get('db_pool_timeouts_total', [0])):.0f}")
+    else:
+        print("\n🔌 Pool: sin métricas (el pool actual no expone tamaño ni conexiones en uso)")
+    print(f"🛰️  Distance Matrix: {fake.requests} requests, {fake.errors} errores inyectados")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga del ciclo de viajes')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=20.0, help='Segundos')
+    parser.add_argument('--trucks-per-user', type=int, default=10)
+    parser.add_argument('--think-time', type=float, default=0.0, help='Pausa máxima entre ciclos (s)')
+    parser.add_argument('--distance-latency-ms', type=float, default=80.0)
+    parser.add_argument('--distance-jitter-ms', type=float, default=40.0)
+    parser.add_argument('--distance-error-rate', type=float, default=0.0)
+    parser.add_argument('--database-url', help='MySQL local (mysql://...); por defecto SQLite temporal')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark de GET /Maintenance/pending
+
+Siembra N owners con M mantenimientos pendientes cada uno sobre SQLite en memoria
+y mide, por request: cantidad de queries SQL y latencia (p50/p95/max).
+
+Uso:
+    python -m bench.pending_maintenances --owners 10 --pending 1000
+"""
+
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('TESTING', 'True')
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import UserModel, TruckModel, MaintenanceModel
+from bench.stats import percentile
+
+
+def seed(owners, pending_per_owner, trucks_per_owner=10):
+    """Crea owners, un driver por owner, camiones y mantenimientos pendientes"""
+    owner_ids = []
+    base = datetime(2025, 1, 1)
+    for o in range(owners):
+        owner = UserModel(name=f'Owner{o}', surname='Bench', rol='owner',
+                          email=f'owner{o}@bench.local', phone='0', password='bench')
+        driver = UserModel(name=f'Driver{o}', surname='Bench', rol='driver',
+                           email=f'driver{o}@bench.local', phone='0', password='bench')
+        db.session.add_all([owner, driver])
+        db.session.flush()
+        owner_ids.append(owner.id)
+
+        truck_ids = []
+        for t in range(trucks_per_owner):
+            truck = TruckModel(owner_id=owner.id, plate=f'B{o:03d}{t:03d}', model='Actros',
+                               brand='Mercedes-Benz', year='2021', color='Blanco',
+                               mileage=50000, health_status='Good',
+                               fleetanalytics_id=None, driver_id=driver.id)
+            db.session.add(truck)
+            db.session.flush()
+            truck_ids.append(truck.truck_id)
+
+        db.session.bulk_insert_mappings(MaintenanceModel, [
+            {
+                'description': f'Mantenimiento {i}',
+                'status': 'Pending',
+                'component': f'Componente {i % 5}',
+                'cost': 100.0,
+                'mileage_interval': 5000,
+                'last_maintenance_mileage': 50000,
+                'next_maintenance_mileage': 55000,
+                'accumulated_km': 0,
+                'maintenance_interval': 5000,
+                'truck_id': truck_ids[i % trucks_per_owner],
+                'driver_id': driver.id,
+                'created_at': base + timedelta(minutes=i),
+                'updated_at': base + timedelta(minutes=i),
+            }
+            for i in range(pending_per_owner)
+        ])
+    db.session.commit()
+    return owner_ids
+
+
+def run(owners, pending, iterations, per_page):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print(f"🌱 Sembrando {owners} owners x {pending} mantenimientos pendientes...")
+        owner_ids = seed(owners, pending)
+        tokens = [create_access_token(identity=str(owner_id)) for owner_id in owner_ids]
+
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        client = app.test_client()
+        latencies_ms = []
+        queries_per_request = []
+        try:
+            for i in range(iterations):
+                token = tokens[i % len(tokens)]
+                statements.clear()
+                start = time.perf_counter()
+                response = client.get(f'/Maintenance/pending?per_page={per_page}',
+                                      headers={'Authorization': f'Bearer {token}'})
+                latencies_ms.append((time.perf_counter() - start) * 1000)
+                queries_per_request.append(len(statements))
+                assert response.status_code == 200, response.get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+        print(f"📊 GET /Maintenance/pending ({iterations} requests, per_page={per_page})")
+        print(f"   queries/request: min={min(queries_per_request)} max={max(queries_per_request)}")
+        print(f"   latencia ms: p50={percentile(latencies_ms, 50):.2f} "
+              f"p95={percentile(latencies_ms, 95):.2f} max={max(latencies_ms):.2f} "
+              f"media={statistics.mean(latencies_ms):.2f}")
+
+        db.session.remove()
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de /Maintenance/pending')
+    parser.add_argument('--owners', type=int, default=10)
+    parser.add_argument('--pending', type=int, default=1000, help='Mantenimientos pendientes por owner')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--per-page', type=int, default=20)
+    args = parser.parse_args()
+    run(args.owners, args.pending, args.iterations, args.per_page)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de serialización de las respuestas grandes
+
+Captura el payload real de los listados grandes sobre una flota sintética:
+- GET /Trips/all con una página grande
+- POST /components/bulk/status con 50 camiones
+- GET /Maintenance/pending
+
+Después mide la serialización de cada payload y la compresión de la respuesta
+(app/utils/compression.py) con la configuración por defecto.
+
+Serialización:
+- legacy: recorrido serialize_dt + json de la stdlib, lo que hacían las rutas antes
+- stdlib: dumps_json sin orjson
+- orjson: dumps_json, la representación actual cuando orjson está instalado
+
+Uso:
+    python -m bench.serialization
+    python -m bench.serialization --trips-per-truck 50 --page-size 2000 --repeat 200
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+
+from bench.stats import percentile
+
+
+def legacy_serialize_dt(obj):
+    """Copia del helper que tenían las rutas antes de la representación única"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, dict):
+        return {k: legacy_serialize_dt(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [legacy_serialize_dt(x) for x in obj]
+    return obj
+
+
+def legacy_dumps(data):
+    return (json.dumps(legacy_serialize_dt(data)) + '\n').encode()
+
+
+def capture_payloads(app, owner, page_size):
+    """Ejecuta los endpoints y guarda el objeto que recibe la representación JSON"""
+    from flask_jwt_extended import create_access_token
+    from app.config import api_config
+
+    captured = {}
+    original = api_config.api.representations['application/json']
+
+    def capture(data, code, headers=None):
+        captured['data'] = data
+        return original(data, code, headers)
+
+    api_config.api.representations['application/json'] = capture
+    try:
+        client = app.test_client()
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(owner['id']))}"}
+        requests = {
+            'trips_all': ('GET', f'/Trips/all?per_page={page_size}', None),
+            'bulk_status': ('POST', '/components/bulk/status', {'truck_ids': owner['truck_ids'][:50]}),
+            'pending_maintenances': ('GET', '/Maintenance/pending', None),
+        }
+        payloads = {}
+        for name, (method, path, body) in requests.items():
+            captured.clear()
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                response = client.open(path, method=method, json=body, headers=headers)
+            if response.status_code != 200 or 'data' not in captured:
+                print(f"⚠️  {name}: status {response.status_code}, se omite")
+                continue
+            payloads[name] = captured['data']
+        return payloads
+    finally:
+        api_config.api.representations['application/json'] = original
+
+
+def available_encodings():
+    from app.utils import compression
+
+    return ('gzip', 'br') if compression.brotli is not None else ('gzip',)
+
+
+def time_encoder(encode, payload, repeat):
+    encode(payload)  # warmup
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode(payload)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run(args):
+    os.environ['TESTING'] = 'True'
+
+    from app import create_app, db
+    from app.config import api_config
+    from app.utils.compression import compress_body
+    from bench.fleet import seed_fleet
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        fleet = seed_fleet(owners=1, trucks_per_owner=args.trucks, trips_per_truck=args.trips_per_truck)
+        payloads = capture_payloads(app, fleet['owners'][0], args.page_size)
+
+        def stdlib_dumps(data):
+            return (json.dumps(data, default=api_config.json_default, separators=(',', ':')) + '\n').encode()
+
+        encoders = {'legacy': legacy_dumps, 'stdlib': stdlib_dumps}
+        if api_config.orjson is not None:
+            encoders['orjson'] = api_config.dumps_json
+
+        print(f"\n{'payload':<24}{'KiB':>8}{'encoder':>9}{'p50 ms':>9}{'p95 ms':>9}{'vs legacy':>11}")
+        try:
+            for name, payload in payloads.items():
+                size_kib = len(stdlib_dumps(payload)) / 1024
+                baseline = None
+                for encoder_name, encode in encoders.items():
+                    samples = time_encoder(encode, payload, args.repeat)
+                    p50 = percentile(samples, 50)
+                    baseline = baseline or p50
+                    print(f"{name:<24}{size_kib:>8.0f}{encoder_name:>9}{p50:>9.3f}"
+                          f"{percentile(samples, 95):>9.3f}{baseline / p50:>10.1f}x")
+
+            print(f"\n{'payload':<24}{'encoding':>9}{'KiB':>8}{'ratio':>8}{'CPU ms':>9}")
+            for name, payload in payloads.items():
+                body = stdlib_dumps(payload)
+                for encoding in available_encodings():
+                    samples = time_encoder(lambda data: compress_body(data, encoding, app.config), body, args.repeat)
+                    compressed = compress_body(body, encoding, app.config)
+                    print(f"{name:<24}{encoding:>9}{len(compressed) / 1024:>8.1f}"
+                          f"{len(body) / len(compressed):>7.1f}x{percentile(samples, 50):>9.3f}")
+        finally:
+            db.session.remove()
+            db.drop_all()
+    if 'orjson' not in encoders:
+        print("\nℹ️  orjson no está instalado: la representación usa json de la stdlib")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark de serialización de respuestas')
+    parser.add_argument('--trucks', type=int, default=60)
+    parser.add_argument('--trips-per-truck', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=1000, help='per_page de /Trips/all')
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+    run(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
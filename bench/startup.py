@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Costo de arranque y overhead por request de la app
+
+Cada corrida es un intérprete nuevo (import en frío) que mide:
+- import_ms: `import app` (modelos, rutas, extensiones)
+- create_app_ms: create_app(), incluido el spec OpenAPI precalculado
+- first_request_ms: el primer GET /swagger.json
+- request_overhead_ms: mediana de un GET /swagger.json ya caliente, que no toca la
+  base: es el costo de los hooks before/after_request y del despacho de Flask
+
+Con --check sale con código 1 si la mediana de create_app o del overhead por
+request pasa su presupuesto. Son presupuestos holgados: detectan trabajo nuevo por
+request o al arrancar, no ruido. Dependen de la máquina, por eso no están en la
+suite de tests.
+
+Uso:
+    python -m bench.startup
+    python -m bench.startup --runs 10 --requests 500
+    python -m bench.startup --check
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from bench.stats import percentile
+
+# Presupuestos de --check (mediana entre corridas)
+CREATE_APP_BUDGET_MS = 1500
+REQUEST_OVERHEAD_BUDGET_MS = 5
+
+
+def measure(requests):
+    """Se ejecuta en el intérprete hijo; devuelve los tiempos en ms"""
+    os.environ.setdefault('TESTING', 'True')
+    started = time.perf_counter()
+    import app as app_module
+    imported = time.perf_counter()
+    flask_app = app_module.create_app()
+    created = time.perf_counter()
+
+    client = flask_app.test_client()
+    client.get('/swagger.json')
+    first = time.perf_counter()
+
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get('/swagger.json')
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'import_ms': (imported - started) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_request_ms': (first - created) * 1000,
+        'request_overhead_ms': percentile(samples, 50),
+    }
+
+
+def run(runs, requests):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-m', 'bench.startup', '--child', '--requests', str(requests)],
+                                check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tiempo de arranque y overhead por request')
+    parser.add_argument('--runs', type=int, default=5, help='Intérpretes nuevos a medir')
+    parser.add_argument('--requests', type=int, default=200, help='Requests calientes por corrida')
+    parser.add_argument('--check', action='store_true',
+                        help='Salir con código 1 si create_app o el overhead pasan su presupuesto')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.requests)))
+        return 0
+
+    results = run(args.runs, args.requests)
+    print(f"\n{'métrica':<22}{'p50 ms':>10}{'máx ms':>10}")
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'request_overhead_ms'):
+        values = [result[key] for result in results]
+        print(f"{key:<22}{percentile(values, 50):>10.2f}{max(values):>10.2f}")
+
+    if args.check:
+        over = [f'{key}: {percentile([result[key] for result in results], 50):.2f} ms > {budget} ms'
+                for key, budget in (('create_app_ms', CREATE_APP_BUDGET_MS),
+                                    ('request_overhead_ms', REQUEST_OVERHEAD_BUDGET_MS))
+                if percentile([result[key] for result in results], 50) > budget]
+        for line in over:
+            print(f'Fuera de presupuesto: {line}')
+        return 1 if over else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""
+Utilidades estadísticas compartidas por los benchmarks
+"""
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano (values no vacío)"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
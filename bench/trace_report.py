@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Reporte de latencia por etapa a partir de las trazas en JSON-lines
+
+Para cada endpoint (span raíz 'HTTP <método> <ruta>') reparte la duración del
+request entre etapas usando el tiempo propio de cada span: su duración menos la de
+sus hijos. Las etapas son los nombres de span (db.query, db.commit,
+distance_api.get_distance, fleet_analytics.update, response.serialize, ...). El
+tiempo propio del span raíz figura como 'app'. Las etapas suman el total del request.
+
+Uso:
+    python -m bench.trace_report traces.jsonl
+    python -m bench.trace_report traces.jsonl --endpoint "PATCH /Trips/<int:id>/complete"
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+from bench.stats import percentile
+
+
+def load_traces(path):
+    traces = defaultdict(list)
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            if line.strip():
+                span = json.loads(line)
+                traces[span['trace_id']].append(span)
+    return traces
+
+
+def stage_breakdown(spans):
+    """(endpoint, duración total ms, {etapa: ms propios}) o None si no hay raíz HTTP"""
+    ids = {span['span_id'] for span in spans}
+    roots = [span for span in spans
+             if span['name'].startswith('HTTP ') and (span['parent_id'] is None or span['parent_id'] not in ids)]
+    if not roots:
+        return None
+    root = roots[0]
+
+    children_ms = defaultdict(float)
+    for span in spans:
+        if span['parent_id'] in ids:
+            children_ms[span['parent_id']] += span['duration_ms']
+
+    stages = defaultdict(float)
+    for span in spans:
+        own = max(0.0, span['duration_ms'] - children_ms[span['span_id']])
+        stages['app' if span is root else span['name']] += own
+    return root['name'][len('HTTP '):], root['duration_ms'], dict(stages)
+
+
+def aggregate(traces):
+    """{endpoint: {'total': [ms], 'stages': {etapa: [ms por request]}}}"""
+    report = {}
+    for spans in traces.values():
+        breakdown = stage_breakdown(spans)
+        if breakdown is None:
+            continue
+        endpoint, total, stages = breakdown
+        entry = report.setdefault(endpoint, {'total': [], 'stages': defaultdict(list)})
+        index = len(entry['total'])
+        entry['total'].append(total)
+        for stage, ms in stages.items():
+            values = entry['stages'][stage]
+            # Los requests que no pasaron por la etapa cuentan como 0 ms
+            values.extend([0.0] * (index - len(values)))
+            values.append(ms)
+    for entry in report.values():
+        for values in entry['stages'].values():
+            values.extend([0.0] * (len(entry['total']) - len(values)))
+    return report
+
+
+def print_report(report, endpoint=None):
+    for name in sorted(report, key=lambda key: -sum(report[key]['total'])):
+        if endpoint and name != endpoint:
+            continue
+        entry = report[name]
+        total = entry['total']
+        print(f"\n{name}  ({len(total)} requests, p50 {percentile(total, 50):.1f} ms, "
+              f"p95 {percentile(total, 95):.1f} ms)")
+        print(f"  {'etapa':<30}{'media ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'% total':>9}")
+        grand_total = sum(total) or 1.0
+        for stage, values in sorted(entry['stages'].items(), key=lambda item: -sum(item[1])):
+            print(f"  {stage:<30}{sum(values) / len(values):>10.2f}{percentile(values, 50):>9.2f}"
+                  f"{percentile(values, 95):>9.2f}{sum(values) / grand_total:>9.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia por etapa desde trazas JSON-lines')
+    parser.add_argument('path', help='Archivo de trazas (TRACING_FILE o salida de bench.fake_otlp_collector)')
+    parser.add_argument('--endpoint', help='Solo este endpoint, p. ej. "PATCH /Trips/<int:id>/complete"')
+    args = parser.parse_args()
+
+    report = aggregate(load_traces(args.path))
+    if not report:
+        print('No hay trazas con span raíz HTTP en el archivo')
+        return 1
+    print_report(report, args.endpoint)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
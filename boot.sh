@@ -1,2 +1,7 @@
 source .venv/bin/activate
-python3 app.py
\ No newline at end of file
+python3 -m flask --app app init-db
+# FLASK_ENV=development: servidor de desarrollo de Flask (un proceso, debug y reloader)
+if [ "$FLASK_ENV" = "development" ]; then
+    exec python3 app.py
+fi
+exec gunicorn -c gunicorn.conf.py wsgi:app
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos de flota para TruckGuard
+
+Crea owners, conductores, camiones con los componentes por defecto
+(ComponentManager.get_default_components), historiales de viajes con distancias
+reales entre ciudades y registros de mantenimiento que siguen la misma
+degradación que Truck.update_mileage: cada viaje suma km a los componentes y,
+al llegar al límite, se registra el servicio y el componente vuelve a cero.
+
+Inserta con executemany en lotes (IDs asignados en Python, sin ida y vuelta por
+fila) y usa una semilla fija: la misma semilla genera exactamente los mismos datos.
+
+Uso:
+    python generate_fleet_data.py --owners 10 --trucks-per-owner 20 --trips-per-truck 50
+    python generate_fleet_data.py --owners 200 --trucks-per-owner 50 --trips-per-truck 80 --yes   # ~1M filas
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from werkzeug.security import generate_password_hash
+
+
+DEFAULT_PASSWORD = 'truckguard123'
+
+# Distancias aproximadas por ruta (km)
+ROUTES = [
+    ('Buenos Aires', 'Rosario', 300),
+    ('Buenos Aires', 'Córdoba', 700),
+    ('Buenos Aires', 'Mar del Plata', 415),
+    ('Buenos Aires', 'Bahía Blanca', 640),
+    ('Buenos Aires', 'Neuquén', 1150),
+    ('Rosario', 'Córdoba', 400),
+    ('Rosario', 'Santa Fe', 170),
+    ('Córdoba', 'Mendoza', 660),
+    ('Córdoba', 'Tucumán', 560),
+    ('Tucumán', 'Salta', 310),
+    ('Mendoza', 'San Juan', 170),
+    ('Mendoza', 'Neuquén', 800),
+]
+
+NAMES = ['Juan', 'María', 'Carlos', 'Lucía', 'Diego', 'Sofía', 'Martín', 'Valentina', 'Jorge', 'Camila']
+SURNAMES = ['González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Martínez', 'Pérez', 'Romero', 'Sosa']
+TRUCK_MODELS = [('Mercedes-Benz', 'Actros'), ('Scania', 'R450'), ('Volvo', 'FH16'), ('Iveco', 'Stralis'),
+                ('Ford', 'Cargo 1723'), ('Volkswagen', 'Constellation')]
+COLORS = ['Blanco', 'Rojo', 'Azul', 'Gris', 'Negro']
+SERVICE_COST = {'Filtros': (80, 200), 'Aceite': (60, 150), 'Inyecciones': (300, 900),
+                'Frenos': (250, 700), 'Neumático': (400, 1500)}
+
+
+class _ChunkedWriter:
+    """
+    Acumula filas por tabla y las inserta con executemany de a chunk_size.
+
+    models define el orden de las FKs: antes de insertar una tabla se vacían
+    los buffers de las anteriores (un viaje nunca llega antes que su camión).
+    """
+
+    def __init__(self, db, models, chunk_size):
+        self.db = db
+        self.models = list(models)
+        self.chunk_size = chunk_size
+        self.buffers = {model: [] for model in self.models}
+        self.counts = {}
+
+    def add(self, model, row):
+        buffer = self.buffers[model]
+        buffer.append(row)
+        if len(buffer) >= self.chunk_size:
+            self.flush(model)
+
+    def flush(self, model=None):
+        last = self.models.index(model) if model is not None else len(self.models) - 1
+        for m in self.models[:last + 1]:
+            rows = self.buffers[m]
+            if rows:
+                self.db.session.execute(m.__table__.insert(), rows)
+                self.db.session.commit()
+                self.counts[m.__tablename__] = self.counts.get(m.__tablename__, 0) + len(rows)
+                rows.clear()
+
+
+def _next_id(db, column):
+    return (db.session.query(db.func.max(column)).scalar() or 0) + 1
+
+
+def generate_fleet(owners=10, trucks_per_owner=20, trips_per_truck=50, extra_drivers_ratio=0.1,
+                   overdue_ratio=0.1, seed=42, chunk_size=5000, end_date=None, password_hash=None,
+                   log=None):
+    """
+    Genera la flota en la base de la app actual (requiere app context).
+
+    overdue_ratio: fracción de camiones que dejaron de hacer servicios en el último
+    tramo de su historial (componentes en Fair / Maintenance Required y
+    mantenimientos Pending). Con 0 toda la flota queda al día.
+
+    Devuelve {'owners': [{'id', 'truck_ids', 'driver_ids'}], 'rows': {tabla: filas}}.
+    """
+    from app import db
+    from app.models import UserModel, TruckModel, TripModel, MaintenanceModel
+    from app.resources.component_restx_routes import ComponentManager
+
+    rng = random.Random(seed)
+    end_date = end_date or datetime(2025, 6, 1)
+    password_hash = password_hash or generate_password_hash(DEFAULT_PASSWORD)
+    components = ComponentManager.get_default_components()
+    writer = _ChunkedWriter(db, [UserModel, TruckModel, TripModel, MaintenanceModel], chunk_size)
+    log = log or (lambda message: None)
+
+    user_id = _next_id(db, UserModel.id)
+    truck_id = _next_id(db, TruckModel.truck_id)
+    trip_id = _next_id(db, TripModel.id)
+    maintenance_id = _next_id(db, MaintenanceModel.id)
+
+    fleet = {'owners': []}
+    drivers_per_owner = trucks_per_owner + int(round(trucks_per_owner * extra_drivers_ratio))
+
+    # 1) Usuarios y camiones (estos se insertan al terminar su historial, con el odómetro final)
+    trucks = []
+    for o in range(owners):
+        owner_id = user_id
+        user_id += 1
+        writer.add(UserModel, _user_row(rng, owner_id, 'owner', password_hash))
+        driver_ids = []
+        for _ in range(drivers_per_owner):
+            writer.add(UserModel, _user_row(rng, user_id, 'driver', password_hash))
+            driver_ids.append(user_id)
+            user_id += 1
+
+        truck_ids = []
+        for t in range(trucks_per_owner):
+            brand, model = rng.choice(TRUCK_MODELS)
+            created_at = end_date - timedelta(days=trips_per_truck * 3 + rng.randint(30, 365))
+            trucks.append({
+                'truck_id': truck_id,
+                'plate': _plate(truck_id),
+                'model': model,
+                'brand': brand,
+                'year': str(rng.randint(2010, 2024)),
+                'color': rng.choice(COLORS),
+                'status': 'Activo' if rng.random() < 0.8 else 'Inactivo',
+                'mileage': rng.randint(0, 150000),
+                'health_status': 'Excellent',
+                'created_at': created_at,
+                'updated_at': created_at,
+                'owner_id': owner_id,
+                'fleetanalytics_id': None,
+                'driver_id': driver_ids[t],
+                'version_id': 1,
+            })
+            truck_ids.append(truck_id)
+            truck_id += 1
+        fleet['owners'].append({'id': owner_id, 'truck_ids': truck_ids, 'driver_ids': driver_ids})
+
+    # 2) Historial por camión: viajes, degradación y servicios (mismo cálculo que update_mileage)
+    for truck in trucks:
+        trips, maintenances = [], []
+        overdue = rng.random() < overdue_ratio
+        stop_servicing_at = int(trips_per_truck * 0.7) if overdue else trips_per_truck
+        state = {}
+        for c in components:
+            accumulated = rng.randint(0, int(c['interval'] * 0.5))
+            state[c['name']] = {'interval': c['interval'], 'accumulated': accumulated,
+                                'last': max(0, truck['mileage'] - accumulated)}
+
+        day = truck['created_at']
+        for n in range(trips_per_truck):
+            day += timedelta(days=rng.randint(1, 4), hours=rng.randint(0, 23))
+            origin, destination, km = rng.choice(ROUTES)
+            if rng.random() < 0.5:
+                origin, destination = destination, origin
+            distance = int(round(km * rng.uniform(0.95, 1.1)))
+            trips.append({
+                'id': trip_id, 'date': day, 'origin': origin, 'destination': destination,
+                'status': 'Completed', 'distance': distance, 'created_at': day, 'updated_at': day,
+                'driver_id': truck['driver_id'], 'truck_id': truck['truck_id'],
+            })
+            trip_id += 1
+
+            truck['mileage'] += distance
+            for name, component in state.items():
+                component['accumulated'] += distance
+                status = MaintenanceModel.status_for_usage(component['accumulated'], component['interval'])
+                if status == 'Maintenance Required' and n < stop_servicing_at:
+                    # Servicio al llegar al límite: registro completado y el componente vuelve a cero
+                    low, high = SERVICE_COST.get(name, (100, 500))
+                    maintenances.append(_maintenance_row(
+                        maintenance_id, f'Servicio de {name}', 'Completed', name, round(rng.uniform(low, high), 2),
+                        component['interval'], truck['mileage'], 0, truck, day))
+                    maintenance_id += 1
+                    component['accumulated'] = 0
+                    component['last'] = truck['mileage']
+
+        # Estado actual de cada componente (cost = 0, como ComponentManager.create_components_for_truck)
+        statuses = []
+        for name, component in state.items():
+            status = MaintenanceModel.status_for_usage(component['accumulated'], component['interval'])
+            statuses.append(status)
+            maintenances.append(_maintenance_row(
+                maintenance_id, f'{name} maintenance', status, name, 0, component['interval'],
+                component['last'], component['accumulated'], truck, day))
+            maintenance_id += 1
+            if status in ('Fair', 'Maintenance Required'):
+                low, high = SERVICE_COST.get(name, (100, 500))
+                maintenances.append(_maintenance_row(
+                    maintenance_id, f'Servicio pendiente de {name}', 'Pending', name,
+                    round(rng.uniform(low, high), 2), component['interval'], component['last'], 0, truck, day))
+                maintenance_id += 1
+
+        truck['health_status'] = TruckModel.health_for_statuses(statuses)
+        truck['updated_at'] = day
+        writer.add(TruckModel, truck)
+        for row in trips:
+            writer.add(TripModel, row)
+        for row in maintenances:
+            writer.add(MaintenanceModel, row)
+
+    writer.flush()
+
+    fleet['rows'] = dict(writer.counts)
+    log(f"   filas: {fleet['rows']}")
+    return fleet
+
+
+def _plate(n):
+    """Patente con formato AA123BB derivada del id"""
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return (f'{letters[n // 17576 % 26]}{letters[n // 676 % 26]}{n % 1000:03d}'
+            f'{letters[n // 26 % 26]}{letters[n % 26]}')
+
+
+def _user_row(rng, user_id, rol, password_hash):
+    return {
+        'id': user_id,
+        'name': rng.choice(NAMES),
+        'surname': rng.choice(SURNAMES),
+        'email': f'{rol}{user_id}@fleet.truckguard.local',
+        'password': password_hash,
+        'rol': rol,
+        'phone': f'11{rng.randint(10000000, 99999999)}',
+        'status': 'active',
+    }
+
+
+def _maintenance_row(maintenance_id, description, status, component, cost, interval, last_mileage,
+                     accumulated_km, truck, when):
+    return {
+        'id': maintenance_id,
+        'description': description,
+        'status': status,
+        'created_at': when,
+        'updated_at': when,
+        'component': component,
+        'cost': cost,
+        'mileage_interval': interval,
+        'last_maintenance_mileage': last_mileage,
+        'next_maintenance_mileage': last_mileage + interval,
+        'accumulated_km': accumulated_km,
+        'maintenance_interval': interval,
+        'truck_id': truck['truck_id'],
+        'driver_id': truck['driver_id'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera datos sintéticos de flota')
+    parser.add_argument('--owners', type=int, default=10)
+    parser.add_argument('--trucks-per-owner', type=int, default=20)
+    parser.add_argument('--trips-per-truck', type=int, default=50)
+    parser.add_argument('--extra-drivers-ratio', type=float, default=0.1,
+                        help='Conductores sin camión por owner, relativo a la cantidad de camiones')
+    parser.add_argument('--overdue-ratio', type=float, default=0.1,
+                        help='Fracción de camiones con mantenimientos atrasados')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--yes', action='store_true', help='No pedir confirmación')
+    args = parser.parse_args()
+
+    print("🚛 TruckGuard - Generador de Datos de Flota")
+    print("=" * 50)
+
+    load_dotenv()
+    if not os.getenv('DATABASE_URL'):
+        print("❌ Error: DATABASE_URL no está configurada en el archivo .env")
+        sys.exit(1)
+
+    print("📊 Base de datos:", os.getenv('DATABASE_URL'))
+    if not args.yes:
+        response = input("\n¿Insertar datos sintéticos en esta base? (escribe 'GENERAR' para confirmar): ")
+        if response != 'GENERAR':
+            print("❌ Operación cancelada")
+            sys.exit(0)
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print(f"🌱 {args.owners} owners x {args.trucks_per_owner} camiones x {args.trips_per_truck} viajes "
+              f"(semilla {args.seed})...")
+        start = time.perf_counter()
+        fleet = generate_fleet(args.owners, args.trucks_per_owner, args.trips_per_truck,
+                               extra_drivers_ratio=args.extra_drivers_ratio, overdue_ratio=args.overdue_ratio,
+                               seed=args.seed, chunk_size=args.chunk_size, log=print)
+        elapsed = time.perf_counter() - start
+        total = sum(fleet['rows'].values())
+        print(f"✅ {total} filas en {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} filas/s)")
+        print(f"🔑 Contraseña de todos los usuarios generados: {DEFAULT_PASSWORD}")
+
+
+if __name__ == '__main__':
+    main()
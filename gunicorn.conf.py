@@ -0,0 +1,69 @@
+"""
+Configuración de gunicorn para producción
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Workers, threads y clase de worker salen de app/config/serving.py (CPUs o env
+WEB_CONCURRENCY, WEB_THREADS, WEB_WORKER_CLASS). Los valores resueltos se exportan
+al entorno para que cada worker dimensione su pool de SQLAlchemy con ellos.
+
+Recarga sin cortar requests: `kill -HUP <pid del master>`. Levanta workers nuevos
+con el código actual y los viejos terminan lo que tienen en curso (graceful_timeout).
+"""
+import os
+
+from dotenv import load_dotenv
+from app.config.serving import pool_sizing, serving_profile, warm_up
+
+# El master también lee el .env: el perfil se resuelve antes de forkear los workers
+load_dotenv()
+_profile = serving_profile()
+for _name, _key in (('WEB_CONCURRENCY', 'workers'), ('WEB_THREADS', 'threads'),
+                    ('WEB_WORKER_CLASS', 'worker_class'), ('WEB_WORKER_CONNECTIONS', 'worker_connections')):
+    os.environ[_name] = str(_profile[_key])
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = _profile['worker_class']
+workers = _profile['workers']
+threads = _profile['threads']
+worker_connections = _profile['worker_connections']
+
+timeout = int(os.getenv('WEB_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('WEB_KEEPALIVE', '5'))
+# Reciclar workers de a poco acota la memoria que crece por fragmentación
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', '100'))
+# Sin preload: cada worker importa la app, así HUP recarga el código
+preload_app = False
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    sizing = pool_sizing(workers, _profile['concurrency'], int(os.getenv('DB_MAX_CONNECTIONS', '100')))
+    server.log.info(
+        'TruckGuard: %s x %d workers, concurrencia %d por worker; pool %d (+%d) por worker, %d conexiones en total',
+        worker_class, workers, _profile['concurrency'], sizing['pool_size'], sizing['max_overflow'],
+        workers * (sizing['pool_size'] + sizing['max_overflow']),
+    )
+
+
+def post_worker_init(worker):
+    # Antes de aceptar conexiones: pool abierto y primer request ya recorrido
+    if os.getenv('WEB_WARMUP', 'true').lower() in ('1', 'true', 'yes'):
+        elapsed = warm_up(worker.wsgi)
+        worker.log.info('Worker %s listo en %.0f ms', worker.pid, elapsed * 1000)
+
+
+def worker_exit(server, worker):
+    # Envía las trazas pendientes y cierra las conexiones del pool
+    from app import db
+    from app.utils.tracing import tracer
+
+    if tracer.exporter is not None:
+        tracer.exporter.shutdown()
+    app = getattr(worker, 'wsgi', None)
+    if app is not None:
+        with app.app_context():
+            db.engine.dispose()
@@ -0,0 +1,186 @@
+"""
+Tests del event loop compartido (app/utils/aio.py) y de la API de distancias sobre él
+
+Verifica que:
+- event_loop.run devuelve el resultado o propaga la excepción de la corutina
+- Las corutinas ven el contexto (contextvars) del hilo que las agenda
+- Las consultas de varios hilos se solapan en el loop en vez de serializarse
+- En el loop compartido la API de distancias reutiliza las conexiones keep-alive
+- Si el loop se recrea (fork, stop) el cliente HTTP compartido se rearma
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+import pytest
+from app.google import locations
+from app.google.locations import GoogleGetLocation
+from app.utils.aio import event_loop
+from bench.fake_distance_server import FakeDistanceServer
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+@pytest.fixture
+def slow_distance_server(monkeypatch):
+    server = FakeDistanceServer(latency_ms=100, jitter_ms=0).start()
+    monkeypatch.setenv('DISTANCE_MATRIX_URL', server.url)
+    yield server
+    server.stop()
+
+
+class TestSharedEventLoop:
+    """Tests de SharedEventLoop"""
+
+    def test_run_result_and_errors(self):
+        """
+        Test: Resultado y errores
+
+        Verifica que:
+        - run devuelve lo que devuelve la corutina
+        - Las excepciones de la corutina llegan al que llama
+        - Con timeout vencido se cancela la corutina
+        """
+        async def double(value):
+            await asyncio.sleep(0)
+            return value * 2
+
+        async def fail():
+            raise ValueError('boom')
+
+        cancelled = threading.Event()
+
+        async def hang():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        assert event_loop.run(double(21)) == 42
+        with pytest.raises(ValueError, match='boom'):
+            event_loop.run(fail())
+        with pytest.raises(concurrent.futures.TimeoutError):
+            event_loop.run(hang(), timeout=0.05)
+        assert cancelled.wait(1)
+
+    def test_context_propagates(self):
+        """
+        Test: contextvars
+
+        Verifica que:
+        - La corutina ve los valores del contexto del hilo que la agenda
+        - Cada hilo ve el suyo aunque el loop sea el mismo
+        """
+        async def read():
+            await asyncio.sleep(0.01)
+            return request_id.get()
+
+        results = {}
+
+        def worker(value):
+            request_id.set(value)
+            results[value] = event_loop.run(read())
+
+        threads = [threading.Thread(target=worker, args=(f'req-{i}',)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == {f'req-{i}': f'req-{i}' for i in range(4)}
+
+    def test_run_from_loop_is_rejected(self):
+        """
+        Test: run desde el propio loop
+
+        Verifica que:
+        - Llamar a run dentro de una corutina del loop falla en vez de bloquearlo
+        """
+        async def nested():
+            inner = asyncio.sleep(0)
+            try:
+                event_loop.run(inner)
+            finally:
+                inner.close()
+
+        with pytest.raises(RuntimeError):
+            event_loop.run(nested())
+
+
+class TestDistanceOnSharedLoop:
+    """Tests de GoogleGetLocation sobre el loop compartido"""
+
+    def test_concurrent_lookups_overlap(self, slow_distance_server):
+        """
+        Test: Consultas concurrentes
+
+        Verifica que:
+        - 8 hilos con 100 ms de latencia terminan en bastante menos de 8 x 100 ms
+        - Todas las consultas llegan al servidor
+        """
+        event_loop.run(GoogleGetLocation().get_distance('Buenos Aires', 'Rosario'))
+        errors = []
+
+        def lookup():
+            try:
+                event_loop.run(GoogleGetLocation().get_distance('Buenos Aires', 'Rosario'))
+            except Exception as exc:  # pragma: no cover - se reporta abajo
+                errors.append(exc)
+
+        threads = [threading.Thread(target=lookup) for _ in range(8)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        assert errors == []
+        assert slow_distance_server.requests == 9
+        assert elapsed < 0.5
+
+    def test_connections_are_reused(self, monkeypatch):
+        """
+        Test: Keep-alive
+
+        Verifica que:
+        - Consultas sucesivas en el loop compartido usan una sola conexión
+        - Con asyncio.run cada consulta abre la suya
+        """
+        server = FakeDistanceServer(latency_ms=0, jitter_ms=0).start()
+        monkeypatch.setenv('DISTANCE_MATRIX_URL', server.url)
+        try:
+            for _ in range(5):
+                event_loop.run(GoogleGetLocation().get_distance('Buenos Aires', 'Rosario'))
+            shared = server.connections
+            for _ in range(3):
+                asyncio.run(GoogleGetLocation().get_distance('Buenos Aires', 'Rosario'))
+        finally:
+            server.stop()
+
+        assert shared == 1
+        assert server.connections - shared == 3
+
+    def test_client_follows_loop_restart(self, monkeypatch):
+        """
+        Test: Loop recreado (fork o stop)
+
+        Verifica que:
+        - Después de event_loop.stop() la consulta siguiente funciona en el loop nuevo
+        - El cliente compartido se rearma para ese loop
+        """
+        server = FakeDistanceServer(latency_ms=0, jitter_ms=0).start()
+        monkeypatch.setenv('DISTANCE_MATRIX_URL', server.url)
+        try:
+            event_loop.run(GoogleGetLocation().get_distance('Buenos Aires', 'Rosario'))
+            old_loop = locations._shared_client[0]
+            event_loop.stop()
+            result = event_loop.run(GoogleGetLocation().get_distance('Buenos Aires', 'Rosario'), timeout=5)
+        finally:
+            server.stop()
+
+        assert 'distance_km' in result
+        assert locations._shared_client[0] is event_loop.loop is not old_loop
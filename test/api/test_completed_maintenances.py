@@ -0,0 +1,69 @@
+"""
+Tests para GET /Maintenance/<truck_id>/components
+
+Verifica que el historial de mantenimientos completados:
+- Devuelve solo los completados, ordenados por última actualización
+- Pagina en SQL
+- No escribe diagnósticos en stdout
+"""
+
+from datetime import datetime, timedelta
+from app import db
+from app.models.user import User as UserModel
+from app.models.truck import Truck as TruckModel
+from app.models.maintenance import Maintenance as MaintenanceModel
+
+
+class TestCompletedMaintenances:
+    """Tests del historial de mantenimientos completados de un camión"""
+
+    def _seed(self):
+        driver = UserModel(name='Diego', surname='Morales', rol='driver',
+                           email='diego@test.com', phone='2', password='test123')
+        db.session.add(driver)
+        db.session.flush()
+        truck = TruckModel(owner_id=1, plate='AAA111', model='Actros', brand='Mercedes-Benz',
+                           year='2021', color='Blanco', mileage=1000, health_status='Excellent',
+                           fleetanalytics_id=None, driver_id=driver.id)
+        db.session.add(truck)
+        db.session.flush()
+
+        base = datetime(2025, 1, 1)
+        for i, status in enumerate(['Completed', 'Pending', 'Completed', 'Completed', 'Rejected']):
+            maintenance = MaintenanceModel(description=f'Mantenimiento {i}', status=status,
+                                           component=f'Componente {i}', cost=100.0,
+                                           mileage_interval=5000, last_maintenance_mileage=1000,
+                                           next_maintenance_mileage=6000, truck_id=truck.truck_id,
+                                           driver_id=driver.id, maintenance_interval=5000)
+            maintenance.created_at = base
+            maintenance.updated_at = base + timedelta(days=i)
+            db.session.add(maintenance)
+        db.session.commit()
+        return truck.truck_id, driver.id
+
+    def test_completed_history_paginated(self, client, auth_headers, capsys):
+        """
+        Test: Historial paginado de completados
+
+        Verifica que:
+        - Solo se incluyen mantenimientos con estado Completed
+        - El orden es por updated_at descendente
+        - La paginación y el total son correctos
+        - El endpoint no imprime diagnósticos
+        """
+        truck_id, driver_id = self._seed()
+        capsys.readouterr()
+
+        response = client.get(f'/Maintenance/{truck_id}/components?per_page=2', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['total'] == 3
+        assert data['pages'] == 2
+        assert [m['component'] for m in data['maintenances']] == ['Componente 3', 'Componente 2']
+        assert data['maintenances'][0]['driver']['id'] == driver_id
+
+        response = client.get(f'/Maintenance/{truck_id}/components?page=2&per_page=2', headers=auth_headers)
+        assert [m['component'] for m in response.get_json()['maintenances']] == ['Componente 0']
+
+        assert capsys.readouterr().out == ''
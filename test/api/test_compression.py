@@ -0,0 +1,151 @@
+"""
+Tests de compresión de respuestas
+
+Verifica que:
+- Las respuestas grandes se comprimen con gzip si el cliente lo acepta
+- Los cuerpos chicos y los clientes sin Accept-Encoding reciben la respuesta original
+- Las respuestas en streaming se comprimen por chunk y text/event-stream no se toca
+- Se registran el ratio de compresión y el tiempo de CPU
+"""
+
+import gzip
+import json
+import zlib
+import pytest
+from datetime import datetime
+from flask import Response
+from werkzeug.datastructures import Accept
+from app import db
+from app.models.trip import Trip as TripModel
+from app.utils.compression import choose_encoding
+from app.utils.metrics import metrics
+from test.api.test_trip_completion import _seed_trip
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _seed_trips(count):
+    trip, truck, driver = _seed_trip()
+    for i in range(count - 1):
+        db.session.add(TripModel(date=datetime.now(), origin=f'Origen {i}', destination='Rosario',
+                                 status='Pending', created_at=datetime.now(), updated_at=datetime.now(),
+                                 driver_id=driver.id, truck_id=truck.truck_id))
+    db.session.commit()
+
+
+class TestResponseCompression:
+    """Tests de compresión negociada"""
+
+    def test_large_list_is_gzipped(self, client, auth_headers):
+        """
+        Test: Listado grande con Accept-Encoding: gzip
+
+        Verifica que:
+        - La respuesta llega con Content-Encoding: gzip y Vary: Accept-Encoding
+        - El cuerpo descomprimido es el JSON del listado
+        - Se registran bytes, ratio y CPU de compresión
+        """
+        _seed_trips(30)
+        headers = dict(auth_headers, **{'Accept-Encoding': 'gzip, deflate'})
+
+        response = client.get('/Trips/all?per_page=50', headers=headers)
+
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        body = gzip.decompress(response.data)
+        assert len(json.loads(body)['trips']) == 30
+        assert len(response.data) * 3 < len(body)
+        assert int(response.headers['Content-Length']) == len(response.data)
+
+        route = '/Trips/all'
+        assert metrics.counter_value('http_response_bytes_total', encoding='identity', route=route) == len(body)
+        assert metrics.counter_value('http_response_bytes_total', encoding='gzip', route=route) == len(response.data)
+        assert metrics.histogram_count('http_response_compression_ratio', encoding='gzip', route=route) == 1
+        assert metrics.histogram_count('http_response_compression_cpu_seconds', encoding='gzip') == 1
+
+    def test_small_or_not_accepted(self, client, auth_headers):
+        """
+        Test: Respuestas sin compresión
+
+        Verifica que:
+        - Un cuerpo menor a COMPRESSION_MIN_SIZE no se comprime
+        - Sin Accept-Encoding la respuesta grande sale sin comprimir
+        """
+        small = client.get('/Trucks/all', headers=dict(auth_headers, **{'Accept-Encoding': 'gzip'}))
+        assert 'Content-Encoding' not in small.headers
+        assert metrics.counter_value('http_response_compression_skipped_total', reason='too_small') == 1
+
+        _seed_trips(30)
+        plain = client.get('/Trips/all?per_page=50', headers=auth_headers)
+        assert 'Content-Encoding' not in plain.headers
+        assert len(plain.get_json()['trips']) == 30
+
+    def test_streaming_and_event_stream(self, app, client):
+        """
+        Test: Streaming
+
+        Verifica que:
+        - Un stream se comprime por chunk y se puede descomprimir de forma incremental
+        - text/event-stream no se comprime
+        """
+        chunks = [json.dumps({'row': i, 'payload': 'x' * 200}) + '\n' for i in range(20)]
+        app.add_url_rule('/_test/stream', 'test_stream',
+                         lambda: Response((chunk for chunk in chunks), mimetype='application/json'))
+        app.add_url_rule('/_test/events', 'test_events',
+                         lambda: Response((f'data: {i}\n\n' for i in range(3)), mimetype='text/event-stream'))
+
+        response = client.get('/_test/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        decompressor = zlib.decompressobj(31)
+        first = decompressor.decompress(next(iter(response.response)))
+        assert first == chunks[0].encode()
+        rest = b''.join(decompressor.decompress(part) for part in response.response)
+        assert (first + rest).decode() == ''.join(chunks)
+        response.close()
+
+        events = client.get('/_test/events', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in events.headers
+        assert events.data == b'data: 0\n\ndata: 1\n\ndata: 2\n\n'
+
+    def test_disabled(self, app, client, auth_headers):
+        """
+        Test: COMPRESSION_ENABLED=false
+        """
+        app.config['COMPRESSION_ENABLED'] = False
+        _seed_trips(30)
+
+        response = client.get('/Trips/all?per_page=50', headers=dict(auth_headers, **{'Accept-Encoding': 'gzip'}))
+
+        assert 'Content-Encoding' not in response.headers
+
+
+class TestEncodingNegotiation:
+    """Tests de negociación de Accept-Encoding"""
+
+    def test_quality_values(self):
+        """
+        Test: Valores q de Accept-Encoding
+
+        Verifica que:
+        - gzip;q=0 desactiva gzip
+        - Sin codificaciones aceptadas no se comprime
+        """
+        assert choose_encoding(Accept([('gzip', 1)])) == 'gzip'
+        assert choose_encoding(Accept([('gzip', 0)])) is None
+        assert choose_encoding(Accept([('identity', 1)])) is None
+
+    def test_brotli_preferred(self):
+        """
+        Test: Preferencia de brotli cuando está instalado
+        """
+        pytest.importorskip('brotli')
+
+        assert choose_encoding(Accept([('gzip', 1), ('br', 1)])) == 'br'
+        assert choose_encoding(Accept([('gzip', 1), ('br', 0.5)])) == 'gzip'
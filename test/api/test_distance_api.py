@@ -0,0 +1,70 @@
+"""
+Tests de la configuración de la API de distancias
+
+Verifica que:
+- GoogleGetLocation usa DISTANCE_MATRIX_URL cuando está configurada
+- El stand-in local responde con el formato de Distance Matrix
+- Los errores inyectados se reportan como error de la API
+"""
+
+import asyncio
+import httpx
+import pytest
+from app.google.locations import GoogleGetLocation
+from bench.fake_distance_server import FakeDistanceServer
+
+
+@pytest.fixture
+def fake_distance_server(monkeypatch):
+    server = FakeDistanceServer(latency_ms=0, jitter_ms=0).start()
+    monkeypatch.setenv('DISTANCE_MATRIX_URL', server.url)
+    yield server
+    server.stop()
+
+
+class TestDistanceMatrixUrl:
+    """Tests de GoogleGetLocation contra el stand-in local"""
+
+    def test_distance_from_configured_url(self, fake_distance_server):
+        """
+        Test: URL configurable
+
+        Verifica que:
+        - La consulta llega al servidor configurado
+        - Se devuelve la distancia de la ruta conocida en km
+        """
+        result = asyncio.run(GoogleGetLocation().get_distance('Buenos Aires', 'Rosario'))
+
+        assert fake_distance_server.requests == 1
+        assert result['distance_km'] == pytest.approx(300.0)
+        assert result['duration_min'] > 0
+
+    def test_unknown_route_is_stable(self, fake_distance_server):
+        """
+        Test: Rutas desconocidas
+
+        Verifica que:
+        - Un par origen/destino sin ruta definida devuelve siempre la misma distancia
+        """
+        first = asyncio.run(GoogleGetLocation().get_distance('Tandil', 'Azul'))
+        second = asyncio.run(GoogleGetLocation().get_distance('Tandil', 'Azul'))
+
+        assert first == second
+        assert 50 <= first['distance_km'] <= 1500
+
+    def test_injected_errors(self, monkeypatch):
+        """
+        Test: Errores inyectados
+
+        Verifica que:
+        - Con error_rate=1 el servidor responde 503
+        - GoogleGetLocation propaga el error HTTP
+        """
+        server = FakeDistanceServer(latency_ms=0, jitter_ms=0, error_rate=1.0).start()
+        monkeypatch.setenv('DISTANCE_MATRIX_URL', server.url)
+        try:
+            with pytest.raises(httpx.HTTPStatusError):
+                asyncio.run(GoogleGetLocation().get_distance('Buenos Aires', 'Rosario'))
+            assert server.errors == 1
+        finally:
+            server.stop()
@@ -0,0 +1,180 @@
+"""
+Tests de los eventos de dominio (app/services/domain_events.py)
+
+Verifica que:
+- Los cambios de camiones, viajes y mantenimientos quedan en domain_event en la misma transacción
+- El dispatcher entrega cada lote a los consumidores y avanza su checkpoint
+- Si un consumidor falla, el lote se reintenta sin frenar a los demás (al menos una vez)
+- Un evento commiteado fuera de orden de id no se saltea (ventana de asentamiento)
+- Con FLEET_ANALYTICS_MODE=events las métricas de flota se recalculan fuera del request
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.domain_event import DomainEvent as DomainEventModel
+from app.models.domain_event import DomainEventCheckpoint as DomainEventCheckpointModel
+from app.models.fleetanalytics import FleetAnalytics as FleetAnalyticsModel
+from app.services.domain_events import EventDispatcher, _consumers, append_events, domain_consumer, event_row
+from app.services.trip_completion import TripCompletionService
+from test.api.test_trip_completion import _seed_trip
+
+
+def _settled():
+    """Un momento en que los eventos recién escritos ya pasaron la ventana de asentamiento"""
+    return datetime.now() + timedelta(seconds=11)
+
+
+@pytest.fixture
+def recorder():
+    """Consumidor de prueba que guarda los lotes; falla mientras fail > 0"""
+    state = {'batches': [], 'fail': 0}
+
+    @domain_consumer('test_recorder', aggregates=('maintenance',))
+    def record(events):
+        if state['fail'] > 0:
+            state['fail'] -= 1
+            raise RuntimeError('consumidor caído')
+        state['batches'].append([(e.id, e.type) for e in events])
+
+    yield state
+    _consumers.pop('test_recorder', None)
+
+
+def _types():
+    return [e.type for e in DomainEventModel.query.order_by(DomainEventModel.id)]
+
+
+class TestDomainEventCapture:
+    """Tests de la captura de cambios en la sesión"""
+
+    def test_changes_are_captured(self, app, auth_headers):
+        """
+        Test: Captura
+
+        Verifica que:
+        - Crear camión, mantenimiento y viaje escribe un *.created por objeto con su owner
+        - Completar el viaje escribe solo las columnas que cambiaron
+        """
+        trip, truck, _ = _seed_trip()
+        assert sorted(_types()) == ['maintenance.created', 'trip.created', 'truck.created']
+        assert {e.owner_id for e in DomainEventModel.query} == {1}
+
+        TripCompletionService.complete(trip, 150)
+
+        # Un evento por objeto y flush: el camión cambia en dos flushes
+        updates = {}
+        for e in DomainEventModel.query.filter(DomainEventModel.type.like('%.updated')):
+            updates.setdefault(e.aggregate, {}).update(e.changes)
+        assert updates['maintenance']['status'] == ['Fair', 'Maintenance Required']
+        assert updates['truck']['mileage'] == [5000, 5150]
+        assert updates['truck']['health_status'] == ['Fair', 'Maintenance Required']
+        assert 'updated_at' not in updates['truck']
+        assert updates['trip']['status'] == ['In Course', 'Completed']
+        assert DomainEventModel.query.filter_by(aggregate='trip', type='trip.updated').one().truck_id == truck.truck_id
+
+    def test_rollback_discards_events(self, app, auth_headers):
+        """
+        Test: Rollback
+
+        Verifica que:
+        - Un cambio que hace rollback no deja eventos
+        """
+        trip, truck, _ = _seed_trip()
+        before = DomainEventModel.query.count()
+
+        truck.mileage = 9999
+        db.session.flush()
+        db.session.rollback()
+
+        assert DomainEventModel.query.count() == before
+
+
+class TestEventDispatcher:
+    """Tests del reparto a consumidores"""
+
+    def test_checkpoint_and_retry(self, app, auth_headers, recorder):
+        """
+        Test: Checkpoint y reintento
+
+        Verifica que:
+        - Un consumidor que falla no avanza su checkpoint y guarda el error
+        - El mismo lote se entrega en la pasada siguiente
+        - Los eventos ya procesados no se vuelven a entregar
+        """
+        _seed_trip()
+        recorder['fail'] = 1
+        dispatcher = EventDispatcher('w1')
+
+        assert dispatcher.run_consumer('test_recorder', _settled()) == 0
+        checkpoint = db.session.get(DomainEventCheckpointModel, 'test_recorder')
+        assert (checkpoint.last_event_id, checkpoint.last_error) == (0, 'consumidor caído')
+
+        assert dispatcher.run_consumer('test_recorder', _settled()) == 1
+        assert [[type for _, type in batch] for batch in recorder['batches']] == [['maintenance.created']]
+        assert dispatcher.run_consumer('test_recorder', _settled()) == 0
+
+        last_id = db.session.query(db.func.max(DomainEventModel.id)).scalar()
+        checkpoint = db.session.get(DomainEventCheckpointModel, 'test_recorder', populate_existing=True)
+        assert (checkpoint.last_event_id, checkpoint.last_error) == (last_id, None)
+
+    def test_one_worker_per_consumer(self, app, auth_headers, recorder):
+        """
+        Test: Lease
+
+        Verifica que:
+        - Mientras un worker tiene el lease de un consumidor, otro no lo corre
+        - Vencido el lease, otro worker lo retoma desde el checkpoint
+        """
+        _seed_trip()
+        now = _settled()
+        assert EventDispatcher('w1')._claim('test_recorder', now, 300) is not None
+
+        assert EventDispatcher('w2').run_consumer('test_recorder', now) == 0
+        assert EventDispatcher('w2').run_consumer('test_recorder', now + timedelta(seconds=301)) == 1
+        assert len(recorder['batches']) == 1
+
+    def test_out_of_order_commit(self, app, auth_headers, recorder):
+        """
+        Test: Commits fuera de orden de id
+
+        Verifica que:
+        - Un evento recién commiteado no se entrega mientras puede haber ids anteriores abiertos
+        - Cuando commitea el id anterior, pasada la ventana llegan los dos en orden
+        """
+        _seed_trip()
+        dispatcher = EventDispatcher('w1')
+        assert dispatcher.run_consumer('test_recorder', _settled()) == 1
+        last_id = db.session.query(db.func.max(DomainEventModel.id)).scalar()
+
+        def commit_event(event_id, type):
+            append_events(db.session, [dict(event_row('maintenance', 7, type, 1, None, {'changes': {}}),
+                                             id=event_id)])
+            db.session.commit()
+
+        # La transacción con last_id + 1 sigue abierta y la de last_id + 2 ya commiteó
+        commit_event(last_id + 2, 'maintenance.updated')
+        assert dispatcher.run_consumer('test_recorder', datetime.now() + timedelta(seconds=1)) == 0
+
+        commit_event(last_id + 1, 'maintenance.deleted')
+        assert dispatcher.run_consumer('test_recorder', _settled()) == 2
+        assert recorder['batches'][-1] == [(last_id + 1, 'maintenance.deleted'), (last_id + 2, 'maintenance.updated')]
+
+    def test_fleet_analytics_off_request_path(self, app, auth_headers):
+        """
+        Test: FLEET_ANALYTICS_MODE=events
+
+        Verifica que:
+        - Completar el viaje no recalcula las métricas de flota
+        - El consumidor fleet_analytics las recalcula una vez por owner
+        """
+        app.config['FLEET_ANALYTICS_MODE'] = 'events'
+        trip, _, _ = _seed_trip()
+
+        TripCompletionService.complete(trip, 150)
+        assert FleetAnalyticsModel.query.filter_by(user_id=1).count() == 0
+
+        assert EventDispatcher('w1').dispatch() == 0
+        assert EventDispatcher('w1').dispatch(_settled()) > 0
+        analytics = FleetAnalyticsModel.query.filter_by(user_id=1).one()
+        assert (analytics.total_trucks, analytics.total_trips) == (1, 1)
@@ -0,0 +1,292 @@
+"""
+Tests del stream de eventos SSE (GET /events/stream)
+
+Verifica que:
+- Completar un viaje publica los cambios de estado de componentes, la alerta y el viaje
+- Cada owner recibe solo sus eventos y el conductor solo los de sus camiones
+- Se puede retomar con Last-Event-ID, en tramos de a SSE_REPLAY_LIMIT eventos
+- Un evento commiteado fuera de orden de id no se saltea
+- Los eventos publicados se insertan al commitear y se descartan con un rollback
+- Sin eventos se manda un heartbeat
+- Un cliente lento con el buffer lleno se desconecta en vez de acumular memoria
+- Pasado SSE_MAX_CONNECTIONS_PER_WORKER se responde 503 con Retry-After
+- Una suscripción se libera aunque el replay falle o el cuerpo nunca se lea
+"""
+
+import json
+from datetime import datetime, timedelta
+import pytest
+from flask_jwt_extended import create_access_token
+from app import db
+from app.models.stream_event import StreamEvent as StreamEventModel
+from app.models.trip import Trip as TripModel
+from app.models.truck import Truck as TruckModel
+from app.services.trip_completion import TripCompletionService
+from app.utils.event_stream import event_broker, publish_event
+from test.api.test_trip_completion import _seed_trip
+
+
+@pytest.fixture
+def sse_config(app):
+    # Sin hilo de polling: el test llama a poll_once
+    app.config.update(SSE_POLL_INTERVAL=0, SSE_HEARTBEAT_SECONDS=0.05,
+                      SSE_MAX_CONNECTION_SECONDS=5, SSE_BUFFER_SIZE=100)
+    yield app.config
+    event_broker.last_id = None
+    event_broker._gaps.clear()
+
+
+def _parse(chunk):
+    fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines() if not line.startswith(':'))
+    return int(fields['id']), fields['event'], json.loads(fields['data'])
+
+
+def _events(chunks, count):
+    events = []
+    for chunk in chunks:
+        if chunk.startswith(b'id:'):
+            events.append(_parse(chunk.decode()))
+            if len(events) == count:
+                return events
+    return events
+
+
+def _open(client, headers, **params):
+    response = client.get('/events/stream', headers=headers, query_string=params, buffered=False)
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry:')
+    return response, chunks
+
+
+class TestEventStream:
+    """Tests del stream SSE por owner"""
+
+    def test_trip_completion_events(self, client, auth_headers, sse_config):
+        """
+        Test: Eventos del completado de viaje
+
+        Verifica que:
+        - El stream es text/event-stream
+        - Llegan component_status, maintenance_alert y trip_completed con ids crecientes
+        """
+        trip, truck, _ = _seed_trip()
+        trip_id, truck_id = trip.id, truck.truck_id
+        response, chunks = _open(client, auth_headers)
+        assert response.mimetype == 'text/event-stream'
+
+        # El endpoint libera la sesión antes de streamear: se vuelve a cargar el viaje
+        TripCompletionService.complete(db.session.get(TripModel, trip_id), 150)
+        assert event_broker.poll_once() == 3
+        events = _events(chunks, 3)
+        response.close()
+
+        assert [event[1] for event in events] == ['component_status', 'maintenance_alert', 'trip_completed']
+        assert events[0][2]['previous'] == 'Fair'
+        assert events[0][2]['status'] == 'Maintenance Required'
+        assert events[2][2]['truck_id'] == truck_id
+        assert events[0][0] < events[1][0] < events[2][0]
+        assert len(event_broker) == 0
+
+    def test_resume_from_last_event_id(self, client, auth_headers, sse_config):
+        """
+        Test: Last-Event-ID
+
+        Verifica que:
+        - Al reconectar llegan solo los eventos posteriores al último visto
+        - No llegan eventos de otro owner
+        """
+        publish_event(1, 'maintenance_alert', truck_id=10, component='Aceite')
+        publish_event(1, 'maintenance_alert', truck_id=10, component='Frenos')
+        publish_event(99, 'maintenance_alert', truck_id=20, component='Filtros')
+        publish_event(1, 'trip_completed', truck_id=10, trip_id=5)
+        db.session.commit()
+        # Eventos ya asentados: salen del replay de la tabla
+        StreamEventModel.query.update({'created_at': datetime.now() - timedelta(minutes=1)})
+        db.session.commit()
+        first = StreamEventModel.query.order_by(StreamEventModel.id).first()
+
+        response, chunks = _open(client, {**auth_headers, 'Last-Event-ID': str(first.id)})
+        events = _events(chunks, 2)
+        response.close()
+
+        assert [(event[1], event[2].get('component')) for event in events] == [
+            ('maintenance_alert', 'Frenos'), ('trip_completed', None)]
+
+    def test_replay_limit_closes_stream(self, client, auth_headers, sse_config):
+        """
+        Test: Replay más largo que SSE_REPLAY_LIMIT
+
+        Verifica que:
+        - Se mandan los primeros eventos y el stream termina, sin pasar al feed en vivo
+        - Al reconectar desde el último recibido llega el resto
+        """
+        sse_config['SSE_REPLAY_LIMIT'] = 2
+        for component in ('Aceite', 'Frenos', 'Filtros'):
+            publish_event(1, 'maintenance_alert', truck_id=10, component=component)
+        db.session.commit()
+        StreamEventModel.query.update({'created_at': datetime.now() - timedelta(minutes=1)})
+        db.session.commit()
+
+        response, chunks = _open(client, {**auth_headers, 'Last-Event-ID': '0'})
+        body = list(chunks)
+        response.close()
+        first = _events(body, 2)
+        assert [event[2]['component'] for event in first] == ['Aceite', 'Frenos']
+        assert b': ping\n\n' not in body
+        assert len(event_broker) == 0
+
+        response, chunks = _open(client, {**auth_headers, 'Last-Event-ID': str(first[-1][0])})
+        [rest] = _events(chunks, 1)
+        response.close()
+        assert rest[2]['component'] == 'Filtros'
+
+    def test_events_follow_the_transaction(self, app):
+        """
+        Test: Eventos publicados y la transacción
+
+        Verifica que:
+        - Un rollback descarta los eventos publicados
+        - Al commitear se insertan todos, en el orden en que se publicaron
+        """
+        publish_event(1, 'maintenance_alert', truck_id=10, component='Aceite')
+        db.session.rollback()
+        publish_event(1, 'maintenance_alert', truck_id=10, component='Frenos')
+        publish_event(1, 'trip_completed', truck_id=10, trip_id=5)
+        db.session.commit()
+
+        events = StreamEventModel.query.order_by(StreamEventModel.id).all()
+        assert [(event.type, json.loads(event.data).get('component')) for event in events] == [
+            ('maintenance_alert', 'Frenos'), ('trip_completed', None)]
+
+    def test_out_of_order_commit(self, client, auth_headers, sse_config):
+        """
+        Test: Commits fuera de orden de id
+
+        Verifica que:
+        - Con el id anterior sin commitear, el broker no avanza más allá del hueco
+        - Cuando commitea, llegan los dos en orden de id
+        - Un hueco que dura más que SSE_SETTLE_SECONDS se da por rollback
+        """
+        response, chunks = _open(client, auth_headers)
+
+        def commit_event(event_id, component):
+            event = StreamEventModel(1, 'maintenance_alert', {'truck_id': 10, 'component': component}, truck_id=10)
+            event.id = event_id
+            db.session.add(event)
+            db.session.commit()
+
+        # La transacción con el id 1 sigue abierta y la del 2 ya commiteó
+        commit_event(2, 'Frenos')
+        assert event_broker.poll_once() == 0
+        commit_event(1, 'Aceite')
+        assert event_broker.poll_once() == 2
+        assert [(event[0], event[2]['component']) for event in _events(chunks, 2)] == [(1, 'Aceite'), (2, 'Frenos')]
+
+        # El id 3 nunca commitea (rollback)
+        commit_event(4, 'Filtros')
+        assert event_broker.poll_once() == 0
+        sse_config['SSE_SETTLE_SECONDS'] = 0
+        assert event_broker.poll_once() == 1
+        [event] = _events(chunks, 1)
+        response.close()
+        assert event[0] == 4
+
+    def test_heartbeat_and_query_token(self, app, client, auth_headers, sse_config):
+        """
+        Test: Heartbeat y token en la URL
+
+        Verifica que:
+        - EventSource puede autenticarse con ?jwt=
+        - Sin eventos se manda un comentario ': ping'
+        """
+        token = auth_headers['Authorization'].split(' ', 1)[1]
+        response, chunks = _open(client, {}, jwt=token)
+
+        assert next(chunks) == b': ping\n\n'
+        response.close()
+
+    def test_driver_sees_only_assigned_trucks(self, client, auth_headers, sse_config):
+        """
+        Test: Alcance del conductor
+
+        Verifica que:
+        - El conductor recibe los eventos de su camión y no los de otros camiones del owner
+        """
+        _, truck, driver = _seed_trip()
+        other = TruckModel(owner_id=1, plate='XYZ789', model='FH', brand='Volvo', year='2020', color='Rojo',
+                           mileage=1000, health_status='Good', fleetanalytics_id=None, driver_id=None)
+        db.session.add(other)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(driver.id))}'}
+        truck_id, other_id = truck.truck_id, other.truck_id
+
+        response, chunks = _open(client, headers)
+        publish_event(1, 'maintenance_alert', truck_id=other_id, component='Aceite')
+        publish_event(1, 'maintenance_alert', truck_id=truck_id, component='Frenos')
+        db.session.commit()
+        event_broker.poll_once()
+        [event] = _events(chunks, 1)
+        response.close()
+
+        assert (event[2]['truck_id'], event[2]['component']) == (truck_id, 'Frenos')
+
+    def test_slow_client_is_disconnected(self, client, auth_headers, sse_config):
+        """
+        Test: Buffer acotado
+
+        Verifica que:
+        - Si se llenan los eventos sin leer, el stream termina (el cliente reconecta con Last-Event-ID)
+        - La suscripción se libera
+        """
+        sse_config['SSE_BUFFER_SIZE'] = 2
+        response, chunks = _open(client, auth_headers)
+        for component in ('Aceite', 'Frenos', 'Filtros'):
+            publish_event(1, 'maintenance_alert', truck_id=10, component=component)
+        db.session.commit()
+        event_broker.poll_once()
+
+        assert list(chunks) == []
+        assert len(event_broker) == 0
+        response.close()
+
+    def test_connection_limit(self, client, auth_headers, sse_config):
+        """
+        Test: Streams por worker
+
+        Verifica que:
+        - Con el límite alcanzado el endpoint responde 503 con Retry-After
+        - Al cerrarse un stream se libera el lugar
+        """
+        sse_config['SSE_MAX_CONNECTIONS_PER_WORKER'] = 1
+        response, _ = _open(client, auth_headers)
+
+        rejected = client.get('/events/stream', headers=auth_headers)
+        assert rejected.status_code == 503
+        assert rejected.headers['Retry-After'] == '5'
+        assert len(event_broker) == 1
+
+        response.close()
+        response, _ = _open(client, auth_headers)
+        response.close()
+
+    def test_subscription_released_without_stream(self, client, auth_headers, sse_config, monkeypatch):
+        """
+        Test: Suscripciones que no llegan a streamear
+
+        Verifica que:
+        - Si el replay falla, la suscripción se libera y el request termina en 500
+        - Si la respuesta se cierra sin leer el cuerpo, la suscripción se libera
+        """
+        def failing_replay(*args, **kwargs):
+            raise RuntimeError('replay caído')
+
+        with monkeypatch.context() as patch:
+            patch.setattr(event_broker, 'replay', failing_replay)
+            response = client.get('/events/stream', headers={**auth_headers, 'Last-Event-ID': '0'})
+        assert response.status_code == 500
+        assert len(event_broker) == 0
+
+        response = client.get('/events/stream', headers=auth_headers, buffered=False)
+        assert len(event_broker) == 1
+        response.close()
+        assert len(event_broker) == 0
@@ -0,0 +1,277 @@
+"""
+Tests de la cola de trabajos y del completado de viajes en modo async
+
+Verifica que:
+- PATCH /Trips/<id>/complete con Prefer: respond-async responde 202 con el id del trabajo
+- El worker aplica el completado y GET /Jobs/<id> devuelve el resultado
+- Solo se completan en async los viajes 'In Course'
+- De un mismo camión corre un trabajo por vez y en orden de llegada
+- Los errores se reintentan con backoff y los permanentes fallan sin reintento
+- Al terminar se notifica al webhook con la firma HMAC
+"""
+
+import hashlib
+import hmac
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from flask_jwt_extended import create_access_token
+from app import db
+from app.google.locations import GoogleGetLocation
+from app.models.job import Job as JobModel
+from app.models.trip import Trip as TripModel
+from app.models.truck import Truck as TruckModel
+from app.services.job_queue import JobWorker, PermanentJobError, job_handler, job_queue
+from app.utils.metrics import metrics
+from test.api.test_trip_completion import _seed_trip
+
+ASYNC_HEADERS = {'Prefer': 'respond-async'}
+
+
+@job_handler('test_flaky')
+def _flaky_job(payload):
+    if payload.get('permanent'):
+        raise PermanentJobError('no se puede')
+    raise RuntimeError('caído')
+
+
+@pytest.fixture
+def fake_distance(monkeypatch):
+    async def get_distance(self, origin, destination):
+        return {'distance_km': 150.0, 'duration_min': 120.0}
+
+    monkeypatch.setattr(GoogleGetLocation, 'get_distance', get_distance)
+
+
+@pytest.fixture
+def webhook_receiver():
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            received.append((dict(self.headers), body))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/hooks/jobs', received
+    server.shutdown()
+    server.server_close()
+
+
+class TestAsyncTripCompletion:
+    """Tests del completado de viajes a través de la cola"""
+
+    def test_enqueue_and_process(self, app, client, auth_headers, fake_distance):
+        """
+        Test: Completado async de punta a punta
+
+        Verifica que:
+        - El PATCH responde 202 con Location al estado y no toca el viaje
+        - Un segundo PATCH mientras está en cola devuelve el mismo trabajo
+        - El worker completa el viaje y el estado queda done con la respuesta sincrónica
+        """
+        trip, truck, _ = _seed_trip()
+        trip_id, truck_id = trip.id, truck.truck_id
+
+        response = client.patch(f'/Trips/{trip_id}/complete', headers={**auth_headers, **ASYNC_HEADERS})
+        again = client.patch(f'/Trips/{trip_id}/complete', headers={**auth_headers, **ASYNC_HEADERS})
+
+        assert response.status_code == 202
+        job_id = response.get_json()['job_id']
+        assert response.headers['Location'] == f'/Jobs/{job_id}'
+        assert again.get_json()['job_id'] == job_id
+        assert db.session.get(TripModel, trip_id).status == 'In Course'
+        assert client.get(f'/Jobs/{job_id}', headers=auth_headers).get_json()['status'] == 'queued'
+
+        assert JobWorker(app).run_pending() == 1
+
+        status = client.get(f'/Jobs/{job_id}', headers=auth_headers).get_json()
+        assert status['status'] == 'done'
+        assert status['result']['distance_km'] == 150.0
+        assert status['result']['components_reaching_maintenance_limit'] == ['Aceite']
+        db.session.expire_all()
+        assert db.session.get(TruckModel, truck_id).mileage == 5150
+
+    def test_async_mode_from_config(self, app, client, auth_headers, fake_distance):
+        """
+        Test: TRIP_COMPLETION_MODE=async
+
+        Verifica que:
+        - Sin header Prefer el PATCH también se encola
+        - Un reintento después de completar no vuelve a sumar kilómetros
+        """
+        trip, truck, _ = _seed_trip()
+        app.config['TRIP_COMPLETION_MODE'] = 'async'
+
+        response = client.patch(f'/Trips/{trip.id}/complete', headers=auth_headers)
+        assert response.status_code == 202
+        worker = JobWorker(app)
+        worker.run_pending()
+
+        # Simula un worker que murió después del commit: el trabajo vuelve a correr
+        job = db.session.get(JobModel, response.get_json()['job_id'])
+        job.status = 'queued'
+        db.session.commit()
+        worker.run_pending()
+
+        db.session.expire_all()
+        assert db.session.get(JobModel, job.id).to_json()['result']['already_completed'] is True
+        assert db.session.get(TruckModel, truck.truck_id).mileage == 5150
+
+    def test_only_trips_in_course(self, app, client, auth_headers, fake_distance):
+        """
+        Test: Viajes que no están en curso
+
+        Verifica que:
+        - Encolar un viaje Pending responde 409 sin crear trabajo
+        - Si el viaje deja de estar en curso antes de que corra el trabajo, falla sin reintento
+          y no suma kilómetros
+        """
+        trip, truck, _ = _seed_trip()
+        trip_id, truck_id = trip.id, truck.truck_id
+        trip.status = 'Pending'
+        db.session.commit()
+
+        response = client.patch(f'/Trips/{trip_id}/complete', headers={**auth_headers, **ASYNC_HEADERS})
+        assert response.status_code == 409
+        assert JobModel.query.count() == 0
+
+        trip = db.session.get(TripModel, trip_id)
+        trip.status = 'In Course'
+        db.session.commit()
+        job_id = client.patch(f'/Trips/{trip_id}/complete',
+                              headers={**auth_headers, **ASYNC_HEADERS}).get_json()['job_id']
+        trip = db.session.get(TripModel, trip_id)
+        trip.status = 'Cancelled'
+        db.session.commit()
+        JobWorker(app).run_pending()
+
+        db.session.expire_all()
+        job = db.session.get(JobModel, job_id)
+        assert (job.status, job.attempts) == ('failed', 1)
+        assert db.session.get(TruckModel, truck_id).mileage == 5000
+
+    def test_status_visibility(self, app, client, auth_headers, fake_distance):
+        """
+        Test: GET /Jobs/<id>
+
+        Verifica que:
+        - Otro usuario recibe 404 aunque el trabajo exista
+        - Un id inexistente es 404
+        """
+        trip, _, driver = _seed_trip()
+        job_id = client.patch(f'/Trips/{trip.id}/complete',
+                              headers={**auth_headers, **ASYNC_HEADERS}).get_json()['job_id']
+        other = {'Authorization': f'Bearer {create_access_token(identity=str(driver.id))}'}
+
+        assert client.get(f'/Jobs/{job_id}', headers=auth_headers).status_code == 200
+        assert client.get(f'/Jobs/{job_id}', headers=other).status_code == 404
+        assert client.get('/Jobs/999', headers=auth_headers).status_code == 404
+
+
+class TestJobQueue:
+    """Tests de reclamo, orden, reintentos y notificación"""
+
+    def test_one_job_per_partition_in_order(self, app, auth_headers):
+        """
+        Test: Orden por partición
+
+        Verifica que:
+        - Mientras corre un trabajo del camión 1, el siguiente del mismo camión espera
+        - Un trabajo de otro camión no espera
+        - Al terminar el primero se libera el siguiente de su camión
+        """
+        first = job_queue.enqueue('test_flaky', {}, partition_key='truck:1')
+        second = job_queue.enqueue('test_flaky', {}, partition_key='truck:1')
+        other = job_queue.enqueue('test_flaky', {}, partition_key='truck:2')
+        db.session.commit()
+
+        assert job_queue.claim('w1').id == first.id
+        assert job_queue.claim('w2').id == other.id
+        assert job_queue.claim('w3') is None
+
+        db.session.get(JobModel, first.id).status = 'done'
+        db.session.commit()
+        assert job_queue.claim('w3').id == second.id
+
+    def test_retry_with_backoff_then_fail(self, app, auth_headers):
+        """
+        Test: Reintentos
+
+        Verifica que:
+        - Un error vuelve el trabajo a la cola con run_after en el futuro
+        - El trabajo en backoff frena a los siguientes de su partición
+        - Agotados los intentos queda failed con el error
+        - PermanentJobError falla en el primer intento
+        """
+        app.config['JOB_MAX_ATTEMPTS'] = 2
+        job = job_queue.enqueue('test_flaky', {}, partition_key='truck:1')
+        behind = job_queue.enqueue('test_flaky', {}, partition_key='truck:1')
+        permanent = job_queue.enqueue('test_flaky', {'permanent': True}, partition_key='truck:2')
+        db.session.commit()
+        worker = JobWorker(app)
+
+        assert worker.run_pending() == 2
+        retried = db.session.get(JobModel, job.id)
+        assert (retried.status, retried.attempts, retried.error) == ('queued', 1, 'caído')
+        assert retried.run_after > datetime.now()
+        assert db.session.get(JobModel, behind.id).attempts == 0
+        assert db.session.get(JobModel, permanent.id).status == 'failed'
+
+        retried.run_after = datetime.now()
+        db.session.commit()
+        worker.run_once()
+
+        failed = db.session.get(JobModel, job.id)
+        assert (failed.status, failed.error) == ('failed', 'caído')
+        assert metrics.counter_value('jobs_processed_total', kind='test_flaky', outcome='failed') >= 2
+
+    def test_reclaim_stale(self, app, auth_headers):
+        """
+        Test: Worker caído
+
+        Verifica que:
+        - Un running más viejo que el lease vuelve a queued
+        """
+        job = job_queue.enqueue('test_flaky', {}, partition_key='truck:1')
+        db.session.commit()
+        claimed = job_queue.claim('w1')
+        claimed.started_at = datetime.now() - timedelta(seconds=600)
+        db.session.commit()
+
+        assert job_queue.reclaim_stale(300) == 1
+        assert db.session.get(JobModel, job.id).status == 'queued'
+
+    def test_webhook_and_metrics(self, app, client, auth_headers, webhook_receiver):
+        """
+        Test: Webhook y métricas
+
+        Verifica que:
+        - Al fallar el trabajo se envía job.failed firmado con JOB_WEBHOOK_SECRET
+        - /metrics expone la profundidad de la cola
+        """
+        url, received = webhook_receiver
+        app.config.update(JOB_WEBHOOK_URL=url, JOB_WEBHOOK_SECRET='s3cret')
+        job = job_queue.enqueue('test_flaky', {'permanent': True})
+        queued = job_queue.enqueue('test_flaky', {}, partition_key='truck:9')
+        queued.run_after = datetime.now() + timedelta(hours=1)
+        db.session.commit()
+
+        JobWorker(app).run_once()
+
+        headers, body = received[0]
+        expected = hmac.new(b's3cret', body, hashlib.sha256).hexdigest()
+        assert headers['X-TruckGuard-Signature'] == f'sha256={expected}'
+        payload = json.loads(body)
+        assert payload['event'] == 'job.failed'
+        assert payload['job']['id'] == job.id
+        assert 'jobs_queue_depth{status="queued"} 1' in metrics.render_prometheus()
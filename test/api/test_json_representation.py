@@ -0,0 +1,84 @@
+"""
+Tests de la representación JSON de la API
+
+Verifica que:
+- datetime, date y Decimal se serializan sin pre-procesar la respuesta
+- orjson y el fallback de la stdlib producen el mismo JSON
+- Los listados devuelven las fechas en ISO 8601
+"""
+
+import json
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from app.config import api_config
+from app.config.api_config import dumps_json, json_default
+from test.api.test_trip_completion import _seed_trip
+
+PAYLOAD = {
+    'created_at': datetime(2024, 5, 1, 10, 30, 15, 123456),
+    'date': date(2024, 5, 1),
+    'cost': Decimal('1500.50'),
+    'items': [{'updated_at': datetime(2024, 5, 2, 8, 0)}, None],
+    7: 'clave numérica',
+}
+EXPECTED = {
+    'created_at': '2024-05-01T10:30:15.123456',
+    'date': '2024-05-01',
+    'cost': 1500.5,
+    'items': [{'updated_at': '2024-05-02T08:00:00'}, None],
+    '7': 'clave numérica',
+}
+
+
+class TestJsonEncoder:
+    """Tests del encoder de respuestas"""
+
+    def test_default_types(self):
+        """
+        Test: Tipos no nativos de JSON
+
+        Verifica que:
+        - Las fechas salen en ISO 8601 y Decimal como número
+        - La salida termina con salto de línea
+        """
+        body = dumps_json(PAYLOAD)
+
+        assert body.endswith(b'\n')
+        assert json.loads(body) == EXPECTED
+
+    def test_stdlib_fallback(self, monkeypatch):
+        """
+        Test: Fallback sin orjson
+
+        Verifica que:
+        - Sin orjson el resultado es el mismo JSON
+        - Los tipos desconocidos fallan con TypeError
+        """
+        monkeypatch.setattr(api_config, 'orjson', None)
+
+        assert json.loads(dumps_json(PAYLOAD)) == EXPECTED
+        with pytest.raises(TypeError):
+            json_default(object())
+
+
+class TestJsonRepresentation:
+    """Tests de la representación registrada en el Api"""
+
+    def test_trip_list_dates(self, client, auth_headers):
+        """
+        Test: Fechas en /Trips/all
+
+        Verifica que:
+        - Las fechas del listado se devuelven en ISO 8601
+        - El Content-Type es application/json
+        """
+        trip, _, _ = _seed_trip()
+
+        response = client.get('/Trips/all', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        listed = response.get_json()['trips'][0]
+        assert listed['created_at'] == trip.created_at.isoformat()
+        assert listed['date'] == trip.date.isoformat()
@@ -0,0 +1,206 @@
+"""
+Tests del outbox de mails (app/mail/outbox.py) contra un SMTP local
+
+Verifica que:
+- Los avisos se escriben en el outbox en la misma transacción que el cambio
+- Ningún request se conecta a SMTP
+- El worker envía un lote por una sola conexión y agrupa alertas por owner
+- Los errores de SMTP se reintentan con backoff y terminan en failed
+"""
+
+import json
+from datetime import datetime, timedelta
+import pytest
+from app import db, mailsender
+from app.google.locations import GoogleGetLocation
+from app.mail.outbox import MailOutbox, queue_mail
+from app.models.fleetanalytics import FleetAnalytics as FleetAnalyticsModel
+from app.models.mail_outbox import MailOutbox as MailOutboxModel
+from app.models.maintenance import Maintenance as MaintenanceModel
+from app.services.job_queue import JobWorker
+from app.services.trip_completion import TripCompletionService
+from bench.fake_smtp_server import FakeSmtpServer
+from test.api.test_trip_completion import _seed_trip
+
+
+def _use_smtp(app, server):
+    app.config.update(MAIL_SERVER=server.host, MAIL_PORT=server.port,
+                      FLASKY_MAIL_SENDER='truckguard@test.com',
+                      MAIL_OUTBOX_RETRY_BASE_SECONDS=30, MAIL_OUTBOX_MAX_ATTEMPTS=2)
+    mailsender.init_app(app)
+
+
+@pytest.fixture
+def smtp_server(app):
+    server = FakeSmtpServer().start()
+    _use_smtp(app, server)
+    yield server
+    server.stop()
+
+
+def _pending(template=None):
+    query = MailOutboxModel.query.filter_by(status='pending')
+    if template:
+        query = query.filter_by(template=template)
+    return query.all()
+
+
+class TestMailOutboxWrites:
+    """Tests de los avisos que se escriben en el outbox"""
+
+    def test_component_reaching_limit(self, client, auth_headers, smtp_server, monkeypatch):
+        """
+        Test: Componente en Maintenance Required
+
+        Verifica que:
+        - Completar un viaje que lleva un componente al límite encola un aviso al owner
+        - El request no abre conexiones SMTP
+        """
+        trip, _, _ = _seed_trip()
+
+        async def fake_distance(self, origin, destination):
+            return {'distance_km': 150.0, 'duration_min': 120.0}
+
+        monkeypatch.setattr(GoogleGetLocation, 'get_distance', fake_distance)
+
+        response = client.patch(f'/Trips/{trip.id}/complete', headers=auth_headers)
+
+        assert response.status_code == 200
+        [row] = _pending('maintenance_required')
+        assert row.recipient == 'owner@test.com'
+        assert row.context_data['component'] == 'Aceite'
+        assert row.context_data['plate'] == 'ABC123'
+        assert smtp_server.connections == 0
+
+    def test_rollback_discards_mail(self, app, auth_headers, monkeypatch):
+        """
+        Test: Rollback
+
+        Verifica que:
+        - Si la transacción del completado falla, el aviso tampoco queda en el outbox
+        """
+        trip, _, _ = _seed_trip()
+
+        def failing_update(user_id, commit=True):
+            raise RuntimeError('analytics caído')
+
+        monkeypatch.setattr(FleetAnalyticsModel, 'update_fleet_analytics', staticmethod(failing_update))
+
+        with pytest.raises(RuntimeError):
+            TripCompletionService.complete(trip, 150)
+
+        assert MailOutboxModel.query.count() == 0
+
+    def test_register_and_approval(self, client, auth_headers):
+        """
+        Test: Registro y aprobación
+
+        Verifica que:
+        - Registrar un usuario encola el mail de bienvenida
+        - Aprobar un mantenimiento encola el aviso al conductor que lo pidió
+        """
+        _, truck, driver = _seed_trip()
+        maintenance = MaintenanceModel(description='Frenos', status='Pending', component='Frenos', cost=300,
+                                       mileage_interval=9500, last_maintenance_mileage=5000,
+                                       next_maintenance_mileage=14500, truck_id=truck.truck_id,
+                                       driver_id=driver.id, maintenance_interval=9500)
+        db.session.add(maintenance)
+        db.session.commit()
+
+        registered = client.post('/Auth/register', data=json.dumps({
+            'name': 'Juan', 'surname': 'Pérez', 'email': 'juan@test.com',
+            'phone': '1', 'password': 'password123'}), content_type='application/json')
+        approved = client.patch(f'/Maintenance/{maintenance.id}/approve', headers=auth_headers,
+                                data=json.dumps({'approval_status': 'Approved'}))
+
+        assert registered.status_code == 201
+        assert approved.status_code == 200
+        assert [row.recipient for row in _pending('register')] == ['juan@test.com']
+        [approval] = _pending('maintenance_approved')
+        assert (approval.recipient, approval.context_data['component']) == ('driver@test.com', 'Frenos')
+
+
+class TestMailOutboxDelivery:
+    """Tests del envío desde el worker"""
+
+    def test_batch_and_digest(self, app, auth_headers, smtp_server):
+        """
+        Test: Lote y digest
+
+        Verifica que:
+        - Tres alertas para el mismo owner salen en un solo mail con las tres
+        - Los mails de distintos destinatarios salen por la misma conexión
+        - Las filas quedan sent
+        """
+        for component in ('Aceite', 'Frenos', 'Filtros'):
+            queue_mail('owner@test.com', 'Mantenimiento requerido', 'maintenance_required',
+                       name='owner', plate='ABC123', brand='Mercedes-Benz', model='Actros',
+                       component=component, mileage=5150)
+        queue_mail('juan@test.com', 'Welcome!', 'register', name='Juan')
+        db.session.commit()
+
+        assert MailOutbox('w1').drain() == 4
+
+        assert smtp_server.connections == 1
+        assert len(smtp_server.messages) == 2
+        digest = next(message for _, to, message in smtp_server.messages if to == ['<owner@test.com>'])
+        assert digest['Subject'] == 'Mantenimiento requerido (3)'
+        text = next(part for part in digest.walk()
+                    if part.get_content_type() == 'text/plain').get_payload(decode=True).decode()
+        assert all(component in text for component in ('Aceite', 'Frenos', 'Filtros'))
+        assert MailOutboxModel.query.filter_by(status='sent').count() == 4
+
+    def test_retry_with_backoff(self, app, auth_headers):
+        """
+        Test: Reintentos
+
+        Verifica que:
+        - Un 451 reprograma ese mail con backoff y el resto del lote sale igual
+        - Al vencer el backoff se reenvía
+        - Con SMTP caído se agotan los intentos y el mail queda failed
+        """
+        server = FakeSmtpServer(fail_first=1).start()
+        _use_smtp(app, server)
+        try:
+            queue_mail('a@test.com', 'Welcome!', 'register', name='A')
+            queue_mail('b@test.com', 'Welcome!', 'register', name='B')
+            db.session.commit()
+            outbox = MailOutbox('w1')
+            now = datetime.now()
+
+            assert outbox.drain(now) == 1
+            [retry] = _pending()
+            assert retry.attempts == 1
+            assert retry.next_attempt_at == now + timedelta(seconds=30)
+            assert outbox.drain(now) == 0
+            assert outbox.drain(now + timedelta(seconds=31)) == 1
+            assert len(server.messages) == 2
+        finally:
+            server.stop()
+
+        queue_mail('c@test.com', 'Welcome!', 'register', name='C')
+        db.session.commit()
+        now = datetime.now()
+        outbox.drain(now)
+        outbox.drain(now + timedelta(seconds=31))
+
+        failed = MailOutboxModel.query.filter_by(recipient='c@test.com').one()
+        assert (failed.status, failed.attempts) == ('failed', 2)
+        assert failed.last_error
+
+    def test_worker_drains_periodically(self, app, auth_headers, smtp_server):
+        """
+        Test: Envío desde worker.py
+
+        Verifica que:
+        - El outbox registrado como tarea periódica del worker envía lo pendiente
+        """
+        queue_mail('juan@test.com', 'Welcome!', 'register', name='Juan')
+        db.session.commit()
+        worker = JobWorker(app)
+        worker.every(10, MailOutbox(worker.worker_id).drain)
+
+        worker.run_periodic()
+
+        assert len(smtp_server.messages) == 1
+        assert MailOutboxModel.query.filter_by(status='sent').count() == 1
@@ -0,0 +1,173 @@
+"""
+Tests para GET /Maintenance/stats
+
+Verifica que las estadísticas:
+- Están acotadas a los camiones del owner autenticado
+- Incluyen desgloses por estado, componente y mes
+- Se cachean por owner y se invalidan al commitear un mantenimiento
+- Un cálculo que se cruza con una invalidación no queda cacheado
+- El TTL se configura con MAINTENANCE_STATS_CACHE_TTL y la caché no crece con las invalidaciones
+"""
+
+import pytest
+from datetime import datetime
+from sqlalchemy import event
+from app import db
+from app.models.user import User as UserModel
+from app.models.truck import Truck as TruckModel
+from app.models.maintenance import Maintenance as MaintenanceModel, stats_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_stats_cache():
+    stats_cache.clear()
+    yield
+    stats_cache.clear()
+
+
+def _create_truck(owner_id, plate):
+    truck = TruckModel(owner_id=owner_id, plate=plate, model='Actros', brand='Mercedes-Benz',
+                       year='2021', color='Blanco', mileage=1000, health_status='Excellent',
+                       fleetanalytics_id=None, driver_id=None)
+    db.session.add(truck)
+    db.session.flush()
+    return truck
+
+
+def _create_maintenance(truck, component, status, cost, created_at):
+    maintenance = MaintenanceModel(description=f'Mantenimiento de {component}', status=status,
+                                   component=component, cost=cost, mileage_interval=5000,
+                                   last_maintenance_mileage=1000, next_maintenance_mileage=6000,
+                                   truck_id=truck.truck_id, driver_id=None, maintenance_interval=5000)
+    maintenance.created_at = created_at
+    maintenance.updated_at = created_at
+    db.session.add(maintenance)
+    return maintenance
+
+
+class TestMaintenanceStats:
+    """Tests de las estadísticas de mantenimiento por owner"""
+
+    def _seed(self):
+        other_owner = UserModel(name='Otro', surname='Owner', rol='owner',
+                                email='otro@test.com', phone='1', password='test123')
+        db.session.add(other_owner)
+        db.session.flush()
+
+        own_truck = _create_truck(1, 'AAA111')
+        foreign_truck = _create_truck(other_owner.id, 'BBB222')
+
+        _create_maintenance(own_truck, 'Aceite', 'Pending', 100.0, datetime(2025, 1, 10))
+        _create_maintenance(own_truck, 'Aceite', 'Completed', 300.0, datetime(2025, 1, 20))
+        _create_maintenance(own_truck, 'Frenos', 'Completed', 200.0, datetime(2025, 2, 5))
+        _create_maintenance(foreign_truck, 'Frenos', 'Pending', 9999.0, datetime(2025, 2, 5))
+        db.session.commit()
+        return own_truck
+
+    def test_stats_scoped_to_owner(self, client, auth_headers):
+        """
+        Test: Las estadísticas solo cuentan los camiones del owner
+
+        Verifica que:
+        - Los totales ignoran mantenimientos de otros owners
+        - Los desgloses por estado, componente y mes son correctos
+        """
+        self._seed()
+
+        response = client.get('/Maintenance/stats', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['total_maintenances'] == 3
+        assert data['pending_maintenances'] == 1
+        assert data['completed_maintenances'] == 2
+        assert data['total_cost'] == 600.0
+        assert data['average_cost'] == 200.0
+
+        by_status = {row['status']: row for row in data['by_status']}
+        assert by_status['Completed']['count'] == 2
+        assert by_status['Completed']['average_cost'] == 250.0
+
+        by_component = {row['component']: row for row in data['by_component']}
+        assert by_component['Aceite']['total_cost'] == 400.0
+        assert by_component['Frenos']['count'] == 1
+
+        assert data['by_month'] == [
+            {'month': '2025-01', 'count': 2, 'total_cost': 400.0},
+            {'month': '2025-02', 'count': 1, 'total_cost': 200.0},
+        ]
+
+    def test_stats_cached_and_invalidated_on_write(self, client, auth_headers):
+        """
+        Test: El caché se usa hasta que se commitea un mantenimiento del owner
+
+        Verifica que:
+        - Una segunda lectura no ejecuta las consultas agregadas
+        - Crear un mantenimiento invalida el caché del owner
+        """
+        truck = self._seed()
+        client.get('/Maintenance/stats', headers=auth_headers)
+
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        try:
+            response = client.get('/Maintenance/stats', headers=auth_headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_statement)
+        assert response.get_json()['total_maintenances'] == 3
+        assert not any('GROUP BY' in statement for statement in statements)
+
+        _create_maintenance(db.session.merge(truck), 'Filtros', 'Pending', 50.0, datetime(2025, 3, 1))
+        db.session.commit()
+
+        data = client.get('/Maintenance/stats', headers=auth_headers).get_json()
+        assert data['total_maintenances'] == 4
+        assert data['pending_maintenances'] == 2
+
+    def test_invalidation_during_compute_is_not_overwritten(self, app, auth_headers, monkeypatch):
+        """
+        Test: Carrera entre el cálculo y la invalidación
+
+        Verifica que:
+        - Si un commit invalida al owner mientras se calculan sus stats, el resultado
+          (ya viejo) se devuelve pero no se guarda
+        - La lectura siguiente recalcula con el mantenimiento nuevo
+        """
+        truck = self._seed()
+        original = MaintenanceModel._compute_owner_stats
+
+        def compute_then_commit(owner_id):
+            stats = original(owner_id)
+            # Otro request commitea un mantenimiento mientras este todavía no guardó
+            monkeypatch.setattr(MaintenanceModel, '_compute_owner_stats', staticmethod(original))
+            _create_maintenance(db.session.merge(truck), 'Filtros', 'Pending', 50.0, datetime(2025, 3, 1))
+            db.session.commit()
+            return stats
+
+        monkeypatch.setattr(MaintenanceModel, '_compute_owner_stats', staticmethod(compute_then_commit))
+
+        assert MaintenanceModel.get_owner_stats(1)['total_maintenances'] == 3
+        assert len(stats_cache) == 0
+        assert MaintenanceModel.get_owner_stats(1)['total_maintenances'] == 4
+        # Terminado el cálculo, su generación no queda guardada
+        assert stats_cache._generations == {}
+
+    def test_cache_configuration(self, app):
+        """
+        Test: Configuración y tamaño de la caché
+
+        Verifica que:
+        - El TTL sale de MAINTENANCE_STATS_CACHE_TTL en app.config
+        - Invalidar owners sin cálculos en curso no acumula generaciones
+        """
+        assert stats_cache.ttl_seconds == app.config['MAINTENANCE_STATS_CACHE_TTL']
+        for owner_id in range(1000):
+            stats_cache.set(owner_id, {})
+            stats_cache.invalidate(owner_id)
+
+        assert len(stats_cache) == 0
+        assert stats_cache._generations == {}
@@ -0,0 +1,137 @@
+"""
+Tests del endpoint /metrics
+
+Verifica que:
+- Se expone un histograma de latencia por namespace y ruta
+- Se exportan las métricas de caché, pool y API de distancias
+- METRICS_TOKEN protege el endpoint
+"""
+
+import asyncio
+import httpx
+import pytest
+from app.google.locations import GoogleGetLocation
+from app.utils.metrics import MetricsRegistry, metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestMetricsEndpoint:
+    """Tests de exposición de métricas en formato Prometheus"""
+
+    def test_request_latency_histogram(self, client, auth_headers):
+        """
+        Test: Latencia por endpoint
+
+        Verifica que:
+        - Se registran buckets, suma y conteo con etiquetas namespace/route
+        - Se cuentan requests por status y queries por request
+        """
+        client.get('/Trucks/all', headers=auth_headers)
+
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        body = response.get_data(as_text=True)
+        assert '# TYPE http_request_duration_seconds histogram' in body
+        assert ('http_request_duration_seconds_count{method="GET",namespace="Trucks",route="/Trucks/all"} 1'
+                in body)
+        assert 'le="+Inf"' in body
+        assert 'http_requests_total{method="GET",namespace="Trucks",route="/Trucks/all",status="200"} 1' in body
+        assert 'http_request_db_queries_count{namespace="Trucks",route="/Trucks/all"} 1' in body
+
+    def test_cache_metrics(self, client, auth_headers):
+        """
+        Test: Ratio de aciertos del caché de estadísticas
+        """
+        client.get('/Maintenance/stats', headers=auth_headers)
+        client.get('/Maintenance/stats', headers=auth_headers)
+
+        body = client.get('/metrics').get_data(as_text=True)
+
+        assert '# TYPE cache_hit_ratio gauge' in body
+        assert 'cache_hits_total{cache="maintenance_stats"}' in body
+
+    def test_distance_api_metrics(self, client, monkeypatch):
+        """
+        Test: Latencia y errores de la API de distancias
+
+        Verifica que:
+        - Una respuesta sin ruta cuenta como error not_found
+        - Un timeout se cuenta y la excepción se propaga
+        """
+        responses = iter([
+            httpx.Response(200, json={'rows': [{'elements': [{'status': 'NOT_FOUND'}]}]},
+                           request=httpx.Request('GET', 'https://maps.example')),
+        ])
+
+        async def fake_get(self, url, params=None, headers=None):
+            try:
+                return next(responses)
+            except StopIteration:
+                raise httpx.ReadTimeout('timeout')
+
+        monkeypatch.setattr(httpx.AsyncClient, 'get', fake_get)
+
+        result = asyncio.run(GoogleGetLocation().get_distance('A', 'B'))
+        assert result == {'error': 'could not get distance'}
+        with pytest.raises(httpx.TimeoutException):
+            asyncio.run(GoogleGetLocation().get_distance('A', 'B'))
+
+        assert metrics.counter_value('distance_api_errors_total', reason='not_found') == 1
+        assert metrics.counter_value('distance_api_errors_total', reason='timeout') == 1
+        assert metrics.histogram_count('distance_api_request_duration_seconds', outcome='timeout') == 1
+
+    def test_metrics_token(self, app, client):
+        """
+        Test: Endpoint protegido con METRICS_TOKEN
+        """
+        app.config['METRICS_TOKEN'] = 'scrape-secret'
+
+        assert client.get('/metrics').status_code == 401
+        response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+        assert response.status_code == 200
+
+
+class TestMetricsRegistry:
+    """Tests del registro de métricas en memoria"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """
+        Test: Buckets acumulados en la exportación
+        """
+        registry = MetricsRegistry()
+        for value in (0.001, 0.02, 0.02, 3):
+            registry.observe('job_seconds', value, buckets=(0.01, 0.1, 1), queue='mail')
+
+        body = registry.render_prometheus()
+
+        assert 'job_seconds_bucket{queue="mail",le="0.01"} 1' in body
+        assert 'job_seconds_bucket{queue="mail",le="0.1"} 3' in body
+        assert 'job_seconds_bucket{queue="mail",le="1"} 3' in body
+        assert 'job_seconds_bucket{queue="mail",le="+Inf"} 4' in body
+        assert 'job_seconds_count{queue="mail"} 4' in body
+
+    def test_collectors_and_label_escaping(self):
+        """
+        Test: Gauges leídos al exportar
+
+        Verifica que:
+        - Los collectors aportan muestras (p. ej. profundidad de cola)
+        - Un collector que falla no rompe el scrape
+        - Las etiquetas se escapan
+        """
+        registry = MetricsRegistry()
+        registry.register_collector('queue', lambda: [('gauge', 'background_queue_depth', {'queue': 'a"b'}, 7)])
+        registry.register_collector('broken', lambda: 1 / 0)
+
+        body = registry.render_prometheus()
+
+        assert 'background_queue_depth{queue="a\\"b"} 7' in body
+        assert 'metrics_collector_failed{collector="broken"} 1' in body
@@ -0,0 +1,141 @@
+"""
+Tests para GET /Maintenance/pending
+
+Verifica que el listado de mantenimientos pendientes:
+- Solo devuelve los mantenimientos de los camiones del owner autenticado
+- Pagina en SQL y devuelve el total real de pendientes
+- No hace una query por fila para el camión o el conductor
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import db
+from app.models.user import User as UserModel
+from app.models.truck import Truck as TruckModel
+from app.models.maintenance import Maintenance as MaintenanceModel
+
+
+def _create_truck(owner_id, driver_id, plate):
+    truck = TruckModel(
+        owner_id=owner_id,
+        plate=plate,
+        model='Actros',
+        brand='Mercedes-Benz',
+        year='2021',
+        color='Blanco',
+        mileage=1000,
+        health_status='Excellent',
+        fleetanalytics_id=None,
+        driver_id=driver_id
+    )
+    db.session.add(truck)
+    db.session.flush()
+    return truck
+
+
+def _create_pending(truck, driver_id, component, created_at):
+    maintenance = MaintenanceModel(
+        description=f'Cambio de {component}',
+        status='Pending',
+        component=component,
+        cost=100.0,
+        mileage_interval=5000,
+        last_maintenance_mileage=truck.mileage,
+        next_maintenance_mileage=truck.mileage + 5000,
+        truck_id=truck.truck_id,
+        driver_id=driver_id,
+        maintenance_interval=5000
+    )
+    maintenance.created_at = created_at
+    maintenance.updated_at = created_at
+    db.session.add(maintenance)
+    return maintenance
+
+
+class TestPendingMaintenances:
+    """Tests del listado de mantenimientos pendientes por owner"""
+
+    def _seed(self):
+        other_owner = UserModel(name='Otro', surname='Owner', rol='owner',
+                                email='otro@test.com', phone='1', password='test123')
+        driver = UserModel(name='Diego', surname='Morales', rol='driver',
+                           email='diego@test.com', phone='2', password='test123')
+        db.session.add_all([other_owner, driver])
+        db.session.flush()
+
+        own_truck = _create_truck(1, driver.id, 'AAA111')
+        foreign_truck = _create_truck(other_owner.id, driver.id, 'BBB222')
+
+        base = datetime(2025, 1, 1)
+        for i in range(5):
+            _create_pending(own_truck, driver.id, f'Componente {i}', base + timedelta(days=i))
+        for i in range(3):
+            _create_pending(foreign_truck, driver.id, f'Ajeno {i}', base + timedelta(days=i))
+        # Un mantenimiento completado del owner no debe aparecer
+        completed = _create_pending(own_truck, None, 'Completado', base)
+        completed.status = 'Completed'
+        db.session.commit()
+        return driver
+
+    def test_only_owner_pending_maintenances(self, client, auth_headers):
+        """
+        Test: Solo se listan los pendientes del owner autenticado
+
+        Verifica que:
+        - Los mantenimientos de camiones de otros owners no aparecen
+        - El total refleja todos los pendientes del owner
+        - Se incluye el conductor cargado en la misma consulta
+        """
+        driver = self._seed()
+
+        response = client.get('/Maintenance/pending', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['total_pending'] == 5
+        assert len(data['pending_maintenances']) == 5
+        assert all(m['truck']['plate'] == 'AAA111' for m in data['pending_maintenances'])
+        assert data['pending_maintenances'][0]['component'] == 'Componente 4'
+        assert data['pending_maintenances'][0]['driver']['id'] == driver.id
+
+    def test_pagination(self, client, auth_headers):
+        """
+        Test: La paginación se aplica sobre los pendientes del owner
+
+        Verifica que:
+        - per_page limita los elementos devueltos
+        - page y pages se calculan sobre el total del owner
+        """
+        self._seed()
+
+        response = client.get('/Maintenance/pending?page=2&per_page=2', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['total_pending'] == 5
+        assert data['page'] == 2
+        assert data['pages'] == 3
+        assert [m['component'] for m in data['pending_maintenances']] == ['Componente 2', 'Componente 1']
+
+    def test_query_count_is_constant(self, app, client, auth_headers):
+        """
+        Test: El número de queries no crece con la cantidad de filas
+
+        Verifica que:
+        - El listado no ejecuta una query por mantenimiento
+        """
+        self._seed()
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        try:
+            response = client.get('/Maintenance/pending', headers=auth_headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+        assert response.status_code == 200
+        # Usuario del token + count + página con JOIN
+        assert len(statements) <= 3
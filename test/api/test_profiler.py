@@ -0,0 +1,126 @@
+"""
+Tests del profiler de requests bajo demanda
+
+Verifica que:
+- Solo se perfilan requests con token firmado válido o por muestreo
+- Se escriben .pstats, stacks colapsados y metadatos por request
+- Los perfiles se listan y descargan con el token de administración
+"""
+
+import os
+import pstats
+import pytest
+from app.utils.profiler import PROFILE_HEADER, sign_profile_token, verify_profile_token
+
+SECRET = 'profiler-secret'
+
+
+@pytest.fixture
+def profiler_dir(app, tmp_path):
+    app.config['PROFILER_SECRET'] = SECRET
+    app.config['PROFILER_DIR'] = str(tmp_path)
+    return tmp_path
+
+
+def _admin_headers(auth_headers=None):
+    headers = dict(auth_headers or {})
+    headers[PROFILE_HEADER] = sign_profile_token(SECRET)
+    return headers
+
+
+class TestProfileTrigger:
+    """Tests de activación del profiler"""
+
+    def test_signed_header_profiles_request(self, client, auth_headers, profiler_dir):
+        """
+        Test: Request con token firmado
+
+        Verifica que:
+        - Se escriben los archivos .pstats, .collapsed y .json
+        - El perfil queda etiquetado con endpoint y request id
+        - El .pstats se puede cargar y los stacks incluyen la vista
+        """
+        headers = _admin_headers(auth_headers)
+        headers['X-Request-ID'] = 'req-123'
+
+        response = client.get('/Trucks/all', headers=headers)
+
+        assert response.status_code == 200
+        assert response.headers['X-Profile-Request-Id'] == 'req-123'
+        files = sorted(os.listdir(profiler_dir))
+        assert len(files) == 3
+        profile_id = files[0].rsplit('.', 1)[0]
+        assert profile_id.endswith('_GET_Trucks_all_req_123')
+        assert {name.rsplit('.', 1)[1] for name in files} == {'collapsed', 'json', 'pstats'}
+
+        stats = pstats.Stats(str(profiler_dir / f'{profile_id}.pstats'))
+        assert stats.total_calls > 0
+        collapsed = (profiler_dir / f'{profile_id}.collapsed').read_text().splitlines()
+        assert collapsed
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in collapsed)
+        assert any('get (truck_restx_routes.py' in line for line in collapsed)
+
+    def test_unsigned_or_expired_token_is_ignored(self, client, auth_headers, profiler_dir):
+        """
+        Test: Tokens inválidos
+
+        Verifica que:
+        - Un token mal firmado o vencido no activa el profiler
+        """
+        headers = dict(auth_headers)
+        headers[PROFILE_HEADER] = sign_profile_token('otro-secreto')
+        client.get('/Trucks/all', headers=headers)
+        headers[PROFILE_HEADER] = sign_profile_token(SECRET, ttl=-1)
+        client.get('/Trucks/all', headers=headers)
+
+        assert os.listdir(profiler_dir) == []
+        assert not verify_profile_token(SECRET, 'no-es-un-token')
+
+    def test_sample_rate(self, app, client, auth_headers, profiler_dir):
+        """
+        Test: Muestreo por configuración
+
+        Verifica que:
+        - Con PROFILER_SAMPLE_RATE=1 se perfila sin header
+        - PROFILER_MAX_FILES limita los perfiles guardados
+        """
+        app.config['PROFILER_SAMPLE_RATE'] = 1.0
+        app.config['PROFILER_MAX_FILES'] = 2
+
+        for _ in range(3):
+            client.get('/Trucks/all', headers=auth_headers)
+
+        assert len([name for name in os.listdir(profiler_dir) if name.endswith('.pstats')]) == 2
+
+
+class TestProfileEndpoints:
+    """Tests de listado y descarga de perfiles"""
+
+    def test_list_and_download(self, client, auth_headers, profiler_dir):
+        """
+        Test: Listado y descarga
+
+        Verifica que:
+        - /profiles devuelve los metadatos del perfil (endpoint, status, trigger)
+        - Se descargan el .pstats y el .collapsed
+        - Sin token válido los endpoints responden 404
+        """
+        client.get('/Trucks/all', headers=_admin_headers(auth_headers))
+
+        assert client.get('/profiles').status_code == 404
+
+        response = client.get('/profiles', headers=_admin_headers())
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['total'] == 1
+        profile = data['profiles'][0]
+        assert profile['endpoint'] == '/Trucks/all'
+        assert profile['status'] == 200
+        assert profile['trigger'] == 'header'
+
+        download = client.get(f"/profiles/{profile['id']}/collapsed", headers=_admin_headers())
+        assert download.status_code == 200
+        assert b';' in download.data
+        assert client.get(f"/profiles/{profile['id']}/pstats", headers=_admin_headers()).status_code == 200
+        assert client.get(f"/profiles/{profile['id']}/json", headers=_admin_headers()).status_code == 404
+        assert client.get(f"/profiles/{profile['id']}/pstats").status_code == 404
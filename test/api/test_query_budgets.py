@@ -0,0 +1,187 @@
+"""
+Presupuestos de queries por endpoint
+
+Verifica que los listados no hagan una query por fila (N+1): cada request
+tiene un máximo fijo de statements, independiente de la cantidad de filas.
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from flask_jwt_extended import create_access_token
+from app import db
+from app.models.user import User as UserModel
+from app.models.truck import Truck as TruckModel
+from app.models.trip import Trip as TripModel
+from app.models.maintenance import Maintenance as MaintenanceModel
+from test.query_budget import QueryBudgetExceeded, format_report
+
+
+TRUCKS = 4
+
+
+def _create_driver(n):
+    driver = UserModel(name=f'Driver{n}', surname='Test', rol='driver',
+                       email=f'driver{n}@test.com', phone=str(n), password='test123')
+    db.session.add(driver)
+    db.session.flush()
+    return driver
+
+
+def _create_maintenance(truck, status, component, next_mileage):
+    db.session.add(MaintenanceModel(
+        description=f'Control de {component}',
+        status=status,
+        component=component,
+        cost=100.0,
+        mileage_interval=5000,
+        last_maintenance_mileage=truck.mileage,
+        next_maintenance_mileage=next_mileage,
+        truck_id=truck.truck_id,
+        driver_id=truck.driver_id,
+        maintenance_interval=5000
+    ))
+
+
+@pytest.fixture
+def fleet(app, auth_headers):
+    """Flota del owner 1: varios camiones con conductor, mantenimientos y viajes"""
+    drivers = [_create_driver(n) for n in range(TRUCKS + 1)]  # el último queda sin camión
+    trucks = []
+    for n, driver in enumerate(drivers[:TRUCKS]):
+        truck = TruckModel(owner_id=1, plate=f'AA{n:03d}BB', model='Actros', brand='Mercedes-Benz',
+                           year='2021', color='Blanco', mileage=10000, health_status='Good',
+                           fleetanalytics_id=None, driver_id=driver.id)
+        db.session.add(truck)
+        db.session.flush()
+        trucks.append(truck)
+
+        _create_maintenance(truck, 'Pending', 'Frenos', 10500)
+        _create_maintenance(truck, 'Critical', 'Motor', 12000)
+        _create_maintenance(truck, 'Completed', 'Filtros', 20000)
+        db.session.add(TripModel(date=datetime.utcnow() + timedelta(days=n), origin='Córdoba',
+                                 destination='Rosario', status='Pending', created_at=datetime.utcnow(),
+                                 updated_at=datetime.utcnow(), driver_id=driver.id,
+                                 truck_id=truck.truck_id))
+    db.session.commit()
+
+    driver_token = create_access_token(identity=str(drivers[0].id))
+    return {
+        'trucks': trucks,
+        'driver_headers': {'Authorization': f'Bearer {driver_token}'},
+    }
+
+
+class TestQueryBudgets:
+    """Tests de queries por request en los listados"""
+
+    @pytest.mark.query_budget(3)
+    def test_list_trucks(self, client, auth_headers, fleet):
+        """
+        Test: Listado de camiones con su conductor
+
+        Verifica que:
+        - El conductor se carga en la misma query que los camiones
+        """
+        response = client.get('/Trucks/all', headers=auth_headers)
+
+        assert response.status_code == 200
+        trucks = response.get_json()['trucks']
+        assert len(trucks) == TRUCKS
+        assert all(truck['driver']['email'].startswith('driver') for truck in trucks)
+
+    @pytest.mark.query_budget(2)
+    def test_drivers_without_truck(self, client, auth_headers, fleet):
+        """
+        Test: Conductores sin camión en una sola query
+        """
+        response = client.get('/Trucks/drivers_without_truck', headers=auth_headers)
+
+        assert response.status_code == 200
+        drivers = response.get_json()['drivers']
+        assert [driver['name'] for driver in drivers] == [f'Driver{TRUCKS}']
+
+    @pytest.mark.query_budget(3)
+    def test_list_trips(self, client, auth_headers, fleet):
+        """
+        Test: Listado de viajes con camión y conductor
+
+        Verifica que:
+        - Camión y conductor se cargan con la página (más el count del total)
+        """
+        response = client.get(f'/Trips/all?per_page={TRUCKS}', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['total'] == TRUCKS
+        assert all(trip['truck'] and trip['driver'] for trip in data['trips'])
+
+    @pytest.mark.query_budget(3)
+    def test_maintenance_alerts(self, client, auth_headers, fleet):
+        """
+        Test: Alertas de mantenimiento de la flota
+
+        Verifica que:
+        - Los mantenimientos de todos los camiones se traen en una query
+        - Las alertas urgentes, próximas y críticas se mantienen
+        """
+        response = client.get('/Fleetanalytics/maintenance-alerts', headers=auth_headers)
+
+        assert response.status_code == 200
+        summary = response.get_json()['summary']
+        assert summary['urgent_count'] == TRUCKS
+        assert summary['upcoming_count'] == TRUCKS
+        assert summary['critical_count'] == TRUCKS
+
+    @pytest.mark.query_budget(3)
+    def test_driver_assigned_trucks(self, client, fleet):
+        """
+        Test: Camiones asignados al driver con conteos agrupados
+        """
+        response = client.get('/Fleetanalytics/driver/assigned-trucks', headers=fleet['driver_headers'])
+
+        assert response.status_code == 200
+        trucks = response.get_json()['assigned_trucks']
+        assert len(trucks) == 1
+        assert trucks[0]['pending_maintenance_count'] == 1
+        assert trucks[0]['critical_maintenance_count'] == 1
+
+    @pytest.mark.query_budget(3)
+    def test_pending_maintenances(self, client, auth_headers, fleet):
+        """
+        Test: Pendientes paginados con camión y conductor precargados
+        """
+        response = client.get('/Maintenance/pending', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.get_json()['total_pending'] == TRUCKS
+
+
+class TestQueryCounter:
+    """Tests del contador de queries del plugin"""
+
+    def test_budget_context_manager(self, client, auth_headers, query_counter):
+        """
+        Test: Presupuesto explícito con el fixture query_counter
+
+        Verifica que:
+        - Un request dentro del presupuesto pasa
+        - Un request que lo supera falla con el reporte
+        """
+        with query_counter.budget(3):
+            client.get('/Trucks/all', headers=auth_headers)
+
+        with pytest.raises(QueryBudgetExceeded, match='GET /Trucks/all ejecutó'):
+            with query_counter.budget(0):
+                client.get('/Trucks/all', headers=auth_headers)
+
+    def test_report_groups_repeated_statements(self):
+        """
+        Test: Reporte agrupado de statements repetidos
+        """
+        statements = ['SELECT trucks'] + ['SELECT user WHERE user.id = ?'] * 5
+
+        report = format_report('GET /Trucks/all', statements, 2)
+
+        assert 'ejecutó 6 queries (presupuesto: 2)' in report
+        assert '5x SELECT user WHERE user.id = ?' in report
+        assert 'SELECT trucks' not in report.split('Statements repetidos:')[1]
@@ -0,0 +1,68 @@
+"""
+Tests de la instrumentación de queries por request
+
+Verifica que:
+- Cada request cuenta sus queries y el tiempo de base de datos
+- Con SERVER_TIMING_ENABLED se agregan los headers Server-Timing y X-DB-Query-Count
+- Los agregados por endpoint acumulan requests y queries
+"""
+
+import pytest
+from app.config.database_config import get_endpoint_query_stats, reset_endpoint_query_stats
+from app.utils.response_cache import response_cache
+
+
+@pytest.fixture(autouse=True)
+def clean_endpoint_stats():
+    reset_endpoint_query_stats()
+    yield
+    reset_endpoint_query_stats()
+
+
+class TestQueryInstrumentation:
+    """Tests de conteo y timing de queries por request"""
+
+    def test_server_timing_headers(self, app, client, auth_headers):
+        """
+        Test: Headers de timing cuando están habilitados
+
+        Verifica que:
+        - X-DB-Query-Count refleja las queries ejecutadas
+        - Server-Timing incluye las entradas db y app
+        """
+        app.config['SERVER_TIMING_ENABLED'] = True
+
+        response = client.get('/Trucks/all', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert int(response.headers['X-DB-Query-Count']) >= 2
+        assert 'db;dur=' in response.headers['Server-Timing']
+        assert 'app;dur=' in response.headers['Server-Timing']
+
+    def test_headers_disabled_by_default(self, client, auth_headers):
+        """
+        Test: Sin configuración no se exponen headers de timing
+        """
+        response = client.get('/Trucks/all', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert 'Server-Timing' not in response.headers
+        assert 'X-DB-Query-Count' not in response.headers
+
+    def test_endpoint_aggregates(self, client, auth_headers):
+        """
+        Test: Agregados por endpoint
+
+        Verifica que:
+        - Se acumulan requests y queries por regla de URL
+        - Se guarda la query más lenta del endpoint
+        """
+        # Se miden las queries de la vista: sin caché de respuestas
+        response_cache.backend = None
+        client.get('/Trucks/all', headers=auth_headers)
+        client.get('/Trucks/all', headers=auth_headers)
+
+        stats = get_endpoint_query_stats()['/Trucks/all']
+        assert stats['requests'] == 2
+        assert stats['queries'] >= 4
+        assert stats['slowest_statement'].startswith('SELECT')
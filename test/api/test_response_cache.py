@@ -0,0 +1,155 @@
+"""
+Tests de la caché de respuestas por owner (app/utils/response_cache.py)
+
+Verifica que:
+- Un hit no ejecuta las queries de la vista
+- Las escrituras commiteadas invalidan por tag; un rollback no
+- La clave incluye al owner: cada owner ve sus propios datos
+- El backend RESP funciona contra el stand-in local y degrada a la vista si se cae
+"""
+
+import pytest
+from flask_jwt_extended import create_access_token
+from app import db
+from app.models.user import User as UserModel
+from app.google.locations import GoogleGetLocation
+from app.utils.metrics import metrics
+from app.utils.response_cache import RespBackend, response_cache
+from bench.fake_resp_server import FakeRespServer
+from .test_trip_completion import _seed_trip
+
+
+def _owner_headers(user_id, email):
+    owner = UserModel(id=user_id, name='owner', surname=str(user_id), rol='owner',
+                      email=email, phone='1', password='test123')
+    db.session.add(owner)
+    db.session.commit()
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+
+class TestResponseCache:
+    """Tests de hits, invalidación y aislamiento por owner"""
+
+    def test_hit_skips_view_queries(self, client, auth_headers, query_counter):
+        """
+        Test: Un hit se sirve sin consultar la base
+
+        Verifica que:
+        - El primer GET es MISS y el segundo HIT, con el mismo cuerpo
+        - El hit solo ejecuta la query del usuario de role_required
+        """
+        _seed_trip()
+        first = client.get('/Fleetanalytics/maintenance-alerts', headers=auth_headers)
+        assert first.status_code == 200
+        assert first.headers['X-Cache'] == 'MISS'
+
+        with query_counter.budget(1):
+            second = client.get('/Fleetanalytics/maintenance-alerts', headers=auth_headers)
+        assert second.headers['X-Cache'] == 'HIT'
+        assert second.get_json() == first.get_json()
+        assert response_cache.hits == 1
+
+    def test_commit_invalidates_and_rollback_does_not(self, client, auth_headers):
+        """
+        Test: Invalidación por tags al commitear
+
+        Verifica que:
+        - Cambiar un camión por el ORM invalida /Trucks/all al commitear
+        - La respuesta siguiente trae el dato nuevo
+        - Un cambio con rollback no invalida
+        """
+        _, truck, _ = _seed_trip()
+        client.get('/Trucks/all', headers=auth_headers)
+        assert client.get('/Trucks/all', headers=auth_headers).headers['X-Cache'] == 'HIT'
+
+        truck.mileage = 7777
+        db.session.commit()
+        response = client.get('/Trucks/all', headers=auth_headers)
+        assert response.headers['X-Cache'] == 'MISS'
+        assert response.get_json()['trucks'][0]['mileage'] == 7777
+
+        truck.mileage = 8888
+        db.session.flush()
+        db.session.rollback()
+        assert client.get('/Trucks/all', headers=auth_headers).headers['X-Cache'] == 'HIT'
+
+    def test_api_write_invalidates_owner_stats(self, client, auth_headers, monkeypatch):
+        """
+        Test: Una escritura por la API invalida las lecturas del owner
+
+        Verifica que:
+        - Completar un viaje invalida las alertas de mantenimiento del owner
+        """
+        trip, _, _ = _seed_trip()
+        client.get('/Fleetanalytics/maintenance-alerts', headers=auth_headers)
+
+        async def fake_distance(self, origin, destination):
+            return {'distance_km': 150.0, 'duration_min': 120.0}
+
+        monkeypatch.setattr(GoogleGetLocation, 'get_distance', fake_distance)
+        assert client.patch(f'/Trips/{trip.id}/complete', headers=auth_headers).status_code == 200
+
+        response = client.get('/Fleetanalytics/maintenance-alerts', headers=auth_headers)
+        assert response.headers['X-Cache'] == 'MISS'
+
+    def test_key_is_per_owner(self, client, auth_headers):
+        """
+        Test: Aislamiento por owner
+
+        Verifica que:
+        - Un owner no recibe la respuesta cacheada de otro
+        """
+        _seed_trip()
+        first = client.get('/Fleetanalytics/maintenance-alerts', headers=auth_headers)
+        other_headers = _owner_headers(3, 'other@test.com')
+        other = client.get('/Fleetanalytics/maintenance-alerts', headers=other_headers)
+
+        assert other.headers['X-Cache'] == 'MISS'
+        assert first.get_json()['summary']['urgent_count'] == 1
+        assert other.get_json()['summary']['urgent_count'] == 0
+
+
+class TestRespBackend:
+    """Tests del backend compartido contra bench/fake_resp_server.py"""
+
+    @pytest.fixture
+    def resp_server(self, app):
+        server = FakeRespServer().start()
+        backend = RespBackend(server.url)
+        response_cache.configure(backend)
+        yield server
+        backend.close()
+        server.stop()
+
+    def test_hit_and_invalidation(self, client, auth_headers, resp_server):
+        """
+        Test: Hits e invalidación a través del store compartido
+
+        Verifica que:
+        - La entrada y las versiones de tags viven en el store
+        - Un commit incrementa la versión del tag y la entrada queda vieja
+        """
+        _, truck, _ = _seed_trip()
+        client.get('/Trucks/all', headers=auth_headers)
+        assert client.get('/Trucks/all', headers=auth_headers).headers['X-Cache'] == 'HIT'
+        version = int(resp_server.execute('GET', [b'tg:tag:trucks']))
+
+        truck.mileage = 6000
+        db.session.commit()
+        assert int(resp_server.execute('GET', [b'tg:tag:trucks'])) == version + 1
+        assert client.get('/Trucks/all', headers=auth_headers).headers['X-Cache'] == 'MISS'
+
+    def test_store_down_falls_back_to_view(self, client, auth_headers, resp_server):
+        """
+        Test: Store caído
+
+        Verifica que:
+        - Sin store la vista responde igual (200, sin X-Cache)
+        - El error queda contado en response_cache_requests_total
+        """
+        resp_server.stop()
+        response = client.get('/Trucks/all', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert 'X-Cache' not in response.headers
+        assert metrics.counter_value('response_cache_requests_total', route='/Trucks/all', result='error') >= 1
@@ -0,0 +1,230 @@
+"""
+Tests de las tareas periódicas (app/services/scheduler.py y scheduled_tasks.py)
+
+Verifica que:
+- Con varios workers cada corrida la hace uno solo (lock en scheduler_lock)
+- Las corridas se reprograman con jitter y las diarias a su hora
+- Errores y timeouts quedan registrados y en métricas
+- El barrido de mantenimientos masivo deja lo mismo que Truck.check_maintenance
+- La limpieza borra solo lo terminado y viejo
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.domain_event import DomainEvent as DomainEventModel
+from app.models.fleetanalytics import FleetAnalytics as FleetAnalyticsModel
+from app.models.job import Job as JobModel
+from app.models.mail_outbox import MailOutbox as MailOutboxModel
+from app.models.maintenance import Maintenance as MaintenanceModel
+from app.models.scheduler_lock import SchedulerLock as SchedulerLockModel
+from app.models.stream_event import StreamEvent as StreamEventModel
+from app.models.truck import Truck as TruckModel
+from app.services.domain_events import EventDispatcher
+from app.services.scheduled_tasks import clean_up_stale_rows
+from app.services.scheduler import Scheduler, _tasks, scheduled_task
+from app.utils.metrics import metrics
+from test.api.test_trip_completion import _seed_trip
+
+
+@pytest.fixture
+def only_tasks(app):
+    """Deja habilitadas solo las tareas pedidas; las de prueba se pasan como nombre=función"""
+    added = []
+
+    def enable(*names, **tasks):
+        for key in ('MAINTENANCE_SWEEP_INTERVAL', 'CACHE_WARMUP_INTERVAL', 'CLEANUP_INTERVAL'):
+            app.config[key] = 0
+        app.config['FLEET_ANALYTICS_ROLLUP_AT'] = ''
+        app.config.update({'TEST_TASK_INTERVAL': 60})
+        for name, func in tasks.items():
+            scheduled_task(name, every='TEST_TASK_INTERVAL', jitter=10, timeout=0.05)(func)
+            added.append(name)
+        for name in names:
+            task = _tasks[name]
+            app.config[task.every or task.at] = 3600 if task.every else '03:00'
+
+    yield enable
+    for name in added:
+        _tasks.pop(name, None)
+
+
+def _add_overdue_component(truck, component, accumulated_km):
+    maintenance = MaintenanceModel(description=f'{component} maintenance', status='Fair', component=component,
+                                   cost=0, mileage_interval=1000, last_maintenance_mileage=3000,
+                                   next_maintenance_mileage=4000, truck_id=truck.truck_id,
+                                   driver_id=truck.driver_id, maintenance_interval=1000)
+    maintenance.accumulated_km = accumulated_km
+    db.session.add(maintenance)
+    return maintenance
+
+
+def _component_state(truck_id):
+    return sorted((m.component, m.status, m.last_maintenance_mileage, m.next_maintenance_mileage)
+                  for m in MaintenanceModel.query.filter_by(truck_id=truck_id))
+
+
+class TestScheduler:
+    """Tests de la elección de líder y el registro de corridas"""
+
+    def test_one_worker_per_run(self, app, auth_headers, only_tasks):
+        """
+        Test: Una corrida por tarea
+
+        Verifica que:
+        - El primer worker corre la tarea y el segundo la saltea
+        - La próxima corrida queda a un intervalo (más jitter) de la anterior
+        - Un lock de un worker muerto vence y otro worker la retoma
+        """
+        calls = []
+        only_tasks(test_task=lambda deadline: calls.append(deadline))
+        now = datetime.now()
+
+        assert Scheduler(app, 'w1').run_pending(now) == [('test_task', 'ok')]
+        assert Scheduler(app, 'w2').run_pending(now) == []
+        lock = db.session.get(SchedulerLockModel, 'test_task')
+        assert now + timedelta(seconds=60) <= lock.next_run_at <= now + timedelta(seconds=70)
+        assert (lock.holder, lock.last_status) == (None, 'ok')
+
+        later = lock.next_run_at
+        assert Scheduler(app, 'w1')._acquire(_tasks['test_task'], app.config, later)
+        assert Scheduler(app, 'w2').run_pending(later) == []
+        assert Scheduler(app, 'w2').run_pending(later + timedelta(seconds=1)) == [('test_task', 'ok')]
+        assert len(calls) == 2
+
+    def test_error_and_timeout(self, app, auth_headers, only_tasks):
+        """
+        Test: Errores y timeouts
+
+        Verifica que:
+        - Una tarea que falla libera el lock, guarda el error y se reprograma
+        - Una tarea que pasa su timeout queda registrada como timeout
+        - Ambas cuentan en scheduler_task_runs_total
+        """
+        def failing(deadline):
+            raise RuntimeError('sin base')
+
+        def slow(deadline):
+            time.sleep(0.06)
+
+        only_tasks(failing_task=failing, slow_task=slow)
+        errors = metrics.counter_value('scheduler_task_runs_total', task='failing_task', status='error')
+
+        assert Scheduler(app, 'w1').run_pending() == [('failing_task', 'error'), ('slow_task', 'timeout')]
+        lock = db.session.get(SchedulerLockModel, 'failing_task')
+        assert (lock.holder, lock.last_error) == (None, 'sin base')
+        assert lock.next_run_at > datetime.now()
+        assert metrics.counter_value('scheduler_task_runs_total', task='failing_task', status='error') == errors + 1
+
+    def test_daily_schedule_with_jitter(self, app, only_tasks):
+        """
+        Test: Tareas diarias
+
+        Verifica que:
+        - Antes de la hora corre hoy; pasada la hora, mañana
+        - El jitter corre la hora a lo sumo `jitter` segundos
+        """
+        task = _tasks['fleet_analytics_rollup']
+        config = {'FLEET_ANALYTICS_ROLLUP_AT': '03:00'}
+        rng = random.Random(7)
+
+        before = task.next_run(config, datetime(2024, 5, 1, 2, 0), rng)
+        after = task.next_run(config, datetime(2024, 5, 1, 4, 0), rng)
+
+        assert datetime(2024, 5, 1, 3, 0) <= before <= datetime(2024, 5, 1, 3, 0) + timedelta(seconds=task.jitter)
+        assert datetime(2024, 5, 2, 3, 0) <= after <= datetime(2024, 5, 2, 3, 0) + timedelta(seconds=task.jitter)
+
+
+class TestScheduledTasks:
+    """Tests de las tareas de la app"""
+
+    def test_maintenance_sweep_matches_check_maintenance(self, app, auth_headers, only_tasks):
+        """
+        Test: Barrido masivo
+
+        Verifica que:
+        - Deja los componentes y la salud igual que Truck.check_maintenance camión por camión
+        - No toca los componentes que no vencieron
+        - Registra los cambios como eventos de dominio y sube la versión del camión
+        """
+        _, truck, _ = _seed_trip()
+        _add_overdue_component(truck, 'Frenos', accumulated_km=1200)
+        _add_overdue_component(truck, 'Filtros', accumulated_km=500)
+        db.session.commit()
+        truck_id, version = truck.truck_id, truck.version_id
+
+        truck.check_maintenance()
+        db.session.flush()
+        expected = (_component_state(truck_id), truck.health_status)
+        db.session.rollback()
+
+        only_tasks('maintenance_sweep')
+        assert Scheduler(app, 'w1').run_pending() == [('maintenance_sweep', 'ok')]
+
+        truck = db.session.get(TruckModel, truck_id, populate_existing=True)
+        assert (_component_state(truck_id), truck.health_status) == expected
+        assert ('Aceite', 'Fair', 4100, 5100) in expected[0]
+        assert truck.version_id == version + 1
+        swept = DomainEventModel.query.filter_by(type='maintenance.updated').all()
+        assert sorted(e.changes['next_maintenance_mileage'][1] for e in swept) == [6000, 6000]
+
+    def test_nightly_rollup(self, app, auth_headers, only_tasks):
+        """
+        Test: Rollup nocturno
+
+        Verifica que:
+        - Recalcula las métricas de flota de cada owner con camiones
+        """
+        _seed_trip()
+        only_tasks('fleet_analytics_rollup')
+        tonight = datetime.now().replace(hour=3, minute=0) + timedelta(days=1, hours=1)
+
+        assert Scheduler(app, 'w1').run_pending() == []
+        assert Scheduler(app, 'w1').run_pending(tonight) == [('fleet_analytics_rollup', 'ok')]
+        assert FleetAnalyticsModel.query.filter_by(user_id=1).one().total_trucks == 1
+
+    def test_cache_warmup(self, app, auth_headers, only_tasks):
+        """
+        Test: Warm-up de caché
+
+        Verifica que:
+        - Recorre los GET cacheados de los owners con cambios recientes
+        - El siguiente pedido del owner sale del caché
+        """
+        _seed_trip()
+        only_tasks('cache_warmup')
+
+        assert Scheduler(app, 'w1').run_pending() == [('cache_warmup', 'ok')]
+        response = app.test_client().get('/Fleetanalytics/maintenance-alerts', headers=auth_headers)
+        assert (response.status_code, response.headers.get('X-Cache')) == (200, 'HIT')
+
+    def test_cleanup(self, app, auth_headers):
+        """
+        Test: Limpieza
+
+        Verifica que:
+        - Borra eventos SSE, trabajos y mails terminados más viejos que su retención
+        - Conserva los mails pendientes y lo reciente
+        - No borra eventos de dominio que algún consumidor no procesó
+        """
+        old = datetime.now() - timedelta(days=60)
+        stale_event = StreamEventModel(1, 'maintenance_alert', {})
+        stale_event.created_at = old
+        done_job = JobModel('trip_completion', {})
+        done_job.status, done_job.finished_at = 'done', old
+        sent, pending = MailOutboxModel('a@test.com', 'x', 'register', {}), MailOutboxModel('b@test.com', 'x', 'register', {})
+        sent.status = 'sent'
+        sent.created_at = pending.created_at = old
+        db.session.add_all([stale_event, StreamEventModel(1, 'maintenance_alert', {}), done_job, sent, pending])
+        _seed_trip()
+        DomainEventModel.query.update({'created_at': old})
+        db.session.commit()
+
+        deleted = clean_up_stale_rows(time.monotonic() + 10)
+        assert deleted == {'stream_event': 1, 'job': 1, 'mail_outbox': 1, 'domain_event': 0}
+        assert [mail.recipient for mail in MailOutboxModel.query] == ['b@test.com']
+
+        EventDispatcher('w1').dispatch(datetime.now() + timedelta(seconds=11))
+        assert clean_up_stale_rows(time.monotonic() + 10)['domain_event'] == 3
@@ -0,0 +1,121 @@
+"""
+Tests del perfil de serving de producción (app/config/serving.py y gunicorn.conf.py)
+
+Verifica que:
+- Workers y threads se dimensionan desde las CPUs o el entorno
+- El pool por worker nunca suma más conexiones que DB_MAX_CONNECTIONS
+- gunicorn.conf.py exporta el perfil resuelto para que los workers dimensionen su pool
+- El warm-up abre conexiones y recorre un request antes de recibir tráfico
+"""
+
+import os
+import runpy
+import pytest
+from app.config.database_config import get_database_config
+from app.config.serving import pool_sizing, serving_profile, sse_connection_limit, warm_up
+from app.utils.metrics import metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestServingProfile:
+    """Tests del dimensionamiento de workers y pool"""
+
+    def test_auto_sizing_from_cpus(self):
+        """
+        Test: Tamaño automático
+
+        Verifica que:
+        - gthread usa 2 x CPUs + 1 workers con 4 threads
+        - gevent usa un worker por CPU con 100 greenlets
+        - WEB_MAX_WORKERS acota los workers en máquinas grandes
+        """
+        gthread = serving_profile({}, cpu_count=4)
+        gevent = serving_profile({'WEB_WORKER_CLASS': 'gevent'}, cpu_count=4)
+
+        assert (gthread['workers'], gthread['threads'], gthread['concurrency']) == (9, 4, 4)
+        assert (gevent['workers'], gevent['threads'], gevent['concurrency']) == (4, 1, 100)
+        assert serving_profile({}, cpu_count=32)['workers'] == 12
+        assert serving_profile({'WEB_CONCURRENCY': '40'}, cpu_count=32)['workers'] == 40
+        with pytest.raises(ValueError):
+            serving_profile({'WEB_WORKER_CLASS': 'sync'})
+
+    def test_sse_connection_limit(self):
+        """
+        Test: Streams SSE por worker
+
+        Verifica que:
+        - Con gthread los streams pueden ocupar a lo sumo la mitad de los hilos
+        - Con gevent el límite sale de los greenlets
+        """
+        assert sse_connection_limit({}) == 2
+        assert sse_connection_limit({'WEB_THREADS': '1'}) == 1
+        assert sse_connection_limit({'WEB_WORKER_CLASS': 'gevent'}) == 50
+
+    @pytest.mark.parametrize('workers, concurrency, max_connections', [
+        (9, 4, 100), (4, 100, 100), (40, 8, 30), (1, 4, 100),
+    ])
+    def test_pool_never_oversubscribes(self, workers, concurrency, max_connections):
+        """
+        Test: El pool no sobresuscribe MySQL
+
+        Verifica que:
+        - Cada worker tiene como mucho una conexión por request simultáneo
+        - workers x (pool_size + max_overflow) no pasa de max_connections (mínimo 1 por worker)
+        """
+        sizing = pool_sizing(workers, concurrency, max_connections)
+        per_worker = sizing['pool_size'] + sizing['max_overflow']
+
+        assert 1 <= per_worker <= concurrency
+        assert workers * per_worker <= max(max_connections, workers)
+
+    def test_database_config_uses_profile(self, monkeypatch):
+        """
+        Test: get_database_config con el perfil en el entorno
+
+        Verifica que:
+        - pool_size sale de WEB_CONCURRENCY x WEB_THREADS y DB_MAX_CONNECTIONS
+        - Sin perfil se mantienen los valores por defecto
+        """
+        monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+        monkeypatch.delenv('FLASK_ENV', raising=False)
+        assert get_database_config()['pool_size'] == 10
+
+        monkeypatch.setenv('WEB_CONCURRENCY', '5')
+        monkeypatch.setenv('WEB_THREADS', '8')
+        monkeypatch.setenv('DB_MAX_CONNECTIONS', '30')
+        config = get_database_config()
+
+        assert (config['pool_size'], config['max_overflow']) == (6, 0)
+
+    def test_gunicorn_config(self, monkeypatch):
+        """
+        Test: gunicorn.conf.py
+
+        Verifica que:
+        - Toma el perfil del entorno y lo exporta para los workers
+        - Define los hooks de arranque, warm-up y salida
+        """
+        for name, value in (('WEB_CONCURRENCY', '3'), ('WEB_THREADS', '6'),
+                            ('WEB_WORKER_CLASS', 'gthread'), ('WEB_WORKER_CONNECTIONS', '100')):
+            monkeypatch.setenv(name, value)
+        config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+
+        assert (config['workers'], config['threads'], config['worker_class']) == (3, 6, 'gthread')
+        assert config['preload_app'] is False
+        assert os.environ['WEB_CONCURRENCY'] == '3'
+        for hook in ('on_starting', 'post_worker_init', 'worker_exit'):
+            assert callable(config[hook])
+
+    def test_warm_up(self, app):
+        """
+        Test: Warm-up del worker
+
+        Verifica que:
+        - Abre conexiones y recorre un request interno sin errores
+        - Publica el tiempo en worker_warmup_seconds
+        """
+        elapsed = warm_up(app, connections=1)
+
+        assert elapsed > 0
+        assert 'worker_warmup_seconds ' in metrics.render_prometheus()
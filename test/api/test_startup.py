@@ -0,0 +1,99 @@
+"""
+Tests del arranque de la app y del overhead por request
+
+Los tiempos (create_app y overhead por request) dependen de la máquina: se miden
+con `python -m bench.startup --check`, no acá.
+
+Verifica que:
+- No quedan hooks por request que reenganchen rutas legacy
+- /swagger.json se sirve desde el spec precalculado al arrancar (o en el primer pedido con STARTUP_LAZY)
+- El esquema se crea con `flask init-db` y los clientes externos se importan en el primer uso
+"""
+
+import os
+import subprocess
+import sys
+from flask_restx import Api
+from sqlalchemy import inspect
+from app import create_app, db
+
+
+class TestStartup:
+    """Tests del arranque; los tiempos se miden con bench/startup.py"""
+
+    def test_no_legacy_request_hooks(self, client):
+        """
+        Test: Sin hooks legacy por request
+
+        Verifica que:
+        - No hay hooks before_request que reenganchen rutas legacy
+        """
+        assert client.get('/swagger.json').status_code == 200
+        hooks = [func.__name__ for func in client.application.before_request_funcs.get(None, [])]
+        assert '_ensure_trucks_endpoints' not in hooks
+
+    def test_swagger_spec_precomputed(self, client, monkeypatch):
+        """
+        Test: Spec OpenAPI precalculado
+
+        Verifica que:
+        - /swagger.json responde sin volver a generar el spec
+        - El spec incluye las rutas de los namespaces
+        """
+        def fail(self):
+            raise AssertionError('el spec se generó durante el request')
+
+        monkeypatch.setattr(Api, '__schema__', property(fail))
+        response = client.get('/swagger.json')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        assert '/Trucks/all' in response.get_json()['paths']
+
+    def test_lazy_specs(self, monkeypatch):
+        """
+        Test: STARTUP_LAZY
+
+        Verifica que:
+        - El primer /swagger.json arma el spec y lo sirve
+        """
+        monkeypatch.setenv('STARTUP_LAZY', 'true')
+        lazy_app = create_app()
+        response = lazy_app.test_client().get('/swagger.json')
+
+        assert lazy_app.config['STARTUP_LAZY'] is True
+        assert response.status_code == 200
+        assert '/Trucks/all' in response.get_json()['paths']
+
+
+class TestDeferredSetup:
+    """Tests de lo que salió del camino de arranque"""
+
+    def test_init_db_command(self, app):
+        """
+        Test: flask init-db
+
+        Verifica que:
+        - Crea las tablas que faltan
+        - Se puede correr dos veces
+        """
+        db.drop_all()
+        runner = app.test_cli_runner()
+
+        result = runner.invoke(args=['init-db'])
+        assert result.exit_code == 0, result.output
+        assert {'user', 'truck', 'trip', 'maintenance'} <= set(inspect(db.engine).get_table_names())
+        assert runner.invoke(args=['init-db']).exit_code == 0
+
+    def test_distance_client_imported_on_first_use(self):
+        """
+        Test: httpx no se importa al arrancar
+
+        Verifica que:
+        - Importar las rutas de viajes (y con ellas la API de distancias) no importa httpx
+        """
+        code = 'import sys, app.resources.trip_restx_routes; print("httpx" in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                check=True, env=dict(os.environ, TESTING='True')).stdout
+
+        assert output.strip() == 'False'
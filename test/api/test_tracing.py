@@ -0,0 +1,135 @@
+"""
+Tests del tracing por request
+
+Verifica que:
+- Un request trazado genera spans de BD, API de distancias, analytics y serialización
+- La traza sigue el header traceparent entrante
+- Los spans se exportan a JSON-lines o a un colector OTLP
+- bench.trace_report reparte la duración del request por etapa
+"""
+
+import json
+import pytest
+from app.utils.tracing import OtlpHttpExporter, Tracer, init_tracing, tracer
+from bench.fake_distance_server import FakeDistanceServer
+from bench.fake_otlp_collector import FakeOtlpCollector
+from bench.trace_report import aggregate, load_traces
+from test.api.test_trip_completion import _seed_trip
+
+
+@pytest.fixture
+def trace_file(app, tmp_path):
+    path = tmp_path / 'traces.jsonl'
+    app.config['TRACING_EXPORTER'] = 'jsonl'
+    app.config['TRACING_FILE'] = str(path)
+    init_tracing(app)
+    yield path
+    tracer.exporter = None
+
+
+@pytest.fixture
+def distance_server(monkeypatch):
+    server = FakeDistanceServer(latency_ms=0).start()
+    monkeypatch.setenv('DISTANCE_MATRIX_URL', server.url)
+    yield server
+    server.stop()
+
+
+def _spans(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestRequestTracing:
+    """Tests de spans por request"""
+
+    def test_complete_trip_breakdown(self, client, auth_headers, trace_file, distance_server):
+        """
+        Test: Traza de PATCH /Trips/<id>/complete
+
+        Verifica que:
+        - Todos los spans comparten trace_id y cuelgan del span raíz
+        - Hay spans de la API de distancias, el completado, analytics, commits, queries y serialización
+        - El reporte por etapa suma la duración total del request
+        """
+        trip, _, _ = _seed_trip()
+
+        response = client.patch(f'/Trips/{trip.id}/complete', headers=auth_headers)
+
+        assert response.status_code == 200
+        spans = _spans(trace_file)
+        assert len({span['trace_id'] for span in spans}) == 1
+        names = {span['name'] for span in spans}
+        assert {'HTTP PATCH /Trips/<int:id>/complete', 'distance_api.get_distance', 'trip_completion.complete',
+                'fleet_analytics.update', 'db.commit', 'db.query', 'response.serialize'} <= names
+        root = next(span for span in spans if span['parent_id'] is None)
+        assert root['attributes']['status'] == 200
+        distance = next(span for span in spans if span['name'] == 'distance_api.get_distance')
+        assert distance['attributes']['outcome'] == 'ok'
+        ids = {span['span_id'] for span in spans}
+        assert all(span['parent_id'] in ids for span in spans if span is not root)
+
+        report = aggregate(load_traces(str(trace_file)))
+        entry = report['PATCH /Trips/<int:id>/complete']
+        stages_total = sum(values[0] for values in entry['stages'].values())
+        assert stages_total == pytest.approx(entry['total'][0], abs=0.05)
+        assert entry['stages']['db.query'][0] > 0
+
+    def test_incoming_traceparent(self, client, auth_headers, trace_file):
+        """
+        Test: Propagación W3C
+
+        Verifica que:
+        - El span raíz continúa la traza del header traceparent
+        - La respuesta devuelve el traceparent del request
+        """
+        trace_id = 'a' * 32
+        headers = dict(auth_headers, traceparent=f'00-{trace_id}-{"b" * 16}-01')
+
+        response = client.get('/Trucks/all', headers=headers)
+
+        assert response.headers['traceparent'].startswith(f'00-{trace_id}-')
+        root = next(span for span in _spans(trace_file) if span['name'].startswith('HTTP '))
+        assert root['trace_id'] == trace_id
+        assert root['parent_id'] == 'b' * 16
+
+    def test_disabled_without_exporter(self, client, auth_headers):
+        """
+        Test: Tracing desactivado
+
+        Verifica que:
+        - Sin TRACING_EXPORTER no se abren spans ni se agrega traceparent
+        """
+        response = client.get('/Trucks/all', headers=auth_headers)
+
+        assert 'traceparent' not in response.headers
+        with tracer.span('fuera de request') as span:
+            assert span is None
+
+
+class TestOtlpExporter:
+    """Tests de exportación OTLP/HTTP"""
+
+    def test_export_to_collector(self):
+        """
+        Test: Exportación a un colector OTLP
+
+        Verifica que:
+        - El colector recibe los spans con su relación padre-hijo y atributos
+        """
+        collector = FakeOtlpCollector().start()
+        local = Tracer()
+        local.exporter = OtlpHttpExporter(collector.url)
+        try:
+            root, token = local.start_trace('HTTP GET /Trucks/all')
+            with local.span('db.query', statement='SELECT 1'):
+                pass
+            local.finish_trace(root, token)
+            local.exporter.flush()
+        finally:
+            local.exporter.shutdown()
+            collector.stop()
+
+        spans = {span['name']: span for span in collector.spans}
+        assert set(spans) == {'HTTP GET /Trucks/all', 'db.query'}
+        assert spans['db.query']['parent_id'] == spans['HTTP GET /Trucks/all']['span_id']
+        assert spans['db.query']['attributes']['statement'] == 'SELECT 1'
@@ -0,0 +1,267 @@
+"""
+Tests del completado de viajes como una sola unidad de trabajo
+
+Verifica que:
+- Completar un viaje hace un único commit
+- Si falla el recálculo de analytics no queda kilometraje aplicado a medias
+- Dos completados del mismo viaje que compiten suman el kilometraje una sola vez
+- El viaje se escribe con un solo UPDATE, sin perder su evento de dominio
+- PATCH /Trips/<id>/complete usa el servicio y reporta componentes al límite
+"""
+
+import json
+import pytest
+from datetime import datetime
+from sqlalchemy import event
+from app import db
+from app.models.user import User as UserModel
+from app.models.truck import Truck as TruckModel
+from app.models.maintenance import Maintenance as MaintenanceModel
+from app.models.trip import Trip as TripModel
+from app.models.fleetanalytics import FleetAnalytics as FleetAnalyticsModel
+from app.models.domain_event import DomainEvent as DomainEventModel
+from app.google.locations import GoogleGetLocation
+from app.services import trip_completion
+from app.services.trip_completion import TripCompletionService, TripNotInCourseError
+from app.utils.metrics import metrics
+
+
+def _seed_trip(owner_id=1, interval=1000, accumulated_km=900):
+    driver = UserModel(name='Driver', surname='Test', rol='driver',
+                       email='driver@test.com', phone='1', password='test123')
+    db.session.add(driver)
+    db.session.flush()
+    truck = TruckModel(owner_id=owner_id, plate='ABC123', model='Actros', brand='Mercedes-Benz',
+                       year='2021', color='Blanco', mileage=5000, health_status='Fair',
+                       fleetanalytics_id=None, driver_id=driver.id)
+    db.session.add(truck)
+    db.session.flush()
+    maintenance = MaintenanceModel(description='Aceite maintenance', status='Fair', component='Aceite',
+                                   cost=0, mileage_interval=interval, last_maintenance_mileage=4100,
+                                   next_maintenance_mileage=4100 + interval, truck_id=truck.truck_id,
+                                   driver_id=driver.id, maintenance_interval=interval)
+    maintenance.accumulated_km = accumulated_km
+    db.session.add(maintenance)
+    trip = TripModel(date=datetime.now(), origin='Córdoba', destination='Rosario', status='In Course',
+                     created_at=datetime.now(), updated_at=datetime.now(),
+                     driver_id=driver.id, truck_id=truck.truck_id)
+    db.session.add(trip)
+    db.session.commit()
+    return trip, truck, driver
+
+
+class TestTripCompletionService:
+    """Tests del servicio de completado de viajes"""
+
+    def test_single_commit(self, app, auth_headers):
+        """
+        Test: Completar un viaje hace un solo commit
+
+        Verifica que:
+        - Kilometraje, componentes, viaje y analytics se commitean juntos
+        - Se reportan los componentes que llegan a Maintenance Required
+        """
+        trip, truck, _ = _seed_trip()
+        commits = []
+
+        def count_commit(session):
+            commits.append(session)
+
+        event.listen(db.session, 'after_commit', count_commit)
+        try:
+            result = TripCompletionService.complete(trip, 150)
+        finally:
+            event.remove(db.session, 'after_commit', count_commit)
+
+        assert len(commits) == 1
+        assert result['components_reaching_limit'] == ['Aceite']
+        assert truck.mileage == 5150
+        assert trip.status == 'Completed'
+        assert FleetAnalyticsModel.query.filter_by(user_id=1).count() == 1
+
+    def test_trip_written_once(self, app, auth_headers):
+        """
+        Test: El viaje se escribe con un solo UPDATE
+
+        Verifica que:
+        - El UPDATE condicionado lleva estado, distancia y updated_at, y el flush no lo repite
+        - El trip.updated sale igual, con el cambio de estado y de distancia
+        """
+        trip, _, _ = _seed_trip()
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            TripCompletionService.complete(trip, 150)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        trip_updates = [statement for statement in statements if statement.startswith('UPDATE trip ')]
+        assert len(trip_updates) == 1
+        assert 'distance' in trip_updates[0]
+        [trip_event] = DomainEventModel.query.filter_by(aggregate='trip', type='trip.updated').all()
+        assert json.loads(trip_event.data)['changes'] == {'status': ['In Course', 'Completed'], 'distance': [0, 150]}
+        assert db.session.get(TripModel, trip.id).distance == 150
+
+    def test_failure_rolls_back_everything(self, app, auth_headers, monkeypatch):
+        """
+        Test: Un error a mitad de camino no deja cambios parciales
+
+        Verifica que:
+        - Si falla el recálculo de analytics, el kilometraje y el viaje quedan intactos
+        """
+        trip, truck, _ = _seed_trip()
+        trip_id, truck_id = trip.id, truck.truck_id
+
+        def failing_update(user_id, commit=True):
+            raise RuntimeError('analytics caído')
+
+        monkeypatch.setattr(FleetAnalyticsModel, 'update_fleet_analytics', staticmethod(failing_update))
+
+        with pytest.raises(RuntimeError):
+            TripCompletionService.complete(trip, 150)
+
+        assert db.session.get(TruckModel, truck_id).mileage == 5000
+        assert db.session.get(TripModel, trip_id).status == 'In Course'
+        assert MaintenanceModel.query.filter_by(truck_id=truck_id).one().accumulated_km == 900
+
+    def test_version_conflict_is_retried(self, app, auth_headers, monkeypatch):
+        """
+        Test: Un conflicto de versión del camión se reintenta
+
+        Verifica que:
+        - Si otro proceso cambió la versión del camión, el flush falla y se reintenta
+        - El reintento aplica el kilometraje una sola vez
+        - El conflicto queda registrado en las métricas
+        """
+        trip, truck, _ = _seed_trip()
+        truck_id = truck.truck_id
+        conflicts_before = metrics.counter_value('truck_version_conflicts_total', operation='trip_completion')
+        original_complete_trip = TripModel.complete_trip
+        calls = []
+
+        def complete_trip_with_concurrent_writer(self, distance_km):
+            if not calls:
+                # Simula otro worker que actualizó el camión después de nuestra lectura
+                self.truck.mileage
+                db.session.execute(
+                    db.update(TruckModel.__table__)
+                    .where(TruckModel.__table__.c.truck_id == truck_id)
+                    .values(version_id=TruckModel.__table__.c.version_id + 1)
+                )
+            calls.append(distance_km)
+            return original_complete_trip(self, distance_km)
+
+        monkeypatch.setattr(TripModel, 'complete_trip', complete_trip_with_concurrent_writer)
+
+        result = TripCompletionService.complete(trip, 150)
+
+        assert len(calls) == 2
+        assert result['trip']['status'] == 'Completed'
+        assert db.session.get(TruckModel, truck_id).mileage == 5150
+        assert metrics.counter_value('truck_version_conflicts_total', operation='trip_completion') == conflicts_before + 1
+
+    def test_concurrent_completion_is_not_counted_twice(self, app, auth_headers, monkeypatch):
+        """
+        Test: Dos completados del mismo viaje
+
+        Verifica que:
+        - Si el otro completado gana mientras este reintenta un conflicto de versión,
+          el reintento ve el viaje completado y no vuelve a sumar kilómetros
+        """
+        trip, truck, _ = _seed_trip()
+        trip_id, truck_id = trip.id, truck.truck_id
+        original_complete_trip = TripModel.complete_trip
+
+        def complete_trip_with_concurrent_writer(self, distance_km):
+            # El otro completado cambió el camión después de nuestra lectura
+            db.session.execute(
+                db.update(TruckModel.__table__)
+                .where(TruckModel.__table__.c.truck_id == truck_id)
+                .values(version_id=TruckModel.__table__.c.version_id + 1)
+            )
+            return original_complete_trip(self, distance_km)
+
+        def concurrent_completion_commits(seconds):
+            # Durante el backoff el otro completado commitea viaje y kilometraje
+            db.session.execute(db.update(TripModel.__table__)
+                               .where(TripModel.__table__.c.id == trip_id).values(status='Completed'))
+            db.session.execute(db.update(TruckModel.__table__)
+                               .where(TruckModel.__table__.c.truck_id == truck_id).values(mileage=5150))
+            db.session.commit()
+
+        monkeypatch.setattr(TripModel, 'complete_trip', complete_trip_with_concurrent_writer)
+        monkeypatch.setattr(trip_completion.time, 'sleep', concurrent_completion_commits)
+
+        with pytest.raises(TripNotInCourseError):
+            TripCompletionService.complete(trip, 150)
+
+        assert db.session.get(TruckModel, truck_id).mileage == 5150
+        assert MaintenanceModel.query.filter_by(truck_id=truck_id).one().accumulated_km == 900
+
+    def test_claim_lost_to_concurrent_completion(self, app, auth_headers):
+        """
+        Test: El UPDATE condicionado del viaje
+
+        Verifica que:
+        - Si otro completado commiteó después de que este leyó el viaje 'In Course',
+          el paso a 'Completed' no encuentra la fila y no se aplica nada
+        """
+        trip, truck, _ = _seed_trip()
+        trip_id, truck_id = trip.id, truck.truck_id
+        # El objeto en la sesión sigue 'In Course'; en la base ya está completado
+        db.session.execute(db.update(TripModel.__table__)
+                           .where(TripModel.__table__.c.id == trip_id).values(status='Completed'))
+
+        with pytest.raises(TripNotInCourseError):
+            TripCompletionService.complete(trip, 150)
+
+        assert db.session.get(TruckModel, truck_id).mileage == 5000
+
+    def test_complete_endpoint_conflict(self, client, auth_headers, monkeypatch):
+        """
+        Test: PATCH /Trips/<id>/complete de un viaje ya completado
+
+        Verifica que:
+        - El segundo completado responde 409 y no vuelve a sumar kilómetros
+        """
+        trip, truck, _ = _seed_trip()
+        trip_id, truck_id = trip.id, truck.truck_id
+
+        async def fake_distance(self, origin, destination):
+            return {'distance_km': 150.0, 'duration_min': 120.0}
+
+        monkeypatch.setattr(GoogleGetLocation, 'get_distance', fake_distance)
+
+        assert client.patch(f'/Trips/{trip_id}/complete', headers=auth_headers).status_code == 200
+        response = client.patch(f'/Trips/{trip_id}/complete', headers=auth_headers)
+
+        assert response.status_code == 409
+        assert db.session.get(TruckModel, truck_id).mileage == 5150
+
+    def test_complete_endpoint(self, client, auth_headers, monkeypatch):
+        """
+        Test: PATCH /Trips/<id>/complete completa el viaje con la distancia de Google
+
+        Verifica que:
+        - Se devuelve 200 con la distancia registrada en el viaje
+        - Se informan los componentes que alcanzaron su límite
+        """
+        trip, _, _ = _seed_trip()
+
+        async def fake_distance(self, origin, destination):
+            return {'distance_km': 150.0, 'duration_min': 120.0}
+
+        monkeypatch.setattr(GoogleGetLocation, 'get_distance', fake_distance)
+
+        response = client.patch(f'/Trips/{trip.id}/complete', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['id'] == trip.id
+        assert data['distance'] == 150
+        assert data['distance_km'] == 150.0
+        assert data['components_reaching_maintenance_limit'] == ['Aceite']
@@ -5,6 +5,8 @@ from flask_jwt_extended import create_access_token
 from app.models.user import User as UserModel
 import os
 
+# Conteo de queries por request y marker query_budget (ver test/query_budget.py)
+pytest_plugins = ['test.query_budget']
 
 
 @pytest.fixture
@@ -15,10 +17,6 @@ def app():
     # Crear la aplicación
     app = create_app()
     
-    # Limpiar endpoints existentes para evitar conflictos
-    if hasattr(app, 'view_functions'):
-        app.view_functions.clear()
-    
     with app.app_context():
         db.create_all()
         yield app
@@ -0,0 +1,147 @@
+"""
+Plugin de pytest: conteo de queries SQL por request y presupuestos por test
+
+Uso:
+
+    @pytest.mark.query_budget(3)
+    def test_listado(self, client, auth_headers):
+        client.get('/Trucks/all', headers=auth_headers)
+
+Cada request hecho dentro del test puede ejecutar como máximo N statements.
+Si alguno se pasa, el test falla con un reporte de los statements repetidos
+(la firma típica de un N+1). Las queries fuera de un request (armado de datos
+del test) no cuentan.
+
+El fixture `query_counter` permite además asserts explícitos:
+
+    with query_counter.budget(2):
+        client.get(...)
+"""
+from collections import Counter
+from contextlib import contextmanager
+
+import pytest
+from flask import has_request_context, request
+from sqlalchemy import event
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """Registra los statements ejecutados por el engine, agrupados por request"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.requests = []  # [(request, [statements])] en orden de ejecución
+        self._active = False
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not has_request_context():
+            return
+        # La lista vive en el environ: es única por request aunque el app context se comparta
+        statements = request.environ.get('query_budget.statements')
+        if statements is None:
+            statements = request.environ['query_budget.statements'] = []
+            self.requests.append((f'{request.method} {request.path}', statements))
+        statements.append(' '.join(statement.split()))
+
+    def start(self):
+        if not self._active:
+            event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+            self._active = True
+
+    def stop(self):
+        if self._active:
+            event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+            self._active = False
+
+    def reset(self):
+        self.requests = []
+
+    @property
+    def count(self):
+        return sum(len(statements) for _, statements in self.requests)
+
+    def check(self, budget):
+        """Falla si algún request superó el presupuesto"""
+        over = [(label, statements) for label, statements in self.requests if len(statements) > budget]
+        if over:
+            raise QueryBudgetExceeded('\n\n'.join(format_report(label, statements, budget)
+                                                  for label, statements in over))
+
+    @contextmanager
+    def budget(self, max_queries):
+        """Presupuesto para los requests hechos dentro del bloque"""
+        previous = self.requests
+        self.reset()
+        self.start()
+        try:
+            yield self
+            self.check(max_queries)
+        finally:
+            self.requests = previous + self.requests
+
+
+def format_report(label, statements, budget):
+    """Reporte legible: total, presupuesto y statements repetidos agrupados"""
+    lines = [f'{label} ejecutó {len(statements)} queries (presupuesto: {budget})']
+    repeated = [(stmt, n) for stmt, n in Counter(statements).most_common() if n > 1]
+    if repeated:
+        lines.append('Statements repetidos:')
+        for stmt, n in repeated:
+            lines.append(f'  {n}x {_shorten(stmt)}')
+    else:
+        lines.append('Statements:')
+        lines.extend(f'  {_shorten(stmt)}' for stmt in statements)
+    return '\n'.join(lines)
+
+
+def _shorten(statement, limit=300):
+    # Conserva el final (WHERE/ORDER BY), que es lo que distingue dos SELECT de la misma tabla
+    if len(statement) <= limit:
+        return statement
+    return f'{statement[:limit // 2]} ... {statement[-limit // 2:]}'
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budget(n): máximo de queries SQL por request dentro del test (detecta N+1)'
+    )
+
+
+@pytest.fixture
+def query_counter(app):
+    from app import db
+
+    counter = QueryCounter(db.engine)
+    counter.start()
+    yield counter
+    counter.stop()
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_pyfunc_call(pyfuncitem):
+    marker = pyfuncitem.get_closest_marker('query_budget')
+    app = pyfuncitem.funcargs.get('app') if marker else None
+    if app is None:
+        return (yield)
+
+    from app import db
+
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+    counter.start()
+    try:
+        result = yield
+    finally:
+        counter.stop()
+
+    budget = marker.args[0] if marker.args else marker.kwargs['max_queries']
+    try:
+        counter.check(budget)
+    except QueryBudgetExceeded as exc:
+        pytest.fail(str(exc), pytrace=False)
+    return result
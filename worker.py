@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Worker de la cola de trabajos (tabla job, ver app/services/job_queue.py)
+
+Procesa los completados de viaje encolados con TRIP_COMPLETION_MODE=async o
+Prefer: respond-async. Cada MAIL_OUTBOX_INTERVAL segundos envía los mails del
+outbox (app/mail/outbox.py), y cada DOMAIN_EVENT_INTERVAL segundos reparte los
+eventos de dominio a sus consumidores (app/services/domain_events.py). Se pueden
+correr varios: de cada camión corre un trabajo por vez y en orden de llegada,
+cada mail lo reclama un solo worker y cada consumidor corre en un worker a la vez.
+Con SCHEDULER_MODE=worker también corre las tareas periódicas
+(app/services/scheduler.py): cada una en un solo worker por corrida.
+
+Uso:
+    python worker.py            # procesa hasta recibir SIGTERM/SIGINT
+    python worker.py --once     # procesa lo pendiente y sale
+"""
+import argparse
+import logging
+import signal
+import sys
+
+from app import create_app
+from app.mail.outbox import MailOutbox
+from app.services.domain_events import EventDispatcher
+from app.services.job_queue import JobWorker
+from app.services.scheduler import Scheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker de la cola de trabajos')
+    parser.add_argument('--once', action='store_true', help='Procesar lo pendiente y salir')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    app = create_app()
+    worker = JobWorker(app)
+    outbox = MailOutbox(worker.worker_id)
+    dispatcher = EventDispatcher(worker.worker_id)
+    scheduler = Scheduler(app, worker.worker_id)
+    run_scheduler = app.config['SCHEDULER_MODE'] == 'worker'
+
+    if args.once:
+        print(f"{worker.run_pending()} trabajos procesados")
+        with app.app_context():
+            print(f"{outbox.drain()} mails enviados")
+            print(f"{dispatcher.dispatch()} eventos de dominio entregados")
+            if run_scheduler:
+                print(f"Tareas periódicas: {scheduler.run_pending() or 'ninguna vencida'}")
+        return 0
+
+    worker.every(app.config['MAIL_OUTBOX_INTERVAL'], outbox.drain)
+    worker.every(app.config['DOMAIN_EVENT_INTERVAL'], dispatcher.dispatch)
+    if run_scheduler:
+        worker.every(app.config['SCHEDULER_TICK_SECONDS'], scheduler.run_pending)
+
+    # Termina el trabajo en curso antes de salir
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: worker.stop())
+    worker.run_forever()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,8 @@
+"""
+Entry point WSGI de producción:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+
+app = create_app()